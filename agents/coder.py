@@ -9,10 +9,17 @@ Uses the configured provider profile for code generation, with OpenAI-first defa
 
 from __future__ import annotations
 
+import ast
 import asyncio
+import json
 import logging
+import os
 import re
-from typing import Iterator
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
 
 from agents.config import (
     MAX_TOOL_CALLS_COMPLEX,
@@ -21,18 +28,27 @@ from agents.config import (
     MAX_TOOL_CALLS_FIX_SIMPLE,
     MAX_TOOL_CALLS_MEDIUM,
     MAX_TOOL_CALLS_SIMPLE,
+    merge_token_usage,
     new_token_counter,
     resolve_fallback_stage_model,
     resolve_stage_model,
 )
+from utils.code_patch import apply_unified_diff, looks_like_diff
+from utils.code_verifier import static_quality_check
+from utils.context_prefetch import prefetch_segment_context
 from utils.golden_scenes import fetch_golden_scenes
-from utils.llm_provider import run_tool_completion
+from utils.layout_analyzer import analyze_scene_layout, report_from_layout_trace
+from utils.llm_provider import merge_tool_latency, run_tool_completion
 from utils.manim_docs import (
     fetch_manim_docs,
     fetch_manim_file,
     get_topic_index_description,
 )
 from utils.manim_runner import dry_run_manim_code, extract_class_name, validate_manim_code
+from utils.model_router import get_model_router
+from utils.prompt_layout import PromptLayout
+from utils.repair_rules import try_auto_fix
+from utils.scene_timing import fit_scene_to_duration
 from utils.web_search import search_web
 
 _log = logging.getLogger(__name__)
@@ -40,6 +56,51 @@ _log = logging.getLogger(__name__)
 # ── helpers ───────────────────────────────────────────────────────────
 
 _CODE_FENCE_RE = re.compile(r"```(?:python)?\s*\n?|```\s*$", re.MULTILINE)
+# Local rule-based fixes chained per attempt before escalating to the LLM.
+_MAX_AUTO_FIXES = 3
+# Tools whose answers the spec-driven prefetch can inline up front.
+_LOOKUP_TOOLS = ("fetch_manim_docs", "fetch_manim_file", "fetch_golden_scenes")
+# Prompt variations that spread best-of-N candidates across different designs.
+_CANDIDATE_STRATEGIES = (
+    "",
+    "Candidate strategy: favor the simplest reliable primitives (Text, MathTex, basic shapes, "
+    "Create/Write/FadeIn/Transform) and avoid updaters and always_redraw.",
+    "Candidate strategy: organize the frame into clearly separated zones with VGroup.arrange and "
+    "next_to, and fade out each idea before introducing the next.",
+    "Candidate strategy: build one persistent anchor visual and evolve it with Transform/ReplacementTransform "
+    "rather than introducing many separate objects.",
+)
+# Brief grace the final report gives abandoned candidates to stop; any still
+# mid-turn are reported as unsettled rather than delaying the winner.
+_ABANDONED_SETTLE_SECONDS = 0.5
+
+
+def _layout_probe_enabled() -> bool:
+    """Whether dry runs should record a layout trace (PAPER2MANIM_LAYOUT_PROBE)."""
+    return os.getenv("PAPER2MANIM_LAYOUT_PROBE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _patch_repairs_enabled() -> bool:
+    """Whether repairs ask for a unified diff first (PAPER2MANIM_PATCH_REPAIRS)."""
+    return os.getenv("PAPER2MANIM_PATCH_REPAIRS", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _doc_prefetch_enabled() -> bool:
+    """Whether likely docs are inlined before generation (PAPER2MANIM_DOC_PREFETCH)."""
+    return os.getenv("PAPER2MANIM_DOC_PREFETCH", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _lookup_calls(tool_call_counts: dict[str, int] | None) -> int:
+    counts = tool_call_counts or {}
+    return sum(counts.get(name, 0) for name in _LOOKUP_TOOLS)
+
+
+def _code_candidates() -> int:
+    """Number of concurrent code candidates per segment (PAPER2MANIM_CODE_CANDIDATES)."""
+    try:
+        return max(1, int(os.getenv("PAPER2MANIM_CODE_CANDIDATES", "1")))
+    except ValueError:
+        return 1
 
 
 def _strip_code_fences(text: str) -> str:
@@ -295,7 +356,8 @@ def _build_tools() -> list[dict]:
             "name": "fetch_manim_docs",
             "description": (
                 "Retrieve Manim source documentation for a topic. "
-                "Pass a keyword like 'circle', 'transform', 'axes', 'scene', etc."
+                "Pass a keyword like 'circle', 'transform', 'axes', 'scene', etc., "
+                "or a class/method name like 'MathTex' or 'next_to'."
             ),
             "input_schema": {
                 "type": "object",
@@ -327,10 +389,18 @@ def _build_tools() -> list[dict]:
         },
         {
             "name": "fetch_golden_scenes",
-            "description": "Returns high-quality golden reference Manim scenes for inspiration. Takes no arguments.",
+            "description": (
+                "Returns the high-quality golden reference Manim scenes most relevant to what you are building. "
+                "Describe the scene's needs, e.g. 'equation rearrangement with MathTex and TransformMatchingTex'."
+            ),
             "input_schema": {
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The Manim classes and techniques the scene needs.",
+                    }
+                },
             },
         },
         {
@@ -349,7 +419,6 @@ def _build_tools() -> list[dict]:
                 },
                 "required": ["query"],
             },
-            "cache_control": {"type": "ephemeral"},
         },
     ]
 
@@ -362,7 +431,7 @@ def _dispatch_tool_call(name: str, input_args: dict) -> str:
         elif name == "fetch_manim_file":
             return fetch_manim_file(**input_args)
         elif name == "fetch_golden_scenes":
-            return fetch_golden_scenes()
+            return fetch_golden_scenes(**input_args)
         elif name == "search_web":
             return search_web(**input_args)
         else:
@@ -381,6 +450,8 @@ def _send_and_extract(
     on_status: object | None = None,
     *,
     fix: bool = False,
+    tool_latency: dict[str, dict] | None = None,
+    cancelled: threading.Event | None = None,
 ) -> str:
     """Send a message via the configured provider, handle tool calls,
     and return the final text with code fences stripped."""
@@ -400,7 +471,10 @@ def _send_and_extract(
         tool_call_counts=tool_call_counts,
         token_counter=token_counter,
         on_status=on_status if callable(on_status) else None,
-        cache_key_parts=("repair" if fix else "generate", primary.model, ",".join(tool["name"] for tool in tools)),
+        cache_key_parts=("code",),
+        stage="code",
+        tool_latency=tool_latency,
+        cancelled=cancelled,
     )
     return _strip_code_fences(result.text)
 
@@ -421,14 +495,23 @@ def generate_manim_script(
     on_status: object | None = None,
     repair_feedback: str = "",
     quality_mode: str = "balanced",
+    strategy_hint: str = "",
+    tool_latency: dict[str, dict] | None = None,
+    cancelled: threading.Event | None = None,
 ) -> Iterator[str]:
-    """Yield the final generated code (single yield after tool calls resolve)."""
+    """Yield the final generated code (single yield after tool calls resolve).
+
+    *strategy_hint* steers one of several best-of-N candidates toward a
+    different design so parallel candidates do not fail the same way;
+    setting *cancelled* stops an abandoned candidate before its next turn.
+    When docs were prefetched from the spec, a ``"prefetch:<json>"`` chunk
+    reporting lookups inlined and round trips avoided precedes the code.
+    """
     model = _get_model_for_complexity(complexity)
     max_tool_calls = _get_tool_budget(complexity)
-    system_sections = [
-        SYSTEM_INSTRUCTION,
-        f"Hard tool budget for this segment: {max_tool_calls} total function calls.",
-    ]
+    # Most-shared content first so the provider prompt cache reuses it
+    # across segments; everything segment-specific goes in the user message.
+    layout = PromptLayout(instructions=[SYSTEM_INSTRUCTION])
 
     # Build the prompt dynamically based on whether it's Lite (str) or Pro (dict)
     if isinstance(instructions, str):
@@ -436,17 +519,21 @@ def generate_manim_script(
             "Write a complete Manim script for the following visual instructions.\n"
             "Prefer writing code immediately using core Manim primitives.\n"
             "Only use docs lookup if absolutely necessary.\n\n"
-            f"The scene class MUST be named `{scene_class_name}`.\n\n"
             f"Instructions:\n{instructions}\n\n"
         )
     else:
         # Structured Pro segment
         seg = instructions
 
-        # Merge theme and segment-specific colors
+        # Theme and palette are shared by every segment of the project.
         palette_str = "No specific palette provided."
         if color_palette:
             palette_str = "\n".join([f"- {k}: {v}" for k, v in color_palette.items()])
+        layout.project.append(
+            f"### Visual Theme: {theme_name or 'Default'}\n"
+            f"Global Color Palette:\n{palette_str}\n\n"
+            f"Set background: self.camera.background_color = \"{(color_palette or {}).get('Background', '#141414')}\""
+        )
 
         equations_str = "\n".join([f"- {eq}" for eq in seg.get('equations_latex', [])])
         vars_str = "\n".join([f"- {k}: {v}" for k, v in seg.get('variable_definitions', {}).items()])
@@ -457,9 +544,6 @@ def generate_manim_script(
         prompt = (
             "Write a complete Manim script for the following highly structured scene specification.\n"
             "This is a DETAILED production spec — follow it precisely.\n\n"
-            f"The scene class MUST be named `{scene_class_name}`.\n\n"
-            f"### Visual Theme: {theme_name or 'Default'}\n"
-            f"Global Color Palette:\n{palette_str}\n\n"
             f"### Mathematical Content (CRITICAL)\n"
             f"You MUST use THESE EXACT LaTeX strings using double backslashes (e.g. r\"$\\frac{{1}}{{2}}$\"):\n{equations_str}\n\n"
             f"Variable Meanings (for your understanding):\n{vars_str}\n\n"
@@ -476,7 +560,7 @@ def generate_manim_script(
             f"{seg.get('visual_instructions', '')}\n\n"
             f"### Required Animations:\n{animations_str}\n\n"
             f"### CRITICAL REQUIREMENTS — FOLLOW THE SPEC EXACTLY\n"
-            f"- Set background: self.camera.background_color = \"{(color_palette or {}).get('Background', '#141414')}\"\n"
+            f"- Set the background color from the Visual Theme\n"
             f"- Every self.play() MUST have run_time parameter\n"
             f"- Add self.wait() after every animation beat\n"
             f"- You MUST use the EXACT hex colors listed in Element Color Mapping above — do NOT substitute or improvise colors\n"
@@ -499,6 +583,9 @@ def generate_manim_script(
             "Quality mode is FAST. Prefer simpler, reliable scenes and avoid ambitious density or expensive effects.\n\n"
         )
 
+    if strategy_hint:
+        prompt += f"{strategy_hint}\n\n"
+
     if repair_feedback:
         prompt += (
             "### QUALITY REPAIR FEEDBACK\n"
@@ -526,6 +613,19 @@ def generate_manim_script(
             f"```python\n{few_shot_example[:6000]}\n```\n"
         )
 
+    prefetch = prefetch_segment_context(instructions) if _doc_prefetch_enabled() else None
+    if prefetch is not None and prefetch.section:
+        layout.reference.append(prefetch.section)
+    lookups_before = _lookup_calls(tool_call_counts)
+
+    layout.segment = [
+        prompt,
+        f"The scene class MUST be named `{scene_class_name}`.\n"
+        f"Hard tool budget for this segment: {max_tool_calls} total function calls.",
+    ]
+    system_sections = layout.system_sections()
+    prompt = layout.user_message()
+
     yield "looking up docs"  # signal to caller
 
     code = _send_and_extract(
@@ -534,6 +634,8 @@ def generate_manim_script(
         tool_call_counts=tool_call_counts,
         token_counter=token_counter,
         on_status=on_status,
+        tool_latency=tool_latency,
+        cancelled=cancelled,
     )
     if not code:
         _log.debug("falling back to tool-less generation (model=%s)", model)
@@ -543,8 +645,20 @@ def generate_manim_script(
             tool_call_counts=tool_call_counts,
             token_counter=token_counter,
             on_status=on_status,
+            tool_latency=tool_latency,
+            cancelled=cancelled,
         )
 
+    if prefetch is not None and prefetch.lookups:
+        still_fetched = _lookup_calls(tool_call_counts) - lookups_before
+        yield "prefetch:" + json.dumps({
+            "topics": prefetch.topics,
+            "golden": prefetch.golden,
+            "lookups_inlined": prefetch.lookups,
+            "round_trips_avoided": max(0, prefetch.lookups - still_fetched),
+            "elapsed_seconds": prefetch.elapsed_seconds,
+        })
+
     # Lightweight spec compliance check for Pro segments
     if code and isinstance(instructions, dict):
         missing = []
@@ -593,12 +707,18 @@ def fix_manim_script(
     original_instructions: str = "",
     repair_attempt: int = 0,
     token_counter: dict | None = None,
+    patch: bool = False,
+    tool_latency: dict[str, dict] | None = None,
 ) -> Iterator[str]:
     """Yield the corrected code after consulting docs.
 
     Args:
         repair_attempt: How many prior fix attempts have already failed (0 = first fix).
             Controls the escalating repair strategy hint appended to the prompt.
+        patch: Ask for a unified diff instead of the whole file.  The diff is
+            applied locally; if it does not apply or the result does not
+            parse, the repair falls back to a full rewrite.  Ignored once the
+            strategy hint asks for a rewrite from scratch.
     """
     model = _get_model_for_complexity(complexity)
     max_tool_calls = _get_tool_budget(complexity, fix=True)
@@ -655,18 +775,240 @@ def fix_manim_script(
 
     yield "looking up docs"
 
+    if patch and repair_attempt < 2:
+        patched = _patch_repair(
+            code, prompt, complexity, max_tool_calls, tool_call_counts, token_counter, on_status,
+            tool_latency=tool_latency,
+        )
+        if patched:
+            yield patched
+            return
+
     fixed = _send_and_extract(
         complexity, system_sections, prompt,
         max_tool_calls=max_tool_calls,
         tool_call_counts=tool_call_counts,
         token_counter=token_counter,
         on_status=on_status,
+        tool_latency=tool_latency,
         fix=True,
     )
     if fixed:
         yield fixed
 
 
+def _patch_repair(
+    code: str,
+    prompt: str,
+    complexity: str,
+    max_tool_calls: int,
+    tool_call_counts: dict[str, int] | None,
+    token_counter: dict | None,
+    on_status: object | None,
+    tool_latency: dict[str, dict] | None = None,
+) -> str:
+    """Request a unified diff for *prompt* and apply it to *code*.
+
+    Returns the patched code, or "" when the caller should fall back to a
+    full rewrite.  Estimated output tokens and seconds saved versus a full
+    rewrite are added to *token_counter*.
+    """
+    counter = token_counter if token_counter is not None else new_token_counter()
+    patch_prompt = prompt.replace(
+        "Fix the code and return the COMPLETE corrected Python file.",
+        "Fix the code and return ONLY a unified diff against the current code "
+        "(@@ hunk headers, 2 lines of unchanged context, no file headers), not the whole file.",
+        1,
+    )
+    outputs_before = counter["output_tokens"]
+    started = time.perf_counter()
+    reply = _send_and_extract(
+        complexity, [SYSTEM_INSTRUCTION], patch_prompt,
+        max_tool_calls=max_tool_calls,
+        tool_call_counts=tool_call_counts,
+        token_counter=counter,
+        on_status=on_status,
+        tool_latency=tool_latency,
+        fix=True,
+    )
+    elapsed = time.perf_counter() - started
+    out_tokens = counter["output_tokens"] - outputs_before
+
+    if looks_like_diff(reply):
+        patched = apply_unified_diff(code, reply)
+    elif "class " in reply and "def construct" in reply:
+        patched = reply  # the model sent the whole file anyway
+    else:
+        patched = None
+    if patched:
+        try:
+            ast.parse(patched)
+        except SyntaxError:
+            patched = None
+    if not patched:
+        _log.info("Patch repair did not apply; falling back to a full rewrite")
+        counter["repair_patch_fallbacks"] += 1
+        return ""
+
+    counter["repair_patches_applied"] += 1
+    # A full rewrite would have emitted roughly the whole patched file.
+    saved = max(0, len(patched) // 4 - out_tokens)
+    counter["repair_output_tokens_saved"] += saved
+    if out_tokens > 0 and elapsed > 0:
+        counter["repair_seconds_saved"] += round(saved * elapsed / out_tokens, 2)
+    return patched
+
+
+# ── best-of-N candidates ─────────────────────────────────────────────
+
+@dataclass
+class _Candidate:
+    """One speculative code candidate and its dry-run outcome."""
+
+    index: int
+    code: str = ""
+    spec_gaps: str = ""
+    result: Optional[dict] = None  # dry-run result; None when never run
+    score: float = 0.0  # static-analysis rank, lower is better
+    elapsed_seconds: float = 0.0
+    token_usage: dict = field(default_factory=new_token_counter)
+    tool_call_counts: dict[str, int] = field(default_factory=dict)
+    tool_latency: dict[str, dict] = field(default_factory=dict)
+    prefetch: Optional[dict] = None
+    model: str = ""  # provider:model that wrote the code
+    # Set once the candidate's counters stop changing (finished, failed or never started).
+    settled: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def passed(self) -> bool:
+        return bool(self.result and self.result["success"])
+
+
+def _static_rank(code: str, audio_duration: float, layout_trace: dict | None = None) -> float:
+    """Rank a candidate by layout/timing findings, clutter heuristics and duration miss."""
+    if layout_trace:
+        report = report_from_layout_trace(layout_trace, audio_duration)
+    else:
+        report = analyze_scene_layout(code, audio_duration)
+    score = len(report.issues) + 0.25 * len(report.warnings) + len(static_quality_check(code))
+    if report.total_duration is not None and audio_duration > 0:
+        score += min(abs(report.total_duration - audio_duration), 10.0) / 5.0
+    return round(score, 3)
+
+
+def _run_candidate(
+    candidate: _Candidate,
+    generate_kwargs: dict,
+    audio_duration: float,
+    cancelled: threading.Event,
+    on_status: object | None = None,
+) -> _Candidate:
+    """Generate one candidate and dry-run it unless a sibling already won."""
+    try:
+        return _generate_candidate(candidate, generate_kwargs, audio_duration, cancelled, on_status)
+    finally:
+        candidate.settled.set()
+
+
+def _generate_candidate(
+    candidate: _Candidate,
+    generate_kwargs: dict,
+    audio_duration: float,
+    cancelled: threading.Event,
+    on_status: object | None,
+) -> _Candidate:
+    started = time.perf_counter()
+    for chunk in generate_manim_script(
+        **generate_kwargs,
+        strategy_hint=_CANDIDATE_STRATEGIES[candidate.index % len(_CANDIDATE_STRATEGIES)],
+        tool_call_counts=candidate.tool_call_counts,
+        tool_latency=candidate.tool_latency,
+        token_counter=candidate.token_usage,
+        on_status=on_status,
+        cancelled=cancelled,
+    ):
+        if chunk == "looking up docs":
+            continue
+        if chunk.startswith("spec_gaps:"):
+            candidate.spec_gaps = chunk[len("spec_gaps:"):]
+            continue
+        if chunk.startswith("prefetch:"):
+            candidate.prefetch = json.loads(chunk[len("prefetch:"):])
+            continue
+        candidate.code = chunk
+    router = get_model_router()
+    candidate.model = router.last_model("code")
+
+    if candidate.code and not cancelled.is_set():
+        validation = validate_manim_code(candidate.code)
+        if validation["errors"]:
+            candidate.result = {
+                "success": False,
+                "error": "Pre-execution validation failed:\n" + "\n".join(validation["errors"]),
+                "error_type": "validation",
+            }
+        else:
+            candidate.result = dry_run_manim_code(
+                candidate.code, extract_class_name(candidate.code), trace_layout=_layout_probe_enabled(),
+            )
+        candidate.score = _static_rank(candidate.code, audio_duration, candidate.result.get("layout_trace"))
+        if candidate.result.get("error_type") != "validation":
+            router.record_outcome("code", candidate.model, passed=candidate.passed)
+    candidate.elapsed_seconds = round(time.perf_counter() - started, 2)
+    return candidate
+
+
+def _race_candidates(
+    count: int,
+    generate_kwargs: dict,
+    audio_duration: float,
+    on_status: object | None = None,
+) -> tuple[Optional[_Candidate], list[_Candidate], list[_Candidate]]:
+    """Run *count* candidates concurrently; the first dry-run pass wins.
+
+    When several candidates have passed by the time one is checked, the best
+    static rank wins.  Still-running siblings are abandoned: queued ones are
+    cancelled, running ones stop before their next model turn and skip their
+    dry run.  With no passing candidate the best-ranked generated one is
+    returned so the repair loop can start from it.  Returns
+    ``(chosen, finished, abandoned)``; an abandoned candidate's counters are
+    final once its ``settled`` event is set.
+    """
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=count, thread_name_prefix="code-candidate")
+    candidates = {
+        pool.submit(_run_candidate, candidate, generate_kwargs, audio_duration, cancelled, on_status): candidate
+        for candidate in (_Candidate(index=index) for index in range(count))
+    }
+    pending = set(candidates)
+    finished: list[_Candidate] = []
+    winner: Optional[_Candidate] = None
+    try:
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                # A failed candidate may still have spent tokens and tool calls.
+                finished.append(candidates[future])
+                if future.exception() is not None:
+                    _log.warning("Code candidate failed: %s", future.exception())
+            passing = [c for c in finished if c.passed]
+            if passing:
+                winner = min(passing, key=lambda c: (c.score, c.index))
+    finally:
+        cancelled.set()
+        for future in pending:
+            if future.cancel():
+                candidates[future].settled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    abandoned = sorted((candidates[future] for future in pending), key=lambda c: c.index)
+    if winner is not None:
+        return winner, finished, abandoned
+    generated = [c for c in finished if c.code]
+    chosen = min(generated, key=lambda c: (c.score, c.index)) if generated else None
+    return chosen, finished, abandoned
+
+
 # ── orchestrator ──────────────────────────────────────────────────────
 
 def run_coder_agent(
@@ -683,6 +1025,7 @@ def run_coder_agent(
     few_shot_example: str = "",
     repair_feedback: str = "",
     quality_mode: str = "balanced",
+    candidates: int | None = None,
 ):
     """Generate a Manim script, execute it, self-correct up to *max_retries*.
 
@@ -692,18 +1035,48 @@ def run_coder_agent(
         complexity: "simple" or "complex" — controls which model is used.
         scene_class_name: The Manim Scene class name to generate.
         output_dir: Optional custom output directory for the rendered video.
+        candidates: Number of initial candidates generated and dry-run in
+            parallel (first pass wins).  Defaults to PAPER2MANIM_CODE_CANDIDATES.
     """
     model_config = resolve_stage_model("code", complexity=complexity)
     model_label = model_config.model
     _seg = f"[Seg {segment_id}] " if segment_id is not None else ""
     code = ""
     tool_call_counts: dict[str, int] = {}
+    tool_latency: dict[str, dict] = {}
     coder_tokens = new_token_counter()
+    abandoned: list[_Candidate] = []
+
+    def _merge_candidate_usage(candidate: _Candidate) -> None:
+        merge_token_usage(coder_tokens, candidate.token_usage)
+        for name, count in candidate.tool_call_counts.items():
+            tool_call_counts[name] = tool_call_counts.get(name, 0) + count
+        merge_tool_latency(tool_latency, candidate.tool_latency)
+
+    def _settle_abandoned() -> None:
+        # Abandoned candidates stop at their next model turn; bill the ones already stopped.
+        if not abandoned:
+            return
+        deadline = time.monotonic() + _ABANDONED_SETTLE_SECONDS
+        spent = {"input_tokens": 0, "output_tokens": 0, "api_calls": 0, "tool_calls": 0, "unsettled": 0}
+        for candidate in abandoned:
+            if not candidate.settled.wait(max(0.0, deadline - time.monotonic())):
+                spent["unsettled"] += 1
+                continue
+            _merge_candidate_usage(candidate)
+            for key in ("input_tokens", "output_tokens", "api_calls"):
+                spent[key] += candidate.token_usage.get(key, 0)
+            spent["tool_calls"] += sum(candidate.tool_call_counts.values())
+        abandoned.clear()
+        if candidates_info is not None:
+            candidates_info["abandoned_usage"] = spent
 
     def _attach_tool_usage(payload: dict) -> dict:
+        _settle_abandoned()
         counts = dict(sorted(tool_call_counts.items()))
         payload["tool_call_counts"] = counts
         payload["total_tool_calls"] = sum(counts.values())
+        payload["tool_latency"] = dict(sorted(tool_latency.items()))
         payload["token_usage"] = dict(coder_tokens)
         payload["model_info"] = {"provider": model_config.provider, "model": model_label}
         return payload
@@ -719,29 +1092,106 @@ def run_coder_agent(
         _rate_limit_msgs.append(msg)
 
     spec_gaps = ""
-    for chunk in generate_manim_script(
-        instructions, audio_script, audio_duration,
-        complexity=complexity, scene_class_name=scene_class_name,
-        tool_call_counts=tool_call_counts,
-        theme_name=theme_name,
-        color_palette=color_palette,
-        few_shot_example=few_shot_example,
-        token_counter=coder_tokens,
-        on_status=_on_rate_limit,
-        repair_feedback=repair_feedback,
-        quality_mode=quality_mode,
-    ):
-        # Surface any rate-limit notifications collected during API calls
+    prefetch_info: dict | None = None
+    code_model = ""  # provider:model that wrote the current code, for router telemetry
+    candidate_count = candidates if candidates is not None else _code_candidates()
+    candidates_info: dict | None = None
+    # A winning candidate's dry run is reused by the first attempt below.
+    pending_result: dict | None = None
+    if candidate_count > 1:
+        yield {
+            "status": f"{_seg}Generating {candidate_count} candidates in parallel via {model_label}...",
+            "phase": "candidates",
+        }
+        chosen, finished, raced_out = _race_candidates(
+            candidate_count,
+            {
+                "instructions": instructions,
+                "audio_script": audio_script,
+                "audio_duration": audio_duration,
+                "complexity": complexity,
+                "scene_class_name": scene_class_name,
+                "theme_name": theme_name,
+                "color_palette": color_palette,
+                "few_shot_example": few_shot_example,
+                "repair_feedback": repair_feedback,
+                "quality_mode": quality_mode,
+            },
+            audio_duration,
+            on_status=_on_rate_limit,
+        )
+        abandoned.extend(raced_out)
+        for candidate in finished:
+            _merge_candidate_usage(candidate)
         while _rate_limit_msgs:
             yield {"status": f"{_seg}{_rate_limit_msgs.pop(0)}", "phase": "rate_limited"}
-        if chunk == "looking up docs":
-            yield {"status": f"{_seg}Generating with {model_config.provider}:{model_label}...", "phase": "docs"}
-            continue
-        if chunk.startswith("spec_gaps:"):
-            spec_gaps = chunk[len("spec_gaps:"):]
-            continue
-        code = chunk
-        yield {"status": f"{_seg}Generating initial Manim script...", "code": code, "phase": "generate"}
+        passed = sum(1 for c in finished if c.passed)
+        candidates_info = {
+            "requested": candidate_count,
+            "completed": len(finished),
+            "passed": passed,
+            "abandoned": len(abandoned),
+            "selected": chosen.index if chosen else None,
+            "scores": {c.index: c.score for c in finished if c.code},
+        }
+        if chosen is not None:
+            code = chosen.code
+            code_model = chosen.model
+            spec_gaps = chosen.spec_gaps
+            prefetch_info = chosen.prefetch
+            if chosen.result and chosen.result.get("error_type") != "validation":
+                pending_result = chosen.result
+            outcome = "passed dry run" if chosen.passed else "best ranked, none passed dry run"
+            yield {
+                "status": (
+                    f"{_seg}Selected candidate {chosen.index + 1}/{candidate_count} ({outcome}; "
+                    f"{passed} passed, {len(abandoned)} abandoned) in {chosen.elapsed_seconds:.1f}s"
+                ),
+                "code": code,
+                "phase": "candidates",
+                "candidates": candidates_info,
+            }
+    else:
+        for chunk in generate_manim_script(
+            instructions, audio_script, audio_duration,
+            complexity=complexity, scene_class_name=scene_class_name,
+            tool_call_counts=tool_call_counts,
+            tool_latency=tool_latency,
+            theme_name=theme_name,
+            color_palette=color_palette,
+            few_shot_example=few_shot_example,
+            token_counter=coder_tokens,
+            on_status=_on_rate_limit,
+            repair_feedback=repair_feedback,
+            quality_mode=quality_mode,
+        ):
+            # Surface any rate-limit notifications collected during API calls
+            while _rate_limit_msgs:
+                yield {"status": f"{_seg}{_rate_limit_msgs.pop(0)}", "phase": "rate_limited"}
+            if chunk == "looking up docs":
+                yield {"status": f"{_seg}Generating with {model_config.provider}:{model_label}...", "phase": "docs"}
+                continue
+            if chunk.startswith("spec_gaps:"):
+                spec_gaps = chunk[len("spec_gaps:"):]
+                continue
+            if chunk.startswith("prefetch:"):
+                prefetch_info = json.loads(chunk[len("prefetch:"):])
+                continue
+            code = chunk
+            yield {"status": f"{_seg}Generating initial Manim script...", "code": code, "phase": "generate"}
+        code_model = get_model_router().last_model("code")
+
+    if prefetch_info:
+        coder_tokens["prefetch_lookups_inlined"] += prefetch_info["lookups_inlined"]
+        coder_tokens["prefetch_round_trips_avoided"] += prefetch_info["round_trips_avoided"]
+        yield {
+            "status": (
+                f"{_seg}Inlined {prefetch_info['lookups_inlined']} doc lookups from the spec "
+                f"({prefetch_info['round_trips_avoided']} tool round trips avoided)"
+            ),
+            "phase": "docs",
+            "context_prefetch": prefetch_info,
+        }
 
     if not code:
         yield _attach_tool_usage({
@@ -786,6 +1236,8 @@ def run_coder_agent(
                     original_instructions=original_instructions,
                     repair_attempt=attempt,
                     token_counter=coder_tokens,
+                    patch=_patch_repairs_enabled(),
+                    tool_latency=tool_latency,
                 ):
                     while _rate_limit_msgs:
                         yield {"status": f"{_seg}{_rate_limit_msgs.pop(0)}", "phase": "rate_limited"}
@@ -807,6 +1259,7 @@ def run_coder_agent(
                     })
                     return
                 code = updated_code
+                code_model = get_model_router().last_model("code") or code_model
                 continue
             else:
                 yield _attach_tool_usage({
@@ -823,17 +1276,69 @@ def run_coder_agent(
             "phase": "execute",
         }
 
-        result = dry_run_manim_code(code, class_name)
+        if pending_result is not None:
+            result, pending_result = pending_result, None
+        else:
+            result = dry_run_manim_code(code, class_name, trace_layout=_layout_probe_enabled())
+            # Model-written code only; the router tracks pass rate per (stage, model).
+            get_model_router().record_outcome("code", code_model, passed=result["success"])
+
+        # Known error signatures are fixed locally and re-run, no LLM needed.
+        for _ in range(_MAX_AUTO_FIXES):
+            if result["success"] or result.get("error_type") == "timeout":
+                break
+            auto = try_auto_fix(code, result["error"] or "")
+            if auto is None:
+                coder_tokens["auto_fix_escalations"] += 1
+                break
+            coder_tokens["auto_fixes_applied"] += 1
+            code = auto.code
+            yield {
+                "status": f"{_seg}Applied local fix for {auto.signature.key}: {auto.description}. Re-running dry run...",
+                "code": code,
+                "phase": "auto_fix",
+            }
+            class_name = extract_class_name(code)
+            result = dry_run_manim_code(code, class_name, trace_layout=_layout_probe_enabled())
 
         if result["success"]:
-            yield _attach_tool_usage({
+            layout_trace = result.get("layout_trace")
+            # Fit the ending to the narration now so stitching needs no pad/trim re-encode.
+            fit = fit_scene_to_duration(code, audio_duration, layout_trace)
+            if fit is not None:
+                code = fit.code
+                layout_trace = fit.layout_trace
+                yield {
+                    "status": (
+                        f"{_seg}Re-timed ending: scene runs {fit.estimated_seconds:.1f}s -> "
+                        f"{fit.fitted_seconds:.1f}s for {audio_duration:.1f}s narration"
+                    ),
+                    "code": code,
+                    "phase": "retime",
+                }
+            done = {
                 "status": f"{_seg}Validation passed. Code ready for HD render.",
                 "video_path": None,
                 "code_validated": True,
                 "code": code,
                 "phase": "done",
                 "final": True,
-            })
+            }
+            if fit is not None:
+                done["timing_fit"] = {
+                    "estimated_seconds": fit.estimated_seconds,
+                    "fitted_seconds": fit.fitted_seconds,
+                    "target_seconds": round(audio_duration, 2),
+                }
+            if layout_trace:
+                done["layout_trace"] = layout_trace
+            if candidates_info:
+                done["candidates"] = candidates_info
+            if prefetch_info:
+                done["context_prefetch"] = prefetch_info
+            if code_model:
+                done["model"] = code_model
+            yield _attach_tool_usage(done)
             return
 
         if attempt < max_retries:
@@ -864,6 +1369,8 @@ def run_coder_agent(
                 original_instructions=original_instructions,
                 repair_attempt=attempt,
                 token_counter=coder_tokens,
+                patch=_patch_repairs_enabled(),
+                tool_latency=tool_latency,
             ):
                 while _rate_limit_msgs:
                     yield {"status": f"{_seg}{_rate_limit_msgs.pop(0)}", "phase": "rate_limited"}
@@ -887,6 +1394,7 @@ def run_coder_agent(
                 return
 
             code = updated_code
+            code_model = get_model_router().last_model("code") or code_model
         else:
             yield _attach_tool_usage({
                 "status": f"{_seg}Failed to generate a working script after {max_retries + 1} attempts.",
@@ -914,6 +1422,7 @@ async def run_coder_agent_async(
     few_shot_example: str = "",
     repair_feedback: str = "",
     quality_mode: str = "balanced",
+    candidates: int | None = None,
 ) -> dict:
     """Async wrapper around ``run_coder_agent``.
 
@@ -940,6 +1449,7 @@ async def run_coder_agent_async(
             few_shot_example=few_shot_example,
             repair_feedback=repair_feedback,
             quality_mode=quality_mode,
+            candidates=candidates,
         ):
             if on_update:
                 try:
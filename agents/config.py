@@ -87,6 +87,22 @@ def new_token_counter() -> dict[str, Any]:
         "cache_creation_input_tokens": 0,
         "cache_read_input_tokens": 0,
         "fallback_invocations": 0,
+        # All prompt tokens, cached or not, for the per-stage cache hit rate.
+        "prompt_input_tokens": 0,
+        # Patch-mode repairs (see agents.coder.fix_manim_script).
+        "repair_patches_applied": 0,
+        "repair_patch_fallbacks": 0,
+        "repair_output_tokens_saved": 0,
+        "repair_seconds_saved": 0.0,
+        # Rule-based local fixes (see utils.repair_rules).
+        "auto_fixes_applied": 0,
+        "auto_fix_escalations": 0,
+        # Spec-driven doc prefetch (see utils.context_prefetch).
+        "prefetch_lookups_inlined": 0,
+        "prefetch_round_trips_avoided": 0,
+        # Hedged duplicate LLM requests (see utils.llm_provider._hedged).
+        "hedged_requests": 0,
+        "hedge_wins": 0,
     }
 
 
@@ -100,10 +116,30 @@ def merge_token_usage(target: dict[str, Any], source: dict[str, Any]) -> None:
         "cache_creation_input_tokens",
         "cache_read_input_tokens",
         "fallback_invocations",
+        "prompt_input_tokens",
+        "repair_patches_applied",
+        "repair_patch_fallbacks",
+        "repair_output_tokens_saved",
+        "repair_seconds_saved",
+        "auto_fixes_applied",
+        "auto_fix_escalations",
+        "prefetch_lookups_inlined",
+        "prefetch_round_trips_avoided",
+        "hedged_requests",
+        "hedge_wins",
     ):
         target[field] = target.get(field, 0) + source.get(field, 0)
 
 
+def cache_hit_rate(counter: dict[str, Any]) -> float:
+    """Fraction of prompt tokens served from the provider prompt cache."""
+    prompt_tokens = counter.get("prompt_input_tokens", 0)
+    if not prompt_tokens:
+        return 0.0
+    cached = counter.get("cached_input_tokens", 0) + counter.get("cache_read_input_tokens", 0)
+    return min(1.0, cached / prompt_tokens)
+
+
 # ── Cost estimation ─────────────────────────────────────────────────────────
 
 MODEL_RATES: dict[str, dict[str, float]] = {
@@ -267,6 +303,6 @@ def resolve_fallback_stage_model(
 
 
 def build_prompt_cache_key(prefix: str, *parts: str) -> str:
-    clean_parts = [prefix] + [part for part in parts if part]
-    digest = hashlib.sha256("::".join(clean_parts).encode("utf-8")).hexdigest()[:16]
+    """Stable key for *parts*; empty parts keep their position so keys cannot collide."""
+    digest = hashlib.sha256("::".join([prefix, *parts]).encode("utf-8")).hexdigest()[:16]
     return f"{prefix}:{digest}"
@@ -11,7 +11,6 @@ Coordinates the full pipelined-parallel pipeline:
 
 from __future__ import annotations
 
-import asyncio
 import json
 import os
 import re
@@ -19,10 +18,11 @@ import threading
 import time
 from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from queue import Empty, Queue
-from typing import Any, Iterator
+from typing import Any, Callable, Iterator
 
 from agents.coder import run_coder_agent
 from agents.config import (
+    cache_hit_rate,
     estimate_cache_savings,
     estimate_cost,
     merge_token_usage,
@@ -33,7 +33,10 @@ from agents.config import (
 from agents.planner import plan_segmented_storyboard_lite
 from agents.planner_math2manim import run_math2manim_planner
 from utils.media_assembler import concatenate_segments, mux_subtitles, stitch_video_and_audio
-from utils.subtitle_generator import generate_combined_srt, write_srt
+from utils.subtitle_generator import generate_combined_srt, read_audio_duration, write_srt
+from utils.golden_scenes import record_golden_scene
+from utils.llm_provider import merge_tool_latency
+from utils.model_router import get_model_router
 from utils.parallel_renderer import RenderJob, render_parallel
 from utils.project_state import (
     create_project,
@@ -44,8 +47,10 @@ from utils.project_state import (
     mark_segment_stage,
     mark_stage_done,
 )
-from utils.code_verifier import verify_code_transitions, verify_segment_code
-from utils.tts_engine import generate_voiceover_async
+from utils.code_verifier import verify_project_code, verify_segment_code
+from utils.scene_timing import adjust_trailing_wait
+from utils.stage_scheduler import RESOURCE_FFMPEG, RESOURCE_LLM, RESOURCE_RENDER, RESOURCE_TTS, StageScheduler
+from utils.tts_engine import generate_voiceover_async, get_tts_loop
 from utils.visual_critique import critique_project_consistency, critique_video
 
 
@@ -62,10 +67,58 @@ def _slugify(text: str) -> str:
     return re.sub(r"[\s-]+", "_", slug).strip("_")[:60]
 
 
+# Upper bound on concurrent segment chains; StageScheduler slots cap actual work.
+_MAX_SEGMENT_THREADS = 16
+
+# Narration pace the planner targets when sizing audio scripts.
+_SPEAKING_RATE_WPM = 150
+# Speculative code is accepted as-is when the real narration is this close.
+_SPECULATIVE_TOLERANCE_SECONDS = 1.5
+_SPECULATIVE_TOLERANCE_RATIO = 0.10
+
+
+def _estimate_narration_seconds(seg: dict) -> float:
+    """Estimate narration length from word count, else the planner's hint."""
+    words = len((seg.get("audio_script") or "").split())
+    if words:
+        return words * 60.0 / _SPEAKING_RATE_WPM
+    return float(seg.get("duration_hint_seconds") or 0.0)
+
+
 def _has_valid_code(result: dict) -> bool:
     return bool(result.get("video_path")) or result.get("code_validated", False)
 
 
+_3D_KEYWORDS = {"threedscene", "3d", "surface", "camera_rotation", "set_camera_orientation"}
+_UPDATER_KEYWORDS = {"always_redraw", "valuetracker", "updater", "add_updater"}
+
+
+def _downgrade_complexity(seg: dict) -> None:
+    """Mark a "complex" segment "medium" when it needs no 3D, updaters or heavy math."""
+    if seg.get("complexity") != "complex":
+        return
+    vis = (seg.get("visual_instructions") or "").lower()
+    eqs = seg.get("equations_latex", [])
+    anims = seg.get("animations", [])
+    has_3d = any(kw in vis for kw in _3D_KEYWORDS)
+    has_updaters = any(kw in vis for kw in _UPDATER_KEYWORDS)
+    if not has_3d and not has_updaters and len(eqs) <= 2 and len(anims) <= 5:
+        seg["complexity"] = "medium"
+
+
+def _stream_segments_enabled() -> bool:
+    return os.getenv("PAPER2MANIM_STREAM_SEGMENTS", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _rerun_after(stale: Any, run: Callable[[dict], dict], seg: dict) -> dict:
+    """Wait for a superseded segment run to finish, then run *seg* afresh."""
+    try:
+        stale.result()
+    except Exception:
+        pass
+    return run(seg)
+
+
 def _quality_mode_settings(questionnaire_answers: dict | None) -> dict[str, Any]:
     mode = (questionnaire_answers or {}).get("quality_mode", "balanced")
     settings = {
@@ -181,6 +234,8 @@ def _save_pipeline_summary(
     concept: str = "",
     tool_call_counts: dict[str, int] | None = None,
     token_summary: dict | None = None,
+    stage_resources: dict[str, dict] | None = None,
+    tool_latency: dict[str, dict] | None = None,
 ) -> str:
     """Write a plain-text pipeline summary to ``project_dir/pipeline_summary.txt``."""
     import time as _time
@@ -212,11 +267,28 @@ def _save_pipeline_summary(
         for tool_name, count in sorted(tool_call_counts.items()):
             lines.append(f"- {tool_name}")
             lines.append(f"  Calls : {count}")
+            latency = (tool_latency or {}).get(tool_name)
+            if latency and latency.get("calls"):
+                avg = latency["total_seconds"] / latency["calls"]
+                timeouts = f", {latency['timeouts']} timed out" if latency.get("timeouts") else ""
+                lines.append(f"  Latency: avg {avg:.2f}s, max {latency['max_seconds']:.2f}s{timeouts}")
             lines.append("")
     else:
         lines.append("No tool calls recorded.")
         lines.append("")
 
+    if stage_resources:
+        lines.append("Stage Scheduling")
+        lines.append("=" * 50)
+        lines.append(f"{'Stage':<10} {'Slot':<8} {'Runs':>5} {'Queue wait':>12} {'Run time':>12}")
+        lines.append("-" * 50)
+        for stage_name, entry in stage_resources.items():
+            lines.append(
+                f"{stage_name:<10} {entry['resource']:<8} {entry['count']:>5} "
+                f"{_format_duration(entry['queue_wait_seconds']):>12} {_format_duration(entry['run_seconds']):>12}"
+            )
+        lines.append("")
+
     if token_summary:
         lines.append("Token Usage & Cost")
         lines.append("=" * 50)
@@ -229,6 +301,39 @@ def _save_pipeline_summary(
         lines.append(f"Estimated savings   : ${token_summary.get('estimated_cache_savings_usd', 0):.4f}")
         if token_summary.get("fallback_invocations", 0):
             lines.append(f"Provider fallbacks  : {token_summary.get('fallback_invocations', 0)}")
+        patches = token_summary.get("repair_patches") or {}
+        if patches.get("applied") or patches.get("fallbacks"):
+            lines.append(
+                f"Patch repairs       : {patches.get('applied', 0)} applied, "
+                f"{patches.get('fallbacks', 0)} fell back to full rewrite"
+            )
+            lines.append(
+                f"Patch savings (est.): {patches.get('output_tokens_saved', 0):,} output tokens, "
+                f"~{patches.get('seconds_saved', 0.0):.1f}s"
+            )
+        auto_fixes = token_summary.get("auto_fixes") or {}
+        if auto_fixes.get("applied") or auto_fixes.get("escalated"):
+            lines.append(
+                f"Local auto-fixes    : {auto_fixes.get('applied', 0)} applied, "
+                f"{auto_fixes.get('escalated', 0)} escalated to LLM"
+            )
+        hit_rates = token_summary.get("cache_hit_rate") or {}
+        if any(hit_rates.values()):
+            lines.append(
+                "Prompt cache hits   : "
+                + ", ".join(f"{stage} {rate:.0%}" for stage, rate in hit_rates.items())
+            )
+        hedging = token_summary.get("hedging") or {}
+        if hedging.get("requests"):
+            lines.append(
+                f"Hedged requests     : {hedging['requests']} sent, {hedging.get('wins', 0)} beat the original"
+            )
+        prefetch = token_summary.get("doc_prefetch") or {}
+        if prefetch.get("lookups_inlined"):
+            lines.append(
+                f"Doc prefetch        : {prefetch['lookups_inlined']} lookups inlined, "
+                f"{prefetch.get('round_trips_avoided', 0)} tool round trips avoided"
+            )
         lines.append("")
         if token_summary.get("model_profile"):
             lines.append("Models")
@@ -236,6 +341,24 @@ def _save_pipeline_summary(
             for stage_name, stage_model in token_summary["model_profile"].items():
                 lines.append(f"{stage_name:<12}: {stage_model}")
             lines.append("")
+        telemetry = token_summary.get("model_telemetry") or {}
+        if telemetry:
+            lines.append("Model telemetry (rolling)")
+            lines.append("=" * 50)
+            for stage_name, models in telemetry.items():
+                for model_name, stats in models.items():
+                    line = (
+                        f"{stage_name:<8} {model_name}: {stats['calls']} calls, "
+                        f"p50 {stats['p50_seconds']:.1f}s, p95 {stats['p95_seconds']:.1f}s"
+                    )
+                    if stats.get("dry_run_pass_rate") is not None:
+                        line += f", dry-run pass {stats['dry_run_pass_rate']:.0%}"
+                    if stats.get("critique_score") is not None:
+                        line += f", critique {stats['critique_score']:.2f}"
+                    if stats.get("cost_usd") is not None:
+                        line += f", ${stats['cost_usd']:.4f}/call"
+                    lines.append(line)
+            lines.append("")
         breakdown = token_summary.get("breakdown", {})
         for stage_name, stage_data in breakdown.items():
             lines.append(f"  {stage_name.capitalize()}:")
@@ -301,7 +424,31 @@ def _build_token_summary(pipeline_tokens, planning_tokens, coding_tokens, verifi
         "fallback_invocations": pipeline_tokens.get("fallback_invocations", 0),
         "estimated_cost_usd": round(total_cost, 4),
         "estimated_cache_savings_usd": round(total_cache_savings, 4),
+        "repair_patches": {
+            "applied": coding_tokens.get("repair_patches_applied", 0),
+            "fallbacks": coding_tokens.get("repair_patch_fallbacks", 0),
+            "output_tokens_saved": coding_tokens.get("repair_output_tokens_saved", 0),
+            "seconds_saved": round(coding_tokens.get("repair_seconds_saved", 0.0), 1),
+        },
+        "auto_fixes": {
+            "applied": coding_tokens.get("auto_fixes_applied", 0),
+            "escalated": coding_tokens.get("auto_fix_escalations", 0),
+        },
+        "cache_hit_rate": {
+            "planning": round(cache_hit_rate(planning_tokens), 3),
+            "coding": round(cache_hit_rate(coding_tokens), 3),
+            "verification": round(cache_hit_rate(verification_tokens), 3),
+        },
+        "hedging": {
+            "requests": pipeline_tokens.get("hedged_requests", 0),
+            "wins": pipeline_tokens.get("hedge_wins", 0),
+        },
+        "doc_prefetch": {
+            "lookups_inlined": coding_tokens.get("prefetch_lookups_inlined", 0),
+            "round_trips_avoided": coding_tokens.get("prefetch_round_trips_avoided", 0),
+        },
         "model_profile": model_profile_summary(),
+        "model_telemetry": get_model_router().summary(),
         "breakdown": {
             "planning": {
                 "model": planning_model,
@@ -348,6 +495,7 @@ def run_segmented_pipeline(
     tts_timeout_seconds: int = 0,
     resume_dir: str | None = None,
     force_restart: bool = False,
+    speculative_codegen: bool | None = None,
 ) -> Iterator[dict]:
     """Run the full segmented pipeline, yielding progress updates.
 
@@ -357,9 +505,15 @@ def run_segmented_pipeline(
     When *force_restart* is False (the default), the pipeline checks for an
     existing incomplete project for the same concept and resumes from where it
     left off, skipping stages that already completed successfully.
+
+    When *speculative_codegen* is True (default: ``PAPER2MANIM_SPECULATIVE_CODEGEN``),
+    each segment starts code generation from an estimated narration length
+    while its TTS runs, then re-times the scene's ending to the real audio.
     """
 
     slug = _slugify(concept)
+    if speculative_codegen is None:
+        speculative_codegen = os.getenv("PAPER2MANIM_SPECULATIVE_CODEGEN", "0").lower() in {"1", "true", "yes"}
     quality_settings = _quality_mode_settings(questionnaire_answers)
 
     # ── Token tracking accumulators ──────────────────────────────────
@@ -398,121 +552,34 @@ def run_segmented_pipeline(
                         "resumed": True,
                     }
 
-    # ── Step 1: Planning ──────────────────────────────────────────────
-
-    storyboard = None
-    timings: list[tuple[str, str, float]] = []
-
-    if resumed and state and is_stage_done(state, "plan"):
-        # Try to load cached storyboard from disk
-        cached_sb = _load_storyboard(project_dir)
-        if cached_sb and "segments" in cached_sb:
-            storyboard = cached_sb
-            segments = storyboard["segments"]
-            num_segments = len(segments)
-            timings.append(("Plan", "skipped", 0.0))
-            yield {
-                "stage": "plan",
-                "status": f"Skipping (already completed) — {num_segments} segments",
-                "skipped": True,
-                "storyboard": storyboard,
-                "num_segments": num_segments,
-            }
-        else:
-            # Plan was marked done but storyboard file is missing/corrupt;
-            # must re-plan.
-            resumed = False
-            state = None
-
-    if storyboard is None:
-        yield {"stage": "plan", "status": "Starting segmented storyboard planning..."}
-        plan_start = time.perf_counter()
-
-        planner_func = plan_segmented_storyboard_lite if is_lite else run_math2manim_planner
-        planner_kwargs: dict = dict(
-            max_retries=max_retries,
-            previous_storyboard=previous_storyboard,
-            feedback=feedback,
-        )
-        if questionnaire_answers:
-            planner_kwargs["questionnaire_answers"] = questionnaire_answers
-        for update in planner_func(concept, **planner_kwargs):
-            if "status" in update:
-                yield {"stage": "plan", "status": update["status"]}
-            if update.get("final"):
-                if "error" in update:
-                    yield {"stage": "plan", "status": update["error"], "error": update["error"], "final": True}
-                    return
-                storyboard = update["storyboard"]
-                # Extract planner token usage
-                try:
-                    planner_tu = update.get("token_usage")
-                    if planner_tu:
-                        merge_token_usage(planning_tokens, planner_tu)
-                        merge_token_usage(pipeline_tokens, planner_tu)
-                except Exception:
-                    pass  # Never let token tracking crash the pipeline
-
-        if not storyboard:
-            yield {"stage": "plan", "status": "No storyboard generated.", "error": "Empty planner output.", "final": True}
-            return
-
-        segments = storyboard["segments"]
-        num_segments = len(segments)
-        plan_elapsed = time.perf_counter() - plan_start
-        timings.append(("Plan", "ok", plan_elapsed))
-        yield {
-            "stage": "plan",
-            "status": f"Storyboard planned: {num_segments} segments",
-            "storyboard": storyboard,
-            "num_segments": num_segments,
-        }
-
-        # Create project directory (only for fresh runs)
-        if project_dir is None:
-            project_dir = os.path.join(output_base, f"{slug}_{id(storyboard) % 10000:04d}")
-            state = create_project(project_dir, concept, slug, total_segments=num_segments)
-
-        mark_stage_done(project_dir, "plan", artifacts=[])
-        _save_storyboard(project_dir, storyboard)
-        # Reload state after marking stage done
-        state = load_project(project_dir)
-
-    # ── Step 2: Complexity downgrade heuristic ────────────────────────
-    # Moved before the parallel block — only reads segment data.
-
-    _3D_KEYWORDS = {"threedscene", "3d", "surface", "camera_rotation", "set_camera_orientation"}
-    _UPDATER_KEYWORDS = {"always_redraw", "valuetracker", "updater", "add_updater"}
-
-    for seg in segments:
-        if seg.get("complexity") != "complex":
-            continue
-        vis = (seg.get("visual_instructions") or "").lower()
-        eqs = seg.get("equations_latex", [])
-        anims = seg.get("animations", [])
-        has_3d = any(kw in vis for kw in _3D_KEYWORDS)
-        has_updaters = any(kw in vis for kw in _UPDATER_KEYWORDS)
-        if not has_3d and not has_updaters and len(eqs) <= 2 and len(anims) <= 5:
-            seg["complexity"] = "medium"
-
-    # ── Step 3: Pipelined-parallel per-segment processing ─────────────
+    # ── Per-segment pipeline machinery ────────────────────────────────
     #
     # Each segment runs through TTS → Code → HD Render → Stitch inside
     # its own thread.  All segments execute concurrently.  This replaces
     # the old sequential-stage approach where ALL TTS had to finish
-    # before ANY code generation could start, etc.
+    # before ANY code generation could start, etc.  It is set up before
+    # planning so segments streamed out of Stage 5 can start right away.
+    #
+    # Every stage acquires a typed StageScheduler slot (llm / render /
+    # ffmpeg / tts) before running, so a segment blocked in a slow render
+    # holds only a render slot while other segments' LLM stages proceed.
 
     tts_results: dict[int, dict] = {}
     code_results: dict[int, dict] = {}
     tool_call_counts: dict[str, int] = {}
+    tool_latency: dict[str, dict] = {}
     stitch_errors: list[str] = []
 
-    theme_name = storyboard.get("theme_name", "")
-    color_palette = storyboard.get("color_palette", {})
+    # Read by segment workers at call time; set once the theme is planned.
+    theme_name = ""
+    color_palette: dict[str, str] = {}
     status_queue: Queue[dict] = Queue()
     _state_lock = threading.Lock()
+    # Segment threads are cheap chains; resource slots bound the real work.
+    scheduler = StageScheduler()
 
-    def _merge_tool_calls(counts: dict[str, int] | None) -> None:
+    def _merge_tool_calls(counts: dict[str, int] | None, latency: dict[str, dict] | None = None) -> None:
+        merge_tool_latency(tool_latency, latency)
         if not counts:
             return
         for tool_name, count in counts.items():
@@ -549,6 +616,50 @@ def run_segmented_pipeline(
         }
 
         # ── Phase 1: TTS ──────────────────────────────────────────
+        def _run_tts(audio_path: str) -> None:
+            status_queue.put({
+                "stage": "tts", "segment_id": seg_id,
+                "status": f"Segment {seg_id}: generating voiceover...",
+                "segment_phase": "running", "segment_final": False,
+            })
+            try:
+                with scheduler.slot(RESOURCE_TTS, "tts"):
+                    tts_r = get_tts_loop().run(
+                        generate_voiceover_async, seg["audio_script"], audio_path,
+                        timeout=tts_timeout_seconds,
+                    )
+                result["tts_result"] = tts_r
+                if tts_r.get("success"):
+                    result["tts_api_call"] = True
+                    with _state_lock:
+                        mark_segment_stage(project_dir, seg_id, "tts", done=True,
+                                           artifacts=[tts_r.get("audio_path", "")])
+                    status_queue.put({
+                        "stage": "tts", "segment_id": seg_id,
+                        "status": f"Segment {seg_id}: TTS done",
+                        "segment_phase": "done", "segment_final": True,
+                    })
+                else:
+                    with _state_lock:
+                        mark_segment_stage(project_dir, seg_id, "tts", done=False,
+                                           error=tts_r.get("error", ""))
+                    status_queue.put({
+                        "stage": "tts", "segment_id": seg_id,
+                        "status": f"Segment {seg_id}: TTS failed",
+                        "segment_phase": "failed", "segment_final": True,
+                    })
+            except Exception as e:
+                result["tts_result"] = {"success": False, "error": str(e), "audio_path": None, "duration": 0}
+                with _state_lock:
+                    mark_segment_stage(project_dir, seg_id, "tts", done=False, error=str(e))
+                status_queue.put({
+                    "stage": "tts", "segment_id": seg_id,
+                    "status": f"Segment {seg_id}: TTS error",
+                    "segment_phase": "failed", "segment_final": True,
+                })
+
+        tts_pending = False
+        audio_path = ""
         if not skip_audio:
             audio_path = os.path.join(project_dir, f"segment_{seg_id}_audio.wav")
 
@@ -556,13 +667,15 @@ def run_segmented_pipeline(
             cached_tts = False
             if resumed and state and is_segment_stage_done(state, seg_id, "tts"):
                 if os.path.isfile(audio_path):
-                    result["tts_result"] = {"success": True, "audio_path": audio_path, "duration": 0.0}
+                    result["tts_result"] = {"success": True, "audio_path": audio_path,
+                                            "duration": read_audio_duration(audio_path)}
                     cached_tts = True
                 else:
                     seg_info = state.get("segments", {}).get(str(seg_id), {}).get("tts", {})
                     found = next((a for a in seg_info.get("artifacts", []) if a and os.path.isfile(a)), None)
                     if found:
-                        result["tts_result"] = {"success": True, "audio_path": found, "duration": 0.0}
+                        result["tts_result"] = {"success": True, "audio_path": found,
+                                                "duration": read_audio_duration(found)}
                         cached_tts = True
 
             if cached_tts:
@@ -573,76 +686,38 @@ def run_segmented_pipeline(
                     "skipped": True,
                 })
             else:
-                status_queue.put({
-                    "stage": "tts", "segment_id": seg_id,
-                    "status": f"Segment {seg_id}: generating voiceover...",
-                    "segment_phase": "running", "segment_final": False,
-                })
-                loop = asyncio.new_event_loop()
-                try:
-                    coro = generate_voiceover_async(seg["audio_script"], audio_path)
-                    if tts_timeout_seconds > 0:
-                        coro = asyncio.wait_for(coro, timeout=tts_timeout_seconds)
-                    tts_r = loop.run_until_complete(coro)
-                    result["tts_result"] = tts_r
-                    if tts_r.get("success"):
-                        result["tts_api_call"] = True
-                        with _state_lock:
-                            mark_segment_stage(project_dir, seg_id, "tts", done=True,
-                                               artifacts=[tts_r.get("audio_path", "")])
-                        status_queue.put({
-                            "stage": "tts", "segment_id": seg_id,
-                            "status": f"Segment {seg_id}: TTS done",
-                            "segment_phase": "done", "segment_final": True,
-                        })
-                    else:
-                        with _state_lock:
-                            mark_segment_stage(project_dir, seg_id, "tts", done=False,
-                                               error=tts_r.get("error", ""))
-                        status_queue.put({
-                            "stage": "tts", "segment_id": seg_id,
-                            "status": f"Segment {seg_id}: TTS failed",
-                            "segment_phase": "failed", "segment_final": True,
-                        })
-                except Exception as e:
-                    result["tts_result"] = {"success": False, "error": str(e), "audio_path": None, "duration": 0}
-                    with _state_lock:
-                        mark_segment_stage(project_dir, seg_id, "tts", done=False, error=str(e))
-                    status_queue.put({
-                        "stage": "tts", "segment_id": seg_id,
-                        "status": f"Segment {seg_id}: TTS error",
-                        "segment_phase": "failed", "segment_final": True,
-                    })
-                finally:
-                    loop.close()
+                tts_pending = True
 
-        def _run_codegen(extra_repair_feedback: str = "") -> dict:
+        def _run_codegen(extra_repair_feedback: str = "", audio_duration: float | None = None) -> dict:
             tts_r = result["tts_result"]
+            if audio_duration is None:
+                audio_duration = tts_r.get("duration", 0.0) or 0.0
             coder_instructions = seg["visual_instructions"] if is_lite else seg
             last_update: dict = {}
-            for update in run_coder_agent(
-                instructions=coder_instructions,
-                max_retries=max_retries,
-                audio_script=seg.get("audio_script", ""),
-                audio_duration=tts_r.get("duration", 0.0) or 0.0,
-                complexity=seg.get("complexity", "complex"),
-                scene_class_name=f"Segment{seg_id}Scene",
-                output_dir=seg_output_dir,
-                theme_name=theme_name,
-                color_palette=color_palette,
-                segment_id=seg_id,
-                few_shot_example=few_shot_example,
-                repair_feedback="\n\n".join(part for part in [repair_feedback, extra_repair_feedback] if part),
-                quality_mode=quality_settings["quality_mode"],
-            ):
-                last_update = update
-                status_queue.put({
-                    "stage": "code", "segment_id": seg_id,
-                    "status": update.get("status", ""),
-                    "segment_phase": update.get("phase", "running"),
-                    "segment_final": bool(update.get("final")),
-                    "code": update.get("code"),
-                })
+            with scheduler.slot(RESOURCE_LLM, "code"):
+                for update in run_coder_agent(
+                    instructions=coder_instructions,
+                    max_retries=max_retries,
+                    audio_script=seg.get("audio_script", ""),
+                    audio_duration=audio_duration,
+                    complexity=seg.get("complexity", "complex"),
+                    scene_class_name=f"Segment{seg_id}Scene",
+                    output_dir=seg_output_dir,
+                    theme_name=theme_name,
+                    color_palette=color_palette,
+                    segment_id=seg_id,
+                    few_shot_example=few_shot_example,
+                    repair_feedback="\n\n".join(part for part in [repair_feedback, extra_repair_feedback] if part),
+                    quality_mode=quality_settings["quality_mode"],
+                ):
+                    last_update = update
+                    status_queue.put({
+                        "stage": "code", "segment_id": seg_id,
+                        "status": update.get("status", ""),
+                        "segment_phase": update.get("phase", "running"),
+                        "segment_final": bool(update.get("final")),
+                        "code": update.get("code"),
+                    })
             return last_update
 
         def _verify_and_render(code_r: dict, render_quality: str) -> tuple[dict | None, dict | None]:
@@ -655,13 +730,15 @@ def run_segmented_pipeline(
                     "status": f"Segment {seg_id}: verifying code quality...",
                     "segment_phase": "running", "segment_final": False,
                 })
-                verify_result = verify_segment_code(
-                    seg_id,
-                    code_r["code"],
-                    segment_context=seg.get("visual_instructions", ""),
-                    audio_duration=result["tts_result"].get("duration", 0.0) or 0.0,
-                    token_counter=verify_tokens,
-                )
+                with scheduler.slot(RESOURCE_LLM, "verify"):
+                    verify_result = verify_segment_code(
+                        seg_id,
+                        code_r["code"],
+                        segment_context=seg.get("visual_instructions", ""),
+                        audio_duration=result["tts_result"].get("duration", 0.0) or 0.0,
+                        token_counter=verify_tokens,
+                        layout_trace=code_r.get("layout_trace"),
+                    )
                 result["verify_token_usage"] = verify_tokens
                 status_queue.put({
                     "stage": "verify", "segment_id": seg_id,
@@ -687,7 +764,8 @@ def run_segmented_pipeline(
                     timeout_seconds=render_timeout_seconds or 300,
                     output_dir=seg_output_dir,
                 )
-                hd_results = render_parallel([hd_job])
+                with scheduler.slot(RESOURCE_RENDER, "render"):
+                    hd_results = render_parallel([hd_job])
                 hd_result = hd_results[0] if hd_results else None
                 if hd_result and hd_result.success and hd_result.video_path:
                     code_r["video_path"] = hd_result.video_path
@@ -699,13 +777,19 @@ def run_segmented_pipeline(
                         "segment_phase": "done", "segment_final": True,
                     })
                     critique_tokens = result.get("verify_token_usage") or new_token_counter()
-                    critique_result = critique_video(
-                        hd_result.video_path,
-                        segment_context=seg.get("visual_instructions", ""),
-                        token_counter=critique_tokens,
-                    )
+                    with scheduler.slot(RESOURCE_LLM, "critique"):
+                        critique_result = critique_video(
+                            hd_result.video_path,
+                            segment_context=seg.get("visual_instructions", ""),
+                            token_counter=critique_tokens,
+                        )
                     result["verify_token_usage"] = critique_tokens
                     result["final_accepted_critique_score"] = critique_result.score
+                    if code_r.get("model"):
+                        get_model_router().record_outcome("code", code_r["model"], score=critique_result.score)
+                    if critique_result.passed:
+                        # High-scoring scenes grow the golden library used for retrieval.
+                        record_golden_scene(code_r.get("code") or "", critique_result.score, name=f"{slug}_seg{seg_id}")
                     status_queue.put({
                         "stage": "verify", "segment_id": seg_id,
                         "status": (
@@ -727,6 +811,45 @@ def run_segmented_pipeline(
                     })
             return verify_result, critique_result
 
+        def _run_speculative_codegen(audio_path: str) -> dict:
+            """Generate code against an estimated duration while TTS runs.
+
+            Once the real narration length is known, accept the code if it is
+            within tolerance, otherwise re-time its trailing ``self.wait`` calls.
+            """
+            estimated = _estimate_narration_seconds(seg)
+            status_queue.put({
+                "stage": "code", "segment_id": seg_id,
+                "status": f"Segment {seg_id}: generating code speculatively for ~{estimated:.1f}s of narration...",
+                "segment_phase": "running", "segment_final": False,
+            })
+            with ThreadPoolExecutor(max_workers=1) as tts_executor:
+                tts_future = tts_executor.submit(_run_tts, audio_path)
+                update = _run_codegen(audio_duration=estimated)
+                tts_future.result()
+
+            actual = result["tts_result"].get("duration") or 0.0
+            speculation = {"estimated_duration": round(estimated, 2), "actual_duration": round(actual, 2),
+                           "adjusted": False}
+            result["speculative"] = speculation
+            if actual <= 0 or not update.get("code"):
+                return update
+            delta = actual - estimated
+            if abs(delta) <= max(_SPECULATIVE_TOLERANCE_SECONDS, actual * _SPECULATIVE_TOLERANCE_RATIO):
+                return update
+            adjusted = adjust_trailing_wait(update["code"], delta)
+            if adjusted:
+                update["code"] = adjusted
+                # The probe trace timed the pre-adjustment scene.
+                update.pop("layout_trace", None)
+                speculation["adjusted"] = True
+                status_queue.put({
+                    "stage": "code", "segment_id": seg_id,
+                    "status": f"Segment {seg_id}: re-timed ending by {delta:+.1f}s to match {actual:.1f}s narration",
+                    "segment_phase": "running", "segment_final": False,
+                })
+            return update
+
         # ── Phase 2-3: Code generation, verification, render, repair ──
         code_cached = False
         if resumed and state and is_segment_stage_done(state, seg_id, "code"):
@@ -754,11 +877,16 @@ def run_segmented_pipeline(
                     "skipped": True,
                 })
 
+        speculate = tts_pending and speculative_codegen and not code_cached
+        if tts_pending and not speculate:
+            _run_tts(audio_path)
+
         if not code_cached:
-            initial_update = _run_codegen()
+            initial_update = _run_speculative_codegen(audio_path) if speculate else _run_codegen()
             result["code_result"] = initial_update
             result["token_usage"] = initial_update.get("token_usage")
             result["tool_call_counts"] = initial_update.get("tool_call_counts")
+            result["tool_latency"] = initial_update.get("tool_latency")
 
             has_code = _has_valid_code(initial_update)
             with _state_lock:
@@ -796,6 +924,7 @@ def run_segmented_pipeline(
                 result["code_result"] = repaired_update
                 result["token_usage"] = repaired_update.get("token_usage") or result["token_usage"]
                 result["tool_call_counts"] = repaired_update.get("tool_call_counts") or result["tool_call_counts"]
+                result["tool_latency"] = repaired_update.get("tool_latency") or result.get("tool_latency")
                 code_r = result["code_result"]
                 repaired_verify, repaired_critique = _verify_and_render(code_r, quality_settings["repair_render_quality"])
                 result["verify_result"] = repaired_verify or verify_result
@@ -856,9 +985,10 @@ def run_segmented_pipeline(
                 else:
                     stitched_output = os.path.join(project_dir, f"segment_{seg_id}_stitched.mp4")
                     stitch_r = None
-                    for update in stitch_video_and_audio(video_path, audio_path, stitched_output):
-                        if update.get("final"):
-                            stitch_r = update
+                    with scheduler.slot(RESOURCE_FFMPEG, "stitch"):
+                        for update in stitch_video_and_audio(video_path, audio_path, stitched_output):
+                            if update.get("final"):
+                                stitch_r = update
 
                     if stitch_r and stitch_r.get("success"):
                         result["stitch_path"] = stitch_r["output_path"]
@@ -883,6 +1013,128 @@ def run_segmented_pipeline(
 
         return result
 
+    # ── Step 1: Planning ──────────────────────────────────────────────
+
+    storyboard = None
+    timings: list[tuple[str, str, float]] = []
+    # Segments started while Stage 5 was still composing the rest (id -> spec).
+    streamed: dict[int, dict] = {}
+    futures_map: dict[Any, dict] = {}
+    segment_executor: ThreadPoolExecutor | None = None
+    stream_segments = not is_lite and _stream_segments_enabled()
+
+    if resumed and state and is_stage_done(state, "plan"):
+        # Try to load cached storyboard from disk
+        cached_sb = _load_storyboard(project_dir)
+        if cached_sb and "segments" in cached_sb:
+            storyboard = cached_sb
+            segments = storyboard["segments"]
+            num_segments = len(segments)
+            theme_name = storyboard.get("theme_name", "")
+            color_palette = storyboard.get("color_palette", {})
+            timings.append(("Plan", "skipped", 0.0))
+            yield {
+                "stage": "plan",
+                "status": f"Skipping (already completed) — {num_segments} segments",
+                "skipped": True,
+                "storyboard": storyboard,
+                "num_segments": num_segments,
+            }
+        else:
+            # Plan was marked done but storyboard file is missing/corrupt;
+            # must re-plan.
+            resumed = False
+            state = None
+
+    if storyboard is None:
+        yield {"stage": "plan", "status": "Starting segmented storyboard planning..."}
+        plan_start = time.perf_counter()
+
+        planner_func = plan_segmented_storyboard_lite if is_lite else run_math2manim_planner
+        planner_kwargs: dict = dict(
+            max_retries=max_retries,
+            previous_storyboard=previous_storyboard,
+            feedback=feedback,
+        )
+        if questionnaire_answers:
+            planner_kwargs["questionnaire_answers"] = questionnaire_answers
+        planned = False
+        try:
+            for update in planner_func(concept, **planner_kwargs):
+                if "status" in update:
+                    yield {"stage": "plan", "status": update["status"]}
+                header = update.get("storyboard_header")
+                if header and stream_segments:
+                    theme_name = header.get("theme_name", "")
+                    color_palette = header.get("color_palette", {})
+                    if project_dir is None:
+                        project_dir = os.path.join(output_base, f"{slug}_{id(header) % 10000:04d}")
+                        state = create_project(project_dir, concept, slug, total_segments=header["num_segments"])
+                streamed_seg = update.get("segment")
+                if streamed_seg and stream_segments and project_dir is not None:
+                    if segment_executor is None:
+                        segment_executor = ThreadPoolExecutor(max_workers=_MAX_SEGMENT_THREADS)
+                    _downgrade_complexity(streamed_seg)
+                    streamed[streamed_seg["id"]] = streamed_seg
+                    futures_map[segment_executor.submit(_run_segment_pipeline, streamed_seg)] = streamed_seg
+                    yield {
+                        "stage": "plan",
+                        "status": f"  → Segment {streamed_seg['id']} planned; starting its TTS/code pipeline now",
+                    }
+                yield from _drain_status_queue(status_queue)
+                if update.get("final"):
+                    if "error" in update:
+                        yield {"stage": "plan", "status": update["error"], "error": update["error"], "final": True}
+                        return
+                    storyboard = update["storyboard"]
+                    # Extract planner token usage
+                    try:
+                        planner_tu = update.get("token_usage")
+                        if planner_tu:
+                            merge_token_usage(planning_tokens, planner_tu)
+                            merge_token_usage(pipeline_tokens, planner_tu)
+                    except Exception:
+                        pass  # Never let token tracking crash the pipeline
+
+            if not storyboard:
+                yield {"stage": "plan", "status": "No storyboard generated.", "error": "Empty planner output.", "final": True}
+                return
+            planned = True
+        finally:
+            if not planned and segment_executor is not None:
+                # Planning failed or raised after segments were streamed: drop
+                # the queued ones and wait for the running ones so none
+                # outlives the run.
+                segment_executor.shutdown(wait=True, cancel_futures=True)
+
+        segments = storyboard["segments"]
+        num_segments = len(segments)
+        theme_name = storyboard.get("theme_name", "")
+        color_palette = storyboard.get("color_palette", {})
+        plan_elapsed = time.perf_counter() - plan_start
+        timings.append(("Plan", "ok", plan_elapsed))
+        yield {
+            "stage": "plan",
+            "status": f"Storyboard planned: {num_segments} segments",
+            "storyboard": storyboard,
+            "num_segments": num_segments,
+        }
+
+        # Create project directory (only for fresh runs)
+        if project_dir is None:
+            project_dir = os.path.join(output_base, f"{slug}_{id(storyboard) % 10000:04d}")
+            state = create_project(project_dir, concept, slug, total_segments=num_segments)
+
+        mark_stage_done(project_dir, "plan", artifacts=[])
+        _save_storyboard(project_dir, storyboard)
+        # Reload state after marking stage done
+        state = load_project(project_dir)
+
+    # ── Step 2: Complexity downgrade heuristic ────────────────────────
+
+    for seg in segments:
+        _downgrade_complexity(seg)
+
     # ── Launch all segments concurrently ──────────────────────────────
 
     yield {
@@ -892,12 +1144,26 @@ def run_segmented_pipeline(
 
     pipeline_start = time.perf_counter()
     segment_results: dict[int, dict] = {}
-    max_workers = max(1, min(5, num_segments))
+    max_workers = max(1, min(_MAX_SEGMENT_THREADS, num_segments))
     segments_done = 0
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures_map: dict[Any, dict] = {}
+    if segment_executor is None:
+        segment_executor = ThreadPoolExecutor(max_workers=max_workers)
+    with segment_executor as executor:
+        streamed_futures = {seg["id"]: fut for fut, seg in futures_map.items()}
         for seg in segments:
+            early = streamed.get(seg["id"])
+            if early is not None and early == seg:
+                continue
+            if early is not None:
+                # A storyboard-level correction changed a segment that already
+                # started: re-plan only that one, after its stale run settles.
+                stale = streamed_futures[seg["id"]]
+                del futures_map[stale]
+                if not stale.cancel():
+                    yield {"stage": "pipeline", "status": f"Segment {seg['id']} changed after planning; re-running it"}
+                    futures_map[executor.submit(_rerun_after, stale, _run_segment_pipeline, seg)] = seg
+                    continue
             futures_map[executor.submit(_run_segment_pipeline, seg)] = seg
 
         for fut, seg in _iter_completed_futures(futures_map, status_queue):
@@ -953,7 +1219,7 @@ def run_segmented_pipeline(
         if seg_verify_tu:
             merge_token_usage(verification_tokens, seg_verify_tu)
             merge_token_usage(pipeline_tokens, seg_verify_tu)
-        _merge_tool_calls(seg_r.get("tool_call_counts"))
+        _merge_tool_calls(seg_r.get("tool_call_counts"), seg_r.get("tool_latency"))
         if seg_r.get("tts_api_call"):
             tts_api_calls += 1
 
@@ -1004,7 +1270,7 @@ def run_segmented_pipeline(
                 seg["complexity"] = "complex"
 
         retry_results: dict[int, dict] = {}
-        retry_max_workers = max(1, min(5, len(failed_segs)))
+        retry_max_workers = max(1, min(_MAX_SEGMENT_THREADS, len(failed_segs)))
 
         with ThreadPoolExecutor(max_workers=retry_max_workers) as retry_executor:
             retry_futures: dict[Any, dict] = {}
@@ -1045,7 +1311,7 @@ def run_segmented_pipeline(
                 if retry_verify_tu:
                     merge_token_usage(verification_tokens, retry_verify_tu)
                     merge_token_usage(pipeline_tokens, retry_verify_tu)
-                _merge_tool_calls(retry_r.get("tool_call_counts"))
+                _merge_tool_calls(retry_r.get("tool_call_counts"), retry_r.get("tool_latency"))
 
                 has_code = _has_valid_code(retry_r["code_result"])
                 if has_code:
@@ -1072,21 +1338,47 @@ def run_segmented_pipeline(
     }
     if len(final_code_map) >= 2:
         yield {"stage": "verify", "status": "Checking cross-segment code transitions..."}
-        transition_checks = verify_code_transitions(final_code_map, token_counter=verification_tokens)
-        transition_repairs = [check for check in transition_checks if not check.smooth]
 
-        for check in transition_checks:
-            yield {
+        def _report_transition(check: Any) -> None:
+            # Batched pairs share their shard's wall time, so label it as such.
+            timing = f"shard {check.shard}: {check.elapsed_seconds:.1f}s" if check.shard else f"{check.elapsed_seconds:.1f}s"
+            status_queue.put({
                 "stage": "verify",
                 "segment_id": check.segment_b_id,
                 "status": (
-                    f"Transition {check.segment_a_id}->{check.segment_b_id} passed"
+                    f"Transition {check.segment_a_id}->{check.segment_b_id} passed ({timing})"
                     if check.smooth
-                    else f"Transition {check.segment_a_id}->{check.segment_b_id} warnings - {'; '.join(check.issues[:2])}"
+                    else f"Transition {check.segment_a_id}->{check.segment_b_id} warnings "
+                         f"({timing}) - {'; '.join(check.issues[:2])}"
                 ),
                 "segment_phase": "done" if check.smooth else "failed",
                 "segment_final": True,
-            }
+                "elapsed_seconds": check.elapsed_seconds,
+                "shard": check.shard,
+            })
+
+        # Segments were verified in their own chains; batch just the pairs and
+        # stream each pair's verdict as its shard finishes.
+        with ThreadPoolExecutor(max_workers=1) as verify_pool:
+            verify_future = verify_pool.submit(
+                verify_project_code,
+                final_code_map, verify_segments=False, token_counter=verification_tokens,
+                on_result=_report_transition,
+            )
+            for done, msg in _iter_completed_futures({verify_future: None}, status_queue):
+                if done is None:
+                    yield msg
+        yield from _drain_status_queue(status_queue)
+        project_check = verify_future.result()
+        transition_checks = project_check.transitions
+        yield {
+            "stage": "verify",
+            "status": (
+                f"Checked {len(transition_checks)} transition(s) in {project_check.llm_calls} verifier call(s)"
+                + (f" ({project_check.fallback_items} re-checked individually)" if project_check.fallback_items else "")
+            ),
+        }
+        transition_repairs = [check for check in transition_checks if not check.smooth]
 
         if quality_settings["allow_repair"]:
             for check in transition_repairs:
@@ -1113,7 +1405,7 @@ def run_segmented_pipeline(
                 if repair_verify_tu:
                     merge_token_usage(verification_tokens, repair_verify_tu)
                     merge_token_usage(pipeline_tokens, repair_verify_tu)
-                _merge_tool_calls(repaired.get("tool_call_counts"))
+                _merge_tool_calls(repaired.get("tool_call_counts"), repaired.get("tool_latency"))
                 yield {
                     "stage": "code_retry",
                     "segment_id": check.segment_b_id,
@@ -1204,7 +1496,9 @@ def run_segmented_pipeline(
             "timings": timings,
             "tool_call_counts": dict(sorted(tool_call_counts.items())),
             "total_tool_calls": sum(tool_call_counts.values()),
+            "tool_latency": dict(sorted(tool_latency.items())),
             "token_summary": token_summary,
+            "stage_resources": scheduler.stats(),
             "project_consistency": project_consistency,
             "segment_quality": {
                 sid: {
@@ -1214,7 +1508,9 @@ def run_segmented_pipeline(
                 for sid in segment_results
             },
         }
-        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts, token_summary=token_summary)
+        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts,
+                               token_summary=token_summary, stage_resources=scheduler.stats(),
+                               tool_latency=tool_latency)
         return
 
     final_output = os.path.join(project_dir, f"{slug}.mp4")
@@ -1224,7 +1520,9 @@ def run_segmented_pipeline(
         timings.append(("Concat", "skipped", 0.0))
         mark_project_complete(project_dir)
         token_summary = _build_token_summary(pipeline_tokens, planning_tokens, coding_tokens, verification_tokens, tts_api_calls)
-        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts, token_summary=token_summary)
+        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts,
+                               token_summary=token_summary, stage_resources=scheduler.stats(),
+                               tool_latency=tool_latency)
         yield {
             "stage": "concat",
             "status": "Skipping (already completed) — final video exists",
@@ -1241,7 +1539,9 @@ def run_segmented_pipeline(
             "timings": timings,
             "tool_call_counts": dict(sorted(tool_call_counts.items())),
             "total_tool_calls": sum(tool_call_counts.values()),
+            "tool_latency": dict(sorted(tool_latency.items())),
             "token_summary": token_summary,
+            "stage_resources": scheduler.stats(),
             "project_consistency": project_consistency,
             "segment_quality": {
                 sid: {
@@ -1301,7 +1601,9 @@ def run_segmented_pipeline(
                 yield {"stage": "subtitles", "status": f"Subtitle generation failed: {exc}"}
 
         token_summary = _build_token_summary(pipeline_tokens, planning_tokens, coding_tokens, verification_tokens, tts_api_calls)
-        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts, token_summary=token_summary)
+        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts,
+                               token_summary=token_summary, stage_resources=scheduler.stats(),
+                               tool_latency=tool_latency)
         yield {
             "stage": "done",
             "status": "Pipeline complete!",
@@ -1314,7 +1616,9 @@ def run_segmented_pipeline(
             "timings": timings,
             "tool_call_counts": dict(sorted(tool_call_counts.items())),
             "total_tool_calls": sum(tool_call_counts.values()),
+            "tool_latency": dict(sorted(tool_latency.items())),
             "token_summary": token_summary,
+            "stage_resources": scheduler.stats(),
             "project_consistency": project_consistency,
             "segment_quality": {
                 sid: {
@@ -1328,7 +1632,9 @@ def run_segmented_pipeline(
         err = concat_result.get("error", "unknown") if concat_result else "unknown"
         timings.append(("Concat", "failed", concat_elapsed))
         token_summary = _build_token_summary(pipeline_tokens, planning_tokens, coding_tokens, verification_tokens, tts_api_calls)
-        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts, token_summary=token_summary)
+        _save_pipeline_summary(timings, project_dir, concept, tool_call_counts=tool_call_counts,
+                               token_summary=token_summary, stage_resources=scheduler.stats(),
+                               tool_latency=tool_latency)
         # If concat fails but we have segments, return the first one
         yield {
             "stage": "done",
@@ -1342,7 +1648,9 @@ def run_segmented_pipeline(
             "timings": timings,
             "tool_call_counts": dict(sorted(tool_call_counts.items())),
             "total_tool_calls": sum(tool_call_counts.values()),
+            "tool_latency": dict(sorted(tool_latency.items())),
             "token_summary": token_summary,
+            "stage_resources": scheduler.stats(),
             "project_consistency": project_consistency,
             "segment_quality": {
                 sid: {
@@ -12,12 +12,14 @@ Output conforms to ProSegmentedStoryboard so the downstream pipeline is unchange
 """
 
 import json
+import os
 import re
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Iterator, List, Literal
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Generator, Iterator, List, Literal
 
 from pydantic import BaseModel, Field
 
@@ -28,6 +30,8 @@ from agents.config import (
     resolve_stage_model,
 )
 from utils.llm_provider import run_text_completion
+from utils.model_router import model_key
+from utils.planner_cache import PlannerCache, get_planner_cache, normalize_concept
 
 # ── Duration presets: map user's video-length choice to hard constraints ──
 
@@ -38,6 +42,9 @@ DURATION_PRESETS = {
 }
 DEFAULT_DURATION_PRESET = DURATION_PRESETS["Medium (3-5 min)"]
 
+# Bump whenever a planner prompt changes so cached stage outputs are not reused.
+_PLANNER_PROMPT_VERSION = 1
+
 _DEFAULT_PALETTE: dict[str, str] = {
     "Background": "#141414",
     "Primary":    "#3B82F6",
@@ -209,6 +216,7 @@ def _call_llm(
         max_output_tokens=max_tokens,
         token_counter=token_counter,
         cache_key_parts=(cache_key_label, primary.model),
+        stage="plan",
     )
     return result.text
 
@@ -428,6 +436,79 @@ Design rules:
     return VisualDesign.model_validate(json.loads(text))
 
 
+# ── Fused planning: stages 1-4 in one structured call ───────────────
+
+class FusedPlan(BaseModel):
+    """Schema of a fused-planning response; each portion is validated on its own."""
+
+    analysis: ConceptAnalysis
+    prerequisite_tree: PrerequisiteTree
+    enriched_tree: EnrichedTree
+    visual_design: VisualDesign
+
+
+_FUSED_PORTIONS: tuple[tuple[str, type[BaseModel]], ...] = (
+    ("analysis", ConceptAnalysis),
+    ("prerequisite_tree", PrerequisiteTree),
+    ("enriched_tree", EnrichedTree),
+    ("visual_design", VisualDesign),
+)
+
+
+def plan_fused(concept: str, duration_preset: dict | None = None, token_counter: dict | None = None) -> tuple[dict[str, BaseModel], dict[str, str]]:
+    """Request stages 1-4 in a single response constrained to :class:`FusedPlan`.
+
+    Returns ``(portions, errors)``: the portions that validated against their
+    stage models, keyed like :class:`FusedPlan` fields, and an error message
+    for each one that did not, so only those need a staged call.  Raises when
+    the response is not usable JSON at all.
+    """
+    preset = duration_preset or DEFAULT_DURATION_PRESET
+    min_seg, max_seg = preset["min_segments"], preset["max_segments"]
+    target_secs = preset["target_seconds"]
+    schema = json.dumps(FusedPlan.model_json_schema(), separators=(",", ":"))
+
+    prompt = f"""You are an expert pedagogical planner, mathematical enricher and cinematic visual designer
+for 3Blue1Brown-style educational math videos.
+The user wants to create an educational video about: "{concept}"
+
+HARD CONSTRAINT: The video must be approximately {target_secs} seconds long, in {min_seg}-{max_seg}
+segments of ~{preset['per_segment_seconds']}s each. Do NOT exceed {max_seg} segments.
+
+Produce the whole pre-production plan in ONE JSON object with four parts:
+1. "analysis": the core concept, domain, audience, key "aha" insights, common misconceptions,
+   the narrative arc, and suggested_segment_count ({min_seg}-{max_seg}).
+2. "prerequisite_tree": a Reverse Knowledge Tree -- ask "what must someone understand BEFORE
+   {concept}?", trace down to what the audience knows, then order the nodes from foundations up.
+   The final node IS the target concept. One node per segment, ids starting at 1.
+3. "enriched_tree": the same nodes (same ids, titles and order), each with correct LaTeX
+   equations (DOUBLE backslashes), variable definitions, primitive visual elements and a
+   visual metaphor connecting the math to intuition.
+4. "visual_design": theme name, a 5-7 color hex palette on a dark background (#141414 or
+   similar) with consistent colors per element type, typography notes, and one segment design
+   per node (layout blueprint, camera notes, transitions that flow between segments).
+
+The object MUST validate against this JSON schema:
+{schema}
+"""
+    text = _extract_json_text(_call_llm(prompt, max_tokens=16384, token_counter=token_counter, cache_key_label="planner-fused"))
+    payload = json.loads(text)
+    if not isinstance(payload, dict):
+        raise ValueError("fused plan is not a JSON object")
+
+    portions: dict[str, BaseModel] = {}
+    errors: dict[str, str] = {}
+    for key, model in _FUSED_PORTIONS:
+        try:
+            portions[key] = model.model_validate(payload.get(key))
+        except Exception as e:
+            errors[key] = str(e)
+    analysis = portions.get("analysis")
+    if isinstance(analysis, ConceptAnalysis):
+        analysis.suggested_segment_count = max(min_seg, min(max_seg, analysis.suggested_segment_count))
+    return portions, errors
+
+
 # ── Stage 5: Narrative Composition (per-segment for speed) ────────────
 
 def _compose_single_segment(
@@ -554,6 +635,42 @@ Respond with ONLY the JSON object, nothing else."""
     return None
 
 
+def _rewrite_segment_to_length(
+    seg: dict,
+    target_word_count: int,
+    per_segment_seconds: int,
+    token_counter: dict | None = None,
+) -> dict:
+    """Resize only a composed segment's narration to *target_word_count* words.
+
+    Cheaper than :func:`_compose_single_segment`: the prompt carries just the
+    narration and the beat list it must stay in sync with, and the reply is a
+    single field.  Returns a copy of *seg* with the new ``audio_script``.
+    """
+    current_words = len(seg.get("audio_script", "").split())
+    prompt = f"""Rewrite the voiceover narration of one segment of an educational math video.
+
+The narration is {current_words} words but must be approximately {target_word_count} words
+(~{per_segment_seconds} seconds at ~150 words/min). Keep the same explanations, order, tone
+and every AUDIO CUE phrase the visual beats below are synced to; only tighten or expand.
+
+Segment title: {seg.get("title", "")}
+Learning goal: {seg.get("learning_goal", "")}
+
+Visual beats:
+{seg.get("visual_instructions", "")}
+
+Current narration:
+{seg.get("audio_script", "")}
+
+Output a SINGLE JSON object: {{"audio_script": "the rewritten narration"}}"""
+    text = _extract_json_text(_call_llm(prompt, max_tokens=2048, token_counter=token_counter, cache_key_label="planner-rewrite"))
+    audio_script = json.loads(text).get("audio_script", "")
+    if not isinstance(audio_script, str) or not audio_script.strip():
+        raise ValueError("rewrite returned no audio_script")
+    return {**seg, "audio_script": audio_script.strip(), "duration_hint_seconds": per_segment_seconds}
+
+
 def compose_narrative(
     enriched_tree: EnrichedTree,
     visual_design: VisualDesign | None,
@@ -564,44 +681,136 @@ def compose_narrative(
     token_counter: dict | None = None,
     planner_preferences: str = "",
 ) -> Iterator[dict]:
-    """Compose all segments in parallel for speed, then assemble the storyboard."""
-    from agents.planner import ProSegmentedStoryboard  # lazy import
+    """Compose all segments in parallel for speed, then assemble the storyboard.
+
+    Besides status updates this yields a ``storyboard_header`` (theme, palette,
+    segment count) up front and one ``segment`` event per segment as soon as it
+    validates with a usable word count, so callers can start downstream work
+    before the whole storyboard is done.  The ``final`` storyboard remains
+    authoritative: a segment may still change if it needed regeneration.
+    """
+    from agents.planner import ProSegment, ProSegmentedStoryboard  # lazy import
 
     preset = duration_preset or DEFAULT_DURATION_PRESET
     per_segment_seconds = preset["per_segment_seconds"]
     target_seconds = preset["target_seconds"]
+    palette = visual_design.color_palette if visual_design else _DEFAULT_PALETTE
+    theme = visual_design.theme_name if visual_design else "Classic 3b1b"
+    target_words = int(per_segment_seconds * 150 / 60)
+    _WORD_TOLERANCE = 0.40
+
+    def _word_deviation(seg: dict) -> float:
+        return abs(len(seg.get("audio_script", "").split()) - target_words) / max(target_words, 1)
+
+    def _validated(seg: dict) -> dict | None:
+        try:
+            return ProSegment.model_validate(seg).model_dump()
+        except Exception:
+            return None
 
     total = len(enriched_tree.nodes)
     yield {"status": f"Composing {total} segments in parallel (~{per_segment_seconds}s each, target {target_seconds}s total)..."}
+    yield {"storyboard_header": {"theme_name": theme, "color_palette": palette, "num_segments": total}}
+
+    # Composed segments are cached like stages 1-4, keyed by everything the
+    # composition prompt is built from.
+    cache = get_planner_cache()
+    sequence = [n.title for n in enriched_tree.nodes]
+    segment_keys = [
+        _cache_key(
+            "segment", node=node.model_dump(), index=i, sequence=sequence,
+            visual_design=visual_design.model_dump() if visual_design else None,
+            analysis=analysis.model_dump() if analysis else None,
+            seconds=per_segment_seconds, preferences=planner_preferences,
+        )
+        for i, node in enumerate(enriched_tree.nodes)
+    ]
+
+    def _compose(i: int, use_cache: bool = True) -> dict | None:
+        cached = cache.get("segment", segment_keys[i]) if use_cache else None
+        if isinstance(cached, dict):
+            return cached
+        return _compose_single_segment(
+            enriched_tree.nodes[i], i, total, visual_design, analysis, enriched_tree, client,
+            max_retries, per_segment_seconds, token_counter, planner_preferences,
+        )
+
+    def _regenerate(i: int, seg: dict) -> dict | None:
+        # A segment that is valid apart from its length only needs its
+        # narration resized, which is far cheaper than recomposing it.
+        if _validated(seg) is not None:
+            try:
+                return _rewrite_segment_to_length(seg, target_words, per_segment_seconds, token_counter)
+            except Exception as e:
+                print(f"Segment {i + 1} rewrite-to-length failed ({e}); recomposing", file=sys.stderr)
+        return _compose(i, use_cache=False)
 
-    # Launch all segment compositions in parallel
+    # Launch all segment compositions in parallel.  Segments whose
+    # audio_script is >40% off the target word count would produce videos
+    # significantly shorter or longer than planned, so each is regenerated
+    # once on the same pool as soon as its first draft lands.
     # L6: Protect results/segment_errors with a lock — futures complete on pool threads
     results: dict[int, dict | None] = {}
     segment_errors: dict[int, str] = {}
     results_lock = threading.Lock()
     with ThreadPoolExecutor(max_workers=min(total, 5)) as pool:
-        futures = {
-            pool.submit(
-                _compose_single_segment,
-                node, i, total, visual_design, analysis, enriched_tree, client,
-                max_retries, per_segment_seconds, token_counter, planner_preferences,
-            ): i
-            for i, node in enumerate(enriched_tree.nodes)
-        }
-        for future in as_completed(futures):
-            idx = futures[future]
-            node = enriched_tree.nodes[idx]
-            try:
-                seg_result = future.result()
-                with results_lock:
-                    results[idx] = seg_result
-            except Exception as e:
-                err_msg = str(e)
-                print(f"Segment {idx + 1} ({node.title}) failed: {err_msg}", file=sys.stderr)
-                with results_lock:
-                    results[idx] = None
-                    segment_errors[idx] = err_msg
-            yield {"status": f"  → Segment {idx + 1}/{total} done: {node.title}"}
+        pending: dict = {pool.submit(_compose, i): (i, None) for i in range(total)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idx, original = pending.pop(future)
+                node = enriched_tree.nodes[idx]
+                if original is not None:
+                    # Regeneration finished: keep it only if the word count improved.
+                    deviation = _word_deviation(original)
+                    try:
+                        new_seg = future.result()
+                    except Exception as e:
+                        yield {"status": f"  → Segment {idx + 1} regeneration failed ({e}) — keeping original"}
+                        new_seg = None
+                    if new_seg:
+                        new_words = len(new_seg.get("audio_script", "").split())
+                        if _word_deviation(new_seg) < deviation:
+                            with results_lock:
+                                results[idx] = new_seg
+                            yield {"status": f"  → Segment {idx + 1} regenerated: {new_words} words (improved)"}
+                        else:
+                            yield {"status": f"  → Segment {idx + 1} regeneration did not improve word count — keeping original"}
+                    settled = _validated(results[idx])
+                    if settled is not None:
+                        cache.put("segment", segment_keys[idx], settled)
+                        yield {"status": f"  → Segment {idx + 1}/{total} settled", "segment": settled}
+                    continue
+
+                try:
+                    seg_result = future.result()
+                    with results_lock:
+                        results[idx] = seg_result
+                except Exception as e:
+                    err_msg = str(e)
+                    print(f"Segment {idx + 1} ({node.title}) failed: {err_msg}", file=sys.stderr)
+                    with results_lock:
+                        results[idx] = None
+                        segment_errors[idx] = err_msg
+                done = {"status": f"  → Segment {idx + 1}/{total} done: {node.title}"}
+                seg_result = results.get(idx)
+                if seg_result and _word_deviation(seg_result) > _WORD_TOLERANCE:
+                    actual_words = len(seg_result.get("audio_script", "").split())
+                    yield done
+                    yield {
+                        "status": (
+                            f"  → Segment {idx + 1} audio script is {actual_words} words "
+                            f"(target ~{target_words}) — regenerating for better timing..."
+                        )
+                    }
+                    pending[pool.submit(_regenerate, idx, seg_result)] = (idx, seg_result)
+                    continue
+                if seg_result:
+                    streamed = _validated(seg_result)
+                    if streamed is not None:
+                        cache.put("segment", segment_keys[idx], streamed)
+                        done["segment"] = streamed
+                yield done
 
     # Collect in order
     segments = []
@@ -625,42 +834,7 @@ def compose_narrative(
         print(f"WARNING: Total planned duration {total_duration}s deviates >30% from target {target_seconds}s", file=sys.stderr)
     yield {"status": f"  → Total planned duration: {total_duration}s (target: {target_seconds}s)"}
 
-    # ── Post-validate audio_script word counts ──────────────────────────────
-    # Segments whose audio_script is >40% off the target word count will produce
-    # videos significantly shorter or longer than planned. Re-generate once.
-    target_words = int(per_segment_seconds * 150 / 60)
-    _WORD_TOLERANCE = 0.40
-    for i, seg in enumerate(segments):
-        actual_words = len(seg.get("audio_script", "").split())
-        deviation = abs(actual_words - target_words) / max(target_words, 1)
-        if deviation > _WORD_TOLERANCE:
-            node = enriched_tree.nodes[i]
-            yield {
-                "status": (
-                    f"  → Segment {i + 1} audio script is {actual_words} words "
-                    f"(target ~{target_words}) — regenerating for better timing..."
-                )
-            }
-            try:
-                new_seg = _compose_single_segment(
-                    node, i, total, visual_design, analysis, enriched_tree,
-                    client, max_retries, per_segment_seconds, token_counter, planner_preferences,
-                )
-                if new_seg:
-                    new_words = len(new_seg.get("audio_script", "").split())
-                    new_dev = abs(new_words - target_words) / max(target_words, 1)
-                    if new_dev < deviation:
-                        segments[i] = new_seg
-                        yield {"status": f"  → Segment {i + 1} regenerated: {new_words} words (improved)"}
-                    else:
-                        yield {"status": f"  → Segment {i + 1} regeneration did not improve word count — keeping original"}
-            except Exception as e:
-                yield {"status": f"  → Segment {i + 1} regeneration failed ({e}) — keeping original"}
-
     # Assemble final storyboard
-    palette = visual_design.color_palette if visual_design else _DEFAULT_PALETTE
-    theme = visual_design.theme_name if visual_design else "Classic 3b1b"
-
     storyboard_dict = {
         "theme_name": theme,
         "color_palette": palette,
@@ -676,55 +850,152 @@ def compose_narrative(
 
 # ── Orchestrator: 5-stage pipeline ───────────────────────────────────
 
-def run_math2manim_planner(concept: str, max_retries: int = 3, previous_storyboard: dict | None = None, feedback: str | None = None, questionnaire_answers: dict | None = None) -> Iterator[dict]:
-    """Run the full 5-stage enrichment pipeline.
+@dataclass
+class PlanningStages:
+    """Outputs of planner stages 1-4 and how they were produced."""
 
-    Stages:
-    1. Concept Analysis — understand the concept deeply
-    2. Prerequisite Discovery — build reverse knowledge tree
-    3. Mathematical Enrichment — add equations, variables, visual elements
-    4. Visual Design — specify colors, layouts, transitions
-    5. Narrative Composition — produce verbose 2000+ token storyboard
-    """
-    client = None
-    planner_tokens = new_token_counter()
+    analysis: ConceptAnalysis | None
+    tree: PrerequisiteTree
+    enriched: EnrichedTree
+    visual_design: VisualDesign | None
+    mode: str = "staged"
+    seconds: float = 0.0
+    fallbacks: list[str] = field(default_factory=list)  # fused portions re-run as staged calls
+    defaults: list[str] = field(default_factory=list)  # stages that fell back to built-in defaults
 
-    # Resolve duration preset from questionnaire
-    video_length = "Medium (3-5 min)"
-    if questionnaire_answers:
-        video_length = questionnaire_answers.get("video_length", video_length)
-    duration_preset = DURATION_PRESETS.get(video_length, DEFAULT_DURATION_PRESET)
 
-    # Enrich concept with questionnaire preferences if available
-    enriched_concept = concept
-    planner_preferences = ""
-    if questionnaire_answers:
-        enriched_pref_context, planner_preferences = _planner_preference_context(questionnaire_answers, duration_preset)
-        enriched_concept = f"{concept}{enriched_pref_context}"
+def _fused_planning_enabled() -> bool:
+    return os.getenv("PAPER2MANIM_FUSED_PLANNING", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _cache_preferences(questionnaire_answers: dict | None) -> dict:
+    """Preferences that appear in the Stage 1 prompt (see ``_planner_preference_context``)."""
+    answers = questionnaire_answers or {}
+    return {
+        key: answers[key]
+        for key in (
+            "video_length", "target_audience", "visual_style", "pacing",
+            "narration_style", "quality_mode", "custom_preferences",
+        )
+        if answers.get(key)
+    }
+
+
+def _cache_key(stage: str, **inputs) -> str:
+    model = model_key(resolve_stage_model("plan"))
+    return PlannerCache.key(stage, model=model, version=_PLANNER_PROMPT_VERSION, **inputs)
+
+
+def _cached_stage(cache: PlannerCache, stage: str, key: str, model: type[BaseModel]) -> BaseModel | None:
+    value = cache.get(stage, key)
+    if value is None:
+        return None
+    try:
+        return model.model_validate(value)
+    except Exception:
+        return None
+
+
+def _plan_stages(
+    concept: str,
+    enriched_concept: str,
+    duration_preset: dict,
+    planner_tokens: dict,
+    max_retries: int = 3,
+    fused: bool = False,
+    preferences: dict | None = None,
+    cache: PlannerCache | None = None,
+) -> Generator[dict, None, PlanningStages]:
+    """Run stages 1-4, yielding status updates and returning their outputs.
+
+    Each stage is first looked up in the planner cache (see
+    :mod:`utils.planner_cache`) under a key built from its own inputs, so a
+    changed input only re-plans the stages downstream of it.  In *fused* mode
+    the first cache miss triggers one :func:`plan_fused` call that covers the
+    remaining stages; a portion that fails validation, or no longer fits a
+    re-planned upstream portion, is produced by its regular staged call instead.
+    Fused portions are only used on top of the fused analysis, since a cached
+    or staged analysis is not the one they were planned from.
+    """
+    client = None
+    started = time.perf_counter()
+    cache = cache or get_planner_cache()
+    concept_key = normalize_concept(concept)
+    fused_response: dict[str, BaseModel] | None = None
+    fallbacks: list[str] = []
+    defaults: list[str] = []
+
+    def _from_fused(name: str) -> Generator[dict, None, BaseModel | None]:
+        nonlocal fused_response
+        if not fused:
+            return None
+        if fused_response is None:
+            yield {"status": "Stages 1-4/5: Planning analysis, prerequisites, enrichment and visuals in one call..."}
+            try:
+                fused_response, errors = plan_fused(enriched_concept, duration_preset, planner_tokens)
+            except Exception as e:
+                fused_response, errors = {}, {key: str(e) for key, _ in _FUSED_PORTIONS}
+            for key, err in errors.items():
+                print(f"Fused planning: {key} invalid: {err}", file=sys.stderr)
+            if errors:
+                yield {"status": f"  → Fused plan incomplete; re-planning {', '.join(errors)} with staged calls..."}
+        portion = fused_response.get(name)
+        if portion is None:
+            fallbacks.append(name)
+        return portion
 
     # ── Stage 1: Concept Analysis ──
-    yield {"status": f"Stage 1/5: Analyzing concept (target: {duration_preset['target_seconds']}s, {duration_preset['min_segments']}-{duration_preset['max_segments']} segments)..."}
-    analysis, analysis_err = _call_stage_with_retries(
-        analyze_concept, enriched_concept, client, duration_preset, planner_tokens,
-        max_retries=max_retries, stage_name="Stage 1 (concept analysis)",
-    )
+    analysis_from_fused = False
+    analysis_key = _cache_key("analysis", concept=concept_key, preferences=preferences or {}, preset=duration_preset)
+    analysis = _cached_stage(cache, "analysis", analysis_key, ConceptAnalysis)
+    if analysis is not None:
+        yield {"status": "Stage 1/5: Reusing cached concept analysis"}
+    else:
+        analysis = yield from _from_fused("analysis")
+        analysis_from_fused = analysis is not None
+        if analysis is None:
+            yield {"status": f"Stage 1/5: Analyzing concept (target: {duration_preset['target_seconds']}s, {duration_preset['min_segments']}-{duration_preset['max_segments']} segments)..."}
+            analysis, analysis_err = _call_stage_with_retries(
+                analyze_concept, enriched_concept, client, duration_preset, planner_tokens,
+                max_retries=max_retries, stage_name="Stage 1 (concept analysis)",
+            )
+            if not analysis:
+                reason = _friendly_planner_error(analysis_err)
+                yield {"status": f"  → Concept analysis failed after {max_retries} attempts: {reason}"}
+                yield {"status": "  → Proceeding with defaults..."}
+                defaults.append("analysis")
+        if analysis:
+            cache.put("analysis", analysis_key, analysis.model_dump())
     if analysis:
         yield {"status": f"  → Domain: {analysis.domain} | Audience: {analysis.target_audience} | Arc: {analysis.narrative_arc[:60]}..."}
-    else:
-        reason = _friendly_planner_error(analysis_err)
-        yield {"status": f"  → Concept analysis failed after {max_retries} attempts: {reason}"}
-        yield {"status": "  → Proceeding with defaults..."}
 
     # ── Stage 2: Prerequisite Discovery ──
-    yield {"status": "Stage 2/5: Building reverse knowledge tree (what must be understood first?)..."}
-    tree, tree_err = _call_stage_with_retries(
-        build_prerequisite_tree, concept, analysis, client, planner_tokens,
-        max_retries=max_retries, stage_name="Stage 2 (prerequisite tree)",
-    )
-    if not tree:
-        yield {"status": f"  → Prerequisite tree failed after {max_retries} attempts: {tree_err}"}
-        yield {"status": "  → Using minimal fallback tree..."}
-        tree = _default_prerequisite_tree(concept, analysis)
+    # The fused tree is only usable on top of the fused analysis, and fused
+    # enrichment and visuals only on top of the fused tree.
+    tree_from_fused = False
+    tree_key = _cache_key("prerequisite_tree", concept=concept_key, analysis=analysis.model_dump() if analysis else None)
+    tree = _cached_stage(cache, "prerequisite_tree", tree_key, PrerequisiteTree)
+    if tree is not None:
+        yield {"status": "Stage 2/5: Reusing cached prerequisite tree"}
+    else:
+        if analysis_from_fused:
+            tree = yield from _from_fused("prerequisite_tree")
+        tree_from_fused = tree is not None
+        if tree is None:
+            yield {"status": "Stage 2/5: Building reverse knowledge tree (what must be understood first?)..."}
+            tree, tree_err = _call_stage_with_retries(
+                build_prerequisite_tree, concept, analysis, client, planner_tokens,
+                max_retries=max_retries, stage_name="Stage 2 (prerequisite tree)",
+            )
+            if tree:
+                cache.put("prerequisite_tree", tree_key, tree.model_dump())
+            else:
+                yield {"status": f"  → Prerequisite tree failed after {max_retries} attempts: {tree_err}"}
+                yield {"status": "  → Using minimal fallback tree..."}
+                tree = _default_prerequisite_tree(concept, analysis)
+                defaults.append("prerequisite_tree")
+        else:
+            cache.put("prerequisite_tree", tree_key, tree.model_dump())
     # Hard-clamp tree to duration preset's max segments so a "Short" video
     # never accidentally becomes 6 segments due to the LLM ignoring the constraint.
     max_segs = duration_preset["max_segments"]
@@ -734,35 +1005,182 @@ def run_math2manim_planner(concept: str, max_retries: int = 3, previous_storyboa
     yield {"status": f"  → Built tree with {len(tree.nodes)} nodes: {' → '.join(n.title for n in tree.nodes)}"}
 
     # ── Stage 3: Mathematical Enrichment ──
-    yield {"status": f"Stage 3/5: Enriching {len(tree.nodes)} segments with equations, variables, and visual metaphors..."}
-    enriched, enrich_err = _call_stage_with_retries(
-        enrich_concept_tree, tree, analysis, client, planner_tokens,
-        max_retries=max_retries, stage_name="Stage 3 (enrichment)",
+    enrich_key = _cache_key(
+        "enriched_tree", tree=tree.model_dump(),
+        misconceptions=analysis.common_misconceptions if analysis else [],
     )
-    if not enriched:
-        yield {"status": f"  → Enrichment failed after {max_retries} attempts: {enrich_err}"}
-        yield {"status": "  → Using minimal fallback enrichment..."}
-        enriched = _default_enriched_tree(tree)
+    enriched = _cached_stage(cache, "enriched_tree", enrich_key, EnrichedTree)
+    if enriched is not None:
+        yield {"status": "Stage 3/5: Reusing cached enrichment"}
+    else:
+        if tree_from_fused:
+            enriched = yield from _from_fused("enriched_tree")
+        node_ids = [(n.id, n.title) for n in tree.nodes]
+        if enriched is not None:
+            enriched = EnrichedTree(nodes=enriched.nodes[:len(node_ids)])
+            if [(n.id, n.title) for n in enriched.nodes] != node_ids:
+                enriched = None
+                fallbacks.append("enriched_tree")
+        if enriched is None:
+            yield {"status": f"Stage 3/5: Enriching {len(tree.nodes)} segments with equations, variables, and visual metaphors..."}
+            enriched, enrich_err = _call_stage_with_retries(
+                enrich_concept_tree, tree, analysis, client, planner_tokens,
+                max_retries=max_retries, stage_name="Stage 3 (enrichment)",
+            )
+            if not enriched:
+                yield {"status": f"  → Enrichment failed after {max_retries} attempts: {enrich_err}"}
+                yield {"status": "  → Using minimal fallback enrichment..."}
+                enriched = _default_enriched_tree(tree)
+                defaults.append("enriched_tree")
+        if "enriched_tree" not in defaults:
+            cache.put("enriched_tree", enrich_key, enriched.model_dump())
     total_equations = sum(len(n.equations_latex) for n in enriched.nodes)
     yield {"status": f"  → Enriched with {total_equations} equations and {len(enriched.nodes)} visual metaphors"}
 
     # ── Stage 4: Visual Design ──
-    yield {"status": "Stage 4/5: Designing visual identity, color palette, and per-segment layouts..."}
-    visual_design, _ = _call_stage_with_retries(
-        design_visuals, enriched, analysis, client, planner_tokens,
-        max_retries=max_retries, stage_name="Stage 4 (visual design)",
-    )
+    design_key = _cache_key("visual_design", enriched=enriched.model_dump())
+    visual_design = _cached_stage(cache, "visual_design", design_key, VisualDesign)
+    if visual_design is not None:
+        yield {"status": "Stage 4/5: Reusing cached visual design"}
+    else:
+        if tree_from_fused:
+            visual_design = yield from _from_fused("visual_design")
+        if visual_design is not None and len(visual_design.segment_designs) < len(enriched.nodes):
+            visual_design = None
+            fallbacks.append("visual_design")
+        if visual_design is None:
+            yield {"status": "Stage 4/5: Designing visual identity, color palette, and per-segment layouts..."}
+            visual_design, _ = _call_stage_with_retries(
+                design_visuals, enriched, analysis, client, planner_tokens,
+                max_retries=max_retries, stage_name="Stage 4 (visual design)",
+            )
+        if visual_design:
+            cache.put("visual_design", design_key, visual_design.model_dump())
     if visual_design:
         yield {"status": f"  → Theme: '{visual_design.theme_name}' with {len(visual_design.color_palette)} colors"}
     else:
         yield {"status": "  → Visual design returned empty, narrative composer will use defaults..."}
+        defaults.append("visual_design")
+
+    return PlanningStages(
+        analysis=analysis,
+        tree=tree,
+        enriched=enriched,
+        visual_design=visual_design,
+        mode="fused" if fused else "staged",
+        seconds=round(time.perf_counter() - started, 3),
+        fallbacks=fallbacks,
+        defaults=defaults,
+    )
+
+
+def planning_quality(stages: PlanningStages) -> dict:
+    """Structural quality proxies for comparing planning modes."""
+    nodes = stages.enriched.nodes
+    designs = stages.visual_design.segment_designs if stages.visual_design else []
+    return {
+        "segments": len(nodes),
+        "equations": sum(len(n.equations_latex) for n in nodes),
+        "nodes_with_equations": sum(1 for n in nodes if n.equations_latex),
+        "nodes_with_metaphor": sum(1 for n in nodes if n.visual_metaphor.strip()),
+        "segment_designs": min(len(designs), len(nodes)),
+        "palette_colors": len(stages.visual_design.color_palette) if stages.visual_design else 0,
+        "key_insights": len(stages.analysis.key_insights) if stages.analysis else 0,
+        "defaults_used": list(stages.defaults),
+    }
+
+
+def benchmark_planning_modes(
+    concept: str,
+    questionnaire_answers: dict | None = None,
+    max_retries: int = 3,
+    modes: tuple[str, ...] = ("staged", "fused"),
+) -> dict[str, dict]:
+    """Run planner stages 1-4 once per mode and report latency, tokens and quality.
+
+    Stage 5 is skipped: it is identical in both modes.
+    """
+    duration_preset, enriched_concept, _ = _resolve_planner_inputs(concept, questionnaire_answers)
+    report: dict[str, dict] = {}
+    for mode in modes:
+        tokens = new_token_counter()
+        # Bypass the planner cache so both modes make their real calls.
+        stages = _plan_stages(
+            concept, enriched_concept, duration_preset, tokens, max_retries,
+            fused=mode == "fused", cache=PlannerCache("", enabled=False),
+        )
+        while True:
+            try:
+                next(stages)
+            except StopIteration as stop:
+                result: PlanningStages = stop.value
+                break
+        report[mode] = {
+            "seconds": result.seconds,
+            "api_calls": tokens["api_calls"],
+            "input_tokens": tokens["input_tokens"],
+            "output_tokens": tokens["output_tokens"],
+            "fallbacks": result.fallbacks,
+            "quality": planning_quality(result),
+        }
+    return report
+
+
+def _resolve_planner_inputs(concept: str, questionnaire_answers: dict | None) -> tuple[dict, str, str]:
+    """Duration preset, preference-enriched concept and Stage-5 preference prompt."""
+    video_length = "Medium (3-5 min)"
+    if questionnaire_answers:
+        video_length = questionnaire_answers.get("video_length", video_length)
+    duration_preset = DURATION_PRESETS.get(video_length, DEFAULT_DURATION_PRESET)
+
+    # Enrich concept with questionnaire preferences if available
+    enriched_concept = concept
+    planner_preferences = ""
+    if questionnaire_answers:
+        enriched_pref_context, planner_preferences = _planner_preference_context(questionnaire_answers, duration_preset)
+        enriched_concept = f"{concept}{enriched_pref_context}"
+    return duration_preset, enriched_concept, planner_preferences
+
+
+def run_math2manim_planner(
+    concept: str,
+    max_retries: int = 3,
+    previous_storyboard: dict | None = None,
+    feedback: str | None = None,
+    questionnaire_answers: dict | None = None,
+    fused_planning: bool | None = None,
+) -> Iterator[dict]:
+    """Run the full 5-stage enrichment pipeline.
+
+    Stages:
+    1. Concept Analysis — understand the concept deeply
+    2. Prerequisite Discovery — build reverse knowledge tree
+    3. Mathematical Enrichment — add equations, variables, visual elements
+    4. Visual Design — specify colors, layouts, transitions
+    5. Narrative Composition — produce verbose 2000+ token storyboard
+
+    With *fused_planning* (default: ``PAPER2MANIM_FUSED_PLANNING``) stages 1-4
+    share one structured call; see :func:`_plan_stages`.
+    """
+    client = None
+    planner_tokens = new_token_counter()
+    if fused_planning is None:
+        fused_planning = _fused_planning_enabled()
+
+    duration_preset, enriched_concept, planner_preferences = _resolve_planner_inputs(concept, questionnaire_answers)
+    stages = yield from _plan_stages(
+        concept, enriched_concept, duration_preset, planner_tokens, max_retries,
+        fused=fused_planning, preferences=_cache_preferences(questionnaire_answers),
+    )
+    if stages.fallbacks:
+        yield {"status": f"  → Fused planning re-planned {', '.join(stages.fallbacks)} with staged calls"}
 
     # ── Stage 5: Narrative Composition (parallel) ──
     yield {"status": "Stage 5/5: Composing verbose narrative storyboard (parallel, 2000+ tokens per segment)..."}
     for update in compose_narrative(
-        enriched,
-        visual_design,
-        analysis,
+        stages.enriched,
+        stages.visual_design,
+        stages.analysis,
         client,
         max_retries,
         duration_preset=duration_preset,
@@ -773,4 +1191,10 @@ def run_math2manim_planner(concept: str, max_retries: int = 3, previous_storyboa
             # Attach planner token usage to the final update
             update["token_usage"] = dict(planner_tokens)
             update["model_profile"] = model_profile_summary()
+            update["planning"] = {
+                "mode": stages.mode,
+                "seconds": stages.seconds,
+                "fallbacks": stages.fallbacks,
+                "cache": get_planner_cache().stats(),
+            }
         yield update
@@ -228,6 +228,9 @@ export const segmentPhaseLabels: Record<string, string> = {
   self_correct: 'Fixing: self-correcting',
   fix_docs: 'Checking: looking up fix docs',
   apply_fix: 'Fixing: applying patch',
+  retime: 'Fixing: fitting ending to narration',
+  auto_fix: 'Fixing: applying known fix',
+  candidates: 'Doing: racing code candidates',
   verify: 'Checking: verifying code quality',
   verify_fix: 'Fixing: verification issues',
   done: 'Complete',
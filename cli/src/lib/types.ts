@@ -197,6 +197,13 @@ export interface PipelineUpdate {
     estimated_cost_usd: number;
     estimated_cache_savings_usd?: number;
     fallback_invocations?: number;
+    repair_patches?: {
+      applied: number;
+      fallbacks: number;
+      output_tokens_saved: number;
+      seconds_saved: number;
+    };
+    auto_fixes?: { applied: number; escalated: number };
     model_profile?: Record<string, string>;
     breakdown?: Record<string, {
       model?: string;
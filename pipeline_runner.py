@@ -233,6 +233,26 @@ def _handle_workspace_command(args: dict) -> None:
         _emit({"type": "error", "message": f"Unknown workspace action: {action}"})
 
 
+def _handle_planning_benchmark(args: dict) -> None:
+    """Compare staged vs fused planner stages 1-4 for one concept (no rendering)."""
+    concept: str = args.get("concept", "")
+    if not concept:
+        _emit({"type": "error", "message": "No concept provided."})
+        return
+    from agents.planner_math2manim import benchmark_planning_modes
+
+    try:
+        results = benchmark_planning_modes(
+            concept,
+            questionnaire_answers=args.get("questionnaire_answers"),
+            max_retries=args.get("max_retries", 3),
+        )
+    except Exception as e:
+        _emit({"type": "error", "message": str(e)})
+        return
+    _emit({"type": "planning_benchmark", "concept": concept, "results": results})
+
+
 def main() -> None:
     if len(sys.argv) < 2:
         _emit({"type": "error", "message": "Usage: pipeline_runner.py '<json_args>'"})
@@ -244,11 +264,14 @@ def main() -> None:
         _emit({"type": "error", "message": f"Invalid JSON args: {e}"})
         sys.exit(1)
 
-    # ── Workspace commands (no pipeline) ─────────────────────────────
+    # ── Workspace and benchmark commands (no pipeline) ───────────────
     mode = args.get("mode")
     if mode == "workspace":
         _handle_workspace_command(args)
         return
+    if mode == "benchmark_planning":
+        _handle_planning_benchmark(args)
+        return
 
     concept: str = args.get("concept", "")
     max_retries: int = args.get("max_retries", 3)
@@ -258,10 +281,13 @@ def main() -> None:
     render_timeout: int = int(args.get("render_timeout") or 0)
     tts_timeout: int = int(args.get("tts_timeout") or 0)
     force_restart: bool = args.get("force_restart", False)
+    speculative_codegen: bool | None = args.get("speculative_codegen")
     # Phase 5-6 extensions (new optional args — fully backward-compatible)
     system_prompt_prefix: str = args.get("system_prompt_prefix") or ""
     max_turns: int = int(args.get("max_turns") or 0)
     model_override: str = args.get("model") or ""
+    fused_planning: bool | None = args.get("fused_planning")
+    planner_cache: str = args.get("planner_cache") or ""  # "reuse" (default), "refresh" or "off"
     default_questionnaire_answers = {
         "video_length": "Medium (3-5 min)",
         "target_audience": "Undergraduate",
@@ -414,6 +440,11 @@ def main() -> None:
             os.environ["PAPER2MANIM_MODEL_OVERRIDE"] = model_override
     if max_turns:
         os.environ["PAPER2MANIM_MAX_TURNS"] = str(max_turns)
+    if fused_planning is not None:
+        os.environ["PAPER2MANIM_FUSED_PLANNING"] = "1" if fused_planning else "0"
+    if planner_cache:
+        os.environ["PAPER2MANIM_PLANNER_CACHE"] = "0" if planner_cache == "off" else "1"
+        os.environ["PAPER2MANIM_PLANNER_CACHE_REFRESH"] = "1" if planner_cache == "refresh" else "0"
 
     active_profile = normalize_model_selection(os.environ.get("PAPER2MANIM_MODEL_PROFILE") or model_override)
     if active_profile == DEFAULT_MODEL_PROFILE and not os.environ.get("ANTHROPIC_API_KEY"):
@@ -437,6 +468,7 @@ def main() -> None:
             tts_timeout_seconds=tts_timeout,
             resume_dir=resume_dir,
             force_restart=force_restart,
+            speculative_codegen=speculative_codegen,
         ):
             _emit({"type": "pipeline", "update": update})
 
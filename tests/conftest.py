@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from utils import golden_scenes, model_router, repair_rules
+
+
+@pytest.fixture(autouse=True)
+def isolated_model_stats(monkeypatch, tmp_path):
+    """Keep routed calls in tests from reading or writing ~/.paper2manim/model_stats.json."""
+    monkeypatch.setenv("PAPER2MANIM_MODEL_STATS_PATH", str(tmp_path / "model_stats.json"))
+    model_router.get_model_router.cache_clear()
+    yield
+    model_router.get_model_router.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_golden_library(monkeypatch, tmp_path):
+    """Keep golden-scene retrieval in tests from reading or writing ~/.paper2manim/golden_library.json."""
+    monkeypatch.setenv("PAPER2MANIM_GOLDEN_LIBRARY_PATH", str(tmp_path / "golden_library.json"))
+    golden_scenes.get_golden_library.cache_clear()
+    yield
+    golden_scenes.get_golden_library.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_error_kb(monkeypatch, tmp_path):
+    """Keep auto-fix bookkeeping in tests out of ~/.paper2manim/error_signatures.json."""
+    monkeypatch.setenv("PAPER2MANIM_ERROR_KB_PATH", str(tmp_path / "error_signatures.json"))
+    repair_rules.get_error_kb.cache_clear()
+    yield
+    repair_rules.get_error_kb.cache_clear()
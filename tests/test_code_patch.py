@@ -0,0 +1,55 @@
+"""Tests for utils.code_patch — applying model-written unified diffs."""
+
+from __future__ import annotations
+
+from utils.code_patch import apply_unified_diff, looks_like_diff
+
+_CODE = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        title = Text("Hello")
+        self.play(Write(title))
+        eq = MathTex(r"\\frac{a}{b}")
+        self.play(FadeIn(eq))
+        self.wait(2)
+"""
+
+
+def test_applies_hunk_with_wrong_line_numbers():
+    diff = """```diff
+@@ -40,3 +40,3 @@
+         title = Text("Hello")
+-        self.play(Write(title))
++        self.play(Write(title), run_time=1.5)
+         eq = MathTex(r"\\frac{a}{b}")
+```"""
+    patched = apply_unified_diff(_CODE, diff)
+    assert "self.play(Write(title), run_time=1.5)" in patched
+    assert patched.count("\n") == _CODE.count("\n")
+
+
+def test_applies_multiple_hunks_and_insertions():
+    diff = """--- a/scene.py
++++ b/scene.py
+@@ -5,1 +5,2 @@
+         title = Text("Hello")
++        title.to_edge(UP)
+@@ -9,1 +10,2 @@
+-        self.wait(2)
++        self.play(FadeOut(title, eq))
++        self.wait(1)
+"""
+    patched = apply_unified_diff(_CODE, diff)
+    assert patched.splitlines()[5] == "        title.to_edge(UP)"
+    assert patched.endswith("        self.play(FadeOut(title, eq))\n        self.wait(1)\n")
+
+
+def test_rejects_patch_whose_context_is_missing():
+    diff = "@@ -6,1 +6,1 @@\n-        self.play(Create(title))\n+        self.play(Write(title))\n"
+    assert apply_unified_diff(_CODE, diff) is None
+
+
+def test_looks_like_diff():
+    assert looks_like_diff("@@ -1 +1 @@\n-a\n+b")
+    assert not looks_like_diff(_CODE)
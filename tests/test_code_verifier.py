@@ -0,0 +1,212 @@
+"""Tests for utils.code_verifier — static-first segment verification."""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import utils.code_verifier as code_verifier
+
+_CLEAN = """from manim import *
+
+class Segment1Scene(Scene):
+    def construct(self):
+        title = Text("Hello").to_edge(UP)
+        self.play(Write(title))
+        self.wait(3)
+"""
+
+_LOOPED = """from manim import *
+
+class Segment1Scene(Scene):
+    def construct(self):
+        for i in range(3):
+            self.play(Create(Dot()))
+"""
+
+
+def test_conclusive_scene_skips_llm(monkeypatch):
+    def _fail(**kwargs):
+        raise AssertionError("LLM verifier should not run")
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", _fail)
+    result = code_verifier.verify_segment_code(1, _CLEAN, audio_duration=4.0)
+    assert result.passed
+    assert result.used_llm is False
+
+
+def test_conclusive_scene_reports_timing_issue(monkeypatch):
+    monkeypatch.setattr(code_verifier, "run_text_completion", lambda **kw: None)
+    result = code_verifier.verify_segment_code(1, _CLEAN, audio_duration=30.0)
+    assert not result.passed
+    assert any("freeze" in issue for issue in result.issues)
+
+
+def test_inconclusive_scene_falls_back_to_llm(monkeypatch):
+    calls: list[dict] = []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(text='{"passed": true, "issues": [], "suggestions": []}')
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    result = code_verifier.verify_segment_code(1, _LOOPED)
+    assert len(calls) == 1
+    assert result.used_llm is True
+    assert result.passed
+
+
+def test_layout_trace_replaces_static_analysis(monkeypatch):
+    def _fail(**kwargs):
+        raise AssertionError("LLM verifier should not run")
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", _fail)
+    trace = {
+        "duration": 2.0,
+        "beats": [{
+            "index": 0, "event": "play", "line": 6, "start": 0.0, "end": 2.0,
+            "mobjects": [
+                {"id": 1, "name": "a", "type": "Text", "bbox": [-1, -0.3, 1, 0.3]},
+                {"id": 2, "name": "b", "type": "Text", "bbox": [-1, -0.3, 1, 0.3]},
+            ],
+        }],
+    }
+    # _LOOPED is inconclusive statically; the trace still avoids the LLM.
+    result = code_verifier.verify_segment_code(1, _LOOPED, layout_trace=trace)
+    assert result.used_llm is False
+    assert not result.passed
+    assert any("overlap" in issue for issue in result.issues)
+
+
+
+def _batch_reply(kwargs: dict) -> dict:
+    """Answer every item in a batched prompt as passing/smooth."""
+    content = kwargs["user_content"]
+    segments = [int(m) for m in re.findall(r"### SEGMENT (\d+)", content)]
+    pairs = [tuple(map(int, m)) for m in re.findall(r"### TRANSITION (\d+) -> (\d+)", content)]
+    return {
+        "segments": [{"segment_id": sid, "passed": True, "issues": [], "suggestions": []} for sid in segments],
+        "transitions": [{"from": a, "to": b, "smooth": a != 2, "issues": [] if a != 2 else ["leftover axes"]}
+                        for a, b in pairs],
+    }
+
+
+def test_project_verification_batches_segments_and_transitions(monkeypatch):
+    calls: list[dict] = []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(text=json.dumps(_batch_reply(kwargs)))
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    codes = {1: _CLEAN, 2: _LOOPED, 3: _LOOPED}
+    outcome = code_verifier.verify_project_code(codes)
+
+    assert len(calls) == 1 and outcome.llm_calls == 1
+    assert "### SEGMENT 1" not in calls[0]["user_content"]  # decided statically
+    assert outcome.segments[1].used_llm is False
+    assert outcome.segments[2].used_llm and outcome.segments[3].used_llm
+    assert [(t.segment_a_id, t.segment_b_id) for t in outcome.transitions] == [(1, 2), (2, 3)]
+    assert outcome.transitions[1].smooth is False
+
+
+def test_project_verification_shards_and_falls_back_per_item(monkeypatch):
+    calls: list[dict] = []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        if "### TRANSITION 2 -> 3" in kwargs["user_content"]:
+            return SimpleNamespace(text="not json")
+        if kwargs["system_sections"][0] is code_verifier._TRANSITION_SYSTEM:
+            return SimpleNamespace(text='{"smooth": true, "issues": []}')
+        return SimpleNamespace(text=json.dumps(_batch_reply(kwargs)))
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    codes = {1: _CLEAN, 2: _CLEAN, 3: _CLEAN}
+    # A tiny budget puts each transition in its own shard.
+    outcome = code_verifier.verify_project_code(codes, verify_segments=False, token_budget=1)
+
+    assert outcome.shards == 2
+    assert outcome.fallback_items == 1
+    assert outcome.llm_calls == 3
+    assert [t.smooth for t in outcome.transitions] == [True, True]
+
+
+def test_project_verification_streams_results_with_shard_timing(monkeypatch):
+    def fake_completion(**kwargs):
+        if "### TRANSITION 2 -> 3" in kwargs["user_content"]:
+            return SimpleNamespace(text="not json")
+        if kwargs["system_sections"][0] is code_verifier._TRANSITION_SYSTEM:
+            return SimpleNamespace(text='{"smooth": true, "issues": []}')
+        return SimpleNamespace(text=json.dumps(_batch_reply(kwargs)))
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    streamed: list[tuple[int, int, int]] = []
+    outcome = code_verifier.verify_project_code(
+        {1: _CLEAN, 2: _CLEAN, 3: _CLEAN}, verify_segments=False, token_budget=1,
+        on_result=lambda r: streamed.append((r.segment_a_id, r.segment_b_id, r.shard)),
+    )
+
+    # 1->2 came from shard 1; 2->3's shard reply was unusable, so it was checked on its own.
+    assert sorted(streamed) == [(1, 2, 1), (2, 3, 0)]
+    assert [t.shard for t in outcome.transitions] == [1, 0]
+
+
+def test_string_verdicts_are_parsed_strictly(monkeypatch):
+    def fake_completion(**kwargs):
+        return SimpleNamespace(text=json.dumps({
+            "segments": [{"segment_id": 2, "passed": "false"}, {"segment_id": 3, "passed": "True"}],
+            "transitions": [{"from": 2, "to": 3, "smooth": "false"}],
+        }))
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    outcome = code_verifier.verify_project_code({2: _LOOPED, 3: _LOOPED})
+
+    assert outcome.segments[2].passed is False and outcome.segments[3].passed is True
+    assert outcome.transitions[0].smooth is False
+
+
+def test_transition_checks_run_concurrently_in_order(monkeypatch):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_completion(**kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        smooth = "Segment 3 to Segment 4" not in kwargs["user_content"]
+        return SimpleNamespace(text=json.dumps({"smooth": smooth, "issues": []}))
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    finished: list[tuple[int, int]] = []
+    codes = {sid: _CLEAN for sid in range(1, 7)}
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = code_verifier.verify_code_transitions(
+            codes, executor=pool, on_result=lambda r: finished.append((r.segment_a_id, r.segment_b_id)),
+        )
+
+    assert [(r.segment_a_id, r.segment_b_id) for r in results] == [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6)]
+    assert [r.smooth for r in results] == [True, True, False, True, True]
+    assert sorted(finished) == [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6)]
+    assert peak == 3
+    assert all(r.elapsed_seconds >= 0.05 for r in results)
+
+
+def test_transition_checks_merge_token_usage(monkeypatch):
+    def fake_completion(**kwargs):
+        kwargs["token_counter"]["api_calls"] += 1
+        return SimpleNamespace(text='{"smooth": true, "issues": []}')
+
+    monkeypatch.setattr(code_verifier, "run_text_completion", fake_completion)
+    counter = {"api_calls": 0}
+    code_verifier.verify_code_transitions({1: _CLEAN, 2: _CLEAN, 3: _CLEAN}, token_counter=counter, max_workers=2)
+    assert counter["api_calls"] == 2
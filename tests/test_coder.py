@@ -0,0 +1,203 @@
+"""Tests for agents.coder repair paths (LLM calls are faked)."""
+
+from __future__ import annotations
+
+from agents import coder
+from agents.config import new_token_counter
+
+_CODE = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        title = Text("Hello")
+        self.play(Create(title, color=BLUE))
+        self.wait(2)
+"""
+
+_DIFF = """@@ -6,1 +6,1 @@
+-        self.play(Create(title, color=BLUE))
++        self.play(Write(title))
+"""
+
+
+def _fake_send(replies: list[str], prompts: list[str]):
+    def fake(complexity, system_sections, user_message, max_tool_calls, tool_call_counts=None,
+             token_counter=None, on_status=None, *, fix=False, tool_latency=None, cancelled=None):
+        prompts.append(user_message)
+        reply = replies.pop(0)
+        token_counter["output_tokens"] += max(1, len(reply) // 4)
+        return reply
+    return fake
+
+
+def test_patch_repair_applies_diff_and_records_savings(monkeypatch):
+    prompts: list[str] = []
+    monkeypatch.setattr(coder, "_send_and_extract", _fake_send([_DIFF], prompts))
+    counter = new_token_counter()
+
+    out = list(coder.fix_manim_script(_CODE, "TypeError: unexpected keyword 'color'", token_counter=counter, patch=True))
+
+    assert out[-1] == _CODE.replace("Create(title, color=BLUE)", "Write(title)")
+    assert len(prompts) == 1 and "unified diff" in prompts[0]
+    assert counter["repair_patches_applied"] == 1
+    assert counter["repair_output_tokens_saved"] > 0
+
+
+def test_patch_repair_falls_back_to_full_rewrite(monkeypatch):
+    prompts: list[str] = []
+    rewritten = _CODE.replace("Create(title, color=BLUE)", "FadeIn(title)")
+    bad_diff = "@@ -6,1 +6,1 @@\n-        self.play(Missing())\n+        self.play(Write(title))\n"
+    monkeypatch.setattr(coder, "_send_and_extract", _fake_send([bad_diff, rewritten], prompts))
+    counter = new_token_counter()
+
+    out = list(coder.fix_manim_script(_CODE, "TypeError", token_counter=counter, patch=True))
+
+    assert out[-1] == rewritten
+    assert len(prompts) == 2 and "COMPLETE corrected Python file" in prompts[1]
+    assert counter["repair_patch_fallbacks"] == 1
+    assert counter["repair_patches_applied"] == 0
+
+
+def test_rewrite_strategy_skips_patch_mode(monkeypatch):
+    prompts: list[str] = []
+    monkeypatch.setattr(coder, "_send_and_extract", _fake_send([_CODE], prompts))
+    list(coder.fix_manim_script(_CODE, "TypeError", token_counter=new_token_counter(), patch=True, repair_attempt=2))
+    assert "unified diff" not in prompts[0]
+
+
+def test_known_dry_run_error_is_fixed_locally(monkeypatch):
+    broken = _CODE.replace("color=BLUE", "color=LIGHT_BLUE")
+
+    def fake_generate(*args, **kwargs):
+        yield broken
+
+    dry_runs: list[str] = []
+
+    def fake_dry_run(code, class_name, trace_layout=False):
+        dry_runs.append(code)
+        if "LIGHT_BLUE" in code:
+            return {"success": False, "video_path": None,
+                    "error": "File \"scene.py\", line 6\nNameError: name 'LIGHT_BLUE' is not defined"}
+        return {"success": True, "video_path": None, "error": None}
+
+    def no_llm_fix(*args, **kwargs):
+        raise AssertionError("LLM repair should not run")
+
+    monkeypatch.setattr(coder, "generate_manim_script", fake_generate)
+    monkeypatch.setattr(coder, "dry_run_manim_code", fake_dry_run)
+    monkeypatch.setattr(coder, "fix_manim_script", no_llm_fix)
+
+    updates = list(coder.run_coder_agent("show a title", max_retries=1))
+
+    assert any(u.get("phase") == "auto_fix" for u in updates)
+    final = updates[-1]
+    assert final["code_validated"] and "color=BLUE_B" in final["code"]
+    assert final["token_usage"]["auto_fixes_applied"] == 1
+    assert len(dry_runs) == 2
+
+
+def test_best_of_n_takes_first_passing_candidate(monkeypatch):
+    import threading
+
+    slow_started = threading.Event()
+    good = _CODE.replace("Create(title, color=BLUE)", "Write(title)")
+    slow = _CODE.replace("Create(title, color=BLUE)", "FadeIn(title)")
+
+    def fake_generate(*args, strategy_hint="", token_counter=None, tool_call_counts=None, cancelled=None, **kwargs):
+        token_counter["api_calls"] += 1
+        if strategy_hint == coder._CANDIDATE_STRATEGIES[0]:
+            yield _CODE
+        elif strategy_hint == coder._CANDIDATE_STRATEGIES[1]:
+            assert slow_started.wait(5)
+            yield good
+        else:
+            slow_started.set()
+            # The abandoned candidate is told to stop, but what it spent is still billed.
+            assert cancelled.wait(5)
+            token_counter["output_tokens"] += 500
+            tool_call_counts["fetch_manim_docs"] = 1
+            yield slow
+
+    dry_runs: list[str] = []
+
+    def fake_dry_run(code, class_name, trace_layout=False):
+        dry_runs.append(code)
+        if code == _CODE:
+            return {"success": False, "video_path": None, "error": "RuntimeError: boom"}
+        return {"success": True, "video_path": None, "error": None}
+
+    monkeypatch.setattr(coder, "generate_manim_script", fake_generate)
+    monkeypatch.setattr(coder, "dry_run_manim_code", fake_dry_run)
+    monkeypatch.setattr(coder, "fit_scene_to_duration", lambda *args, **kwargs: None)
+
+    updates = list(coder.run_coder_agent("show a title", max_retries=1, candidates=3))
+
+    final = updates[-1]
+    assert final["code_validated"] and final["code"] == good
+    assert final["candidates"]["selected"] == 1
+    assert final["candidates"]["abandoned"] == 1
+    # The winner's dry run is reused; the abandoned candidate is never run.
+    assert dry_runs.count(good) == 1 and slow not in dry_runs
+    assert final["token_usage"]["api_calls"] == 3
+    assert final["token_usage"]["output_tokens"] == 500
+    assert final["tool_call_counts"] == {"fetch_manim_docs": 1}
+    assert final["candidates"]["abandoned_usage"] == {
+        "input_tokens": 0, "output_tokens": 500, "api_calls": 1, "tool_calls": 1, "unsettled": 0,
+    }
+
+
+def test_stuck_abandoned_candidate_does_not_delay_the_winner(monkeypatch):
+    import threading
+    import time
+
+    release = threading.Event()
+    stuck_started = threading.Event()
+
+    def fake_generate(*args, strategy_hint="", token_counter=None, cancelled=None, **kwargs):
+        token_counter["api_calls"] += 1
+        if strategy_hint == coder._CANDIDATE_STRATEGIES[0]:
+            assert stuck_started.wait(5)
+            yield _CODE
+        else:
+            stuck_started.set()
+            release.wait(10)  # a model turn that ignores cancellation
+            yield _CODE
+
+    monkeypatch.setattr(coder, "generate_manim_script", fake_generate)
+    monkeypatch.setattr(coder, "dry_run_manim_code", lambda *args, **kwargs: {
+        "success": True, "video_path": None, "error": None,
+    })
+    monkeypatch.setattr(coder, "fit_scene_to_duration", lambda *args, **kwargs: None)
+
+    started = time.perf_counter()
+    try:
+        final = list(coder.run_coder_agent("show a title", max_retries=1, candidates=2))[-1]
+    finally:
+        release.set()
+
+    assert time.perf_counter() - started < 3
+    assert final["candidates"]["abandoned_usage"]["unsettled"] == 1
+
+
+def test_generate_keeps_segment_details_out_of_system_prefix(monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_DOC_PREFETCH", "0")
+    calls: list[tuple[list[str], str]] = []
+
+    def fake(complexity, system_sections, user_message, max_tool_calls, tool_call_counts=None,
+             token_counter=None, on_status=None, *, fix=False, tool_latency=None, cancelled=None):
+        calls.append((list(system_sections), user_message))
+        return _CODE
+
+    monkeypatch.setattr(coder, "_send_and_extract", fake)
+    palette = {"Background": "#101010", "Primary": "#58C4DD"}
+    for name, complexity in (("SegOne", "simple"), ("SegTwo", "complex")):
+        spec = {"elements": [f"{name} title"], "animations": ["Write title"], "visual_instructions": name}
+        list(coder.generate_manim_script(spec, complexity=complexity, scene_class_name=name,
+                                         theme_name="Dark", color_palette=palette, tool_call_counts={},
+                                         token_counter=new_token_counter()))
+
+    (first_system, first_user), (second_system, second_user) = calls
+    assert first_system == second_system
+    assert first_system[0] == coder.SYSTEM_INSTRUCTION.strip() and "#101010" in first_system[-1]
+    assert "SegOne" in first_user and "Hard tool budget" in first_user
+    assert not any("SegOne" in s or "tool budget" in s for s in first_system)
@@ -0,0 +1,76 @@
+"""Tests for spec-driven doc/golden prefetch."""
+
+from __future__ import annotations
+
+import json
+
+from agents import coder
+from agents.config import new_token_counter
+from utils import context_prefetch
+from utils.context_prefetch import plan_prefetch, prefetch_segment_context
+from utils.manim_docs import FETCH_FAILED_MARKER
+
+_SPEC = {
+    "elements": ["MathTex equation for the loss", "Arrow from input to output"],
+    "animations": ["TransformMatchingTex between equation steps"],
+    "visual_instructions": "Use a ValueTracker to sweep the learning rate.",
+}
+
+
+def test_plan_maps_spec_to_topics_and_golden_scenes():
+    topics, golden = plan_prefetch(_SPEC)
+    assert topics[:1] == ["mathtex"] and "arrow" in topics
+    assert set(golden) == {"StepByStep_Proof_Example", "TransformMatchingTex_Example"}
+    assert plan_prefetch({"elements": ["a dog"]}) == ([], [])
+
+
+def test_prefetch_section_is_deterministic(monkeypatch):
+    monkeypatch.setattr(context_prefetch, "fetch_manim_docs", lambda topic: f"docs for {topic}")
+    first = prefetch_segment_context(_SPEC)
+    second = prefetch_segment_context(dict(_SPEC))
+    assert first.section == second.section
+    assert "#### Docs: mathtex\ndocs for mathtex" in first.section
+    assert "Golden example: TransformMatchingTex_Example" in first.section
+    assert first.lookups == len(first.topics) + 1
+
+
+def test_unknown_topics_are_not_counted_as_inlined(monkeypatch):
+    monkeypatch.setattr(context_prefetch, "fetch_manim_docs", lambda topic: (
+        f"docs for {topic}" if topic == "mathtex" else f"Unknown topic '{topic}'"
+    ))
+    prefetch = prefetch_segment_context(_SPEC, max_golden=0)
+    assert prefetch.topics == ["mathtex"] and prefetch.lookups == 1
+    assert "Docs: arrow" not in prefetch.section
+
+    monkeypatch.setattr(context_prefetch, "fetch_manim_docs", lambda topic: f"Unknown topic '{topic}'")
+    empty = prefetch_segment_context(_SPEC, max_golden=0)
+    assert empty.lookups == 0 and empty.section == ""
+
+
+def test_topics_with_failed_fetches_are_not_inlined(monkeypatch):
+    monkeypatch.setattr(context_prefetch, "fetch_manim_docs", lambda topic: (
+        f"# --- {topic}.py ---\ndocs" if topic == "mathtex" else f"# --- {topic}.py --- {FETCH_FAILED_MARKER}"
+    ))
+    prefetch = prefetch_segment_context(_SPEC, max_golden=0)
+    assert prefetch.topics == ["mathtex"] and prefetch.lookups == 1
+    assert FETCH_FAILED_MARKER not in prefetch.section
+
+
+def test_generate_inlines_prefetch_and_reports_round_trips(monkeypatch):
+    monkeypatch.setattr(context_prefetch, "fetch_manim_docs", lambda topic: f"docs for {topic}")
+    seen_sections: list[list[str]] = []
+
+    def fake_send(complexity, system_sections, user_message, max_tool_calls, tool_call_counts=None,
+                  token_counter=None, on_status=None, *, fix=False, tool_latency=None, cancelled=None):
+        seen_sections.append(list(system_sections))
+        tool_call_counts["fetch_manim_docs"] = tool_call_counts.get("fetch_manim_docs", 0) + 1
+        return "from manim import *\n\nclass S(Scene):\n    def construct(self):\n        self.wait(1)\n"
+
+    monkeypatch.setattr(coder, "_send_and_extract", fake_send)
+    chunks = list(coder.generate_manim_script(_SPEC, tool_call_counts={}, token_counter=new_token_counter()))
+
+    assert any("PREFETCHED MANIM REFERENCE" in s for s in seen_sections[0])
+    prefetch = [c for c in chunks if c.startswith("prefetch:")]
+    assert prefetch and '"round_trips_avoided"' in prefetch[0]
+    info = json.loads(prefetch[0][len("prefetch:"):])
+    assert info["round_trips_avoided"] == info["lookups_inlined"] - 1
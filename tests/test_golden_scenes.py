@@ -0,0 +1,60 @@
+"""Tests for the indexed golden scene library."""
+
+from __future__ import annotations
+
+from utils import golden_scenes
+from utils.golden_scenes import GOLDEN_SCENES, GoldenLibrary, scene_tags, spec_tags
+
+_LEARNED = """from manim import *
+
+class Orbit(Scene):
+    def construct(self):
+        path = Circle(radius=2)
+        dot = Dot()
+        self.play(MoveAlongPath(dot, path), run_time=3)
+        self.wait(1)
+"""
+
+
+def test_scene_tags_capture_api_base_and_techniques():
+    tags = scene_tags(GOLDEN_SCENES["Custom_ValueTracker_Example"])
+    assert {"api:ValueTracker", "base:Scene", "tech:value_tracker", "tech:updater"} <= tags
+    assert "base:MovingCameraScene" in scene_tags(GOLDEN_SCENES["MovingCamera_Zoom_Example"])
+
+
+def test_retrieve_ranks_relevant_scenes_first(tmp_path):
+    library = GoldenLibrary(str(tmp_path / "lib.json"))
+    spec = {"elements": ["Matrix of weights"], "animations": ["highlight a column with SurroundingRectangle"]}
+    assert library.retrieve(spec_tags(spec), k=1)[0].name == "Matrix_Highlight_Example"
+    camera = library.retrieve(spec_tags("zoom the camera into the circle"), k=2)
+    assert camera[0].name == "MovingCamera_Zoom_Example"
+    assert len(library.retrieve(frozenset(), k=3)) == 3
+
+
+def test_learned_scenes_persist_and_deduplicate(tmp_path):
+    path = str(tmp_path / "lib.json")
+    library = GoldenLibrary(path)
+    assert library.add(_LEARNED, 0.95, name="orbit")
+    assert not library.add(_LEARNED + "        # same scene, comment only\n", 0.97, name="orbit_copy")
+    assert not library.add(GOLDEN_SCENES["Graph_Network_Example"], 0.99)
+
+    reloaded = GoldenLibrary(path)
+    learned = [s for s in reloaded.scenes if s.learned]
+    assert [s.name for s in learned] == ["orbit_copy"] and learned[0].score == 0.97
+    assert reloaded.retrieve(spec_tags("a dot moving along a path"), k=2)[0].tags & {"tech:path_motion"}
+
+
+def test_unnamed_learned_scenes_keep_unique_names_across_eviction(monkeypatch):
+    monkeypatch.setattr(golden_scenes, "_MAX_LEARNED", 2)
+    library = GoldenLibrary(builtin={})
+    bodies = [
+        "dot = Dot()\n        self.play(MoveAlongPath(dot, Circle()))",
+        "ax = Axes()\n        self.play(Create(ax.plot(lambda x: x**2)))",
+        "self.play(Write(MathTex('a^2')))",
+        "t = ValueTracker(0)\n        self.add(always_redraw(lambda: Dot().shift(RIGHT * t.get_value())))",
+    ]
+    for score, body in zip((0.91, 0.95, 0.97, 0.98), bodies):
+        assert library.add(f"from manim import *\n\nclass S(Scene):\n    def construct(self):\n        {body}\n", score)
+
+    names = [s.name for s in library.scenes]
+    assert len(names) == 2 and len(set(names)) == 2
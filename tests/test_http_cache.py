@@ -0,0 +1,135 @@
+"""Tests for the persistent HTTP/result cache used by web_search."""
+
+from __future__ import annotations
+
+import os
+
+import requests
+
+from utils import http_cache, web_search
+from utils.http_cache import HttpCache, normalize_url
+
+
+class _Resp:
+    def __init__(self, status_code=200, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+def _fake_get(responses, calls):
+    def fake(url, params=None, headers=None, timeout=None):
+        calls.append(dict(headers or {}))
+        reply = responses.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+    return fake
+
+
+def test_normalize_url_sorts_query_and_drops_fragment():
+    assert normalize_url("HTTPS://Example.com/a?b=2&a=1#frag") == normalize_url("https://example.com/a", {"a": 1, "b": 2})
+
+
+def test_fresh_entry_skips_network_across_instances(tmp_path, monkeypatch):
+    calls: list[dict] = []
+    monkeypatch.setattr(http_cache.requests, "get", _fake_get([_Resp(text="body")], calls))
+
+    first = HttpCache(str(tmp_path)).get_url("https://example.com/page")
+    second = HttpCache(str(tmp_path)).get_url("https://example.com/page")
+
+    assert first.text == second.text == "body"
+    assert second.from_cache and len(calls) == 1
+
+
+def test_stale_entry_revalidates_with_etag(tmp_path, monkeypatch):
+    calls: list[dict] = []
+    responses = [_Resp(text="v1", headers={"ETag": '"abc"'}), _Resp(status_code=304)]
+    monkeypatch.setattr(http_cache.requests, "get", _fake_get(responses, calls))
+    cache = HttpCache(str(tmp_path), ttl_seconds=-1)
+
+    cache.get_url("https://example.com/page")
+    again = cache.get_url("https://example.com/page")
+
+    assert again.ok and again.text == "v1" and again.from_cache
+    assert calls[1]["If-None-Match"] == '"abc"'
+
+
+def test_failures_are_negatively_cached_and_stale_served_on_error(tmp_path, monkeypatch):
+    calls: list[dict] = []
+    responses = [_Resp(status_code=503), _Resp(text="ok"), requests.ConnectionError("down")]
+    monkeypatch.setattr(http_cache.requests, "get", _fake_get(responses, calls))
+
+    negative = HttpCache(str(tmp_path / "neg"))
+    assert not negative.get_url("https://example.com/x").ok
+    assert not negative.get_url("https://example.com/x").ok
+    assert len(calls) == 1
+
+    stale = HttpCache(str(tmp_path / "stale"), ttl_seconds=-1)
+    stale.get_url("https://example.com/y")
+    served = stale.get_url("https://example.com/y")
+    assert served.ok and served.text == "ok"
+
+
+def test_eviction_keeps_directory_under_budget(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=600)
+    for i in range(10):
+        cache.put_value(f"k{i}", "x" * 200)
+    total = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert total <= 600
+    assert cache.get_value("k9") == "x" * 200
+
+
+def test_search_web_reuses_result_for_normalized_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_HTTP_CACHE_DIR", str(tmp_path))
+    http_cache.get_http_cache.cache_clear()
+    searches: list[str] = []
+
+    def fake_google(query, num_results=5):
+        searches.append(query)
+        return [{"title": "T", "link": "https://example.com/t", "snippet": "S"}]
+
+    monkeypatch.setattr(web_search, "_google_search", fake_google)
+    try:
+        first = web_search.search_web("Manim  Axes example")
+        second = web_search.search_web("manim axes EXAMPLE ")
+    finally:
+        http_cache.get_http_cache.cache_clear()
+
+    assert "[1] T" in first
+    assert len(searches) == 1 and second == first
+
+
+def test_search_web_keeps_degraded_results_briefly(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_HTTP_CACHE_DIR", str(tmp_path))
+    http_cache.get_http_cache.cache_clear()
+    stored: list[float | None] = []
+
+    monkeypatch.setattr(web_search, "_google_search", lambda query, num_results=5: [
+        {"title": "T", "link": "https://stackoverflow.com/q/1", "snippet": "S"},
+    ])
+    monkeypatch.setattr(web_search, "_fallback_search", lambda query: [
+        {"title": "F", "link": "https://example.com/f", "snippet": "S"},
+    ])
+    monkeypatch.setattr(web_search, "_fetch_page_text", lambda url, max_chars=8_000: "[Failed to fetch x: 503]")
+    try:
+        cache = http_cache.get_http_cache()
+        real_put = cache.put_value
+
+        def tracking_put(key, value, ttl_seconds=None):
+            stored.append(ttl_seconds)
+            real_put(key, value, ttl_seconds)
+
+        monkeypatch.setattr(cache, "put_value", tracking_put)
+        web_search.search_web("manim axes")  # deep fetch failed
+        monkeypatch.setattr(web_search, "_google_search", lambda query, num_results=5: [])
+        web_search.search_web("manim graph")  # served by the scraped fallback
+    finally:
+        http_cache.get_http_cache.cache_clear()
+
+    assert stored == [cache.negative_ttl_seconds, cache.negative_ttl_seconds]
+
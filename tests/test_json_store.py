@@ -0,0 +1,26 @@
+import json
+import os
+
+import pytest
+
+from utils.json_store import write_json_atomic
+
+
+def test_write_json_atomic_creates_directory_and_replaces_file(tmp_path):
+    path = tmp_path / "nested" / "store.json"
+    write_json_atomic(path, {"a": 1})
+    write_json_atomic(str(path), {"b": 2}, indent=2)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"b": 2}
+    assert os.listdir(path.parent) == ["store.json"]
+
+
+def test_write_json_atomic_removes_temp_file_on_failure(tmp_path):
+    path = tmp_path / "store.json"
+    path.write_text('{"kept": true}', encoding="utf-8")
+
+    with pytest.raises(TypeError):
+        write_json_atomic(path, {"bad": object()})
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"kept": True}
+    assert os.listdir(tmp_path) == ["store.json"]
@@ -0,0 +1,145 @@
+"""Tests for utils.layout_analyzer — symbolic Manim layout checks."""
+
+from __future__ import annotations
+
+from utils.layout_analyzer import analyze_scene_layout, report_from_layout_trace
+
+
+def _scene(body: str, base: str = "Scene") -> str:
+    lines = "\n".join(f"        {line}" for line in body.strip().splitlines())
+    return f"from manim import *\n\nclass Demo({base}):\n    def construct(self):\n{lines}\n"
+
+
+def test_clean_scene_is_conclusive_with_no_issues():
+    report = analyze_scene_layout(_scene("""
+title = Text("Dot product").to_edge(UP)
+eq = MathTex(r"a \\cdot b = |a||b|\\cos\\theta")
+note = Text("projection", font_size=32).next_to(eq, DOWN, buff=0.5)
+self.play(Write(title))
+self.play(Write(eq), run_time=2)
+self.play(FadeIn(note))
+self.wait(2)
+"""), audio_duration=6.0)
+    assert report.conclusive
+    assert report.issues == []
+    assert report.total_duration == 6.0
+    assert report.leftover_objects == ["title", "eq", "note"]
+
+
+def test_overlapping_text_at_origin():
+    report = analyze_scene_layout(_scene("""
+a = Text("first idea")
+b = Text("second idea")
+self.play(Write(a))
+self.play(Write(b))
+"""))
+    assert any("'a' and 'b' overlap" in issue for issue in report.issues)
+
+
+def test_fadeout_before_new_text_avoids_overlap():
+    report = analyze_scene_layout(_scene("""
+a = Text("first idea")
+b = Text("second idea")
+self.play(Write(a))
+self.play(FadeOut(a))
+self.play(Write(b))
+"""))
+    assert report.issues == []
+    assert report.leftover_objects == ["b"]
+
+
+def test_label_inside_shape_is_not_an_overlap():
+    report = analyze_scene_layout(_scene("""
+box = Rectangle(width=4, height=2)
+label = Text("box")
+self.play(Create(box), Write(label))
+"""))
+    assert report.issues == []
+
+
+def test_off_frame_placement():
+    report = analyze_scene_layout(_scene("""
+t = Text("far away").shift(RIGHT * 7)
+self.add(t)
+"""))
+    assert any("past the frame edge" in issue for issue in report.issues)
+
+
+def test_arranged_group_moves_children():
+    report = analyze_scene_layout(_scene("""
+items = VGroup(Text("one"), Text("two"), Text("three")).arrange(DOWN, buff=0.4).to_edge(LEFT)
+other = Text("right side").to_edge(RIGHT)
+self.play(FadeIn(items), FadeIn(other))
+self.play(FadeOut(*self.mobjects))
+"""))
+    assert report.conclusive
+    assert report.issues == []
+    assert report.leftover_objects == []
+
+
+def test_duration_mismatch_against_audio():
+    code = _scene("""
+dot = Dot()
+self.play(Create(dot), run_time=3)
+self.wait(20)
+""")
+    long_report = analyze_scene_layout(code, audio_duration=8.0)
+    assert long_report.total_duration == 23.0
+    assert any("will be cut" in issue for issue in long_report.issues)
+    short_report = analyze_scene_layout(code, audio_duration=40.0)
+    assert any("freeze" in issue for issue in short_report.issues)
+
+
+def test_loops_and_updaters_are_inconclusive():
+    loop = analyze_scene_layout(_scene("""
+for i in range(3):
+    self.play(Create(Dot()))
+"""))
+    assert not loop.conclusive
+    updater = analyze_scene_layout(_scene("""
+t = ValueTracker(0)
+self.play(t.animate.set_value(1))
+"""))
+    assert not updater.conclusive
+
+
+def test_three_d_and_unparseable_scenes_are_inconclusive():
+    assert not analyze_scene_layout(_scene("self.wait()", base="ThreeDScene")).conclusive
+    assert not analyze_scene_layout("class Broken(:\n").conclusive
+
+
+def _beat(index, line, mobjects, start=0.0, end=0.0, event="play"):
+    return {"index": index, "event": event, "line": line, "start": start, "end": end, "mobjects": mobjects}
+
+
+def test_trace_report_flags_real_overlap_and_off_frame():
+    title = {"id": 1, "name": "title", "type": "Text", "bbox": [-1.0, -0.3, 1.0, 0.3]}
+    label = {"id": 2, "name": "label", "type": "MathTex", "bbox": [-0.8, -0.2, 0.8, 0.2]}
+    wide = {"id": 3, "name": "panel", "type": "Rectangle", "bbox": [-9.0, -3.0, 9.0, 3.0]}
+    trace = {
+        "frame": {"width": 14.222, "height": 8.0},
+        "duration": 3.0,
+        "beats": [
+            _beat(0, 5, [title], end=1.0),
+            _beat(1, 6, [title, label, wide], start=1.0, end=3.0),
+        ],
+    }
+    report = report_from_layout_trace(trace, audio_duration=3.0)
+    assert report.conclusive
+    assert any("'title' and 'label' overlap" in issue and "line 6" in issue for issue in report.issues)
+    assert any("'panel' extends" in issue for issue in report.issues)
+    assert report.tracked_objects == 3
+    assert report.leftover_objects == ["title", "label", "panel"]
+
+
+def test_trace_report_checks_clutter_duration_and_empty_end():
+    dots = [{"id": i, "name": f"d{i}", "type": "Dot", "bbox": [i * 0.5 - 6, 0, i * 0.5 - 5.9, 0.1]} for i in range(14)]
+    trace = {
+        "duration": 4.0,
+        "beats": [_beat(0, 4, dots, end=2.0), _beat(1, 5, [], start=2.0, end=4.0)],
+    }
+    report = report_from_layout_trace(trace, audio_duration=20.0)
+    assert any("cluttered" in issue for issue in report.issues)
+    assert any("freeze" in issue for issue in report.issues)
+    assert any("empty frame" in warning for warning in report.warnings)
+
@@ -0,0 +1,276 @@
+"""Tests for tool-call dispatch and prompt caching in utils.llm_provider."""
+
+from __future__ import annotations
+
+import threading
+import time
+from types import SimpleNamespace
+
+from agents.config import cache_hit_rate, new_token_counter
+from utils import llm_provider
+
+
+def test_tool_calls_run_concurrently_in_call_order():
+    both_started = threading.Barrier(2, timeout=2)
+
+    def dispatcher(name, args):
+        both_started.wait()  # deadlocks unless the calls overlap
+        time.sleep(0.05 if name == "fetch_manim_docs" else 0.0)
+        return f"{name}:{args['q']}"
+
+    counts: dict[str, int] = {}
+    latency: dict[str, dict] = {}
+    results = llm_provider._dispatch_tool_calls(
+        [("fetch_manim_docs", {"q": "a"}), ("search_web", {"q": "b"})], dispatcher, counts, latency,
+    )
+
+    assert results == ["fetch_manim_docs:a", "search_web:b"]
+    assert counts == {"fetch_manim_docs": 1, "search_web": 1}
+    assert latency["fetch_manim_docs"]["calls"] == 1
+    assert latency["fetch_manim_docs"]["max_seconds"] >= 0.05
+
+
+def test_slow_tool_times_out_without_blocking_turn(monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_TOOL_TIMEOUT", "1")
+    release = threading.Event()
+
+    def dispatcher(name, args):
+        if name == "slow":
+            release.wait(5)
+        return name
+
+    latency: dict[str, dict] = {}
+    started = time.perf_counter()
+    try:
+        results = llm_provider._dispatch_tool_calls([("slow", {}), ("fast", {})], dispatcher, None, latency)
+    finally:
+        release.set()
+
+    assert time.perf_counter() - started < 3
+    assert "timed out" in results[0] and results[1] == "fast"
+    assert latency["slow"]["timeouts"] == 1 and latency["fast"]["timeouts"] == 0
+
+
+def test_merge_tool_latency_accumulates():
+    target: dict[str, dict] = {}
+    llm_provider.merge_tool_latency(target, {"search_web": {"calls": 1, "total_seconds": 0.5, "max_seconds": 0.5}})
+    llm_provider.merge_tool_latency(target, {"search_web": {"calls": 2, "total_seconds": 1.0, "max_seconds": 0.7}})
+    assert target["search_web"] == {"calls": 3, "total_seconds": 1.5, "max_seconds": 0.7, "timeouts": 0}
+
+
+def test_anthropic_system_puts_global_prefix_first_and_caps_breakpoints(monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_SYSTEM_PROMPT_PREFIX", "GLOBAL")
+    blocks = llm_provider._build_anthropic_system(["instructions", "reference", "project"])
+
+    assert [b["text"] for b in blocks] == ["GLOBAL", "instructions", "reference", "project"]
+    assert ["cache_control" in b for b in blocks] == [False, True, True, True]
+
+
+def _anthropic_tool_requests(monkeypatch, tools):
+    requests: list[dict] = []
+    replies = [
+        SimpleNamespace(
+            stop_reason="tool_use",
+            content=[SimpleNamespace(type="tool_use", id="t1", name="fetch_manim_docs", input={"topic": "axes"})],
+            usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+        ),
+        SimpleNamespace(
+            stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text="done")],
+            usage=SimpleNamespace(input_tokens=1, output_tokens=1),
+        ),
+    ]
+
+    class FakeClient:
+        def __init__(self):
+            self.messages = SimpleNamespace(create=lambda **kwargs: requests.append(kwargs) or replies.pop(0))
+
+    monkeypatch.delenv("PAPER2MANIM_SYSTEM_PROMPT_PREFIX", raising=False)
+    monkeypatch.setattr(llm_provider.anthropic, "Anthropic", FakeClient)
+    llm_provider._run_anthropic_tool_completion(
+        config=SimpleNamespace(provider="anthropic", model="claude"),
+        system_sections=["instructions", "prefetched reference", "project theme"],
+        user_message="spec", tools=tools, max_tool_calls=5,
+        tool_dispatcher=lambda name, args: "docs", tool_call_counts={}, token_counter=new_token_counter(),
+        on_status=None,
+    )
+    return requests
+
+
+def _breakpoints(request: dict) -> int:
+    blocks = list(request.get("tools", [])) + list(request["system"])
+    for message in request["messages"]:
+        if isinstance(message["content"], list):
+            blocks.extend(message["content"])
+    return sum(1 for block in blocks if isinstance(block, dict) and "cache_control" in block)
+
+
+def test_coder_tool_requests_stay_within_breakpoint_limit(monkeypatch):
+    from agents.coder import _build_tools
+
+    requests = _anthropic_tool_requests(monkeypatch, _build_tools())
+    assert len(requests) == 2
+    assert all(_breakpoints(r) == 4 for r in requests)
+
+    # A caller-supplied tool breakpoint takes a system tier's place.
+    cached_tools = _build_tools()
+    cached_tools[-1]["cache_control"] = {"type": "ephemeral"}
+    requests = _anthropic_tool_requests(monkeypatch, cached_tools)
+    assert all(_breakpoints(r) == 4 for r in requests)
+    assert ["cache_control" in b for b in requests[0]["system"]] == [False, True, True]
+
+
+def test_message_breakpoint_marks_only_latest_block_without_mutating():
+    messages = [
+        {"role": "user", "content": "spec"},
+        {"role": "assistant", "content": []},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "t1", "content": "docs"}]},
+    ]
+    marked = llm_provider._with_message_breakpoint(messages)
+
+    assert marked[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in messages[-1]["content"][-1]
+    assert marked[0] == messages[0]
+
+
+def test_prompt_cache_key_depends_only_on_shared_head(monkeypatch):
+    monkeypatch.delenv("PAPER2MANIM_SYSTEM_PROMPT_PREFIX", raising=False)
+    config = SimpleNamespace(cache_key_prefix="", model="m")
+
+    def key(sections):
+        return llm_provider._prompt_cache_key(config, "coder", ("code",), sections, [{"name": "search_web"}])
+
+    assert key(["SYSTEM", "docs: axes", "theme A"]) == key(["SYSTEM", "docs: mathtex", "theme B"])
+    assert key(["SYSTEM"]) != key(["OTHER SYSTEM"])
+
+
+def test_note_usage_tracks_cache_hit_rate():
+    counter = new_token_counter()
+    llm_provider._note_usage(counter, {
+        "input_tokens": 100, "output_tokens": 10,
+        "cache_read_input_tokens": 700, "cache_creation_input_tokens": 200,
+    }, "anthropic")
+    llm_provider._note_usage(counter, {
+        "input_tokens": 1000, "output_tokens": 10,
+        "input_tokens_details": {"cached_tokens": 300},
+    }, "openai")
+
+    assert counter["prompt_input_tokens"] == 2000
+    assert cache_hit_rate(counter) == 0.5
+
+
+def _hedge_setup(monkeypatch, budget: str):
+    from agents.config import StageModelConfig
+    from utils.model_router import ModelRouter
+
+    primary = StageModelConfig("openai", "slow-primary")
+    fallback = StageModelConfig("anthropic", "fast-fallback")
+    router = ModelRouter()
+    for _ in range(5):
+        router.record_call("plan", primary, 0.05, ok=True)
+        router.record_call("code", primary, 0.05, ok=True)
+    monkeypatch.setattr(llm_provider, "get_model_router", lambda: router)
+    monkeypatch.setattr(llm_provider, "_HEDGE_BUDGET", llm_provider._HedgeBudget())
+    monkeypatch.setenv("PAPER2MANIM_HEDGE", "1")
+    monkeypatch.setenv("PAPER2MANIM_HEDGE_BUDGET", budget)
+
+    def fake_single(*, config, token_counter, **kwargs):
+        time.sleep(0.6 if config.model == "slow-primary" else 0.0)
+        token_counter["input_tokens"] += 10
+        return llm_provider.ProviderResult(text=config.model, trace=llm_provider.ProviderTrace(config.provider, config.model))
+
+    def fake_tool_single(*, config, token_counter, tool_call_counts, tool_latency, **kwargs):
+        tool_call_counts[config.model] = tool_call_counts.get(config.model, 0) + 1
+        tool_latency[config.model] = {"calls": 1, "total_seconds": 0.1, "max_seconds": 0.1, "timeouts": 0}
+        return fake_single(config=config, token_counter=token_counter)
+
+    monkeypatch.setattr(llm_provider, "_run_single_text_completion", fake_single)
+    monkeypatch.setattr(llm_provider, "_run_single_tool_completion", fake_tool_single)
+    return primary, fallback, router
+
+
+def test_slow_call_is_hedged_to_fallback_and_loser_still_billed(monkeypatch):
+    primary, fallback, router = _hedge_setup(monkeypatch, "1.0")
+    counter = new_token_counter()
+
+    result = llm_provider.run_text_completion(
+        primary=primary, fallback=fallback, system_sections=["sys"], user_content="hi",
+        max_output_tokens=10, token_counter=counter, stage="plan",
+    )
+
+    assert result.text == "fast-fallback"
+    assert counter["hedged_requests"] == 1 and counter["hedge_wins"] == 1
+    assert router.last_model("plan") == "anthropic:fast-fallback"
+    time.sleep(0.8)  # the abandoned original finishes and is accounted for
+    assert counter["input_tokens"] == 20
+
+
+def test_hedged_tool_loops_keep_separate_tool_stats(monkeypatch):
+    primary, fallback, _ = _hedge_setup(monkeypatch, "1.0")
+    counter = new_token_counter()
+    counts: dict[str, int] = {}
+    latency: dict[str, dict] = {}
+
+    result = llm_provider.run_tool_completion(
+        primary=primary, fallback=fallback, system_sections=["sys"], user_message="hi", tools=[],
+        max_tool_calls=2, tool_dispatcher=lambda name, args: "", tool_call_counts=counts,
+        token_counter=counter, tool_latency=latency, stage="code",
+    )
+
+    assert result.text == "fast-fallback"
+    # The winner's usage is in place as soon as the call returns.
+    assert counter["input_tokens"] == 10
+    time.sleep(0.8)
+    assert counts == {"fast-fallback": 1} and set(latency) == {"fast-fallback"}
+    assert counter["input_tokens"] == 20
+
+
+def test_hedging_respects_budget(monkeypatch):
+    primary, fallback, _ = _hedge_setup(monkeypatch, "0")
+    counter = new_token_counter()
+
+    result = llm_provider.run_text_completion(
+        primary=primary, fallback=fallback, system_sections=["sys"], user_content="hi",
+        max_output_tokens=10, token_counter=counter, stage="plan",
+    )
+
+    assert result.text == "slow-primary"
+    assert counter["hedged_requests"] == 0 and counter["input_tokens"] == 10
+
+
+def _tool_heavy_single(*, config, token_counter, tool_clock, **kwargs):
+    with tool_clock:
+        time.sleep(0.6)  # a slow tool turn, not the model
+    return llm_provider.ProviderResult(text=config.model, trace=llm_provider.ProviderTrace(config.provider, config.model))
+
+
+def test_tool_loop_latency_excludes_tool_dispatch(monkeypatch):
+    from agents.config import StageModelConfig
+    from utils.model_router import ModelRouter, model_key
+
+    primary = StageModelConfig("openai", "coder")
+    router = ModelRouter()
+    monkeypatch.setattr(llm_provider, "get_model_router", lambda: router)
+    monkeypatch.setattr(llm_provider, "_run_single_tool_completion", _tool_heavy_single)
+
+    llm_provider.run_tool_completion(
+        primary=primary, fallback=None, system_sections=["sys"], user_message="hi", tools=[],
+        max_tool_calls=2, tool_dispatcher=lambda name, args: "", stage="code",
+    )
+
+    (latency,) = router.stats("code", model_key(primary)).latencies
+    assert latency < 0.3
+
+
+def test_tool_dispatch_does_not_trigger_a_hedge(monkeypatch):
+    primary, fallback, _ = _hedge_setup(monkeypatch, "1.0")
+    monkeypatch.setattr(llm_provider, "_run_single_tool_completion", _tool_heavy_single)
+    counter = new_token_counter()
+
+    result = llm_provider.run_tool_completion(
+        primary=primary, fallback=fallback, system_sections=["sys"], user_message="hi", tools=[],
+        max_tool_calls=2, tool_dispatcher=lambda name, args: "", token_counter=counter, stage="code",
+    )
+
+    assert result.text == "slow-primary"
+    assert counter["hedged_requests"] == 0
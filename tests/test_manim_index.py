@@ -0,0 +1,115 @@
+"""Tests for the offline Manim doc index (built from a fake package)."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from utils import manim_docs, manim_index
+from utils.manim_index import ManimDocIndex, build_chunks
+
+_ARC = '''
+class Circle(Arc):
+    """A circle.
+
+    Examples: Circle(radius=2, color=RED)
+    """
+
+    def __init__(self, radius: float = 1.0, **kwargs):
+        pass
+
+    def surround(self, mobject, buffer_factor=1.2):
+        """Modify the circle so it surrounds a given mobject."""
+
+    def _private(self):
+        pass
+
+
+def _helper():
+    pass
+'''
+
+_TEX = '''
+class MathTex(SingleStringMathTex):
+    """A string compiled with LaTeX in math mode."""
+
+    def get_part_by_tex(self, tex):
+        """Return the first submobject matching tex."""
+'''
+
+
+def _fake_package(root: Path) -> Path:
+    pkg = root / "manim"
+    (pkg / "mobject" / "geometry").mkdir(parents=True)
+    (pkg / "mobject" / "text").mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "mobject" / "geometry" / "arc.py").write_text(_ARC)
+    (pkg / "mobject" / "text" / "tex_mobject.py").write_text(_TEX)
+    (pkg / "mobject" / "_private_module.py").write_text("def hidden():\n    pass\n")
+    return pkg
+
+
+def test_build_chunks_keeps_public_symbols(tmp_path):
+    chunks = build_chunks(_fake_package(tmp_path))
+    symbols = {c.symbol for c in chunks}
+    assert {"Circle", "Circle.surround", "MathTex", "MathTex.get_part_by_tex"} <= symbols
+    assert not any("private" in s or "helper" in s or "hidden" in s for s in symbols)
+    circle = next(c for c in chunks if c.symbol == "Circle")
+    assert circle.path == "manim/mobject/geometry/arc.py"
+    assert "def __init__(self, radius: float=1.0, **kwargs)" in circle.text
+    assert "# methods: surround" in circle.text
+
+
+def test_search_ranks_symbols_and_splits_camel_case(tmp_path):
+    index = ManimDocIndex(build_chunks(_fake_package(tmp_path)))
+    assert index.search("circle")[0].symbol == "Circle"
+    assert index.search("surround a mobject")[0].symbol == "Circle.surround"
+    assert index.search("tex")[0].symbol.startswith("MathTex")
+    assert index.search("zzz") == []
+
+
+def test_index_persists_and_rebuilds_on_version_change(tmp_path, monkeypatch):
+    pkg = _fake_package(tmp_path / "site")
+    index_path = tmp_path / "index.json"
+    monkeypatch.setenv("PAPER2MANIM_DOC_INDEX_PATH", str(index_path))
+    monkeypatch.setattr(manim_index, "_installed_manim", lambda: (pkg, "0.18.0"))
+    manim_index.get_doc_index.cache_clear()
+    try:
+        built = manim_index.get_doc_index()
+        assert index_path.exists() and built.version == "0.18.0"
+
+        builds: list[Path] = []
+        original = manim_index.build_chunks
+        monkeypatch.setattr(manim_index, "build_chunks", lambda d: builds.append(d) or original(d))
+        manim_index.get_doc_index.cache_clear()
+        loaded = manim_index.get_doc_index()
+        assert not builds and len(loaded.chunks) == len(built.chunks)
+
+        monkeypatch.setattr(manim_index, "_installed_manim", lambda: (pkg, "0.19.0"))
+        manim_index.get_doc_index.cache_clear()
+        assert manim_index.get_doc_index().version == "0.19.0" and builds
+    finally:
+        manim_index.get_doc_index.cache_clear()
+
+
+def test_fetch_manim_docs_uses_local_index_without_network(tmp_path, monkeypatch):
+    pkg = _fake_package(tmp_path)
+    index = ManimDocIndex(build_chunks(pkg), version="x", source_root=str(tmp_path))
+    monkeypatch.setattr(manim_docs, "get_doc_index", lambda: index)
+
+    def no_network(path):
+        raise AssertionError(f"unexpected fetch of {path}")
+
+    monkeypatch.setattr(manim_docs, "_fetch_raw", no_network)
+
+    text = manim_docs.fetch_manim_docs("circle")
+    assert "class Circle(Arc):" in text and "MathTex" not in text
+    assert "class MathTex" in manim_docs.fetch_manim_docs("MathTex")
+    assert "def surround" in manim_docs.fetch_manim_file("manim/mobject/geometry/arc.py")
+
+
+def test_load_rejects_malformed_rows(tmp_path):
+    path = tmp_path / "index.json"
+    for chunks in ([["Circle", "class"]], [7], 3):
+        path.write_text(json.dumps({"format": manim_index._INDEX_FORMAT, "version": "0.18.0", "chunks": chunks}))
+        assert ManimDocIndex.load(path) is None
@@ -0,0 +1,52 @@
+"""Tests for utils.manim_runner — dry run and layout probe plumbing (no manim needed)."""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+
+from utils import manim_runner
+
+_CODE = "from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n        self.wait(1)\n"
+
+
+def test_probe_returns_layout_trace(monkeypatch):
+    trace = {"class_name": "Demo", "duration": 1.0, "beats": []}
+
+    def fake_run(cmd, **kwargs):
+        assert os.path.basename(cmd[1]) == "layout_probe.py"
+        with open(cmd[4], "w") as f:
+            json.dump(trace, f)
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    result = manim_runner.dry_run_manim_code(_CODE, "Demo", trace_layout=True)
+    assert result["success"]
+    assert result["layout_trace"] == trace
+
+
+def test_probe_unavailable_falls_back_to_dry_run(monkeypatch):
+    calls: list[list[str]] = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        if len(calls) == 1:
+            return subprocess.CompletedProcess(cmd, 3, stdout="", stderr="layout probe unavailable")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    result = manim_runner.dry_run_manim_code(_CODE, "Demo", trace_layout=True)
+    assert result["success"]
+    assert "layout_trace" not in result
+    assert "--dry_run" in calls[1]
+
+
+def test_probe_scene_error_is_reported(monkeypatch):
+    def fake_run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="NameError: name 'Foo' is not defined")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    result = manim_runner.dry_run_manim_code(_CODE, "Demo", trace_layout=True)
+    assert not result["success"]
+    assert "NameError" in result["error"]
@@ -0,0 +1,118 @@
+"""Tests for utils.model_router."""
+
+from __future__ import annotations
+
+import time
+
+from agents.config import StageModelConfig, new_token_counter
+from utils import llm_provider, model_router
+from utils.llm_provider import ProviderResult, ProviderTrace
+from utils.model_router import ModelRouter
+
+_PRIMARY = StageModelConfig("openai", "gpt-primary")
+_FALLBACK = StageModelConfig("anthropic", "claude-fallback")
+
+
+def _calls(router: ModelRouter, config: StageModelConfig, seconds: list[float], cost: float = 0.01) -> None:
+    for value in seconds:
+        router.record_call("code", config, value, ok=True, tokens=1000, cost=cost)
+
+
+def test_healthy_primary_keeps_traffic():
+    router = ModelRouter()
+    _calls(router, _PRIMARY, [10.0] * 10)
+
+    assert router.route("code", _PRIMARY, _FALLBACK) == (_PRIMARY, _FALLBACK)
+
+
+def test_latency_degradation_swaps_to_fallback_and_probes_back():
+    router = ModelRouter()
+    _calls(router, _PRIMARY, [10.0] * 10 + [45.0] * 5)
+
+    assert router.route("code", _PRIMARY, _FALLBACK) == (_FALLBACK, _PRIMARY)
+
+    router.stats("code", "openai:gpt-primary").last_call_at = time.time() - 3600
+    assert router.route("code", _PRIMARY, _FALLBACK)[0] == _PRIMARY
+
+
+def test_recent_failures_trigger_fallback():
+    router = ModelRouter()
+    for _ in range(3):
+        router.record_call("plan", _PRIMARY, 1.0, ok=False)
+
+    assert router.route("plan", _PRIMARY, _FALLBACK)[0] == _FALLBACK
+
+
+def test_targets_and_pass_rate_guard():
+    router = ModelRouter(latency_target=20.0)
+    _calls(router, _PRIMARY, [30.0] * 6)
+    assert router.route("code", _PRIMARY, _FALLBACK)[0] == _FALLBACK
+
+    # A fallback that meets the target but fails dry runs far more often is not used.
+    _calls(router, _FALLBACK, [5.0] * 6)
+    for passed in (True, True, True, True, True):
+        router.record_outcome("code", "openai:gpt-primary", passed=passed)
+    for passed in (False, False, False, True, False):
+        router.record_outcome("code", "anthropic:claude-fallback", passed=passed)
+    assert router.route("code", _PRIMARY, _FALLBACK)[0] == _PRIMARY
+
+    cheap = ModelRouter(cost_target=0.05)
+    _calls(cheap, _PRIMARY, [5.0] * 6, cost=0.2)
+    assert cheap.route("code", _PRIMARY, _FALLBACK)[0] == _FALLBACK
+
+
+def test_stats_persist_across_instances(tmp_path):
+    path = tmp_path / "model_stats.json"
+    router = ModelRouter(path)
+    _calls(router, _PRIMARY, [4.0, 6.0])
+    router.record_outcome("code", passed=True, score=0.8)
+    router.save()
+
+    reloaded = ModelRouter(path)
+    reloaded.load()
+    summary = reloaded.summary()["code"]["openai:gpt-primary"]
+    assert summary["calls"] == 2
+    assert summary["dry_run_pass_rate"] == 1.0
+    assert summary["critique_score"] == 0.8
+
+
+def test_stats_writes_are_batched(tmp_path):
+    path = tmp_path / "model_stats.json"
+    router = ModelRouter(path)
+    _calls(router, _PRIMARY, [4.0] * 10)
+
+    # Only the first call is written right away; the rest wait for the next save.
+    written = ModelRouter(path)
+    written.load()
+    assert written.summary()["code"]["openai:gpt-primary"]["calls"] == 1
+
+    router.save()
+    written.load()
+    assert written.summary()["code"]["openai:gpt-primary"]["calls"] == 10
+
+
+def test_text_completion_is_routed_and_observed(monkeypatch):
+    router = ModelRouter()
+    for _ in range(3):
+        router.record_call("verify", _PRIMARY, 1.0, ok=False)
+    monkeypatch.setattr(llm_provider, "get_model_router", lambda: router)
+    used: list[str] = []
+
+    def fake_single(*, config, token_counter, **kwargs):
+        used.append(config.model)
+        token_counter["input_tokens"] += 100
+        token_counter["output_tokens"] += 20
+        return ProviderResult(text="ok", trace=ProviderTrace(config.provider, config.model))
+
+    monkeypatch.setattr(llm_provider, "_run_single_text_completion", fake_single)
+    counter = new_token_counter()
+    llm_provider.run_text_completion(
+        primary=_PRIMARY, fallback=_FALLBACK, system_sections=["sys"], user_content="hi",
+        max_output_tokens=10, token_counter=counter, stage="verify",
+    )
+
+    assert used == ["claude-fallback"]
+    assert counter["input_tokens"] == 100
+    assert router.summary()["verify"]["anthropic:claude-fallback"]["tokens"] == 120
+    assert router.last_model("verify") == "anthropic:claude-fallback"
+    assert model_router.model_key(_FALLBACK) == "anthropic:claude-fallback"
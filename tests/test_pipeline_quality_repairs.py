@@ -125,10 +125,12 @@ def test_verify_failure_triggers_one_repair(monkeypatch, tmp_path):
     monkeypatch.setattr(pipeline, "verify_segment_code", fake_verify)
     monkeypatch.setattr(pipeline, "render_parallel", fake_render_parallel)
     monkeypatch.setattr(pipeline, "critique_video", fake_critique)
+    monkeypatch.setattr(pipeline, "record_golden_scene", lambda *args, **kwargs: False)
     monkeypatch.setattr(pipeline, "stitch_video_and_audio", fake_stitch)
     monkeypatch.setattr(pipeline, "concatenate_segments", fake_concat)
     monkeypatch.setattr(pipeline, "mux_subtitles", fake_mux)
-    monkeypatch.setattr(pipeline, "verify_code_transitions", lambda *args, **kwargs: [])
+    monkeypatch.setattr(pipeline, "verify_project_code", lambda *args, **kwargs: SimpleNamespace(
+        segments={}, transitions=[], llm_calls=0, shards=0, fallback_items=0))
     monkeypatch.setattr(pipeline, "critique_project_consistency", lambda *args, **kwargs: SimpleNamespace(passed=True, issues=[]))
 
     updates = list(
@@ -146,6 +148,11 @@ def test_verify_failure_triggers_one_repair(monkeypatch, tmp_path):
         info["repair_attempted"] is True
         for info in updates[-1]["segment_quality"].values()
     )
+    stage_resources = updates[-1]["stage_resources"]
+    assert stage_resources["code"]["resource"] == "llm"
+    assert stage_resources["code"]["count"] == call_counter["count"]
+    assert stage_resources["render"]["resource"] == "render"
+    assert set(stage_resources["tts"]) >= {"queue_wait_seconds", "run_seconds"}
 
 
 def test_transition_verification_repairs_later_segment(monkeypatch, tmp_path):
@@ -182,8 +189,11 @@ def test_transition_verification_repairs_later_segment(monkeypatch, tmp_path):
     def fake_verify(*args, **kwargs):
         return SimpleNamespace(segment_id=1, passed=True, issues=[], suggestions=[], static_issues=[])
 
-    def fake_transition_checks(*args, **kwargs):
-        return [SimpleNamespace(segment_a_id=1, segment_b_id=2, smooth=False, issues=["Segment 2 starts without respecting the prior anchor."])]
+    def fake_transition_checks(*args, on_result=None, **kwargs):
+        check = SimpleNamespace(segment_a_id=1, segment_b_id=2, smooth=False, elapsed_seconds=0.4, shard=0,
+                                issues=["Segment 2 starts without respecting the prior anchor."])
+        on_result(check)
+        return SimpleNamespace(segments={}, transitions=[check], llm_calls=1, shards=1, fallback_items=0)
 
     def fake_stitch(video_path, audio_path, output_path):
         with open(output_path, "w", encoding="utf-8") as f:
@@ -204,7 +214,8 @@ def test_transition_verification_repairs_later_segment(monkeypatch, tmp_path):
     monkeypatch.setattr(pipeline, "verify_segment_code", fake_verify)
     monkeypatch.setattr(pipeline, "render_parallel", fake_render_parallel)
     monkeypatch.setattr(pipeline, "critique_video", fake_critique)
-    monkeypatch.setattr(pipeline, "verify_code_transitions", fake_transition_checks)
+    monkeypatch.setattr(pipeline, "record_golden_scene", lambda *args, **kwargs: False)
+    monkeypatch.setattr(pipeline, "verify_project_code", fake_transition_checks)
     monkeypatch.setattr(pipeline, "stitch_video_and_audio", fake_stitch)
     monkeypatch.setattr(pipeline, "concatenate_segments", fake_concat)
     monkeypatch.setattr(pipeline, "mux_subtitles", fake_mux)
@@ -219,6 +230,7 @@ def test_transition_verification_repairs_later_segment(monkeypatch, tmp_path):
     )
 
     assert any("respecting the prior anchor" in feedback for feedback in repair_feedbacks)
+    assert any(u.get("elapsed_seconds") == 0.4 and "(0.4s)" in u["status"] for u in updates)
     assert any(
         u.get("stage") == "code_retry" and u.get("segment_id") == 2
         for u in updates
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+import agents.pipeline as pipeline
+from tests.test_pipeline_speculative_codegen import _patch_pipeline, _storyboard
+
+
+def _streaming_planner(coder_started, final_storyboard):
+    def fake_planner(*args, **kwargs):
+        streamed = _storyboard()
+        yield {"storyboard_header": {"theme_name": "Test", "color_palette": {}, "num_segments": 1}}
+        yield {"status": "  → Segment 1/1 done: One", "segment": streamed["segments"][0]}
+        # Segment 1's pipeline must start while the planner is still running.
+        assert coder_started.wait(5)
+        yield {"final": True, "storyboard": final_storyboard}
+
+    return fake_planner
+
+
+def _patch_streaming(monkeypatch, tmp_path, final_storyboard):
+    coder_calls: list[dict] = []
+    tts_scripts: list[str] = []
+    coder_started = threading.Event()
+    _patch_pipeline(monkeypatch, tmp_path, 6.0, coder_calls, [], threading.Event())
+
+    fake_coder = pipeline.run_coder_agent
+
+    def tracking_coder(*args, **kwargs):
+        coder_started.set()
+        yield from fake_coder(*args, **kwargs)
+
+    async def fake_tts_async(script, audio_path):
+        tts_scripts.append(script)
+        return {"success": True, "audio_path": audio_path, "duration": 6.0}
+
+    monkeypatch.setenv("PAPER2MANIM_STREAM_SEGMENTS", "1")
+    monkeypatch.setattr(pipeline, "run_coder_agent", tracking_coder)
+    monkeypatch.setattr(pipeline, "generate_voiceover_async", fake_tts_async)
+    monkeypatch.setattr(pipeline, "run_math2manim_planner", _streaming_planner(coder_started, final_storyboard))
+    return coder_calls, tts_scripts
+
+
+def test_streamed_segment_starts_before_planning_finishes(monkeypatch, tmp_path):
+    coder_calls, tts_scripts = _patch_streaming(monkeypatch, tmp_path, _storyboard())
+
+    updates = list(pipeline.run_segmented_pipeline("streaming demo", output_base=str(tmp_path)))
+
+    assert len(coder_calls) == 1
+    assert len(tts_scripts) == 1
+    assert any("starting its TTS/code pipeline now" in u.get("status", "") for u in updates)
+    assert updates[-1].get("final") and not updates[-1].get("error")
+
+
+def test_segment_changed_by_final_storyboard_is_rerun(monkeypatch, tmp_path):
+    corrected = _storyboard()
+    corrected["segments"][0]["audio_script"] = " ".join(["revised"] * 15)
+    coder_calls, tts_scripts = _patch_streaming(monkeypatch, tmp_path, corrected)
+
+    updates = list(pipeline.run_segmented_pipeline("streaming demo", output_base=str(tmp_path)))
+
+    assert len(coder_calls) == 2
+    assert tts_scripts[-1].startswith("revised")
+    assert any("changed after planning" in u.get("status", "") for u in updates)
+
+
+def test_planner_failure_waits_for_streamed_segments(monkeypatch, tmp_path):
+    _patch_streaming(monkeypatch, tmp_path, _storyboard())
+    segment_done = threading.Event()
+    fake_coder = pipeline.run_coder_agent
+
+    def slow_coder(*args, **kwargs):
+        yield from fake_coder(*args, **kwargs)
+        time.sleep(0.2)
+        segment_done.set()
+
+    def failing_planner(*args, **kwargs):
+        yield {"storyboard_header": {"theme_name": "Test", "color_palette": {}, "num_segments": 1}}
+        yield {"status": "  → Segment 1/1 done: One", "segment": _storyboard()["segments"][0]}
+        raise RuntimeError("planner crashed")
+
+    monkeypatch.setattr(pipeline, "run_coder_agent", slow_coder)
+    monkeypatch.setattr(pipeline, "run_math2manim_planner", failing_planner)
+
+    with pytest.raises(RuntimeError, match="planner crashed"):
+        list(pipeline.run_segmented_pipeline("streaming demo", output_base=str(tmp_path)))
+
+    # The streamed segment settled before the failure reached the caller.
+    assert segment_done.is_set()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import agents.pipeline as pipeline
+
+
+def _storyboard():
+    return {
+        "theme_name": "Test",
+        "color_palette": {},
+        "segments": [
+            {
+                "id": 1,
+                "title": "One",
+                "audio_script": " ".join(["word"] * 15),  # ~6s at 150 wpm
+                "complexity": "complex",
+                "visual_instructions": "visual 1",
+                "equations_latex": [],
+                "animations": [],
+            },
+        ],
+    }
+
+
+def _patch_pipeline(monkeypatch, tmp_path, tts_duration, coder_calls, render_codes, tts_done):
+    def fake_planner(*args, **kwargs):
+        yield {"final": True, "storyboard": _storyboard()}
+
+    async def fake_tts_async(script, audio_path):
+        await asyncio.sleep(0.2)
+        tts_done.set()
+        return {"success": True, "audio_path": audio_path, "duration": tts_duration}
+
+    def fake_coder(*args, **kwargs):
+        coder_calls.append({"audio_duration": kwargs["audio_duration"], "tts_done": tts_done.is_set()})
+        yield {
+            "status": "ok",
+            "phase": "done",
+            "code": "from manim import *\nclass Segment1Scene(Scene):\n    def construct(self):\n        self.wait(2)\n",
+            "code_validated": True,
+            "final": True,
+            "tool_call_counts": {},
+            "token_usage": {},
+        }
+
+    def fake_render_parallel(jobs):
+        render_codes.append(jobs[0].code)
+        out = tmp_path / "render.mp4"
+        out.write_text("video")
+        return [SimpleNamespace(success=True, video_path=str(out), error=None)]
+
+    def fake_stitch(video_path, audio_path, output_path):
+        yield {"final": True, "success": True, "output_path": output_path}
+
+    def fake_concat(paths, final_output):
+        yield {"final": True, "success": True, "output_path": final_output}
+
+    def fake_mux(video_path, srt_path, output_path):
+        yield {"final": True, "success": True, "output_path": output_path}
+
+    monkeypatch.setattr(pipeline, "run_math2manim_planner", fake_planner)
+    monkeypatch.setattr(pipeline, "generate_voiceover_async", fake_tts_async)
+    monkeypatch.setattr(pipeline, "run_coder_agent", fake_coder)
+    monkeypatch.setattr(pipeline, "verify_segment_code",
+                        lambda *a, **k: SimpleNamespace(passed=True, issues=[], suggestions=[], static_issues=[]))
+    monkeypatch.setattr(pipeline, "render_parallel", fake_render_parallel)
+    monkeypatch.setattr(pipeline, "critique_video",
+                        lambda *a, **k: SimpleNamespace(passed=True, score=0.9, issues=[], suggestions=[], sub_scores={}))
+    monkeypatch.setattr(pipeline, "record_golden_scene", lambda *a, **k: False)
+    monkeypatch.setattr(pipeline, "stitch_video_and_audio", fake_stitch)
+    monkeypatch.setattr(pipeline, "concatenate_segments", fake_concat)
+    monkeypatch.setattr(pipeline, "mux_subtitles", fake_mux)
+    monkeypatch.setattr(pipeline, "critique_project_consistency",
+                        lambda *a, **k: SimpleNamespace(passed=True, issues=[]))
+
+
+def test_speculative_codegen_overlaps_tts_and_retimes(monkeypatch, tmp_path):
+    coder_calls: list[dict] = []
+    render_codes: list[str] = []
+    tts_done = threading.Event()
+    _patch_pipeline(monkeypatch, tmp_path, 10.0, coder_calls, render_codes, tts_done)
+
+    updates = list(pipeline.run_segmented_pipeline(
+        "speculative demo", output_base=str(tmp_path), speculative_codegen=True,
+    ))
+
+    assert coder_calls[0] == {"audio_duration": 6.0, "tts_done": False}
+    # Narration came in 4s longer than estimated: the ending is stretched, not regenerated.
+    assert "self.wait(6.00)" in render_codes[0]
+    assert len(coder_calls) == 1
+    assert any("re-timed ending by +4.0s" in u.get("status", "") for u in updates)
+
+
+def test_speculative_codegen_within_tolerance_keeps_code(monkeypatch, tmp_path):
+    coder_calls: list[dict] = []
+    render_codes: list[str] = []
+    tts_done = threading.Event()
+    _patch_pipeline(monkeypatch, tmp_path, 6.5, coder_calls, render_codes, tts_done)
+
+    list(pipeline.run_segmented_pipeline(
+        "speculative demo", output_base=str(tmp_path), speculative_codegen=True,
+    ))
+
+    assert "self.wait(2)" in render_codes[0]
+
+
+def test_default_mode_waits_for_tts(monkeypatch, tmp_path):
+    monkeypatch.delenv("PAPER2MANIM_SPECULATIVE_CODEGEN", raising=False)
+    coder_calls: list[dict] = []
+    render_codes: list[str] = []
+    tts_done = threading.Event()
+    _patch_pipeline(monkeypatch, tmp_path, 10.0, coder_calls, render_codes, tts_done)
+
+    list(pipeline.run_segmented_pipeline("speculative demo", output_base=str(tmp_path)))
+
+    assert coder_calls[0] == {"audio_duration": 10.0, "tts_done": True}
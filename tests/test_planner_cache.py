@@ -0,0 +1,41 @@
+"""Tests for utils.planner_cache."""
+
+from __future__ import annotations
+
+from utils.planner_cache import PlannerCache, normalize_concept
+
+
+def test_key_depends_on_every_input():
+    base = PlannerCache.key("analysis", model="openai:gpt", version=1, concept="fft", preferences={"a": 1})
+    assert base == PlannerCache.key("analysis", model="openai:gpt", version=1, preferences={"a": 1}, concept="fft")
+    assert base != PlannerCache.key("tree", model="openai:gpt", version=1, concept="fft", preferences={"a": 1})
+    assert base != PlannerCache.key("analysis", model="openai:other", version=1, concept="fft", preferences={"a": 1})
+    assert base != PlannerCache.key("analysis", model="openai:gpt", version=2, concept="fft", preferences={"a": 1})
+    assert base != PlannerCache.key("analysis", model="openai:gpt", version=1, concept="fft", preferences={"a": 2})
+    assert normalize_concept("  The  FFT\n") == "the fft"
+
+
+def test_round_trip_refresh_and_disabled(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = PlannerCache(directory)
+    assert cache.get("analysis", "k") is None
+    cache.put("analysis", "k", {"domain": "Signals"})
+    assert PlannerCache(directory).get("analysis", "k") == {"domain": "Signals"}
+    assert cache.stats() == {"hits": 0, "misses": 1}
+
+    refresh = PlannerCache(directory, refresh=True)
+    assert refresh.get("analysis", "k") is None
+    refresh.put("analysis", "k", {"domain": "Audio"})
+    assert cache.get("analysis", "k") == {"domain": "Audio"}
+
+    off = PlannerCache(str(tmp_path / "off"), enabled=False)
+    off.put("analysis", "k", {"domain": "Signals"})
+    assert off.get("analysis", "k") is None
+    assert not (tmp_path / "off").exists()
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = PlannerCache(str(tmp_path))
+    cache.put("analysis", "k", {"domain": "Signals"})
+    next(tmp_path.glob("analysis-*.json")).write_text("{not json")
+    assert cache.get("analysis", "k") is None
@@ -1,8 +1,56 @@
+import json
+import os
+import threading
+
+import pytest
+
+import agents.planner_math2manim as planner_math2manim
 from agents.planner_math2manim import (
     ConceptAnalysis,
+    EnrichedNode,
+    EnrichedTree,
     _friendly_planner_error,
     _planner_preference_context,
+    compose_narrative,
 )
+from utils.planner_cache import PlannerCache
+
+
+@pytest.fixture(autouse=True)
+def planner_cache(monkeypatch, tmp_path):
+    cache = PlannerCache(str(tmp_path / "planner_cache"))
+    monkeypatch.setattr(planner_math2manim, "get_planner_cache", lambda: cache)
+    return cache
+
+
+def _segment(seg_id: int, words: int) -> dict:
+    return {
+        "id": seg_id,
+        "title": f"Segment {seg_id}",
+        "learning_goal": "goal",
+        "must_show": [],
+        "end_state": "summary",
+        "carry_over_from_previous": "clean slate",
+        "equations_latex": [],
+        "variable_definitions": {},
+        "elements": [],
+        "element_colors": {},
+        "animations": [],
+        "layout_instructions": "",
+        "visual_instructions": "show it",
+        "audio_script": " ".join(["word"] * words),
+        "duration_hint_seconds": 20,
+    }
+
+
+def _tree(count: int) -> EnrichedTree:
+    return EnrichedTree(nodes=[
+        EnrichedNode(
+            id=i, title=f"Node {i}", description="d", complexity="simple",
+            equations_latex=[], variable_definitions={}, elements=[], visual_metaphor="m",
+        )
+        for i in range(1, count + 1)
+    ])
 
 
 def test_concept_analysis_accepts_short_preset_segment_count():
@@ -38,3 +86,206 @@ def test_planner_preference_context_mentions_new_quality_controls():
     assert "Quality mode: polished" in enriched
     assert "Maximum visual density: low" in enriched
     assert "stable, meaningful frame" in prompt
+
+
+def test_compose_narrative_streams_segments_that_validate(monkeypatch):
+    preset = {"per_segment_seconds": 20, "target_seconds": 40}  # ~50 target words
+    composed: list[int] = []
+    rewrites: list[str] = []
+
+    def fake_compose(node, i, *args, **kwargs):
+        composed.append(i)
+        # Segment 2 is far too short and only needs its narration resized.
+        return _segment(i + 1, 50 if i == 0 else 5)
+
+    def fake_call_llm(prompt, **kwargs):
+        rewrites.append(kwargs["cache_key_label"])
+        return json.dumps({"audio_script": " ".join(["word"] * 48)})
+
+    monkeypatch.setattr(planner_math2manim, "_compose_single_segment", fake_compose)
+    monkeypatch.setattr(planner_math2manim, "_call_llm", fake_call_llm)
+    updates = list(compose_narrative(_tree(2), None, None, None, duration_preset=preset))
+
+    assert updates[1]["storyboard_header"]["num_segments"] == 2
+    assert sorted(composed) == [0, 1]
+    assert rewrites == ["planner-rewrite"]
+    streamed = sorted((u["segment"] for u in updates if "segment" in u), key=lambda seg: seg["id"])
+    assert [seg["id"] for seg in streamed] == [1, 2]
+    assert len(streamed[1]["audio_script"].split()) == 48
+    final = updates[-1]["storyboard"]
+    assert final["segments"] == streamed
+
+
+def test_compose_narrative_regenerates_concurrently_and_keeps_better_draft(monkeypatch):
+    preset = {"per_segment_seconds": 20, "target_seconds": 60}
+    barrier = threading.Barrier(3, timeout=5)
+    attempts: dict[int, int] = {}
+
+    def fake_compose(node, i, *args, **kwargs):
+        attempts[i] = attempts.get(i, 0) + 1
+        if attempts[i] == 1:
+            return {"id": i + 1, "audio_script": "too short"}  # invalid: forces recomposition
+        barrier.wait()  # all three regenerations must be in flight together
+        return _segment(i + 1, 45 if i != 2 else 1)
+
+    monkeypatch.setattr(planner_math2manim, "_compose_single_segment", fake_compose)
+    updates = list(compose_narrative(_tree(3), None, None, None, duration_preset=preset))
+
+    statuses = [u.get("status", "") for u in updates]
+    assert sum("regenerated: 45 words (improved)" in s for s in statuses) == 2
+    assert any("Segment 3 regeneration did not improve" in s for s in statuses)
+    assert attempts == {0: 2, 1: 2, 2: 2}
+
+
+def _fused_payload(enriched_ok: bool = True) -> dict:
+    nodes = [{"id": i, "title": f"Node {i}", "description": "d", "complexity": "simple"} for i in (1, 2)]
+    enriched = [
+        {**node, "equations_latex": ["a^2"], "variable_definitions": {}, "elements": [], "visual_metaphor": "m"}
+        for node in nodes
+    ]
+    return {
+        "analysis": {
+            "core_concept": "Dot product", "domain": "Linear Algebra", "target_audience": "Undergraduate",
+            "key_insights": ["projection"], "common_misconceptions": [], "narrative_arc": "intuition -> formula",
+            "suggested_segment_count": 6,
+        },
+        "prerequisite_tree": {"nodes": nodes},
+        "enriched_tree": {"nodes": enriched if enriched_ok else [{"id": 1}]},
+        "visual_design": {
+            "theme_name": "Fused", "color_palette": {"Background": "#141414"}, "typography_notes": "",
+            "segment_designs": [
+                {"segment_id": i, "layout_blueprint": "", "camera_notes": "", "transition_in": "", "transition_out": ""}
+                for i in (1, 2)
+            ],
+        },
+    }
+
+
+def test_fused_planning_replans_only_the_invalid_portion(monkeypatch):
+    labels: list[str] = []
+
+    def fake_call_llm(prompt, **kwargs):
+        labels.append(kwargs["cache_key_label"])
+        if kwargs["cache_key_label"] == "planner-fused":
+            return json.dumps(_fused_payload(enriched_ok=False))
+        return json.dumps({"nodes": _fused_payload()["enriched_tree"]["nodes"]})
+
+    monkeypatch.setattr(planner_math2manim, "_call_llm", fake_call_llm)
+    preset = planner_math2manim.DEFAULT_DURATION_PRESET
+    gen = planner_math2manim._plan_stages("dot product", "dot product", preset, {}, max_retries=1, fused=True)
+    updates = []
+    while True:
+        try:
+            updates.append(next(gen))
+        except StopIteration as stop:
+            stages = stop.value
+            break
+
+    assert labels == ["planner-fused", "planner-stage3"]
+    assert stages.fallbacks == ["enriched_tree"]
+    assert stages.analysis.suggested_segment_count == preset["max_segments"]
+    assert stages.visual_design.theme_name == "Fused"
+    assert [n.id for n in stages.enriched.nodes] == [1, 2]
+    assert any("re-planning enriched_tree" in u["status"] for u in updates)
+
+
+def test_benchmark_planning_modes_reports_both_paths(monkeypatch):
+    payload = _fused_payload()
+    staged = {
+        "planner-stage1": payload["analysis"],
+        "planner-stage2": payload["prerequisite_tree"],
+        "planner-stage3": payload["enriched_tree"],
+        "planner-stage4": payload["visual_design"],
+        "planner-fused": payload,
+    }
+
+    def fake_call_llm(prompt, *, token_counter=None, **kwargs):
+        token_counter["api_calls"] += 1
+        return json.dumps(staged[kwargs["cache_key_label"]])
+
+    monkeypatch.setattr(planner_math2manim, "_call_llm", fake_call_llm)
+    report = planner_math2manim.benchmark_planning_modes("dot product")
+
+    assert report["staged"]["api_calls"] == 4
+    assert report["fused"]["api_calls"] == 1
+    assert report["fused"]["fallbacks"] == []
+    assert report["fused"]["quality"] == report["staged"]["quality"]
+    assert report["fused"]["quality"]["equations"] == 2
+
+
+def _run_stages(concept: str, answers: dict, fused: bool = False) -> planner_math2manim.PlanningStages:
+    preset = planner_math2manim.DEFAULT_DURATION_PRESET
+    enriched_concept = concept + planner_math2manim._planner_preference_context(answers, preset)[0]
+    gen = planner_math2manim._plan_stages(
+        concept, enriched_concept, preset, {}, max_retries=1, fused=fused,
+        preferences=planner_math2manim._cache_preferences(answers),
+    )
+    while True:
+        try:
+            next(gen)
+        except StopIteration as stop:
+            return stop.value
+
+
+def test_planner_cache_reuses_stages_and_replans_only_changed_inputs(monkeypatch):
+    payload = _fused_payload()
+    labels: list[str] = []
+
+    def fake_call_llm(prompt, **kwargs):
+        label = kwargs["cache_key_label"]
+        labels.append(label)
+        if label == "planner-stage1":
+            audience = "Graduate" if "Graduate" in prompt else "Undergraduate"
+            return json.dumps({**payload["analysis"], "target_audience": audience})
+        return json.dumps(payload[{
+            "planner-stage2": "prerequisite_tree", "planner-stage3": "enriched_tree", "planner-stage4": "visual_design",
+        }[label]])
+
+    monkeypatch.setattr(planner_math2manim, "_call_llm", fake_call_llm)
+    answers = {"target_audience": "Undergraduate", "quality_mode": "balanced"}
+    first = _run_stages("Dot  Product", answers)
+    assert labels == ["planner-stage1", "planner-stage2", "planner-stage3", "planner-stage4"]
+
+    # Concepts are normalized, so identical inputs re-plan nothing.
+    labels.clear()
+    again = _run_stages("dot product", answers)
+    assert labels == []
+    assert again.visual_design == first.visual_design
+
+    # Quality mode is part of the Stage 1 prompt, so the analysis is re-run;
+    # it comes back identical, so the later stages are still reused.
+    labels.clear()
+    _run_stages("dot product", {**answers, "quality_mode": "polished"})
+    assert labels == ["planner-stage1"]
+
+    # A new audience changes the analysis and so the tree's inputs; the tree
+    # comes back identical, so enrichment and visuals are still reused.
+    labels.clear()
+    _run_stages("dot product", {**answers, "target_audience": "Graduate / Professional"})
+    assert labels == ["planner-stage1", "planner-stage2"]
+
+
+def test_fused_planning_is_skipped_on_top_of_a_cached_analysis(monkeypatch, planner_cache):
+    payload = _fused_payload()
+    labels: list[str] = []
+
+    def fake_call_llm(prompt, **kwargs):
+        label = kwargs["cache_key_label"]
+        labels.append(label)
+        return json.dumps(payload[{
+            "planner-stage1": "analysis", "planner-stage2": "prerequisite_tree",
+            "planner-stage3": "enriched_tree", "planner-stage4": "visual_design",
+        }[label]])
+
+    monkeypatch.setattr(planner_math2manim, "_call_llm", fake_call_llm)
+    answers = {"target_audience": "Undergraduate"}
+    _run_stages("dot product", answers)
+    for name in os.listdir(planner_cache.directory):
+        if not name.startswith("analysis-"):
+            os.remove(os.path.join(planner_cache.directory, name))
+
+    # The fused call would plan from its own analysis, not the cached one.
+    labels.clear()
+    stages = _run_stages("dot product", answers, fused=True)
+    assert labels == ["planner-stage2", "planner-stage3", "planner-stage4"]
+    assert stages.fallbacks == []
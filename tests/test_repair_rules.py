@@ -0,0 +1,66 @@
+"""Tests for utils.repair_rules — error signatures and local auto-fixes."""
+
+from __future__ import annotations
+
+import json
+
+from utils.repair_rules import ErrorKnowledgeBase, error_signature, try_auto_fix
+
+_CODE = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        eq = MathTex("\\frac{a}{b} + \\\\alpha", r"\\theta")
+        label = Text("hi", size=40, color=LIGHT_BLUE)
+        dot = Dot(point=np.array([1, 0, 0]), glow=True)
+        self.play(ShowCreation(dot))
+"""
+
+
+def test_error_signature_normalises_stderr():
+    sig = error_signature('File "/tmp/abc/scene.py", line 6, in construct\nNameError: name \'LIGHT_BLUE\' is not defined')
+    assert (sig.kind, sig.detail, sig.line, sig.key) == ("name-error", "LIGHT_BLUE", 6, "name-error:LIGHT_BLUE")
+    assert error_signature("TypeError: got an unexpected keyword argument 'glow'").key == "unexpected-kwarg:glow"
+    assert error_signature("LaTeX compilation error: Undefined control sequence").kind == "latex"
+    assert error_signature("ValueError: bad shape").kind == "valueerror"
+
+
+def test_latex_fix_escapes_only_non_raw_strings():
+    fix = try_auto_fix(_CODE, "LaTeX Error: Undefined control sequence", ErrorKnowledgeBase())
+    assert 'MathTex("\\\\frac{a}{b} + \\\\alpha", r"\\theta")' in fix.code
+
+
+def test_name_error_fixes():
+    kb = ErrorKnowledgeBase()
+    color = try_auto_fix(_CODE, "NameError: name 'LIGHT_BLUE' is not defined", kb)
+    assert "color=BLUE_B" in color.code
+    renamed = try_auto_fix(_CODE, "NameError: name 'ShowCreation' is not defined", kb)
+    assert "self.play(Create(dot))" in renamed.code
+    imported = try_auto_fix(_CODE, "NameError: name 'np' is not defined", kb)
+    assert imported.code.splitlines()[1] == "import numpy as np"
+
+
+def test_unexpected_kwarg_is_renamed_or_removed_on_failing_line():
+    kb = ErrorKnowledgeBase()
+    renamed = try_auto_fix(
+        _CODE, "scene.py:6 in construct\nTypeError: Text.__init__() got an unexpected keyword argument 'size'", kb,
+    )
+    assert 'Text("hi", font_size=40, color=LIGHT_BLUE)' in renamed.code
+    removed = try_auto_fix(_CODE, "scene.py:7 in construct\nTypeError: unexpected keyword argument 'glow'", kb)
+    assert "dot = Dot(point=np.array([1, 0, 0]))" in removed.code
+    # Without the failing line the keyword may be valid in other calls, so leave it to the LLM.
+    assert try_auto_fix(_CODE, "TypeError: got an unexpected keyword argument 'glow'", kb) is None
+
+
+def test_unknown_signature_escalates_and_hit_rate_is_persisted(tmp_path):
+    path = tmp_path / "kb.json"
+    kb = ErrorKnowledgeBase(str(path))
+    assert try_auto_fix(_CODE, "ValueError: something odd", kb) is None
+    assert try_auto_fix(_CODE, "NameError: name 'CYAN' is not defined", kb) is None  # CYAN not in code
+    assert try_auto_fix(_CODE, "NameError: name 'LIGHT_BLUE' is not defined", kb) is not None
+    kb.save()  # writes after the first are batched
+
+    stats = ErrorKnowledgeBase(str(path)).stats()
+    assert stats["seen"] == 3 and stats["auto_fixed"] == 1
+    assert stats["signatures"]["name-error:LIGHT_BLUE"]["rule"] == "name-error"
+    assert json.loads(path.read_text())["signatures"]["valueerror"]["escalated"] == 1
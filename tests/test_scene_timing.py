@@ -0,0 +1,118 @@
+"""Tests for utils.scene_timing — trailing self.wait() re-timing."""
+
+from __future__ import annotations
+
+import ast
+
+from utils.scene_timing import adjust_trailing_wait, estimate_scene_duration, fit_scene_to_duration
+
+_SCENE = """from manim import *
+
+class Demo(Scene):
+    def construct(self):
+        self.play(Write(Text("hi")))
+        self.wait(1)
+        self.wait(2)
+"""
+
+
+def _trailing_waits(code: str) -> list[str]:
+    return [line.strip() for line in code.splitlines() if line.strip().startswith("self.wait")]
+
+
+def test_extend_last_trailing_wait():
+    adjusted = adjust_trailing_wait(_SCENE, 3.0)
+    assert _trailing_waits(adjusted) == ["self.wait(1)", "self.wait(5.00)"]
+    ast.parse(adjusted)
+
+
+def test_shrink_spills_into_earlier_waits():
+    adjusted = adjust_trailing_wait(_SCENE, -2.0)
+    # Last wait drops to the 0.5s floor, the remaining 0.5s comes from the one before.
+    assert _trailing_waits(adjusted) == ["self.wait(0.50)", "self.wait(0.50)"]
+
+
+def test_append_wait_when_scene_ends_with_play():
+    code = "from manim import *\nclass Demo(Scene):\n    def construct(self):\n        self.play(FadeIn(Dot()))\n"
+    adjusted = adjust_trailing_wait(code, 1.25)
+    assert adjusted.splitlines()[-1] == "        self.wait(1.25)"
+    ast.parse(adjusted)
+
+
+def test_bare_wait_counts_as_one_second():
+    code = "from manim import *\nclass Demo(Scene):\n    def construct(self):\n        self.wait()\n"
+    assert _trailing_waits(adjust_trailing_wait(code, 0.5)) == ["self.wait(1.50)"]
+
+
+def test_unparseable_or_unshrinkable_returns_none():
+    assert adjust_trailing_wait("class Broken(:\n", 1.0) is None
+    code = "from manim import *\nclass Demo(Scene):\n    def construct(self):\n        self.play(FadeIn(Dot()))\n"
+    assert adjust_trailing_wait(code, -1.0) is None
+
+
+_TIMELINE = """from manim import *
+class Demo(Scene):
+    def construct(self):
+        title = Text("Hi")
+        self.play(Write(title), run_time=2)
+        self.play(FadeOut(title))
+        self.wait()
+"""
+
+
+def test_estimate_scene_duration_from_static_timeline():
+    # 2s write + 1s default FadeOut + 1s default wait.
+    assert estimate_scene_duration(_TIMELINE) == 4.0
+
+
+def test_estimate_prefers_probe_trace_clock():
+    assert estimate_scene_duration(_TIMELINE, {"duration": 4.4, "beats": []}) == 4.4
+
+
+def test_fit_scene_to_duration_stretches_ending_and_shifts_trace():
+    trace = {"duration": 4.0, "beats": [{"index": 0, "event": "wait", "start": 3.0, "end": 4.0, "mobjects": []}]}
+    fit = fit_scene_to_duration(_TIMELINE, 7.5, layout_trace=trace)
+    assert fit.estimated_seconds == 4.0
+    assert fit.fitted_seconds == 7.5
+    assert _trailing_waits(fit.code) == ["self.wait(4.50)"]
+    assert fit.layout_trace["duration"] == 7.5
+    assert fit.layout_trace["beats"][-1]["end"] == 7.5
+    assert trace["duration"] == 4.0
+
+
+def test_fit_scene_reports_partial_shrink():
+    fit = fit_scene_to_duration(_TIMELINE, 1.0)
+    # Only the final 1s hold can shrink, down to the 0.5s floor.
+    assert fit.fitted_seconds == 3.5
+
+
+def test_fit_scene_skips_close_or_unknown_durations():
+    assert fit_scene_to_duration(_TIMELINE, 4.05) is None
+    assert fit_scene_to_duration(_TIMELINE, 0.0) is None
+    looped = _TIMELINE.replace("self.wait()", "for _ in range(n):\n            self.wait()")
+    assert fit_scene_to_duration(looped, 8.0) is None
+
+
+
+def _construct(body: str) -> str:
+    lines = "\n".join(f"        {line}" for line in body.strip().splitlines())
+    return f"from manim import *\n\nclass Demo(Scene):\n    def construct(self):\n{lines}\n"
+
+
+def test_unknown_play_duration_makes_estimate_unknown():
+    code = _construct("c = Circle()\nself.play(Create(c, run_time=len(self.mobjects) + 5))\nself.wait(1)")
+    assert estimate_scene_duration(code) is None
+    assert fit_scene_to_duration(code, 8.0) is None
+
+    stored = _construct("anim = Create(Circle())\nself.play(anim)\nself.wait(1)")
+    assert estimate_scene_duration(stored) is None
+
+
+def test_group_lag_ratio_is_modelled():
+    fades = ", ".join("FadeIn(Dot(), run_time=1)" for _ in range(10))
+    # Starts every 0.5s, the last one ends at 4.5 + 1.
+    assert estimate_scene_duration(_construct(f"self.play(LaggedStart({fades}, lag_ratio=0.5))")) == 5.5
+    # LaggedStart's default lag_ratio is 0.05: 9 * 0.05 + 1.
+    assert estimate_scene_duration(_construct(f"self.play(LaggedStart({fades}))")) == 1.45
+    assert estimate_scene_duration(_construct("self.play(Succession(Write(Text('a')), FadeIn(Dot(), run_time=2)))")) == 3.0
+    assert estimate_scene_duration(_construct("self.play(LaggedStartMap(FadeIn, VGroup(Dot(), Dot())))")) is None
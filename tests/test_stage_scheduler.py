@@ -0,0 +1,79 @@
+"""Tests for utils.stage_scheduler — typed resource slots and stage timings."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.stage_scheduler import RESOURCE_LLM, RESOURCE_RENDER, RESOURCE_TTS, StageScheduler, default_resource_limits
+
+
+def test_slots_bound_concurrency_per_resource():
+    scheduler = StageScheduler({RESOURCE_LLM: 2, RESOURCE_RENDER: 1})
+    active = {RESOURCE_LLM: 0, RESOURCE_RENDER: 0}
+    peak = {RESOURCE_LLM: 0, RESOURCE_RENDER: 0}
+    lock = threading.Lock()
+
+    def work(resource):
+        with scheduler.slot(resource, resource):
+            with lock:
+                active[resource] += 1
+                peak[resource] = max(peak[resource], active[resource])
+            time.sleep(0.03)
+            with lock:
+                active[resource] -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, [RESOURCE_LLM] * 4 + [RESOURCE_RENDER] * 4))
+
+    assert peak == {RESOURCE_LLM: 2, RESOURCE_RENDER: 1}
+
+
+def test_slow_render_does_not_block_llm_stage():
+    scheduler = StageScheduler({RESOURCE_LLM: 1, RESOURCE_RENDER: 1})
+    render_started = threading.Event()
+    release_render = threading.Event()
+
+    def render():
+        with scheduler.slot(RESOURCE_RENDER, "render"):
+            render_started.set()
+            release_render.wait(2)
+
+    thread = threading.Thread(target=render)
+    thread.start()
+    render_started.wait(2)
+    with scheduler.slot(RESOURCE_LLM, "code"):
+        pass  # acquired while the render slot is still held
+    release_render.set()
+    thread.join()
+
+    assert scheduler.stats()["code"]["queue_wait_seconds"] < 0.5
+
+
+def test_stats_split_queue_wait_and_run_time():
+    scheduler = StageScheduler({RESOURCE_RENDER: 1})
+
+    def render():
+        with scheduler.slot(RESOURCE_RENDER, "render"):
+            time.sleep(0.05)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda _: render(), range(2)))
+
+    stats = scheduler.stats()["render"]
+    assert stats["resource"] == RESOURCE_RENDER
+    assert stats["count"] == 2
+    assert stats["run_seconds"] >= 0.1
+    assert stats["max_queue_wait_seconds"] >= 0.04
+
+
+def test_default_limits_honour_env(monkeypatch):
+    monkeypatch.setenv("PAPER2MANIM_RENDER_SLOTS", "3")
+    monkeypatch.setenv("PAPER2MANIM_LLM_SLOTS", "not-a-number")
+    monkeypatch.setenv("PAPER2MANIM_TTS_SLOTS", "2")
+    monkeypatch.setenv("GEMINI_TTS_MAX_CONCURRENCY", "9")
+    limits = default_resource_limits()
+    assert limits[RESOURCE_RENDER] == 3
+    assert limits[RESOURCE_LLM] == 5
+    assert limits[RESOURCE_TTS] == 2
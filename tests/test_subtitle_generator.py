@@ -2,12 +2,19 @@
 
 from __future__ import annotations
 
+import subprocess
+import wave
+
+import utils.subtitle_generator as subtitle_generator
 from utils.subtitle_generator import (
     SrtEntry,
     format_srt_time,
     generate_combined_srt,
     generate_segment_srt,
+    load_timing_sidecar,
+    read_audio_duration,
     split_into_sentences,
+    write_timing_sidecar,
 )
 
 # ---------------------------------------------------------------------------
@@ -160,3 +167,61 @@ def test_combined_srt_skips_failed():
 
 def test_combined_srt_empty():
     assert generate_combined_srt([], {}).strip() == ""
+
+
+# ---------------------------------------------------------------------------
+# Timing sidecar
+# ---------------------------------------------------------------------------
+
+def _write_silent_wav(path, seconds: float, rate: int = 24000) -> None:
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+
+
+def test_read_audio_duration_from_wav_header(tmp_path):
+    audio = tmp_path / "segment_1_audio.wav"
+    _write_silent_wav(audio, 2.5)
+    assert abs(read_audio_duration(str(audio)) - 2.5) < 1e-6
+
+
+def test_read_audio_duration_missing_file():
+    assert read_audio_duration("/nonexistent/audio.wav") == 0.0
+
+
+def test_combined_srt_uses_sidecar_without_probing(tmp_path, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise AssertionError("ffprobe should not run when a sidecar exists")
+
+    monkeypatch.setattr(subprocess, "run", _fail)
+    audio = tmp_path / "segment_1_audio.wav"
+    _write_silent_wav(audio, 4.0)
+    write_timing_sidecar(
+        str(audio), 4.0,
+        [("One two three four five six.", 0.0, 1.0), ("Seven.", 1.0, 4.0)],
+        "silence",
+    )
+    assert load_timing_sidecar(str(audio))["source"] == "silence"
+
+    segments = [{"id": 1, "audio_script": "One two three four five six. Seven."}]
+    # Resumed TTS results carry duration 0.0.
+    tts_results = {1: {"success": True, "audio_path": str(audio), "duration": 0.0}}
+    srt = generate_combined_srt(segments, tts_results)
+    assert "00:00:00,000 --> 00:00:01,000" in srt
+    assert "00:00:01,000 --> 00:00:04,000" in srt
+
+
+def test_combined_srt_ignores_sidecar_for_different_script(tmp_path, monkeypatch):
+    monkeypatch.setattr(subtitle_generator, "_probe_audio_duration", lambda _p: 0.0)
+    audio = tmp_path / "segment_1_audio.wav"
+    _write_silent_wav(audio, 2.0)
+    write_timing_sidecar(str(audio), 2.0, [("Old text.", 0.0, 2.0)], "silence")
+
+    segments = [{"id": 1, "audio_script": "New first. New second."}]
+    tts_results = {1: {"success": True, "audio_path": str(audio), "duration": 2.0}}
+    srt = generate_combined_srt(segments, tts_results)
+    # Falls back to proportional timing: two equal-length sentences.
+    assert "00:00:00,000 --> 00:00:01,000" in srt
+    assert "New second." in srt
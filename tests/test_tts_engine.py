@@ -0,0 +1,159 @@
+"""Tests for utils.tts_engine — in-process PCM/WAV handling (no ffmpeg needed)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import tts_engine
+
+
+@pytest.fixture
+def no_subprocess(monkeypatch):
+    def _fail(*args, **kwargs):
+        raise AssertionError(f"unexpected subprocess call: {args}")
+
+    monkeypatch.setattr(subprocess, "run", _fail)
+
+
+def test_write_pcm_wav_round_trip(tmp_path, no_subprocess):
+    out = tmp_path / "out.wav"
+    pcm = b"\x01\x00" * 24000  # 1 second @ 24 kHz mono s16le
+    ok, err = tts_engine._write_pcm_wav(pcm, str(out), 24000)
+    assert ok and err == ""
+
+    with wave.open(str(out), "rb") as wav:
+        assert wav.getnchannels() == 1
+        assert wav.getsampwidth() == 2
+        assert wav.getframerate() == 24000
+        assert wav.getnframes() == 24000
+
+
+def test_write_pcm_wav_drops_dangling_byte(tmp_path, no_subprocess):
+    out = tmp_path / "out.wav"
+    ok, _ = tts_engine._write_pcm_wav(b"\x00\x00\x00", str(out), 24000)
+    assert ok
+    assert tts_engine._read_wav_header(str(out)) == (1, 24000)
+
+
+def test_write_pcm_wav_rejects_empty_buffer(tmp_path, no_subprocess):
+    ok, err = tts_engine._write_pcm_wav(b"", str(tmp_path / "out.wav"), 24000)
+    assert not ok
+    assert "empty" in err
+
+
+def test_duration_and_validation_read_wav_header(tmp_path, no_subprocess):
+    out = tmp_path / "out.wav"
+    tts_engine._write_pcm_wav(b"\x00\x00" * 36000, str(out), 24000)
+    assert tts_engine._is_valid_audio_file(str(out)) is True
+    assert tts_engine._get_audio_duration(str(out)) == pytest.approx(1.5)
+
+
+def test_non_wav_falls_back_to_ffprobe(tmp_path, monkeypatch):
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"ID3not-a-wav")
+    calls: list[list[str]] = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="2.25\n", stderr="")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    assert tts_engine._get_audio_duration(str(path)) == pytest.approx(2.25)
+    assert calls and calls[0][0] == "ffprobe"
+
+
+def test_sentence_timing_snaps_to_silence(tmp_path):
+    rate = 8000
+    tone = b"\xe8\x03\x18\xfc" * (rate // 2)  # 1 s of +/-1000 square wave
+    gap = b"\x00\x00" * (rate // 2)  # 0.5 s of silence
+    out = tmp_path / "segment_1_audio.wav"
+    # Word counts suggest a 2:1 split, but the pause sits at 1.0-1.5 s.
+    tts_engine._write_pcm_wav(tone + gap + tone, str(out), rate)
+
+    timing_path = tts_engine._write_sentence_timing("One two three four. Five six.", str(out))
+    with open(timing_path) as f:
+        data = json.load(f)
+
+    assert data["source"] == "silence"
+    assert data["duration"] == pytest.approx(2.5)
+    first, second = data["sentences"]
+    assert first["text"] == "One two three four."
+    assert first["end"] == pytest.approx(1.25, abs=0.03)
+    assert second["start"] == first["end"]
+    assert second["end"] == pytest.approx(2.5)
+
+
+def test_tts_session_loop_caps_concurrency():
+    loop = tts_engine.TTSSessionLoop(max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def fake_tts(text, path):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return {"success": True, "audio_path": path}
+
+    try:
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda i: loop.run(fake_tts, "hi", f"seg_{i}.wav"), range(5)))
+    finally:
+        loop.close()
+
+    assert [r["audio_path"] for r in results] == [f"seg_{i}.wav" for i in range(5)]
+    assert peak == 2
+
+
+def test_tts_session_loop_timeout():
+    loop = tts_engine.TTSSessionLoop(max_concurrency=1)
+
+    async def slow_tts(text, path):
+        await asyncio.sleep(5)
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run(slow_tts, "hi", "out.wav", timeout=0.05)
+    finally:
+        loop.close()
+
+
+def test_get_tts_loop_is_shared():
+    assert tts_engine.get_tts_loop() is tts_engine.get_tts_loop()
+
+
+def test_tts_session_loop_holds_slot_until_batch_call_returns(monkeypatch):
+    monkeypatch.setenv("GEMINI_TTS_MODE", "batch")
+    release = threading.Event()
+    calls: list[str] = []
+
+    def fake_generate(text, output_path):
+        calls.append(output_path)
+        if output_path == "slow.wav":
+            release.wait(5)  # a blocking API call that outlives the timeout
+        yield {"success": True, "audio_path": output_path}
+
+    monkeypatch.setattr(tts_engine, "generate_voiceover", fake_generate)
+    loop = tts_engine.TTSSessionLoop(max_concurrency=1)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run(tts_engine.generate_voiceover_async, "hi", "slow.wav", timeout=0.05)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = pool.submit(loop.run, tts_engine.generate_voiceover_async, "hi", "next.wav")
+            time.sleep(0.2)
+            assert calls == ["slow.wav"]  # still waiting on the slow call's slot
+            release.set()
+            assert pending.result(timeout=5)["audio_path"] == "next.wav"
+    finally:
+        release.set()
+        loop.close()
@@ -0,0 +1,103 @@
+"""Apply model-written unified diffs to generated Manim code.
+
+Repair prompts can ask the model for a patch instead of the whole script:
+a unified diff is a fraction of the output tokens on long scenes.  Models
+get hunk line numbers wrong often enough that hunks are located by their
+context/removed lines (nearest match to the stated position wins), and a
+patch that cannot be placed exactly is rejected rather than guessed at.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_FILE_HEADER_PREFIXES = ("--- ", "+++ ", "diff ", "index ")
+
+
+@dataclass
+class _Hunk:
+    start: Optional[int]  # 0-based line in the original, if the header gave one
+    old: list[str] = field(default_factory=list)
+    new: list[str] = field(default_factory=list)
+
+
+def looks_like_diff(text: str) -> bool:
+    """Whether *text* contains at least one unified-diff hunk header."""
+    return any(line.startswith("@@") for line in text.splitlines())
+
+
+def _parse_hunks(diff: str) -> list[_Hunk]:
+    hunks: list[_Hunk] = []
+    current: Optional[_Hunk] = None
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            match = _HUNK_HEADER_RE.match(line)
+            current = _Hunk(start=int(match.group(1)) - 1 if match else None)
+            hunks.append(current)
+            continue
+        if current is None:
+            continue  # preamble: fences, file headers, prose
+        if line.startswith(_FILE_HEADER_PREFIXES) or line.startswith("```"):
+            current = None
+            continue
+        if line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        if line.startswith("+"):
+            current.new.append(line[1:])
+        elif line.startswith("-"):
+            current.old.append(line[1:])
+        else:
+            # Context line; models often drop the leading space on blank lines.
+            text = line[1:] if line.startswith(" ") else line
+            current.old.append(text)
+            current.new.append(text)
+    return [h for h in hunks if h.old or h.new]
+
+
+def _locate(lines: list[str], needle: list[str], expected: int, floor: int) -> Optional[int]:
+    """Return the match of *needle* in *lines* at or after *floor* nearest *expected*."""
+    want = [s.rstrip() for s in needle]
+    size = len(want)
+    candidates = [
+        i for i in range(floor, len(lines) - size + 1)
+        if [s.rstrip() for s in lines[i:i + size]] == want
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda i: abs(i - expected))
+
+
+def apply_unified_diff(code: str, diff: str) -> Optional[str]:
+    """Apply *diff* to *code*; return the patched code or None if it does not apply.
+
+    Hunks are applied in order.  Each hunk's context and removed lines must
+    appear verbatim (ignoring trailing whitespace) after the previous hunk.
+    """
+    hunks = _parse_hunks(diff)
+    if not hunks:
+        return None
+    lines = code.splitlines()
+    offset = 0
+    floor = 0
+    for hunk in hunks:
+        expected = (hunk.start + offset) if hunk.start is not None else floor
+        if hunk.old:
+            at = _locate(lines, hunk.old, expected, floor)
+            if at is None:
+                return None
+        else:
+            # Pure insertion: trust the header position.
+            if hunk.start is None:
+                return None
+            at = min(max(expected + 1, floor), len(lines))
+        lines[at:at + len(hunk.old)] = hunk.new
+        offset += len(hunk.new) - len(hunk.old)
+        floor = at + len(hunk.new)
+
+    patched = "\n".join(lines)
+    if code.endswith("\n"):
+        patched += "\n"
+    return patched
@@ -3,21 +3,36 @@ Code-level verifier for Manim scenes.
 
 Analyzes generated Manim code (not rendered video) to predict visual issues
 like overlapping elements, bad transitions, timing mismatches, and layout
-problems. Runs a lightweight LLM pass on the code to catch issues that
-static analysis in `_quality_check_code` might miss.
+problems. The symbolic layout analyzer in ``utils.layout_analyzer`` handles
+most scenes deterministically; a lightweight LLM pass is only run when the
+analyzer cannot follow the scene (loops, helpers, updaters, ...).
 
 Also verifies cross-segment transitions by comparing the tail of one
-segment's code with the head of the next.
+segment's code with the head of the next.  ``verify_project_code`` checks a
+whole project's segments and transitions in as few LLM calls as the token
+budget allows.
 """
 
 from __future__ import annotations
 
 import json
+import logging
+import os
 import re
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
+from typing import Callable, TypeVar
 
-from agents.config import resolve_fallback_stage_model, resolve_stage_model
+from agents.config import merge_token_usage, new_token_counter, resolve_fallback_stage_model, resolve_stage_model
+from utils.layout_analyzer import analyze_scene_layout, report_from_layout_trace
 from utils.llm_provider import run_text_completion
+from utils.stage_scheduler import RESOURCE_LLM, default_resource_limits
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
 
 # ── Result types ────────────────────────────────────────────────────
 
@@ -30,6 +45,7 @@ class VerifyResult:
     issues: list[str] = field(default_factory=list)
     suggestions: list[str] = field(default_factory=list)
     static_issues: list[str] = field(default_factory=list)
+    used_llm: bool = True
 
 
 @dataclass
@@ -40,6 +56,21 @@ class TransitionVerifyResult:
     segment_b_id: int
     smooth: bool
     issues: list[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    # 1-based batched shard that answered the pair, 0 for a call of its own.
+    # For a batched pair, elapsed_seconds is the whole shard's wall time.
+    shard: int = 0
+
+
+@dataclass
+class ProjectVerifyResult:
+    """Result of a batched, project-wide code verification."""
+
+    segments: dict[int, VerifyResult] = field(default_factory=dict)
+    transitions: list[TransitionVerifyResult] = field(default_factory=list)
+    llm_calls: int = 0
+    shards: int = 0
+    fallback_items: int = 0
 
 
 # ── Prompts ─────────────────────────────────────────────────────────
@@ -87,8 +118,72 @@ Output ONLY valid JSON:
 
 Set "smooth" to false only for clear transition problems. Max 2 issues."""
 
+_BATCH_SYSTEM = """\
+You are an expert Manim code reviewer checking several scenes of one multi-segment \
+3Blue1Brown-style educational video in a single pass.
+
+The request contains SEGMENT items (a full Scene class) and TRANSITION items (the END of one \
+segment's code and the START of the next).
+
+For each SEGMENT, predict visual problems that would appear when rendered: overlapping elements, \
+missing FadeOut cleanup, off-screen content (frame is 14.2 x 8 units), clutter, animations that are \
+too fast or lack wait() breathing room, malformed MathTex/Tex, z-ordering problems.
+
+For each TRANSITION, check that the first segment cleans up at its end, the second starts fresh \
+instead of assuming leftover state, visual style is consistent, and the content flows logically.
+
+Output ONLY valid JSON covering every item:
+{
+  "segments": [{"segment_id": 1, "passed": true/false, "issues": ["..."], "suggestions": ["..."]}],
+  "transitions": [{"from": 1, "to": 2, "smooth": true/false, "issues": ["..."]}]
+}
+
+Fail a segment or mark a transition not smooth ONLY for issues that will clearly cause visible \
+problems. Max 4 issues and 4 suggestions per segment, 2 issues per transition. Be specific about \
+line numbers or object names."""
+
 # ── Helpers ─────────────────────────────────────────────────────────
 
+def _run_bounded(
+    tasks: list[Callable[[], _T]],
+    max_workers: int = 0,
+    executor: Executor | None = None,
+) -> list[_T]:
+    """Run independent LLM tasks concurrently and return results in task order.
+
+    Uses *executor* when given, otherwise a private pool of *max_workers*
+    threads (default: the ``PAPER2MANIM_LLM_SLOTS`` limit).
+    """
+    if not tasks:
+        return []
+    if executor is not None:
+        return [future.result() for future in [executor.submit(task) for task in tasks]]
+    workers = max_workers if max_workers > 0 else default_resource_limits()[RESOURCE_LLM]
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        return [task() for task in tasks]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [future.result() for future in [pool.submit(task) for task in tasks]]
+
+
+class _CounterSink:
+    """Hands each concurrent call its own token counter and merges them back."""
+
+    def __init__(self, target: dict | None) -> None:
+        self._target = target
+        self._lock = threading.Lock()
+
+    def run(self, fn: Callable[[dict | None], _T]) -> _T:
+        if self._target is None:
+            return fn(None)
+        counter = new_token_counter()
+        try:
+            return fn(counter)
+        finally:
+            with self._lock:
+                merge_token_usage(self._target, counter)
+
+
 def _parse_json_response(raw: str) -> dict:
     """Extract JSON from a model response that may include markdown fences."""
     text = raw.strip()
@@ -100,6 +195,14 @@ def _parse_json_response(raw: str) -> dict:
     return json.loads(text)
 
 
+def _verdict(reply: dict, key: str) -> bool:
+    """Read a boolean verdict from a model reply; a missing one passes, anything but true/"true" fails."""
+    value = reply.get(key, True)
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return value is True
+
+
 def _get_code_tail(code: str, n_lines: int = 40) -> str:
     """Get the last N non-empty lines of code."""
     lines = [line for line in code.split("\n") if line.strip()]
@@ -140,31 +243,75 @@ def static_quality_check(code: str) -> list[str]:
 
 # ── Single-segment verification ────────────────────────────────────
 
+def _local_verdict(
+    segment_id: int,
+    code: str,
+    audio_duration: float,
+    layout_trace: dict | None,
+) -> tuple[VerifyResult | None, list[str], list[str]]:
+    """Run the LLM-free checks for one segment.
+
+    Returns ``(result, static_issues, layout_hints)`` where *result* is set
+    when the layout report is conclusive and no LLM review is needed.
+    """
+    if layout_trace:
+        layout = report_from_layout_trace(layout_trace, audio_duration=audio_duration)
+    else:
+        layout = analyze_scene_layout(code, audio_duration=audio_duration)
+    static_issues = static_quality_check(code)
+
+    if layout.conclusive:
+        static_issues.extend(layout.issues)
+        return VerifyResult(
+            segment_id=segment_id,
+            passed=not static_issues,
+            issues=list(static_issues),
+            suggestions=list(layout.warnings),
+            static_issues=static_issues,
+            used_llm=False,
+        ), static_issues, []
+    return None, static_issues, list(layout.issues)
+
+
 def verify_segment_code(
     segment_id: int,
     code: str,
     segment_context: str = "",
     audio_duration: float = 0.0,
     token_counter: dict | None = None,
+    layout_trace: dict | None = None,
 ) -> VerifyResult:
     """Verify a single segment's Manim code for potential visual issues.
 
+    When the coder's dry run recorded a ``layout_trace`` (real bounding boxes
+    from the headless probe), its findings are used directly.  Otherwise the
+    static layout analyzer runs first; when it covers the whole scene its
+    verdict is returned without an LLM call.
+
     Args:
         segment_id: Segment number.
         code: The full Manim Python code for this segment.
         segment_context: Description of what this segment should show.
         audio_duration: Expected audio duration for timing checks.
+        layout_trace: Optional probe trace from ``dry_run_manim_code``.
 
     Returns:
         VerifyResult with pass/fail and issue list.
     """
+    local, static_issues, layout_hints = _local_verdict(segment_id, code, audio_duration, layout_trace)
+    if local is not None:
+        return local
+
     prompt = f"Review this Manim scene code for visual issues:\n\n```python\n{code}\n```"
     if segment_context:
         prompt += f"\n\nThis segment should show: {segment_context}"
     if audio_duration > 0:
         prompt += f"\n\nTarget audio duration: {audio_duration:.1f}s"
-
-    static_issues = static_quality_check(code)
+    if layout_hints:
+        # Partial analysis: pass findings as hints for the reviewer to confirm.
+        prompt += "\n\nStatic layout analysis (partial, may be incomplete):\n" + "\n".join(
+            f"- {issue}" for issue in layout_hints
+        )
 
     try:
         result = run_text_completion(
@@ -175,12 +322,13 @@ def verify_segment_code(
             max_output_tokens=1024,
             token_counter=token_counter,
             cache_key_parts=("verify",),
+            stage="verify",
         )
         raw = result.text or ""
         data = _parse_json_response(raw)
         combined_issues = list(static_issues)
         combined_issues.extend(data.get("issues", []))
-        passed = data.get("passed", True) and not static_issues
+        passed = _verdict(data, "passed") and not static_issues
 
         return VerifyResult(
             segment_id=segment_id,
@@ -204,59 +352,340 @@ def verify_segment_code(
 def verify_code_transitions(
     segment_codes: dict[int, str],
     token_counter: dict | None = None,
+    max_workers: int = 0,
+    executor: Executor | None = None,
+    on_result: Callable[[TransitionVerifyResult], None] | None = None,
 ) -> list[TransitionVerifyResult]:
     """Check code-level transition smoothness between consecutive segments.
 
+    Pairs are independent, so they are checked concurrently.
+
     Args:
         segment_codes: Mapping of segment_id -> full Manim code, in order.
+        max_workers: Concurrent pair checks (default ``PAPER2MANIM_LLM_SLOTS``).
+        executor: Optional executor to run the checks on instead of a private pool.
+        on_result: Called from the worker thread as each pair finishes.
 
     Returns:
-        List of TransitionVerifyResult for each adjacent pair.
+        List of TransitionVerifyResult for each adjacent pair, in segment order.
     """
     sorted_ids = sorted(segment_codes.keys())
     if len(sorted_ids) < 2:
         return []
 
-    results: list[TransitionVerifyResult] = []
+    sink = _CounterSink(token_counter)
+
+    def _check(id_a: int, id_b: int) -> TransitionVerifyResult:
+        check = sink.run(lambda counter: _verify_transition_pair(
+            id_a, segment_codes[id_a], id_b, segment_codes[id_b], counter,
+        ))
+        if on_result is not None:
+            on_result(check)
+        return check
+
+    return _run_bounded(
+        [lambda a=id_a, b=id_b: _check(a, b) for id_a, id_b in zip(sorted_ids, sorted_ids[1:])],
+        max_workers=max_workers,
+        executor=executor,
+    )
 
-    for i in range(len(sorted_ids) - 1):
-        id_a, id_b = sorted_ids[i], sorted_ids[i + 1]
-        code_a, code_b = segment_codes[id_a], segment_codes[id_b]
 
-        tail_a = _get_code_tail(code_a)
-        head_b = _get_code_head(code_b)
+def _transition_excerpt(id_a: int, code_a: str, id_b: int, code_b: str) -> str:
+    return (
+        f"END of Segment {id_a}:\n```python\n{_get_code_tail(code_a)}\n```\n\n"
+        f"START of Segment {id_b}:\n```python\n{_get_code_head(code_b)}\n```"
+    )
 
-        prompt = (
-            f"Reviewing transition from Segment {id_a} to Segment {id_b}.\n\n"
-            f"END of Segment {id_a}:\n```python\n{tail_a}\n```\n\n"
-            f"START of Segment {id_b}:\n```python\n{head_b}\n```"
+
+def _verify_transition_pair(
+    id_a: int,
+    code_a: str,
+    id_b: int,
+    code_b: str,
+    token_counter: dict | None = None,
+) -> TransitionVerifyResult:
+    """Check one adjacent pair with its own LLM call."""
+    started = time.perf_counter()
+    prompt = (
+        f"Reviewing transition from Segment {id_a} to Segment {id_b}.\n\n"
+        + _transition_excerpt(id_a, code_a, id_b, code_b)
+    )
+    try:
+        result = run_text_completion(
+            primary=resolve_stage_model("verify"),
+            fallback=resolve_fallback_stage_model("verify"),
+            system_sections=[_TRANSITION_SYSTEM],
+            user_content=prompt,
+            max_output_tokens=512,
+            token_counter=token_counter,
+            cache_key_parts=("verify-transition",),
+            stage="verify",
+        )
+        data = _parse_json_response(result.text or "")
+        return TransitionVerifyResult(
+            segment_a_id=id_a,
+            segment_b_id=id_b,
+            smooth=_verdict(data, "smooth"),
+            issues=data.get("issues", []),
+            elapsed_seconds=round(time.perf_counter() - started, 3),
+        )
+    except Exception as e:
+        return TransitionVerifyResult(
+            segment_a_id=id_a,
+            segment_b_id=id_b,
+            smooth=True,
+            issues=[f"Transition check error: {str(e)}"],
+            elapsed_seconds=round(time.perf_counter() - started, 3),
         )
 
-        try:
-            result = run_text_completion(
-                primary=resolve_stage_model("verify"),
-                fallback=resolve_fallback_stage_model("verify"),
-                system_sections=[_TRANSITION_SYSTEM],
-                user_content=prompt,
-                max_output_tokens=512,
-                token_counter=token_counter,
-                cache_key_parts=("verify-transition",),
+
+# ── Batched project verification ───────────────────────────────────
+
+# Rough prompt-size estimate; code runs close to 4 characters per token.
+_CHARS_PER_TOKEN = 4
+# Output allowance per item in a batched request, and the per-call ceiling.
+_BATCH_OUTPUT_TOKENS_PER_SEGMENT = 400
+_BATCH_OUTPUT_TOKENS_PER_TRANSITION = 160
+_BATCH_MAX_OUTPUT_TOKENS = 8192
+
+
+def _batch_token_budget() -> int:
+    """Input-token budget per batched request (PAPER2MANIM_VERIFY_BATCH_TOKENS)."""
+    try:
+        return max(1000, int(os.getenv("PAPER2MANIM_VERIFY_BATCH_TOKENS", "24000")))
+    except ValueError:
+        return 24000
+
+
+@dataclass
+class _BatchItem:
+    kind: str  # "segment" or "transition"
+    key: tuple[int, ...]
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return len(self.text) // _CHARS_PER_TOKEN + 1
+
+
+def _shard_items(items: list[_BatchItem], budget: int) -> list[list[_BatchItem]]:
+    """Greedily pack items, in order, into shards under *budget* tokens each.
+
+    An item larger than the budget gets a shard of its own.
+    """
+    shards: list[list[_BatchItem]] = []
+    current: list[_BatchItem] = []
+    used = 0
+    for item in items:
+        if current and used + item.tokens > budget:
+            shards.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += item.tokens
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _run_batch_shard(shard: list[_BatchItem], token_counter: dict | None) -> dict:
+    """Send one shard and return its parsed JSON (raises on failure)."""
+    n_segments = sum(1 for item in shard if item.kind == "segment")
+    n_transitions = len(shard) - n_segments
+    max_output = min(
+        _BATCH_MAX_OUTPUT_TOKENS,
+        256 + n_segments * _BATCH_OUTPUT_TOKENS_PER_SEGMENT + n_transitions * _BATCH_OUTPUT_TOKENS_PER_TRANSITION,
+    )
+    result = run_text_completion(
+        primary=resolve_stage_model("verify"),
+        fallback=resolve_fallback_stage_model("verify"),
+        system_sections=[_BATCH_SYSTEM],
+        user_content="\n\n".join(item.text for item in shard),
+        max_output_tokens=max_output,
+        token_counter=token_counter,
+        cache_key_parts=("verify-batch",),
+        stage="verify",
+    )
+    return _parse_json_response(result.text or "")
+
+
+def verify_project_code(
+    segment_codes: dict[int, str],
+    segment_contexts: dict[int, str] | None = None,
+    audio_durations: dict[int, float] | None = None,
+    layout_traces: dict[int, dict] | None = None,
+    verify_segments: bool = True,
+    token_counter: dict | None = None,
+    token_budget: int = 0,
+    max_workers: int = 0,
+    executor: Executor | None = None,
+    on_result: Callable[[VerifyResult | TransitionVerifyResult], None] | None = None,
+) -> ProjectVerifyResult:
+    """Verify a project's segments and adjacent transitions in batched calls.
+
+    Segments the layout analyzer (or a probe trace) fully covers are decided
+    locally.  Remaining segments and every transition pair go out together in
+    one structured request, sharded to stay under *token_budget* input tokens
+    (``PAPER2MANIM_VERIFY_BATCH_TOKENS`` by default).  Items a shard's reply
+    fails to cover — including every item of an unparsable shard — are
+    re-checked with the single-item verifiers.  Shards and re-checks run
+    concurrently, bounded like ``verify_code_transitions``.
+
+    Args:
+        segment_codes: Mapping of segment_id -> full Manim code.
+        segment_contexts: Optional segment_id -> what the segment should show.
+        audio_durations: Optional segment_id -> narration length for timing checks.
+        layout_traces: Optional segment_id -> probe trace from the coder's dry run.
+        verify_segments: Set False to check transitions only.
+        max_workers: Concurrent LLM calls (default ``PAPER2MANIM_LLM_SLOTS``).
+        executor: Optional executor to run the calls on instead of a private pool.
+        on_result: Called from the worker thread with each LLM-decided
+            segment or pair as soon as its shard or re-check finishes.
+
+    Returns:
+        ProjectVerifyResult with per-segment and per-pair results in segment order.
+    """
+    segment_contexts = segment_contexts or {}
+    audio_durations = audio_durations or {}
+    layout_traces = layout_traces or {}
+    budget = token_budget if token_budget > 0 else _batch_token_budget()
+    sorted_ids = sorted(segment_codes.keys())
+    outcome = ProjectVerifyResult()
+
+    items: list[_BatchItem] = []
+    static_by_segment: dict[int, list[str]] = {}
+    if verify_segments:
+        for sid in sorted_ids:
+            code = segment_codes[sid]
+            local, static_issues, layout_hints = _local_verdict(
+                sid, code, audio_durations.get(sid, 0.0) or 0.0, layout_traces.get(sid),
             )
-            raw = result.text or ""
-            data = _parse_json_response(raw)
-
-            results.append(TransitionVerifyResult(
-                segment_a_id=id_a,
-                segment_b_id=id_b,
-                smooth=data.get("smooth", True),
-                issues=data.get("issues", []),
-            ))
+            if local is not None:
+                outcome.segments[sid] = local
+                continue
+            static_by_segment[sid] = static_issues
+            text = f"### SEGMENT {sid}\n"
+            if segment_contexts.get(sid):
+                text += f"This segment should show: {segment_contexts[sid]}\n"
+            if (audio_durations.get(sid) or 0.0) > 0:
+                text += f"Target audio duration: {audio_durations[sid]:.1f}s\n"
+            if layout_hints:
+                text += "Static layout analysis (partial, may be incomplete):\n" + "\n".join(
+                    f"- {issue}" for issue in layout_hints
+                ) + "\n"
+            text += f"```python\n{code}\n```"
+            items.append(_BatchItem("segment", (sid,), text))
+    for id_a, id_b in zip(sorted_ids, sorted_ids[1:]):
+        text = f"### TRANSITION {id_a} -> {id_b}\n" + _transition_excerpt(
+            id_a, segment_codes[id_a], id_b, segment_codes[id_b],
+        )
+        items.append(_BatchItem("transition", (id_a, id_b), text))
+
+    sink = _CounterSink(token_counter)
+    shards = _shard_items(items, budget)
+    outcome.shards = len(shards)
+    outcome.llm_calls = len(shards)
+
+    def _send(index: int, shard: list[_BatchItem]) -> tuple[list[VerifyResult | TransitionVerifyResult], list[_BatchItem]]:
+        """Run one shard; return the items it decided and the ones its reply missed."""
+        started = time.perf_counter()
+        try:
+            data = sink.run(lambda counter: _run_batch_shard(shard, counter))
         except Exception as e:
-            results.append(TransitionVerifyResult(
-                segment_a_id=id_a,
-                segment_b_id=id_b,
-                smooth=True,
-                issues=[f"Transition check error: {str(e)}"],
+            logger.warning("Batched verification shard of %d item(s) failed: %s", len(shard), e)
+            data = {}
+        elapsed = round(time.perf_counter() - started, 3)
+        seg_replies = {
+            int(entry["segment_id"]): entry
+            for entry in data.get("segments") or []
+            if isinstance(entry, dict) and str(entry.get("segment_id", "")).isdigit()
+        }
+        pair_replies = {
+            (int(entry["from"]), int(entry["to"])): entry
+            for entry in data.get("transitions") or []
+            if isinstance(entry, dict) and str(entry.get("from", "")).isdigit() and str(entry.get("to", "")).isdigit()
+        }
+        decided: list[VerifyResult | TransitionVerifyResult] = []
+        missed: list[_BatchItem] = []
+        for item in shard:
+            if item.kind == "segment":
+                sid = item.key[0]
+                reply = seg_replies.get(sid)
+                if reply is None:
+                    missed.append(item)
+                    continue
+                static_issues = static_by_segment[sid]
+                decided.append(VerifyResult(
+                    segment_id=sid,
+                    passed=_verdict(reply, "passed") and not static_issues,
+                    issues=list(static_issues) + list(reply.get("issues") or []),
+                    suggestions=list(reply.get("suggestions") or []),
+                    static_issues=static_issues,
+                ))
+            else:
+                reply = pair_replies.get(item.key)
+                if reply is None:
+                    missed.append(item)
+                    continue
+                decided.append(TransitionVerifyResult(
+                    segment_a_id=item.key[0],
+                    segment_b_id=item.key[1],
+                    smooth=_verdict(reply, "smooth"),
+                    issues=list(reply.get("issues") or []),
+                    elapsed_seconds=elapsed,
+                    shard=index,
+                ))
+        if on_result is not None:
+            for checked in decided:
+                on_result(checked)
+        return decided, missed
+
+    replies = _run_bounded(
+        [lambda index=index, shard=shard: _send(index, shard) for index, shard in enumerate(shards, 1)],
+        max_workers=max_workers, executor=executor,
+    )
+
+    transitions: dict[tuple[int, int], TransitionVerifyResult] = {}
+    fallbacks: list[_BatchItem] = []
+    for decided, missed in replies:
+        for checked in decided:
+            if isinstance(checked, VerifyResult):
+                outcome.segments[checked.segment_id] = checked
+            else:
+                transitions[(checked.segment_a_id, checked.segment_b_id)] = checked
+        fallbacks.extend(missed)
+
+    def _fallback(item: _BatchItem) -> VerifyResult | TransitionVerifyResult:
+        checked: VerifyResult | TransitionVerifyResult
+        if item.kind == "segment":
+            sid = item.key[0]
+            checked = sink.run(lambda counter: verify_segment_code(
+                sid,
+                segment_codes[sid],
+                segment_context=segment_contexts.get(sid, ""),
+                audio_duration=audio_durations.get(sid, 0.0) or 0.0,
+                token_counter=counter,
+                layout_trace=layout_traces.get(sid),
             ))
-
-    return results
+        else:
+            id_a, id_b = item.key
+            checked = sink.run(lambda counter: _verify_transition_pair(
+                id_a, segment_codes[id_a], id_b, segment_codes[id_b], counter,
+            ))
+        if on_result is not None:
+            on_result(checked)
+        return checked
+
+    outcome.fallback_items = len(fallbacks)
+    outcome.llm_calls += len(fallbacks)
+    rechecked = _run_bounded(
+        [lambda item=item: _fallback(item) for item in fallbacks], max_workers=max_workers, executor=executor,
+    )
+    for item, checked in zip(fallbacks, rechecked):
+        if isinstance(checked, VerifyResult):
+            outcome.segments[item.key[0]] = checked
+        else:
+            transitions[item.key] = checked
+
+    outcome.segments = {sid: outcome.segments[sid] for sid in sorted_ids if sid in outcome.segments}
+    outcome.transitions = [transitions[key] for key in sorted(transitions)]
+    return outcome
@@ -0,0 +1,153 @@
+"""
+Spec-driven prefetch of Manim docs and golden scenes for the coder.
+
+Every ``fetch_manim_docs`` / ``fetch_golden_scenes`` tool call costs the
+coder a full model round trip that re-sends the growing conversation, yet
+what it will look up is usually predictable from the segment spec: the
+planned ``elements``, ``animations``, ``equations_latex`` and keywords such
+as ``ThreeDScene`` or ``ValueTracker``.  This module maps a spec onto
+``manim_docs.TOPIC_INDEX`` topics and the most relevant golden scenes,
+retrieves them concurrently, and renders one compact,
+deterministically ordered section that can sit in the cacheable system
+prompt.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from utils.golden_scenes import retrieve_golden_scenes
+from utils.manim_docs import FETCH_FAILED_MARKER, TOPIC_INDEX, fetch_manim_docs
+
+logger = logging.getLogger(__name__)
+
+_MAX_TOPICS = 4
+_MAX_GOLDEN = 2
+_DOC_SNIPPET_CHARS = 2_500
+_GOLDEN_SNIPPET_CHARS = 2_000
+
+# Spec phrases -> doc topics, most specific (and most error-prone) APIs first.
+# Golden scenes are chosen by ``golden_scenes.retrieve_golden_scenes``.
+_SPEC_RULES: tuple[tuple[re.Pattern, tuple[str, ...]], ...] = (
+    (re.compile(r"threedscene|three[- ]?d\b|\b3d\b|surface"), ("threedscene", "surface")),
+    (re.compile(r"movingcamera|camera\.frame|zoom"), ("movingcamera",)),
+    (re.compile(r"transformmatchingtex|equation|mathtex|latex|derivation"), ("mathtex",)),
+    (re.compile(r"\baxes\b|\bplot\b|\bgraph of\b|function curve"), ("axes",)),
+    (re.compile(r"numberline|number line"), ("numberline",)),
+    (re.compile(r"\bmatrix|matrices"), ("matrix",)),
+    (re.compile(r"movealongpath|along (?:a |the )?path|trajector"), ("movement",)),
+    (re.compile(r"laggedstart|animationgroup|staggered|one after another"), ("composition",)),
+    (re.compile(r"gradient|color_gradient"), ("color",)),
+    (re.compile(r"barchart|bar chart"), ("barchart",)),
+    (re.compile(r"\btable\b"), ("table",)),
+)
+_WORD_RE = re.compile(r"[a-z_]+")
+
+
+@dataclass
+class SpecPrefetch:
+    """Context retrieved ahead of the first coder call."""
+
+    topics: list[str] = field(default_factory=list)  # doc topics whose text was inlined
+    golden: list[str] = field(default_factory=list)
+    section: str = ""
+    elapsed_seconds: float = 0.0
+
+    @property
+    def lookups(self) -> int:
+        """Tool lookups inlined (golden scenes arrive in a single tool call)."""
+        return len(self.topics) + (1 if self.golden else 0)
+
+
+def _spec_text(instructions: str | dict) -> str:
+    if isinstance(instructions, str):
+        return instructions.lower()
+    parts: list[str] = []
+    for key in ("elements", "animations", "equations_latex", "visual_instructions",
+                "layout_instructions", "scene_type", "scene_class"):
+        value = instructions.get(key)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v) for v in value)
+        elif value:
+            parts.append(str(value))
+    return "\n".join(parts).lower()
+
+
+def plan_prefetch(
+    instructions: str | dict,
+    max_topics: int = _MAX_TOPICS,
+    max_golden: int = _MAX_GOLDEN,
+) -> tuple[list[str], list[str]]:
+    """Return the doc topics and golden scene names a spec will likely need."""
+    text = _spec_text(instructions)
+    topics: list[str] = []
+    for pattern, rule_topics in _SPEC_RULES:
+        if pattern.search(text):
+            topics.extend(t for t in rule_topics if t not in topics)
+    # Topic keys named verbatim in the spec ("arrow", "circle", ...).
+    words = set(_WORD_RE.findall(text))
+    topics.extend(
+        key for key, paths in TOPIC_INDEX.items()
+        if key in words and key not in topics and any(p.startswith("manim/") for p in paths)
+    )
+    golden = [scene.name for scene in retrieve_golden_scenes(instructions, k=max_golden, fallback=False)] if max_golden else []
+    return topics[:max_topics], golden
+
+
+def _snippet(text: str, max_chars: int) -> str:
+    text = text.strip()
+    return text if len(text) <= max_chars else text[:max_chars] + "\n... [truncated]"
+
+
+def prefetch_segment_context(
+    instructions: str | dict,
+    max_topics: int = _MAX_TOPICS,
+    max_golden: int = _MAX_GOLDEN,
+) -> SpecPrefetch:
+    """Fetch the likely docs and golden scenes for *instructions* concurrently.
+
+    The returned ``section`` lists topics in plan order and golden scenes in
+    relevance order, so two segments needing the same context produce the
+    same text.
+    """
+    started = time.perf_counter()
+    topics, _ = plan_prefetch(instructions, max_topics, max_golden=0)
+    scenes = retrieve_golden_scenes(instructions, k=max_golden, fallback=False) if max_golden else []
+    if not topics and not scenes:
+        return SpecPrefetch()
+
+    docs: list[str] = []
+    if topics:
+        with ThreadPoolExecutor(max_workers=len(topics), thread_name_prefix="doc-prefetch") as pool:
+            docs = list(pool.map(fetch_manim_docs, topics))
+
+    # Only topics whose docs were actually inlined count as lookups saved; an
+    # unknown or partly failed topic is left for the coder to look up itself.
+    inlined = [
+        (topic, text) for topic, text in zip(topics, docs)
+        if not text.startswith("Unknown topic") and FETCH_FAILED_MARKER not in text
+    ]
+    if not inlined and not scenes:
+        return SpecPrefetch()
+
+    parts = [
+        "### PREFETCHED MANIM REFERENCE",
+        "These docs and examples were already looked up for this scene. "
+        "Do NOT call tools for these topics again; only look up APIs not covered here.",
+    ]
+    for topic, text in inlined:
+        parts.append(f"#### Docs: {topic}\n{_snippet(text, _DOC_SNIPPET_CHARS)}")
+    for scene in scenes:
+        code = _snippet(scene.code, _GOLDEN_SNIPPET_CHARS)
+        parts.append(f"#### Golden example: {scene.name}\n```python\n{code}\n```")
+
+    return SpecPrefetch(
+        topics=[topic for topic, _ in inlined],
+        golden=[scene.name for scene in scenes],
+        section="\n\n".join(parts),
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
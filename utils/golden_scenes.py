@@ -2,10 +2,30 @@
 Golden Reference Scenes for LLM Context Injection.
 These are high-quality, 3Blue1Brown-style Manim scenes that demonstrate
 advanced animations, precise timing, and good aesthetic practices.
+
+Scenes are indexed by the Manim API symbols they use, their Scene base
+class and the techniques those imply, so the coder receives only the few
+examples relevant to the segment at hand.  The library grows from rendered
+scenes that passed visual critique with a high score.
 """
 
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
 from functools import lru_cache
 
+from utils.json_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
 GOLDEN_SCENES = {
     "TransformMatchingTex_Example": '''
 class TransformEquation(Scene):
@@ -385,24 +405,281 @@ class AnnotatedNumberLine(Scene):
 ''',
 }
 
-# Cache the full golden-scenes output.  GOLDEN_SCENES is a module-level
-# constant so the formatted string never changes; maxsize=1 is sufficient.
+# ── Indexed library ──────────────────────────────────────────────────
+
+# Technique tags implied by API symbols (scene features) or spec phrases.
+_TECHNIQUES: dict[str, tuple[frozenset[str], re.Pattern]] = {
+    "updater": (frozenset({"always_redraw", "add_updater"}), re.compile(r"updater|always_redraw|continuous")),
+    "value_tracker": (frozenset({"ValueTracker"}), re.compile(r"valuetracker|tracker|sweep|slider")),
+    "camera_motion": (frozenset({"MovingCameraScene"}), re.compile(r"camera|zoom|pan")),
+    "latex": (frozenset({"MathTex", "Tex"}), re.compile(r"equation|latex|formula|mathtex")),
+    "equation_morph": (frozenset({"TransformMatchingTex", "TransformMatchingShapes"}),
+                       re.compile(r"transformmatching|rearrang|derivation|morph")),
+    "staggered": (frozenset({"LaggedStart", "AnimationGroup", "LaggedStartMap"}),
+                  re.compile(r"laggedstart|animationgroup|stagger|one after another")),
+    "graph_network": (frozenset({"Graph", "DiGraph"}), re.compile(r"\bnodes?\b|\bedges?\b|network")),
+    "plotting": (frozenset({"Axes", "NumberPlane", "plot"}), re.compile(r"\baxes\b|\bplot|curve")),
+    "path_motion": (frozenset({"MoveAlongPath"}), re.compile(r"along (?:a |the )?path|trajector|orbit")),
+    "matrix": (frozenset({"Matrix", "IntegerMatrix", "DecimalMatrix", "MobjectMatrix"}), re.compile(r"matri")),
+    "number_line": (frozenset({"NumberLine"}), re.compile(r"number ?line")),
+    "three_d": (frozenset({"ThreeDScene", "ThreeDAxes", "Surface"}), re.compile(r"three[- ]?d|\b3d\b|surface")),
+    "color_gradient": (frozenset({"color_gradient", "interpolate_color"}), re.compile(r"gradient")),
+    "highlight": (frozenset({"SurroundingRectangle", "Indicate", "Circumscribe", "Flash"}),
+                  re.compile(r"highlight|emphasi|surround")),
+    "proof_steps": (frozenset(), re.compile(r"\bproof\b|step[- ]by[- ]step")),
+}
+# Technique and base-class matches count more than a shared API symbol.
+_TAG_WEIGHTS = {"tech": 2.0, "base": 1.5, "api": 1.0}
+_IDENT_RE = re.compile(r"\b[A-Z][a-z]+(?:[A-Z][a-z0-9]*)+\b|\b[A-Z][a-z]{2,}\b|\b[a-z]+_[a-z_]+\b")
+_MAX_LEARNED = 40
+_DUPLICATE_JACCARD = 0.9
+_DEFAULT_K = 3
+
+
+def scene_tags(code: str) -> frozenset[str]:
+    """Tags for a scene: ``api:<symbol>``, ``base:<SceneClass>`` and ``tech:<technique>``."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return frozenset()
+    symbols: set[str] = set()
+    tags: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for base in node.bases:
+                name = base.id if isinstance(base, ast.Name) else getattr(base, "attr", "")
+                if name.endswith("Scene"):
+                    tags.add(f"base:{name}")
+                    symbols.add(name)
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                symbols.add(func.id)
+            elif isinstance(func, ast.Attribute):
+                symbols.add(func.attr)
+    tags.update(f"api:{sym}" for sym in symbols if sym[:1].isupper() or sym in _KNOWN_FUNCTIONS)
+    for technique, (technique_symbols, _) in _TECHNIQUES.items():
+        if symbols & technique_symbols:
+            tags.add(f"tech:{technique}")
+    return frozenset(tags)
+
+
+_KNOWN_FUNCTIONS = frozenset(
+    sym for technique_symbols, _ in _TECHNIQUES.values() for sym in technique_symbols if sym[:1].islower()
+)
+
+
+def spec_tags(instructions: str | dict) -> frozenset[str]:
+    """Tags a segment spec asks for, from named API symbols and technique phrases."""
+    if isinstance(instructions, dict):
+        parts: list[str] = []
+        for value in instructions.values():
+            if isinstance(value, (list, tuple)):
+                parts.extend(str(v) for v in value)
+            elif isinstance(value, str):
+                parts.append(value)
+        text = "\n".join(parts)
+    else:
+        text = instructions or ""
+    tags = {f"api:{ident}" for ident in _IDENT_RE.findall(text)}
+    lowered = text.lower()
+    for technique, (technique_symbols, pattern) in _TECHNIQUES.items():
+        if pattern.search(lowered) or any(f"api:{sym}" in tags for sym in technique_symbols):
+            tags.add(f"tech:{technique}")
+    for ident in list(tags):
+        if ident.startswith("api:") and ident.endswith("Scene"):
+            tags.add(f"base:{ident[4:]}")
+    return frozenset(tags)
+
+
+def _normalized_code(code: str) -> str:
+    lines = []
+    for line in code.splitlines():
+        stripped = line.split("#", 1)[0].strip()
+        if stripped:
+            lines.append(" ".join(stripped.split()))
+    return "\n".join(lines)
+
+
+@dataclass
+class GoldenScene:
+    """One reference scene and its retrieval tags."""
+
+    name: str
+    code: str
+    tags: frozenset[str] = field(default_factory=frozenset)
+    score: float = 1.0
+    learned: bool = False
+
+    def __post_init__(self) -> None:
+        if not self.tags:
+            self.tags = scene_tags(self.code)
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(_normalized_code(self.code).encode("utf-8")).hexdigest()
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class GoldenLibrary:
+    """Built-in golden scenes plus scenes learned from high-scoring renders."""
+
+    def __init__(self, path: str = "", builtin: dict[str, str] | None = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        source = GOLDEN_SCENES if builtin is None else builtin
+        self.scenes: list[GoldenScene] = [GoldenScene(name, code) for name, code in source.items()]
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                entries = json.load(fh).get("scenes", [])
+        except (OSError, ValueError, AttributeError):
+            logger.warning("Ignoring unreadable golden library at %s", self.path)
+            return
+        for entry in entries:
+            try:
+                self.scenes.append(GoldenScene(
+                    entry["name"], entry["code"], score=float(entry.get("score", 0.0)), learned=True,
+                ))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        learned = [
+            {"name": s.name, "code": s.code, "score": s.score}
+            for s in self.scenes if s.learned
+        ]
+        try:
+            write_json_atomic(self.path, {"scenes": learned})
+        except OSError as exc:
+            logger.warning("Could not save golden library to %s: %s", self.path, exc)
+
+    def _idf(self) -> dict[str, float]:
+        counts: dict[str, int] = {}
+        for scene in self.scenes:
+            for tag in scene.tags:
+                counts[tag] = counts.get(tag, 0) + 1
+        total = len(self.scenes)
+        return {tag: math.log(1 + total / n) for tag, n in counts.items()}
+
+    def retrieve(self, tags: frozenset[str], k: int = _DEFAULT_K, fallback: bool = True) -> list[GoldenScene]:
+        """Top-*k* scenes by IDF-weighted cosine similarity of tag sets.
+
+        With no query tags the first *k* built-in scenes are returned, or
+        none when *fallback* is off.
+        """
+        with self._lock:
+            scenes = list(self.scenes)
+            idf = self._idf()
+        if not tags:
+            return [s for s in scenes if not s.learned][:k] if fallback else []
+
+        def weight(tag: str) -> float:
+            return idf.get(tag, 0.0) * _TAG_WEIGHTS.get(tag.split(":", 1)[0], 1.0)
+
+        query_norm = math.sqrt(sum(weight(t) ** 2 for t in tags)) or 1.0
+        scored: list[tuple[float, int, GoldenScene]] = []
+        for order, scene in enumerate(scenes):
+            shared = tags & scene.tags
+            if not shared:
+                continue
+            scene_norm = math.sqrt(sum(weight(t) ** 2 for t in scene.tags)) or 1.0
+            similarity = sum(weight(t) ** 2 for t in shared) / (query_norm * scene_norm)
+            scored.append((similarity, order, scene))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [scene for _, _, scene in scored[:k]]
+
+    def add(self, code: str, score: float, name: str = "") -> bool:
+        """Learn a scene that passed critique; returns False when it duplicates one already held.
+
+        A scene with identical normalised code, or the same base class and
+        nearly the same tags, counts as a duplicate; the higher-scoring copy
+        is kept.  Learned scenes beyond the cap are evicted lowest score first.
+        Unnamed scenes are named after their code fingerprint, which stays
+        unique as scenes are evicted and re-learned.
+        """
+        candidate = GoldenScene(name, code, score=score, learned=True)
+        if not candidate.tags:
+            return False
+        if not name:
+            candidate.name = f"learned_{candidate.fingerprint[:12]}"
+        base = {t for t in candidate.tags if t.startswith("base:")}
+        with self._lock:
+            for i, existing in enumerate(self.scenes):
+                same_code = existing.fingerprint == candidate.fingerprint
+                near = (
+                    base == {t for t in existing.tags if t.startswith("base:")}
+                    and _jaccard(existing.tags, candidate.tags) >= _DUPLICATE_JACCARD
+                )
+                if not (same_code or near):
+                    continue
+                if existing.learned and score > existing.score:
+                    self.scenes[i] = candidate
+                    self._save()
+                return False
+            self.scenes.append(candidate)
+            learned = sorted((s for s in self.scenes if s.learned), key=lambda s: s.score)
+            for evicted in learned[: max(0, len(learned) - _MAX_LEARNED)]:
+                self.scenes.remove(evicted)
+            self._save()
+        return True
+
+
 @lru_cache(maxsize=1)
-def fetch_golden_scenes() -> str:
+def get_golden_library() -> GoldenLibrary:
+    """Process-wide library (learned scenes at ``PAPER2MANIM_GOLDEN_LIBRARY_PATH``)."""
+    path = os.getenv("PAPER2MANIM_GOLDEN_LIBRARY_PATH", "").strip() or os.path.join(
+        os.path.expanduser("~"), ".paper2manim", "golden_library.json"
+    )
+    return GoldenLibrary(os.path.expanduser(path))
+
+
+def _golden_min_score() -> float:
+    try:
+        return float(os.getenv("PAPER2MANIM_GOLDEN_MIN_SCORE", "0.9"))
+    except ValueError:
+        return 0.9
+
+
+def record_golden_scene(code: str, score: float, name: str = "") -> bool:
+    """Add a rendered scene to the library if its critique score clears the bar."""
+    if not code or score < _golden_min_score():
+        return False
+    return get_golden_library().add(code, score, name=name)
+
+
+def retrieve_golden_scenes(
+    instructions: str | dict,
+    k: int = _DEFAULT_K,
+    fallback: bool = True,
+) -> list[GoldenScene]:
+    """Return the *k* golden scenes most relevant to a segment spec or query."""
+    return get_golden_library().retrieve(spec_tags(instructions), k=k, fallback=fallback)
+
+
+def fetch_golden_scenes(query: str = "") -> str:
     """
-    Returns several high-quality 'golden' Manim code examples
+    Returns the golden Manim examples most relevant to *query*
+    (what the scene needs, e.g. "equation rearrangement with MathTex"),
     to serve as inspiration for animations, timing, and properties.
     """
+    scenes = retrieve_golden_scenes(query)
     out = ["=== GOLDEN REFERENCE SCENES ===\n"]
-    out.append(
-        "Use these patterns (TransformMatchingTex, LaggedStart, always_redraw, ValueTracker, "
-        "Graph, MovingCameraScene, MoveAlongPath, Matrix, color gradients, NumberLine annotations) "
-        "to make your output fluid and high-quality.\n"
-    )
+    out.append("Use these patterns to make your output fluid and high-quality.\n")
 
-    for name, code in GOLDEN_SCENES.items():
-        out.append(f"--- Example: {name} ---")
-        out.append(code.strip())
+    for scene in scenes:
+        techniques = ", ".join(sorted(t[5:] for t in scene.tags if t.startswith("tech:")))
+        out.append(f"--- Example: {scene.name} ({techniques or 'core primitives'}) ---")
+        out.append(scene.code.strip())
         out.append("\n")
 
     return "\n".join(out)
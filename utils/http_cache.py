@@ -0,0 +1,237 @@
+"""
+Disk-backed HTTP and result cache shared across runner processes.
+
+Web lookups made by the coder's tools (search APIs, fetched pages) are
+stored under ``~/.paper2manim/http_cache`` with a TTL, so a query seen in
+an earlier project costs no network round trip.  Stale entries carrying an
+``ETag`` or ``Last-Modified`` header are revalidated with a conditional
+request, failures are cached briefly so a dead endpoint is not hammered,
+and the directory is kept under a size budget by evicting the oldest
+entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from utils.json_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+_DEFAULT_NEGATIVE_TTL_SECONDS = 600
+_DEFAULT_MAX_MB = 64
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return _WHITESPACE_RE.sub(" ", query).strip().lower()
+
+
+def normalize_url(url: str, params: dict | None = None) -> str:
+    """Canonical URL: lower-case scheme/host, sorted query, no fragment."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items())
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(sorted(query)),
+        "",
+    ))
+
+
+@dataclass
+class CachedResponse:
+    """Outcome of :meth:`HttpCache.get_url`."""
+
+    ok: bool
+    text: str = ""
+    error: str = ""
+    status_code: int = 0
+    from_cache: bool = False
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class HttpCache:
+    """TTL cache of HTTP bodies and derived values, one JSON file per key."""
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = _DEFAULT_NEGATIVE_TTL_SECONDS,
+        max_bytes: int = _DEFAULT_MAX_MB * 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    # ── storage ──
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _read(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key), encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        return entry if isinstance(entry, dict) and entry.get("key") == key else None
+
+    def _write(self, key: str, entry: dict) -> None:
+        entry["key"] = key
+        try:
+            write_json_atomic(self._path(key), entry)
+        except OSError as exc:
+            logger.warning("Could not write HTTP cache entry: %s", exc)
+            return
+        self._evict(keep=self._path(key))
+
+    def _evict(self, keep: str = "") -> None:
+        """Delete the least recently written entries (never *keep*) until under ``max_bytes``."""
+        with self._lock:
+            try:
+                entries = [
+                    (e.stat().st_mtime, e.stat().st_size, e.path)
+                    for e in os.scandir(self.directory)
+                    if e.is_file() and e.name.endswith(".json")
+                ]
+            except OSError:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    # ── derived values (e.g. assembled search results) ──
+
+    def get_value(self, key: str) -> Optional[Any]:
+        """Return a fresh value stored with :meth:`put_value`, else None."""
+        entry = self._read(key)
+        if entry is None or entry.get("expires_at", 0) < time.time():
+            return None
+        return entry.get("value")
+
+    def put_value(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._write(key, {"value": value, "expires_at": time.time() + ttl})
+
+    # ── HTTP ──
+
+    def get_url(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        timeout: float = 10,
+        cache_key: str = "",
+    ) -> CachedResponse:
+        """GET *url* through the cache.
+
+        *cache_key* overrides the normalised URL as the key, e.g. to keep API
+        keys out of it.  Fresh entries are served without a request; stale
+        ones are revalidated with ``If-None-Match``/``If-Modified-Since`` and
+        served as-is if the origin is unreachable.  Failures are cached for
+        ``negative_ttl_seconds``.
+        """
+        key = "url:" + (cache_key or normalize_url(url, params))
+        entry = self._read(key)
+        now = time.time()
+        if entry is not None and entry.get("expires_at", 0) >= now:
+            return CachedResponse(
+                ok=entry["ok"], text=entry.get("text", ""), error=entry.get("error", ""),
+                status_code=entry.get("status_code", 0), from_cache=True,
+            )
+
+        request_headers = dict(headers or {})
+        if entry is not None and entry.get("ok"):
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            resp = requests.get(url, params=params, headers=request_headers, timeout=timeout)
+        except requests.RequestException as exc:
+            if entry is not None and entry.get("ok"):
+                logger.info("Serving stale cache for %s: %s", url, exc)
+                return CachedResponse(ok=True, text=entry.get("text", ""),
+                                      status_code=entry.get("status_code", 200), from_cache=True)
+            self._write(key, {"ok": False, "error": str(exc), "expires_at": now + self.negative_ttl_seconds})
+            return CachedResponse(ok=False, error=str(exc))
+
+        if resp.status_code == 304 and entry is not None and entry.get("ok"):
+            entry["expires_at"] = now + self.ttl_seconds
+            self._write(key, entry)
+            return CachedResponse(ok=True, text=entry.get("text", ""),
+                                  status_code=entry.get("status_code", 200), from_cache=True)
+
+        if resp.status_code >= 500 and entry is not None and entry.get("ok"):
+            logger.info("Serving stale cache for %s: HTTP %s", url, resp.status_code)
+            return CachedResponse(ok=True, text=entry.get("text", ""),
+                                  status_code=entry.get("status_code", 200), from_cache=True)
+
+        if not resp.ok:
+            error = f"HTTP {resp.status_code} for {url}"
+            self._write(key, {"ok": False, "error": error, "status_code": resp.status_code,
+                              "expires_at": now + self.negative_ttl_seconds})
+            return CachedResponse(ok=False, error=error, status_code=resp.status_code)
+
+        self._write(key, {
+            "ok": True,
+            "text": resp.text,
+            "status_code": resp.status_code,
+            "etag": resp.headers.get("ETag", ""),
+            "last_modified": resp.headers.get("Last-Modified", ""),
+            "expires_at": now + self.ttl_seconds,
+        })
+        return CachedResponse(ok=True, text=resp.text, status_code=resp.status_code)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@lru_cache(maxsize=1)
+def get_http_cache() -> HttpCache:
+    """Process-wide cache configured from ``PAPER2MANIM_HTTP_CACHE_*`` env vars."""
+    directory = os.getenv("PAPER2MANIM_HTTP_CACHE_DIR", "").strip() or os.path.join(
+        os.path.expanduser("~"), ".paper2manim", "http_cache"
+    )
+    return HttpCache(
+        os.path.expanduser(directory),
+        ttl_seconds=max(0.0, _env_float("PAPER2MANIM_HTTP_CACHE_TTL", _DEFAULT_TTL_SECONDS)),
+        max_bytes=int(max(1.0, _env_float("PAPER2MANIM_HTTP_CACHE_MAX_MB", _DEFAULT_MAX_MB)) * 1024 * 1024),
+    )
@@ -0,0 +1,36 @@
+"""
+Atomic JSON writes for the on-disk caches and stores under ``~/.paper2manim``.
+
+The payload is written to a temporary file in the target's directory and
+moved into place with :func:`os.replace`, so a reader (or a crash mid-write)
+never sees a truncated file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def write_json_atomic(path: str | os.PathLike[str], payload: Any, **dump_kwargs: Any) -> None:
+    """Atomically write *payload* as JSON to *path*, creating its directory.
+
+    Extra keyword arguments are passed to :func:`json.dump`.  Errors propagate
+    to the caller (after the temporary file is removed), which decides how a
+    failed write is reported.
+    """
+    directory = os.path.dirname(os.fspath(path)) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, **dump_kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
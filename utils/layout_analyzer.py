@@ -0,0 +1,1009 @@
+"""Static, symbolic layout analysis of generated Manim scenes.
+
+Walks ``construct()`` with the AST, tracking mobject creation, placement
+calls (``move_to``/``next_to``/``shift``/``to_edge``/``to_corner``/
+``arrange``/``scale``), what is on screen after each ``play``/``add``/
+``remove``, and the running total of ``run_time`` and ``wait`` durations.
+
+Geometry is approximate (text width from character counts, shape sizes
+from constructor arguments) but good enough to flag the problems the LLM
+verifier is usually asked to predict: overlapping text, content placed
+off-frame, objects still on screen at the end, and scene length vs the
+narration.  When the scene uses constructs the walker cannot follow
+(loops, helper methods, updaters, non-literal timings) the report is
+marked inconclusive so callers can fall back to the LLM verifier.
+"""
+
+from __future__ import annotations
+
+import ast
+import itertools
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.manim_runner import SCENE_BASES
+
+FRAME_HALF_WIDTH = 14.222 / 2
+FRAME_HALF_HEIGHT = 8.0 / 2
+
+# Tolerance before content counts as off-frame (units).
+_OFF_FRAME_MARGIN = 0.15
+# Fraction of the smaller box that must be covered to count as an overlap.
+_OVERLAP_RATIO = 0.25
+# Scene length may differ from narration by this much before it is flagged.
+_DURATION_TOLERANCE_SECONDS = 2.0
+_DURATION_TOLERANCE_RATIO = 0.15
+# Above this share of on-screen objects with unknown size the report is inconclusive.
+_MAX_UNKNOWN_RATIO = 0.25
+
+_VECTORS = {
+    "ORIGIN": (0.0, 0.0), "IN": (0.0, 0.0), "OUT": (0.0, 0.0),
+    "UP": (0.0, 1.0), "DOWN": (0.0, -1.0), "LEFT": (-1.0, 0.0), "RIGHT": (1.0, 0.0),
+    "UL": (-1.0, 1.0), "UR": (1.0, 1.0), "DL": (-1.0, -1.0), "DR": (1.0, -1.0),
+}
+_SCALARS = {
+    "PI": 3.14159, "TAU": 6.28318, "SMALL_BUFF": 0.1, "MED_SMALL_BUFF": 0.25,
+    "MED_LARGE_BUFF": 0.5, "LARGE_BUFF": 1.0, "DEFAULT_MOBJECT_TO_EDGE_BUFFER": 0.5,
+    "DEFAULT_MOBJECT_TO_MOBJECT_BUFFER": 0.25,
+}
+
+_TEXT_KINDS = {
+    "Text", "MarkupText", "Paragraph", "Tex", "MathTex", "Title", "BulletedList",
+    "DecimalNumber", "Integer", "Variable",
+}
+_BACKDROP_KINDS = {
+    "Axes", "ThreeDAxes", "NumberPlane", "ComplexPlane", "PolarPlane",
+    "ScreenRectangle", "FullScreenRectangle", "FullScreenFadeRectangle", "BackgroundRectangle",
+}
+_CONNECTOR_KINDS = {
+    "Arrow", "DoubleArrow", "Vector", "Line", "DashedLine", "CurvedArrow", "Arc",
+    "Dot", "Brace", "BraceBetweenPoints", "Cross", "Underline", "TangentLine",
+}
+_CONTAINER_KINDS = {
+    "Rectangle", "RoundedRectangle", "Square", "Circle", "Ellipse", "Polygon",
+    "RegularPolygon", "SurroundingRectangle", "Annulus", "Triangle",
+}
+_GROUP_KINDS = {"VGroup", "Group", "VDict"}
+
+_INTRO_ANIMS = {
+    "Create", "Write", "FadeIn", "DrawBorderThenFill", "GrowFromCenter", "GrowFromPoint",
+    "GrowFromEdge", "GrowArrow", "SpinInFromNothing", "AddTextLetterByLetter", "AddTextWordByWord",
+    "Flash", "Indicate", "Circumscribe", "ShowPassingFlash", "Wiggle", "FocusOn", "ApplyWave",
+    "Succession",
+}
+_EXIT_ANIMS = {"FadeOut", "Uncreate", "Unwrite", "ShrinkToCenter", "RemoveTextLetterByLetter"}
+_REPLACE_ANIMS = {"ReplacementTransform", "TransformMatchingTex", "TransformMatchingShapes", "FadeTransform"}
+_MORPH_ANIMS = {"Transform", "TransformFromCopy", "ClockwiseTransform", "CounterclockwiseTransform"}
+_GROUP_ANIMS = {"AnimationGroup", "LaggedStart", "Succession"}
+# Manim's default ``lag_ratio`` per group kind (start offset as a fraction of
+# the previous animation's run time).
+_GROUP_LAG_RATIOS = {"AnimationGroup": 0.0, "LaggedStart": 0.05, "Succession": 1.0}
+# Emphasis animations touch an existing mobject without adding it.
+_EMPHASIS_ANIMS = {"Flash", "Indicate", "Circumscribe", "ShowPassingFlash", "Wiggle", "FocusOn", "ApplyWave"}
+
+# Mobject methods that mutate and return the same mobject; any other method
+# call (``axes.plot``, ``eq.get_part_by_tex``...) yields a new, derived object.
+_CHAINING_METHODS = {
+    "move_to", "shift", "next_to", "to_edge", "to_corner", "center", "scale", "arrange",
+    "align_to", "scale_to_fit_width", "scale_to_fit_height", "set_width", "set_height",
+    "set_x", "set_y", "set", "rotate", "flip", "stretch", "match_width", "match_height",
+    "arrange_in_grid", "apply_matrix", "apply_function", "become", "add", "remove",
+    "set_color", "set_fill", "set_stroke", "set_opacity", "set_z_index", "set_color_by_tex",
+    "set_color_by_gradient", "set_sheen", "fade", "save_state", "add_background_rectangle",
+}
+_LATEX_COMMAND_RE = re.compile(r"\\[a-zA-Z]+")
+
+_DYNAMIC_NAMES = {"always_redraw", "ValueTracker", "add_updater", "always", "f_always", "TracedPath"}
+_SCENE_CALLS = {"play", "wait", "add", "remove", "clear", "next_section", "bring_to_front", "bring_to_back"}
+
+
+@dataclass
+class _Mobj:
+    name: str
+    kind: str
+    line: int
+    x: float = 0.0
+    y: float = 0.0
+    width: Optional[float] = None
+    height: Optional[float] = None
+    children: list["_Mobj"] = field(default_factory=list)
+    parent: Optional["_Mobj"] = None
+
+    def bbox(self) -> Optional[tuple[float, float, float, float]]:
+        if self.children:
+            boxes = [b for b in (c.bbox() for c in self.children) if b]
+            if not boxes:
+                return None
+            return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                    max(b[2] for b in boxes), max(b[3] for b in boxes))
+        if self.width is None or self.height is None:
+            return None
+        return (self.x - self.width / 2, self.y - self.height / 2,
+                self.x + self.width / 2, self.y + self.height / 2)
+
+    def center(self) -> tuple[float, float]:
+        box = self.bbox()
+        if box and self.children:
+            return ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
+        return (self.x, self.y)
+
+    def size(self) -> Optional[tuple[float, float]]:
+        box = self.bbox()
+        if not box:
+            return None
+        return (box[2] - box[0], box[3] - box[1])
+
+    def shift(self, dx: float, dy: float) -> None:
+        self.x += dx
+        self.y += dy
+        for child in self.children:
+            child.shift(dx, dy)
+
+    def scale(self, factor: float, about: Optional[tuple[float, float]] = None) -> None:
+        cx, cy = about or self.center()
+        self.x = cx + (self.x - cx) * factor
+        self.y = cy + (self.y - cy) * factor
+        if self.width is not None:
+            self.width *= factor
+        if self.height is not None:
+            self.height *= factor
+        for child in self.children:
+            child.scale(factor, (cx, cy))
+
+    def ancestors(self) -> set[int]:
+        out: set[int] = set()
+        node = self.parent
+        while node is not None:
+            out.add(id(node))
+            node = node.parent
+        return out
+
+
+@dataclass
+class LayoutReport:
+    """Findings from :func:`analyze_scene_layout`."""
+
+    issues: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    leftover_objects: list[str] = field(default_factory=list)
+    total_duration: Optional[float] = None
+    tracked_objects: int = 0
+    inconclusive_reasons: list[str] = field(default_factory=list)
+
+    @property
+    def conclusive(self) -> bool:
+        """True when the walk covered the whole scene well enough to skip the LLM."""
+        return not self.inconclusive_reasons and self.tracked_objects > 0
+
+
+def _text_size(kind: str, call: ast.Call) -> tuple[Optional[float], Optional[float]]:
+    """Approximate ``(width, height)`` of a text-like mobject at its font size."""
+    pieces = [a.value for a in call.args if isinstance(a, ast.Constant) and isinstance(a.value, str)]
+    if not pieces and kind in {"DecimalNumber", "Integer"}:
+        pieces = ["0.00"]
+    if not pieces:
+        return None, None
+    font_size = 48.0
+    for kw in call.keywords:
+        if kw.arg == "font_size" and isinstance(kw.value, ast.Constant) and isinstance(kw.value.value, (int, float)):
+            font_size = float(kw.value.value)
+    factor = font_size / 48.0
+    text = " ".join(pieces)
+    if kind in {"MathTex", "Tex", "Title"}:
+        # LaTeX commands render as roughly one glyph; braces/scripts take no width.
+        stripped = text.replace("\\left", "").replace("\\right", "")
+        stripped = _LATEX_COMMAND_RE.sub("#", stripped)
+        glyphs = len(re.sub(r"[{}^_&\s]", "", stripped))
+        width = max(1, glyphs) * 0.3 * factor
+    elif kind in {"Paragraph", "BulletedList"}:
+        width = max(len(p) for p in pieces) * 0.26 * factor
+        return width, 0.6 * len(pieces) * factor
+    else:
+        width = len(text) * 0.26 * factor
+    height = 0.55 * factor * (1 + text.count("\n"))
+    if kind == "Title":
+        # Title spans the frame with its underline.
+        width = 2 * FRAME_HALF_WIDTH - 2
+        height += 0.3
+    return width, height
+
+
+def _find_construct(tree: ast.Module) -> Optional[ast.FunctionDef]:
+    """Return the ``construct`` method of the first Scene subclass, if any."""
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        is_scene = any(
+            (isinstance(b, ast.Name) and b.id in SCENE_BASES)
+            or (isinstance(b, ast.Attribute) and b.attr in SCENE_BASES)
+            for b in node.bases
+        )
+        if not is_scene:
+            continue
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef) and item.name == "construct":
+                return item
+    return None
+
+
+@dataclass
+class _Placed:
+    """A mobject with a known bounding box at one moment of the scene."""
+
+    key: object
+    name: str
+    kind: str
+    box: tuple[float, float, float, float]
+    ancestors: frozenset = frozenset()
+
+
+def _layout_findings(
+    placed: list[_Placed],
+    half_width: float,
+    half_height: float,
+    where: str,
+    reported_offscreen: set,
+    reported_pairs: set,
+) -> list[str]:
+    """Return off-frame and text-overlap findings for one on-screen snapshot.
+
+    *reported_offscreen*/*reported_pairs* carry state across snapshots so each
+    problem is reported once, at the first beat it appears.
+    """
+    findings: list[str] = []
+    visible = [p for p in placed if p.kind not in _BACKDROP_KINDS]
+    for item in visible:
+        if item.key in reported_offscreen:
+            continue
+        box = item.box
+        over = max(box[2] - half_width, -half_width - box[0], box[3] - half_height, -half_height - box[1])
+        if over > _OFF_FRAME_MARGIN:
+            reported_offscreen.add(item.key)
+            findings.append(f"{where}: '{item.name}' extends ~{over:.1f} units past the frame edge")
+    for a, b in itertools.combinations(visible, 2):
+        if not (a.kind in _TEXT_KINDS or b.kind in _TEXT_KINDS):
+            continue
+        if a.kind in _CONNECTOR_KINDS or b.kind in _CONNECTOR_KINDS:
+            continue
+        if a.key in b.ancestors or b.key in a.ancestors:
+            continue
+        key = (a.key, b.key)
+        if key in reported_pairs:
+            continue
+        box_a, box_b = a.box, b.box
+        ix = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+        iy = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+        if ix <= 0 or iy <= 0:
+            continue
+        area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+        area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+        smaller = min(area_a, area_b)
+        if smaller <= 0 or ix * iy / smaller < _OVERLAP_RATIO:
+            continue
+        # Text framed by a shape (label in a box/circle) is intentional.
+        a_holds_b = box_a[0] <= box_b[0] and box_a[1] <= box_b[1] and box_a[2] >= box_b[2] and box_a[3] >= box_b[3]
+        b_holds_a = box_b[0] <= box_a[0] and box_b[1] <= box_a[1] and box_b[2] >= box_a[2] and box_b[3] >= box_a[3]
+        if (a_holds_b and a.kind in _CONTAINER_KINDS) or (b_holds_a and b.kind in _CONTAINER_KINDS):
+            continue
+        reported_pairs.add(key)
+        findings.append(f"{where}: '{a.name}' and '{b.name}' overlap on screen")
+    return findings
+
+
+def _duration_findings(duration: float, audio_duration: float) -> list[str]:
+    """Flag a scene length that is far from the narration length."""
+    if audio_duration <= 0:
+        return []
+    tolerance = max(_DURATION_TOLERANCE_SECONDS, audio_duration * _DURATION_TOLERANCE_RATIO)
+    gap = duration - audio_duration
+    if gap > tolerance:
+        return [f"Scene runs ~{duration:.1f}s but narration is {audio_duration:.1f}s; the last {gap:.1f}s will be cut"]
+    if -gap > tolerance:
+        return [f"Scene runs ~{duration:.1f}s but narration is {audio_duration:.1f}s; "
+                f"the final frame will freeze for {-gap:.1f}s"]
+    return []
+
+
+class _SceneWalker:
+    """Symbolic interpreter for the statements of ``construct()``."""
+
+    def __init__(self, audio_duration: float) -> None:
+        self.audio_duration = audio_duration
+        self.env: dict[str, _Mobj] = {}
+        self.scalars: dict[str, float] = dict(_SCALARS)
+        self.vectors: dict[str, tuple[float, float]] = dict(_VECTORS)
+        self.on_screen: list[_Mobj] = []
+        self.created: list[_Mobj] = []
+        self.duration: Optional[float] = 0.0
+        self.report = LayoutReport()
+        self._reported_pairs: set[tuple[int, int]] = set()
+        self._reported_offscreen: set[int] = set()
+        self._anon = itertools.count(1)
+
+    # ── Expression evaluation ──────────────────────────────────────
+
+    def _inconclusive(self, reason: str) -> None:
+        if reason not in self.report.inconclusive_reasons:
+            self.report.inconclusive_reasons.append(reason)
+
+    def scalar(self, node: ast.AST) -> Optional[float]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return self.scalars.get(node.id)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self.scalar(node.operand)
+            return -value if value is not None else None
+        if isinstance(node, ast.BinOp):
+            left, right = self.scalar(node.left), self.scalar(node.right)
+            if left is None or right is None:
+                return None
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            if isinstance(node.op, ast.Div) and right:
+                return left / right
+        return None
+
+    def vector(self, node: ast.AST) -> Optional[tuple[float, float]]:
+        if isinstance(node, ast.Name):
+            if node.id in self.vectors:
+                return self.vectors[node.id]
+            if node.id in self.env:
+                return self.env[node.id].center()
+            return None
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            vec = self.vector(node.operand)
+            return (-vec[0], -vec[1]) if vec else None
+        if isinstance(node, ast.BinOp):
+            if isinstance(node.op, (ast.Add, ast.Sub)):
+                left, right = self.vector(node.left), self.vector(node.right)
+                if left is None or right is None:
+                    return None
+                sign = 1 if isinstance(node.op, ast.Add) else -1
+                return (left[0] + sign * right[0], left[1] + sign * right[1])
+            if isinstance(node.op, ast.Mult):
+                for vec_node, num_node in ((node.left, node.right), (node.right, node.left)):
+                    vec, num = self.vector(vec_node), self.scalar(num_node)
+                    if vec is not None and num is not None:
+                        return (vec[0] * num, vec[1] * num)
+                return None
+            if isinstance(node.op, ast.Div):
+                vec, num = self.vector(node.left), self.scalar(node.right)
+                if vec is not None and num:
+                    return (vec[0] / num, vec[1] / num)
+            return None
+        if isinstance(node, (ast.List, ast.Tuple)) and len(node.elts) in (2, 3):
+            x, y = self.scalar(node.elts[0]), self.scalar(node.elts[1])
+            return (x, y) if x is not None and y is not None else None
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Attribute) and func.attr == "array" and node.args:
+                return self.vector(node.args[0])
+            if isinstance(func, ast.Attribute) and func.attr.startswith("get_"):
+                target = self.mobject(func.value, create=False)
+                if target is None:
+                    return None
+                box = target.bbox()
+                cx, cy = target.center()
+                edge = func.attr[4:]
+                if edge in ("center", "center_of_mass"):
+                    return (cx, cy)
+                if box is None:
+                    return (cx, cy)
+                return {
+                    "top": (cx, box[3]), "bottom": (cx, box[1]),
+                    "left": (box[0], cy), "right": (box[2], cy),
+                }.get(edge)
+        return None
+
+    def _kw(self, call: ast.Call, name: str, index: Optional[int] = None) -> Optional[ast.AST]:
+        for kw in call.keywords:
+            if kw.arg == name:
+                return kw.value
+        if index is not None and len(call.args) > index:
+            return call.args[index]
+        return None
+
+    def _num(self, call: ast.Call, name: str, index: Optional[int], default: float) -> Optional[float]:
+        node = self._kw(call, name, index)
+        return self.scalar(node) if node is not None else default
+
+    def _construct(self, kind: str, call: ast.Call, name: str) -> _Mobj:
+        mob = _Mobj(name=name, kind=kind, line=call.lineno)
+
+        def num(key: str, idx: Optional[int], default: float) -> Optional[float]:
+            return self._num(call, key, idx, default)
+
+        if kind in _TEXT_KINDS:
+            mob.width, mob.height = _text_size(kind, call)
+            if kind == "Title" and mob.height is not None:
+                mob.y = FRAME_HALF_HEIGHT - 0.25 - mob.height / 2
+        elif kind in _GROUP_KINDS:
+            for arg in call.args:
+                if isinstance(arg, ast.Starred):
+                    self._inconclusive(f"line {call.lineno}: {kind} built from an unpacked sequence")
+                    continue
+                child = self.mobject(arg)
+                if child is not None:
+                    child.parent = mob
+                    mob.children.append(child)
+        elif kind in ("Circle", "Dot", "Annulus"):
+            if kind == "Dot":
+                radius = num("radius", 1, 0.08)
+                point_node = self._kw(call, "point", 0)
+                point = self.vector(point_node) if point_node is not None else (0.0, 0.0)
+                if point is None:
+                    return mob
+                mob.x, mob.y = point
+            elif kind == "Annulus":
+                radius = num("outer_radius", 1, 2.0)
+            else:
+                radius = num("radius", 0, 1.0)
+            if radius is not None:
+                mob.width = mob.height = 2 * radius
+        elif kind in ("Square",):
+            side = num("side_length", 0, 2.0)
+            mob.width = mob.height = side
+        elif kind in ("Rectangle", "RoundedRectangle", "ScreenRectangle"):
+            mob.width = num("width", None, 4.0)
+            mob.height = num("height", None, 2.0)
+        elif kind == "Ellipse":
+            mob.width = num("width", None, 2.0)
+            mob.height = num("height", None, 1.0)
+        elif kind in ("Triangle", "RegularPolygon"):
+            mob.width = mob.height = 2.0
+        elif kind in ("Axes", "ThreeDAxes"):
+            mob.width = num("x_length", None, 2 * FRAME_HALF_WIDTH - 2)
+            mob.height = num("y_length", None, 2 * FRAME_HALF_HEIGHT - 2)
+        elif kind in ("NumberPlane", "ComplexPlane", "PolarPlane", "FullScreenRectangle"):
+            mob.width, mob.height = 2 * FRAME_HALF_WIDTH, 2 * FRAME_HALF_HEIGHT
+        elif kind == "NumberLine":
+            mob.width, mob.height = num("length", None, 2 * FRAME_HALF_WIDTH - 2), 0.4
+        elif kind in ("Line", "Arrow", "DoubleArrow", "DashedLine", "Vector"):
+            if kind == "Vector":
+                start, end = (0.0, 0.0), self.vector(call.args[0]) if call.args else (1.0, 0.0)
+            else:
+                start_node, end_node = self._kw(call, "start", 0), self._kw(call, "end", 1)
+                start = self.vector(start_node) if start_node is not None else (-1.0, 0.0)
+                end = self.vector(end_node) if end_node is not None else (1.0, 0.0)
+            if start is not None and end is not None:
+                mob.x, mob.y = (start[0] + end[0]) / 2, (start[1] + end[1]) / 2
+                mob.width = max(abs(end[0] - start[0]), 0.1)
+                mob.height = max(abs(end[1] - start[1]), 0.1)
+        elif kind in ("SurroundingRectangle", "BackgroundRectangle", "Brace", "Underline"):
+            target = self.mobject(call.args[0], create=False) if call.args else None
+            size = target.size() if target else None
+            if target and size:
+                buff = 0.2 if kind != "Brace" else 0.0
+                mob.x, mob.y = target.center()
+                mob.width, mob.height = size[0] + 2 * buff, size[1] + 2 * buff
+                if kind in ("Brace", "Underline"):
+                    mob.height = 0.3
+                    mob.y -= size[1] / 2 + 0.3
+        return mob
+
+    def mobject(self, node: ast.AST, name: str = "", create: bool = True) -> Optional[_Mobj]:
+        """Evaluate *node* to a tracked mobject, applying chained placement calls."""
+        if isinstance(node, ast.Name):
+            return self.env.get(node.id)
+        if isinstance(node, ast.Subscript):
+            base = self.mobject(node.value, create=False)
+            if base is None:
+                return None
+            part = _Mobj(name=f"{base.name}[...]", kind="part", line=node.lineno, x=base.x, y=base.y)
+            part.parent = base
+            return part
+        if not isinstance(node, ast.Call):
+            return None
+        func = node.func
+        if isinstance(func, ast.Name):
+            if not create or not func.id[:1].isupper():
+                return None
+            if func.id in _DYNAMIC_NAMES:
+                self._inconclusive(f"line {node.lineno}: {func.id} makes the layout time-dependent")
+            mob = self._construct(func.id, node, name or f"{func.id}#{next(self._anon)}")
+            self.created.append(mob)
+            return mob
+        if isinstance(func, ast.Attribute):
+            if func.attr in _CHAINING_METHODS:
+                base = self.mobject(func.value, name=name, create=create)
+                if base is not None:
+                    self.apply_method(base, func.attr, node)
+                return base
+            base = self.mobject(func.value, create=False)
+            if base is None or not create:
+                return None
+            if func.attr == "copy":
+                derived = _Mobj(name=name or f"{base.name}.copy()", kind=base.kind, line=node.lineno,
+                                x=base.x, y=base.y, width=base.width, height=base.height)
+            else:
+                # Parts of a backdrop (axes.plot, plane labels) inherit its kind so
+                # they are ignored by the overlap checks like the backdrop itself.
+                kind = base.kind if base.kind in _BACKDROP_KINDS else "derived"
+                derived = _Mobj(name=name or f"{base.name}.{func.attr}()", kind=kind, line=node.lineno,
+                                x=base.x, y=base.y)
+            self.created.append(derived)
+            return derived
+        return None
+
+    # ── Placement methods ──────────────────────────────────────────
+
+    def apply_method(self, mob: _Mobj, method: str, call: ast.Call) -> None:
+        if method in _DYNAMIC_NAMES:
+            self._inconclusive(f"line {call.lineno}: {method} makes the layout time-dependent")
+            return
+        size = mob.size() or (0.0, 0.0)
+        if method == "move_to":
+            target = self.vector(call.args[0]) if call.args else None
+            if target is None:
+                self._mark_unknown_position(mob)
+                return
+            cx, cy = mob.center()
+            mob.shift(target[0] - cx, target[1] - cy)
+        elif method == "shift":
+            total = [0.0, 0.0]
+            for arg in call.args:
+                vec = self.vector(arg)
+                if vec is None:
+                    self._mark_unknown_position(mob)
+                    return
+                total[0] += vec[0]
+                total[1] += vec[1]
+            mob.shift(*total)
+        elif method == "center":
+            cx, cy = mob.center()
+            mob.shift(-cx, -cy)
+        elif method == "next_to":
+            anchor_node = call.args[0] if call.args else None
+            anchor = self.mobject(anchor_node, create=False) if anchor_node is not None else None
+            direction_node = self._kw(call, "direction", 1)
+            direction = self.vector(direction_node) if direction_node is not None else (1.0, 0.0)
+            buff_node = self._kw(call, "buff", 2)
+            buff = self.scalar(buff_node) if buff_node is not None else 0.25
+            if direction is None or buff is None:
+                self._mark_unknown_position(mob)
+                return
+            if anchor is not None:
+                box = anchor.bbox()
+                ax, ay = anchor.center()
+                half_w = (box[2] - box[0]) / 2 if box else 0.0
+                half_h = (box[3] - box[1]) / 2 if box else 0.0
+            else:
+                point = self.vector(anchor_node) if anchor_node is not None else None
+                if point is None:
+                    self._mark_unknown_position(mob)
+                    return
+                (ax, ay), half_w, half_h = point, 0.0, 0.0
+            tx = ax + direction[0] * (half_w + buff + size[0] / 2) if direction[0] else ax
+            ty = ay + direction[1] * (half_h + buff + size[1] / 2) if direction[1] else ay
+            cx, cy = mob.center()
+            mob.shift(tx - cx, ty - cy)
+        elif method in ("to_edge", "to_corner"):
+            default = (-1.0, 0.0) if method == "to_edge" else (-1.0, -1.0)
+            direction_node = self._kw(call, "edge" if method == "to_edge" else "corner", 0)
+            direction = self.vector(direction_node) if direction_node is not None else default
+            buff_node = self._kw(call, "buff", 1)
+            buff = self.scalar(buff_node) if buff_node is not None else 0.5
+            if direction is None or buff is None:
+                self._mark_unknown_position(mob)
+                return
+            cx, cy = mob.center()
+            tx = direction[0] * (FRAME_HALF_WIDTH - buff - size[0] / 2) if direction[0] else cx
+            ty = direction[1] * (FRAME_HALF_HEIGHT - buff - size[1] / 2) if direction[1] else cy
+            mob.shift(tx - cx, ty - cy)
+        elif method == "scale":
+            factor = self.scalar(call.args[0]) if call.args else None
+            if factor is not None:
+                mob.scale(factor)
+        elif method in ("scale_to_fit_width", "set_width", "scale_to_fit_height", "set_height"):
+            target = self.scalar(call.args[0]) if call.args else None
+            index = 0 if "width" in method else 1
+            if target is not None and size[index]:
+                mob.scale(target / size[index])
+        elif method == "arrange":
+            self._arrange(mob, call)
+        elif method == "add":
+            for arg in call.args:
+                child = self.mobject(arg)
+                if child is not None:
+                    child.parent = mob
+                    mob.children.append(child)
+        elif method == "align_to":
+            anchor = self.mobject(call.args[0], create=False) if call.args else None
+            direction_node = self._kw(call, "direction", 1)
+            direction = self.vector(direction_node) if direction_node is not None else None
+            box, anchor_box = mob.bbox(), anchor.bbox() if anchor else None
+            if box and anchor_box and direction:
+                dx = (anchor_box[2] - box[2] if direction[0] > 0 else anchor_box[0] - box[0]) if direction[0] else 0.0
+                dy = (anchor_box[3] - box[3] if direction[1] > 0 else anchor_box[1] - box[1]) if direction[1] else 0.0
+                mob.shift(dx, dy)
+        elif method in ("arrange_in_grid", "rotate", "apply_matrix", "apply_function", "set_x", "set_y",
+                        "set", "match_width", "match_height", "stretch", "flip", "become"):
+            if method in ("set_x", "set_y") and call.args:
+                value = self.scalar(call.args[0])
+                if value is not None:
+                    cx, cy = mob.center()
+                    mob.shift(value - cx if method == "set_x" else 0.0, value - cy if method == "set_y" else 0.0)
+                    return
+            # Geometry-changing calls we do not model precisely.
+            if method not in ("rotate", "flip", "set"):
+                self._mark_unknown_position(mob)
+
+    def _arrange(self, group: _Mobj, call: ast.Call) -> None:
+        direction_node = self._kw(call, "direction", 0)
+        direction = self.vector(direction_node) if direction_node is not None else (1.0, 0.0)
+        buff_node = self._kw(call, "buff", 1)
+        buff = self.scalar(buff_node) if buff_node is not None else 0.25
+        sizes = [c.size() for c in group.children]
+        if direction is None or buff is None or not sizes or any(s is None for s in sizes):
+            return
+        cx, cy = group.center()
+        horizontal = abs(direction[0]) >= abs(direction[1])
+        sign = 1 if (direction[0] if horizontal else -direction[1]) >= 0 else -1
+        span = sum(s[0] if horizontal else s[1] for s in sizes) + buff * (len(sizes) - 1)
+        cursor = -span / 2
+        for child, (w, h) in zip(group.children, sizes):
+            extent = w if horizontal else h
+            offset = sign * (cursor + extent / 2)
+            ccx, ccy = child.center()
+            if horizontal:
+                child.shift(cx + offset - ccx, cy - ccy)
+            else:
+                child.shift(cx - ccx, cy - offset - ccy)
+            cursor += extent + buff
+
+    def _mark_unknown_position(self, mob: _Mobj) -> None:
+        mob.width = mob.height = None
+        for child in mob.children:
+            self._mark_unknown_position(child)
+
+    # ── Scene events ───────────────────────────────────────────────
+
+    def _show(self, mob: _Mobj) -> None:
+        if all(m is not mob for m in self.on_screen):
+            self.on_screen.append(mob)
+
+    def _hide(self, mob: _Mobj) -> None:
+        self.on_screen = [m for m in self.on_screen if m is not mob and id(mob) not in m.ancestors()]
+
+    @staticmethod
+    def _is_scene_mobjects(node: ast.AST) -> bool:
+        """Match ``*self.mobjects`` and ``Group(*self.mobjects)``."""
+        if isinstance(node, ast.Starred):
+            node = node.value
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _GROUP_KINDS:
+            return any(_SceneWalker._is_scene_mobjects(arg) for arg in node.args)
+        return isinstance(node, ast.Attribute) and node.attr == "mobjects"
+
+    @staticmethod
+    def _group_duration(durations: list[float], lag_ratio: float) -> float:
+        """Run time of an animation group, following Manim's lag timing."""
+        start = end = 0.0
+        for duration in durations:
+            end = max(end, start + duration)
+            start += duration * lag_ratio
+        return end
+
+    def _animation(self, node: ast.AST) -> Optional[float]:
+        """Apply one animation argument of ``self.play``; return its own duration.
+
+        None means the duration is not statically known.
+        """
+        if isinstance(node, ast.Starred):
+            inner = node.value
+            if isinstance(inner, ast.ListComp) and isinstance(inner.elt, ast.Call):
+                func = inner.elt.func
+                if isinstance(func, ast.Name) and func.id in _EXIT_ANIMS and self._iterates_scene(inner):
+                    self.on_screen = []
+                    run_time = self._kw(inner.elt, "run_time")
+                    return self.scalar(run_time) if run_time is not None else 1.0
+            if isinstance(inner, ast.Attribute) and inner.attr == "mobjects":
+                return 1.0
+            self._inconclusive(f"line {node.lineno}: animations unpacked from a sequence")
+            return None
+        if not isinstance(node, ast.Call):
+            return None
+        func = node.func
+        own = self._kw(node, "run_time")
+        own_time = self.scalar(own) if own is not None else 1.0
+        if own is not None and own_time is None:
+            self._inconclusive(f"line {node.lineno}: non-literal run_time")
+        # mob.animate.<method>(...)... chains
+        if isinstance(func, ast.Attribute):
+            chain: list[tuple[str, ast.Call]] = []
+            cursor: ast.AST = node
+            while isinstance(cursor, ast.Call) and isinstance(cursor.func, ast.Attribute):
+                chain.append((cursor.func.attr, cursor))
+                cursor = cursor.func.value
+            if isinstance(cursor, ast.Attribute) and cursor.attr == "animate":
+                if "camera" in ast.unparse(cursor.value):
+                    self._inconclusive(f"line {node.lineno}: camera movement")
+                    return 1.0
+                target = self.mobject(cursor.value, create=False)
+                if target is not None:
+                    for method, call in reversed(chain):
+                        if method != "set_run_time":
+                            self.apply_method(target, method, call)
+                for method, call in chain:
+                    if method == "set_run_time":
+                        return self.scalar(call.args[0]) if call.args else None
+                return 1.0
+            return None
+        if not isinstance(func, ast.Name):
+            return None
+        kind = func.id
+        if kind in _DYNAMIC_NAMES or kind in ("UpdateFromFunc", "UpdateFromAlphaFunc", "MoveAlongPath"):
+            self._inconclusive(f"line {node.lineno}: {kind} makes the layout time-dependent")
+            return own_time
+        if kind in _GROUP_ANIMS:
+            durations = [self._animation(arg) for arg in node.args]
+            if own is not None:
+                return own_time
+            lag = self._kw(node, "lag_ratio")
+            lag_ratio = self.scalar(lag) if lag is not None else _GROUP_LAG_RATIOS[kind]
+            if lag_ratio is None or any(d is None for d in durations):
+                self._inconclusive(f"line {node.lineno}: {kind} timing depends on runtime values")
+                return None
+            return self._group_duration(durations, lag_ratio) if durations else 0.0
+        if kind == "LaggedStartMap" and own is None:
+            self._inconclusive(f"line {node.lineno}: LaggedStartMap length depends on the submobject count")
+            return None
+        if kind in _EXIT_ANIMS and any(self._is_scene_mobjects(arg) for arg in node.args):
+            self.on_screen = []
+            return own_time
+        targets = [self.mobject(arg) for arg in node.args]
+        if kind in _EXIT_ANIMS:
+            for target in targets:
+                if target is not None:
+                    self._hide(target)
+        elif kind in _REPLACE_ANIMS and len(targets) >= 2:
+            if targets[0] is not None:
+                self._hide(targets[0])
+            if targets[1] is not None:
+                self._show(targets[1])
+        elif kind in _MORPH_ANIMS and len(targets) >= 2:
+            source, target = targets[0], targets[1]
+            if kind == "TransformFromCopy":
+                if target is not None:
+                    self._show(target)
+            elif source is not None and target is not None:
+                source.x, source.y = target.center()
+                size = target.size()
+                source.children = []
+                source.width, source.height = size if size else (None, None)
+        elif kind in _INTRO_ANIMS and kind not in _EMPHASIS_ANIMS:
+            for target in targets:
+                if target is not None:
+                    self._show(target)
+        return own_time
+
+    def _iterates_scene(self, comp: ast.ListComp) -> bool:
+        return any(
+            isinstance(gen.iter, ast.Attribute) and gen.iter.attr == "mobjects"
+            for gen in comp.generators
+        )
+
+    def _add_duration(self, seconds: Optional[float]) -> None:
+        if seconds is None or self.duration is None:
+            self.duration = None
+        else:
+            self.duration += seconds
+
+    def _scene_call(self, call: ast.Call) -> None:
+        method = call.func.attr  # type: ignore[union-attr]
+        if method == "play":
+            durations = [self._animation(arg) for arg in call.args]
+            run_time = self._kw(call, "run_time")
+            if run_time is not None:
+                value = self.scalar(run_time)
+                if value is None:
+                    self._inconclusive(f"line {call.lineno}: non-literal run_time")
+                self._add_duration(value)
+            elif any(d is None for d in durations):
+                # One unknown animation makes the whole call's length unknown.
+                self._add_duration(None)
+            else:
+                self._add_duration(max(durations) if durations else 1.0)
+            self._check_layout(call.lineno)
+        elif method == "wait":
+            arg = self._kw(call, "duration", 0)
+            value = self.scalar(arg) if arg is not None else 1.0
+            if value is None:
+                self._inconclusive(f"line {call.lineno}: non-literal wait duration")
+            self._add_duration(value)
+        elif method == "add":
+            for arg in call.args:
+                mob = self.mobject(arg)
+                if mob is not None:
+                    self._show(mob)
+            self._check_layout(call.lineno)
+        elif method == "remove":
+            if any(self._is_scene_mobjects(arg) for arg in call.args):
+                self.on_screen = []
+            for arg in call.args:
+                mob = self.mobject(arg, create=False)
+                if mob is not None:
+                    self._hide(mob)
+        elif method == "clear":
+            self.on_screen = []
+
+    @staticmethod
+    def _may_advance_clock(node: ast.AST) -> bool:
+        """Whether *node* may call into the scene (and so advance scene time)."""
+        for sub in ast.walk(node):
+            if not isinstance(sub, ast.Call):
+                continue
+            func = sub.func
+            if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+                if func.attr not in ("add", "remove", "set_camera_orientation"):
+                    return True
+            if any(isinstance(arg, ast.Name) and arg.id == "self" for arg in sub.args):
+                return True
+        return False
+
+    def statement(self, stmt: ast.stmt) -> None:
+        if isinstance(stmt, (ast.For, ast.While, ast.AsyncFor)):
+            self._inconclusive(f"line {stmt.lineno}: loop in construct()")
+            if self._may_advance_clock(stmt):
+                self.duration = None
+            return
+        if isinstance(stmt, (ast.If, ast.Try, ast.With)):
+            self._inconclusive(f"line {stmt.lineno}: control flow in construct()")
+            if self._may_advance_clock(stmt):
+                self.duration = None
+            return
+        if isinstance(stmt, (ast.FunctionDef, ast.Lambda)):
+            self._inconclusive(f"line {stmt.lineno}: nested function in construct()")
+            return
+        if isinstance(stmt, ast.Assign):
+            if len(stmt.targets) != 1 or not isinstance(stmt.targets[0], ast.Name):
+                if any(isinstance(n, ast.Call) for n in ast.walk(stmt.value)):
+                    self._inconclusive(f"line {stmt.lineno}: unpacked assignment")
+                return
+            name = stmt.targets[0].id
+            value = self.scalar(stmt.value)
+            if value is not None:
+                self.scalars[name] = value
+                return
+            mob = self.mobject(stmt.value, name=name)
+            if mob is not None:
+                self.env[name] = mob
+                return
+            vec = self.vector(stmt.value)
+            if vec is not None:
+                self.vectors[name] = vec
+            return
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+            call = stmt.value
+            func = call.func
+            if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "self":
+                if func.attr in _SCENE_CALLS:
+                    self._scene_call(call)
+                elif func.attr not in ("set_camera_orientation", "move_camera"):
+                    self._inconclusive(f"line {call.lineno}: helper call self.{func.attr}()")
+                    self.duration = None
+                else:
+                    self._inconclusive(f"line {call.lineno}: camera movement")
+                    if func.attr == "move_camera":
+                        self.duration = None
+                return
+            if self._may_advance_clock(call):
+                self._inconclusive(f"line {call.lineno}: helper call receives the scene")
+                self.duration = None
+                return
+            self.mobject(call, create=False)
+
+    # ── Checks ─────────────────────────────────────────────────────
+
+    def _check_layout(self, lineno: int) -> None:
+        placed = [
+            _Placed(key=id(m), name=m.name, kind=m.kind, box=m.bbox(), ancestors=frozenset(m.ancestors()))
+            for m in self.on_screen
+            if m.bbox() is not None
+        ]
+        self.report.issues.extend(_layout_findings(
+            placed, FRAME_HALF_WIDTH, FRAME_HALF_HEIGHT, f"line {lineno}",
+            self._reported_offscreen, self._reported_pairs,
+        ))
+
+    def finish(self) -> LayoutReport:
+        report = self.report
+        report.tracked_objects = len(self.created)
+        report.total_duration = round(self.duration, 2) if self.duration is not None else None
+        report.leftover_objects = [m.name for m in self.on_screen]
+        if report.leftover_objects:
+            report.warnings.append(
+                f"{len(report.leftover_objects)} object(s) still on screen at scene end: "
+                + ", ".join(report.leftover_objects[:6])
+            )
+        unknown = [m for m in self.created if m.bbox() is None and m.kind not in _BACKDROP_KINDS]
+        if self.created and len(unknown) / len(self.created) > _MAX_UNKNOWN_RATIO:
+            self._inconclusive(f"{len(unknown)}/{len(self.created)} objects have unknown size or position")
+        if self.duration is not None:
+            report.issues.extend(_duration_findings(self.duration, self.audio_duration))
+        return report
+
+
+def analyze_scene_layout(code: str, audio_duration: float = 0.0) -> LayoutReport:
+    """Symbolically execute ``construct()`` and report layout/timing findings."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as exc:
+        return LayoutReport(inconclusive_reasons=[f"SyntaxError: {exc.msg} (line {exc.lineno})"])
+    construct = _find_construct(tree)
+    if construct is None:
+        return LayoutReport(inconclusive_reasons=["No Scene.construct() found"])
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and any(
+            (isinstance(b, ast.Name) and b.id == "ThreeDScene")
+            or (isinstance(b, ast.Attribute) and b.attr == "ThreeDScene")
+            for b in node.bases
+        ):
+            return LayoutReport(inconclusive_reasons=["3D scenes need camera projection"])
+
+    walker = _SceneWalker(audio_duration)
+    for stmt in construct.body:
+        walker.statement(stmt)
+    return walker.finish()
+
+
+# ── Probe traces (real bounding boxes) ───────────────────────────────
+
+# More top-level mobjects than this on screen at once reads as clutter.
+_CLUTTER_LIMIT = 12
+
+
+def report_from_layout_trace(trace: dict, audio_duration: float = 0.0) -> LayoutReport:
+    """Run the layout checks on a trace from ``manim_runner.probe_manim_scene``.
+
+    The trace holds real bounding boxes recorded while ``construct()`` ran, so
+    the resulting report is always conclusive.
+    """
+    frame = trace.get("frame") or {}
+    half_width = float(frame.get("width") or 2 * FRAME_HALF_WIDTH) / 2
+    half_height = float(frame.get("height") or 2 * FRAME_HALF_HEIGHT) / 2
+    report = LayoutReport()
+    reported_offscreen: set = set()
+    reported_pairs: set = set()
+    seen: set = set()
+    cluttered = False
+    beats = trace.get("beats") or []
+
+    for beat in beats:
+        mobjects = beat.get("mobjects") or []
+        where = f"line {beat['line']}" if beat.get("line") else f"beat {beat.get('index', 0)}"
+        placed = []
+        for mob in mobjects:
+            seen.add(mob.get("id"))
+            if mob.get("bbox"):
+                placed.append(_Placed(
+                    key=mob.get("id"),
+                    name=mob.get("name") or mob.get("type", "mobject"),
+                    kind=mob.get("type", ""),
+                    box=tuple(mob["bbox"]),
+                ))
+        report.issues.extend(_layout_findings(
+            placed, half_width, half_height, where, reported_offscreen, reported_pairs,
+        ))
+        if not cluttered and len(mobjects) > _CLUTTER_LIMIT:
+            cluttered = True
+            report.issues.append(f"{where}: {len(mobjects)} objects on screen at once; the frame is cluttered")
+
+    report.tracked_objects = len(seen)
+    report.total_duration = round(float(trace.get("duration") or 0.0), 2)
+    final = beats[-1].get("mobjects") or [] if beats else []
+    report.leftover_objects = [m.get("name") or m.get("type", "mobject") for m in final]
+    if beats and not final:
+        report.warnings.append("Scene ends on an empty frame; hold a summary visual while narration finishes.")
+    elif report.leftover_objects:
+        report.warnings.append(
+            f"{len(report.leftover_objects)} object(s) still on screen at scene end: "
+            + ", ".join(report.leftover_objects[:6])
+        )
+    report.issues.extend(_duration_findings(report.total_duration, audio_duration))
+    return report
@@ -2,18 +2,38 @@
 
 from __future__ import annotations
 
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
 from dataclasses import dataclass
+import hashlib
 import json
+import logging
 import os
+import threading
 import time
 from typing import Any, Callable, Iterable
 
 import anthropic
 import requests
 
-from agents.config import build_prompt_cache_key, get_system_prompt_prefix
+from agents.config import (
+    build_prompt_cache_key,
+    estimate_cost,
+    get_system_prompt_prefix,
+    merge_token_usage,
+    new_token_counter,
+)
+from utils.model_router import get_model_router
+
+logger = logging.getLogger(__name__)
 
 _OPENAI_RESPONSES_URL = "https://api.openai.com/v1/responses"
+# Anthropic allows four cache_control breakpoints per request (tools,
+# system and messages together): one per system tier (see
+# utils.prompt_layout) plus a rolling one on the latest message of a tool
+# loop.  Breakpoints a caller puts on tool schemas come out of the system
+# tiers' share.
+_MAX_CACHE_BREAKPOINTS = 4
+_SYSTEM_CACHE_BREAKPOINTS = 3
 
 
 class ProviderFailure(RuntimeError):
@@ -43,32 +63,68 @@ class ProviderResult:
 
 ToolDispatcher = Callable[[str, dict[str, Any]], str]
 
+_TOOL_BUDGET_WARNING = (
+    "\n\nCRITICAL SYSTEM WARNING: You have exhausted all tool calls. "
+    "Do NOT call any more functions. You MUST output the complete final code NOW."
+)
+
 
-def _hash_for_cache(*parts: str) -> str:
-    return build_prompt_cache_key(parts[0], *parts[1:]) if parts else "cache:default"
+def _prompt_cache_key(
+    config: Any,
+    default_prefix: str,
+    cache_key_parts: Iterable[str],
+    system_sections: list[str],
+    tools: list[dict[str, Any]] | None = None,
+) -> str:
+    """Cache routing key derived only from the shared head of the prompt.
+
+    Covers the stage label, the model, the tool schema names and the first
+    (most-shared) system section, so every call that can reuse a cached
+    prefix -- first attempt, repair, tool-less retry -- gets the same key.
+    """
+    sections = _append_system_prefix(system_sections)
+    head = hashlib.sha256(sections[0].encode("utf-8")).hexdigest()[:12] if sections else ""
+    tool_names = ",".join(sorted(tool.get("name", "") for tool in tools or []))
+    return build_prompt_cache_key(
+        config.cache_key_prefix or default_prefix, *cache_key_parts, config.model, tool_names, head,
+    )
 
 
 def _append_system_prefix(system_sections: list[str]) -> list[str]:
+    """System sections with the global prefix first (it is shared by every call)."""
     sections = [section for section in system_sections if section]
     prefix = get_system_prompt_prefix()
     if prefix:
-        sections.append(prefix)
+        sections.insert(0, prefix)
     return sections
 
 
 def _note_usage(token_counter: dict[str, Any] | None, usage: dict[str, Any], provider: str) -> None:
+    if provider == "openai":
+        prompt_tokens = int(usage.get("input_tokens") or 0)
+        cached = int((usage.get("input_tokens_details") or {}).get("cached_tokens") or 0)
+    else:
+        # Anthropic reports cache reads and writes separately from input_tokens.
+        cached = int(usage.get("cache_read_input_tokens") or 0)
+        prompt_tokens = (
+            int(usage.get("input_tokens") or 0) + cached + int(usage.get("cache_creation_input_tokens") or 0)
+        )
+    if prompt_tokens:
+        logger.debug("%s prompt cache: %d/%d tokens cached (%.0f%%)",
+                     provider, cached, prompt_tokens, 100.0 * cached / prompt_tokens)
+
     if token_counter is None:
         return
     token_counter["input_tokens"] += int(usage.get("input_tokens") or 0)
     token_counter["output_tokens"] += int(usage.get("output_tokens") or 0)
     token_counter["api_calls"] += 1
+    token_counter["prompt_input_tokens"] = token_counter.get("prompt_input_tokens", 0) + prompt_tokens
 
     if provider == "openai":
-        details = usage.get("input_tokens_details") or {}
-        token_counter["cached_input_tokens"] += int(details.get("cached_tokens") or 0)
+        token_counter["cached_input_tokens"] += cached
     else:
         token_counter["cache_creation_input_tokens"] += int(usage.get("cache_creation_input_tokens") or 0)
-        token_counter["cache_read_input_tokens"] += int(usage.get("cache_read_input_tokens") or 0)
+        token_counter["cache_read_input_tokens"] += cached
 
 
 def _classify_anthropic_error(exc: Exception) -> ProviderFailure:
@@ -179,8 +235,47 @@ def _build_openai_messages(system_sections: list[str], user_content: str | list[
     return messages
 
 
-def _build_anthropic_system(system_sections: list[str]) -> list[dict[str, Any]]:
-    return [{"type": "text", "text": section, "cache_control": {"type": "ephemeral"}} for section in _append_system_prefix(system_sections)]
+def _count_breakpoints(blocks: Iterable[Any]) -> int:
+    return sum(1 for block in blocks if isinstance(block, dict) and "cache_control" in block)
+
+
+def _build_anthropic_system(system_sections: list[str], reserved: int = 0) -> list[dict[str, Any]]:
+    """System blocks with a cache breakpoint closing each of the last tiers.
+
+    *reserved* breakpoints (tool schemas, the message breakpoint) are kept
+    free so the request stays within ``_MAX_CACHE_BREAKPOINTS``.
+    """
+    sections = _append_system_prefix(system_sections)
+    budget = max(0, min(_SYSTEM_CACHE_BREAKPOINTS, _MAX_CACHE_BREAKPOINTS - reserved))
+    first_breakpoint = len(sections) - budget
+    blocks: list[dict[str, Any]] = []
+    for index, section in enumerate(sections):
+        block: dict[str, Any] = {"type": "text", "text": section}
+        if index >= first_breakpoint:
+            block["cache_control"] = {"type": "ephemeral"}
+        blocks.append(block)
+    return blocks
+
+
+def _with_message_breakpoint(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Copy of *messages* with a cache breakpoint on the last content block.
+
+    Each tool-loop turn re-sends the whole conversation, so caching up to
+    the latest message makes the next turn read it instead of re-paying it.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    if not content:
+        return messages
+    content = [dict(block) if isinstance(block, dict) else block for block in content]
+    if not isinstance(content[-1], dict):
+        return messages
+    content[-1]["cache_control"] = {"type": "ephemeral"}
+    return messages[:-1] + [{**last, "content": content}]
 
 
 def _build_anthropic_messages(user_content: str | list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -204,6 +299,192 @@ def _build_anthropic_messages(user_content: str | list[dict[str, Any]]) -> list[
     return [{"role": "user", "content": user_content}]
 
 
+def _observed(
+    stage: str,
+    config: Any,
+    token_counter: dict[str, Any] | None,
+    call: Callable[[dict[str, Any] | None], ProviderResult],
+    tool_clock: _ToolClock | None = None,
+) -> ProviderResult:
+    """Run *call* and report its latency, tokens and cost to the model router.
+
+    Time spent dispatching tools (*tool_clock*) is left out of the latency,
+    which measures the model's turns only.
+    """
+    if not stage:
+        return call(token_counter)
+    local = new_token_counter()
+    started = time.perf_counter()
+
+    def _model_seconds() -> float:
+        return max(0.0, time.perf_counter() - started - (tool_clock.seconds() if tool_clock else 0.0))
+
+    try:
+        result = call(local)
+    except ProviderFailure as exc:
+        if exc.kind != "cancelled":
+            get_model_router().record_call(stage, config, _model_seconds(), ok=False)
+        raise
+    finally:
+        if token_counter is not None:
+            merge_token_usage(token_counter, local)
+    cost = estimate_cost(
+        local["input_tokens"], local["output_tokens"], model=config.model,
+        cached_input_tokens=local["cached_input_tokens"],
+        cache_creation_tokens=local["cache_creation_input_tokens"],
+        cache_read_tokens=local["cache_read_input_tokens"],
+    )
+    get_model_router().record_call(
+        stage, config, _model_seconds(), ok=True,
+        tokens=local["input_tokens"] + local["output_tokens"], cost=cost,
+    )
+    return result
+
+
+# ── Hedged requests ──────────────────────────────────────────────────
+
+# Stages on the critical path of a segment/project; the rest are cheap.
+_HEDGED_STAGES = frozenset({"plan", "code"})
+
+
+def _hedging_enabled() -> bool:
+    return os.getenv("PAPER2MANIM_HEDGE", "0").strip().lower() not in {"0", "false", "no", "off", ""}
+
+
+def _hedge_budget_ratio() -> float:
+    try:
+        return max(0.0, float(os.getenv("PAPER2MANIM_HEDGE_BUDGET", "0.1")))
+    except ValueError:
+        return 0.1
+
+
+class _HedgeBudget:
+    """Caps hedged duplicates at a fraction of the hedge-eligible calls."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+
+    def note_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def take(self, ratio: float) -> bool:
+        with self._lock:
+            if self.hedges + 1 > ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+_HEDGE_BUDGET = _HedgeBudget()
+_COUNTER_LOCK = threading.Lock()
+
+
+def _hedge_delay(stage: str, config: Any) -> float | None:
+    """Seconds to wait before hedging a *stage* call, or None to not hedge it."""
+    if stage not in _HEDGED_STAGES or not _hedging_enabled():
+        return None
+    _HEDGE_BUDGET.note_call()
+    return get_model_router().hedge_delay(stage, config)
+
+
+def _merge_usage(target: dict[str, Any] | None, source: dict[str, Any]) -> None:
+    if target is not None:
+        with _COUNTER_LOCK:
+            merge_token_usage(target, source)
+
+
+def _merge_when_done(future: Future, target: dict[str, Any] | None, source: dict[str, Any]) -> None:
+    """Add *source* usage to *target* once *future* settles (the loser is still billed)."""
+    if target is not None:
+        future.add_done_callback(lambda _: _merge_usage(target, source))
+
+
+def _hedged(
+    stage: str,
+    primary: Any,
+    fallback: Any | None,
+    token_counter: dict[str, Any] | None,
+    attempt: Callable[[Any, dict[str, Any] | None, threading.Event | None], ProviderResult],
+    on_win: Callable[[dict[str, Any]], None] | None = None,
+    tool_seconds: Callable[[dict[str, Any]], float] | None = None,
+) -> ProviderResult:
+    """Run *attempt* on *primary*; past the stage/model p90, race a duplicate.
+
+    The duplicate goes to *fallback* when there is one (a slow provider is
+    the usual cause), else to *primary* again.  The first successful
+    response wins and the loser is told to stop at its next turn.  Each
+    raced attempt gets its own counter: a settled attempt's usage is merged
+    before returning, a still-running loser's once it stops, and *on_win*
+    receives the winning attempt's counter.  The p90 covers model turns only,
+    so the time *tool_seconds* reports for an attempt's counter is not
+    counted against it.
+    """
+    delay = _hedge_delay(stage, primary)
+    if delay is None:
+        return attempt(primary, token_counter, None)
+
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+    original_counter = new_token_counter()
+    started = time.perf_counter()
+    original = pool.submit(attempt, primary, original_counter, cancelled)
+    try:
+        done, _ = wait([original], timeout=delay)
+        while not done and tool_seconds is not None:
+            remaining = delay - (time.perf_counter() - started - tool_seconds(original_counter))
+            if remaining <= 0:
+                break
+            done, _ = wait([original], timeout=remaining)
+        if done or not _HEDGE_BUDGET.take(_hedge_budget_ratio()):
+            try:
+                result = original.result()
+            finally:
+                _merge_usage(token_counter, original_counter)
+            if on_win is not None:
+                on_win(original_counter)
+            get_model_router().note_model(stage, result.trace)
+            return result
+
+        hedge_config = fallback or primary
+        logger.info("Hedging slow %s call to %s after %.1fs (p90)", stage, hedge_config.model, delay)
+        hedge_counter = new_token_counter()
+        hedge = pool.submit(attempt, hedge_config, hedge_counter, cancelled)
+        counters = {original: original_counter, hedge: hedge_counter}
+        if token_counter is not None:
+            with _COUNTER_LOCK:
+                token_counter["hedged_requests"] = token_counter.get("hedged_requests", 0) + 1
+
+        pending = {original, hedge}
+        error: ProviderFailure | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _merge_usage(token_counter, counters[future])
+            for future in done:
+                try:
+                    result = future.result()
+                except ProviderFailure as exc:
+                    error = exc
+                    continue
+                cancelled.set()
+                for loser in pending:
+                    _merge_when_done(loser, token_counter, counters[loser])
+                if future is hedge and token_counter is not None:
+                    with _COUNTER_LOCK:
+                        token_counter["hedge_wins"] = token_counter.get("hedge_wins", 0) + 1
+                if on_win is not None:
+                    on_win(counters[future])
+                get_model_router().note_model(stage, result.trace)
+                return result
+        assert error is not None
+        raise error
+    finally:
+        pool.shutdown(wait=False)
+
+
 def run_text_completion(
     *,
     primary: Any,
@@ -214,32 +495,37 @@ def run_text_completion(
     token_counter: dict[str, Any] | None = None,
     on_status: Callable[[str], None] | None = None,
     cache_key_parts: Iterable[str] = (),
+    stage: str = "",
 ) -> ProviderResult:
-    """Run a text-only completion with optional provider fallback."""
-    try:
-        return _run_single_text_completion(
-            config=primary,
+    """Run a text-only completion with optional provider fallback.
+
+    With a *stage*, :mod:`utils.model_router` may swap primary and fallback
+    based on live telemetry, the call's latency and cost are recorded, and
+    a slow call may be hedged (``PAPER2MANIM_HEDGE``).
+    """
+    if stage:
+        primary, fallback = get_model_router().route(stage, primary, fallback)
+
+    def _attempt(config: Any, counter: dict[str, Any] | None, cancelled: threading.Event | None = None) -> ProviderResult:
+        # A single request cannot be interrupted; a losing hedge just finishes.
+        return _observed(stage, config, counter, lambda inner: _run_single_text_completion(
+            config=config,
             system_sections=system_sections,
             user_content=user_content,
             max_output_tokens=max_output_tokens,
-            token_counter=token_counter,
+            token_counter=inner,
             on_status=on_status,
             cache_key_parts=cache_key_parts,
-        )
+        ))
+
+    try:
+        return _hedged(stage, primary, fallback, token_counter, _attempt)
     except ProviderFailure as exc:
         if token_counter is not None and exc.fallback_ok:
             token_counter["fallback_invocations"] += 1
         if not fallback or not exc.fallback_ok:
             raise
-        result = _run_single_text_completion(
-            config=fallback,
-            system_sections=system_sections,
-            user_content=user_content,
-            max_output_tokens=max_output_tokens,
-            token_counter=token_counter,
-            on_status=on_status,
-            cache_key_parts=cache_key_parts,
-        )
+        result = _attempt(fallback, token_counter)
         result.trace.used_fallback = True
         result.trace.fallback_from = primary.model
         return result
@@ -259,7 +545,7 @@ def _run_single_text_completion(
         api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
         if not api_key:
             raise ProviderFailure("openai", "auth", "OPENAI_API_KEY is not set", fallback_ok=True)
-        cache_key = _hash_for_cache(config.cache_key_prefix or "stage", *cache_key_parts)
+        cache_key = _prompt_cache_key(config, "stage", cache_key_parts, system_sections)
         payload: dict[str, Any] = {
             "model": config.model,
             "input": _build_openai_messages(system_sections, user_content),
@@ -314,42 +600,162 @@ def run_tool_completion(
     token_counter: dict[str, Any] | None = None,
     on_status: Callable[[str], None] | None = None,
     cache_key_parts: Iterable[str] = (),
+    tool_latency: dict[str, dict] | None = None,
+    stage: str = "",
+    cancelled: threading.Event | None = None,
 ) -> ProviderResult:
-    try:
-        return _run_single_tool_completion(
-            config=primary,
+    """Run a tool-using completion with optional provider fallback (routed and hedged like ``run_text_completion``).
+
+    Setting *cancelled* stops the tool loop before its next model turn.
+    """
+    if stage:
+        primary, fallback = get_model_router().route(stage, primary, fallback)
+    stop = cancelled
+    # Raced (hedged) attempts keep their own tool stats, keyed by attempt counter; the winner's are merged.
+    raced_tools: dict[int, tuple[dict[str, int], dict[str, dict]]] = {}
+    tool_clocks: dict[int, _ToolClock] = {}
+
+    def _attempt(config: Any, counter: dict[str, Any] | None, cancelled: threading.Event | None = None) -> ProviderResult:
+        counts, latency = tool_call_counts, tool_latency
+        if cancelled is not None:
+            counts, latency = raced_tools.setdefault(id(counter), ({}, {}))
+        clock = tool_clocks[id(counter)] = _ToolClock()
+        return _observed(stage, config, counter, lambda inner: _run_single_tool_completion(
+            config=config,
             system_sections=system_sections,
             user_message=user_message,
             tools=tools,
             max_tool_calls=max_tool_calls,
             tool_dispatcher=tool_dispatcher,
-            tool_call_counts=tool_call_counts,
-            token_counter=token_counter,
+            tool_call_counts=counts,
+            token_counter=inner,
             on_status=on_status,
             cache_key_parts=cache_key_parts,
+            tool_latency=latency,
+            cancelled=_AnyEvent(stop, cancelled),
+            tool_clock=clock,
+        ), tool_clock=clock)
+
+    def _tool_seconds(counter: dict[str, Any]) -> float:
+        clock = tool_clocks.get(id(counter))
+        return clock.seconds() if clock else 0.0
+
+    def _merge_winner_tools(counter: dict[str, Any]) -> None:
+        counts, latency = raced_tools.get(id(counter), ({}, {}))
+        if tool_call_counts is not None:
+            for name, count in counts.items():
+                tool_call_counts[name] = tool_call_counts.get(name, 0) + count
+        if tool_latency is not None:
+            merge_tool_latency(tool_latency, latency)
+
+    try:
+        return _hedged(
+            stage, primary, fallback, token_counter, _attempt,
+            on_win=_merge_winner_tools, tool_seconds=_tool_seconds,
         )
     except ProviderFailure as exc:
         if token_counter is not None and exc.fallback_ok:
             token_counter["fallback_invocations"] += 1
         if not fallback or not exc.fallback_ok:
             raise
-        result = _run_single_tool_completion(
-            config=fallback,
-            system_sections=system_sections,
-            user_message=user_message,
-            tools=tools,
-            max_tool_calls=max_tool_calls,
-            tool_dispatcher=tool_dispatcher,
-            tool_call_counts=tool_call_counts,
-            token_counter=token_counter,
-            on_status=on_status,
-            cache_key_parts=cache_key_parts,
-        )
+        result = _attempt(fallback, token_counter)
         result.trace.used_fallback = True
         result.trace.fallback_from = primary.model
         return result
 
 
+def _tool_workers() -> int:
+    try:
+        return max(1, int(os.getenv("PAPER2MANIM_TOOL_WORKERS", "4")))
+    except ValueError:
+        return 4
+
+
+def _tool_timeout_seconds() -> float:
+    try:
+        return max(1.0, float(os.getenv("PAPER2MANIM_TOOL_TIMEOUT", "30")))
+    except ValueError:
+        return 30.0
+
+
+def merge_tool_latency(target: dict[str, dict], source: dict[str, dict] | None) -> None:
+    """Add per-tool latency stats from *source* into *target* (in place)."""
+    for name, stats in (source or {}).items():
+        if not isinstance(stats, dict):
+            continue
+        entry = target.setdefault(name, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "timeouts": 0})
+        entry["calls"] += int(stats.get("calls") or 0)
+        entry["total_seconds"] = round(entry["total_seconds"] + float(stats.get("total_seconds") or 0.0), 3)
+        entry["max_seconds"] = round(max(entry["max_seconds"], float(stats.get("max_seconds") or 0.0)), 3)
+        entry["timeouts"] += int(stats.get("timeouts") or 0)
+
+
+class _ToolClock:
+    """Wall time a tool loop spends dispatching tools, including a dispatch still in flight."""
+
+    def __init__(self) -> None:
+        self._total = 0.0
+        self._since: float | None = None
+
+    def __enter__(self) -> _ToolClock:
+        self._since = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._total += time.perf_counter() - self._since
+        self._since = None
+
+    def seconds(self) -> float:
+        since = self._since
+        return self._total + (time.perf_counter() - since if since is not None else 0.0)
+
+
+def _dispatch_tool_calls(
+    calls: list[tuple[str, dict[str, Any]]],
+    tool_dispatcher: ToolDispatcher,
+    tool_call_counts: dict[str, int] | None,
+    tool_latency: dict[str, dict] | None,
+) -> list[str]:
+    """Run one turn's tool calls concurrently and return their results in call order.
+
+    Each call is bounded by ``PAPER2MANIM_TOOL_TIMEOUT``; a call that overruns
+    returns a timeout notice to the model instead of blocking the turn.
+    """
+    for name, _ in calls:
+        if tool_call_counts is not None:
+            tool_call_counts[name] = tool_call_counts.get(name, 0) + 1
+
+    def _timed(name: str, args: dict[str, Any]) -> tuple[str, float]:
+        started = time.perf_counter()
+        result = tool_dispatcher(name, args)
+        return result, time.perf_counter() - started
+
+    timeout = _tool_timeout_seconds()
+    pool = ThreadPoolExecutor(max_workers=min(len(calls), _tool_workers()), thread_name_prefix="tool-call")
+    try:
+        submitted_at = time.perf_counter()
+        futures = [pool.submit(_timed, name, args) for name, args in calls]
+        results: list[str] = []
+        for (name, _), future in zip(calls, futures):
+            remaining = max(0.0, timeout - (time.perf_counter() - submitted_at))
+            try:
+                result, elapsed = future.result(timeout=remaining)
+                timed_out = False
+            except FutureTimeout:
+                future.cancel()
+                result = f"Tool '{name}' timed out after {timeout:.0f}s; continue without it."
+                elapsed, timed_out = timeout, True
+            if tool_latency is not None:
+                merge_tool_latency(tool_latency, {name: {
+                    "calls": 1, "total_seconds": elapsed, "max_seconds": elapsed, "timeouts": int(timed_out),
+                }})
+            results.append(result)
+        return results
+    finally:
+        # Do not wait on overrunning tools; their threads finish in the background.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 def _openai_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
     mapped = []
     for tool in tools:
@@ -362,6 +768,22 @@ def _openai_tools(tools: list[dict[str, Any]]) -> list[dict[str, Any]]:
     return mapped
 
 
+class _AnyEvent:
+    """Set once any of the given events is (caller cancellation or a lost hedge)."""
+
+    def __init__(self, *events: threading.Event | None) -> None:
+        self._events = [event for event in events if event is not None]
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self._events)
+
+
+def _raise_if_cancelled(config: Any, cancelled: threading.Event | _AnyEvent | None) -> None:
+    """Stop a tool loop that was cancelled or whose hedged twin already answered."""
+    if cancelled is not None and cancelled.is_set():
+        raise ProviderFailure(config.provider, "cancelled", "request was cancelled")
+
+
 def _run_single_tool_completion(
     *,
     config: Any,
@@ -374,6 +796,9 @@ def _run_single_tool_completion(
     token_counter: dict[str, Any] | None,
     on_status: Callable[[str], None] | None,
     cache_key_parts: Iterable[str],
+    tool_latency: dict[str, dict] | None = None,
+    cancelled: threading.Event | _AnyEvent | None = None,
+    tool_clock: _ToolClock | None = None,
 ) -> ProviderResult:
     if config.provider == "openai":
         return _run_openai_tool_completion(
@@ -387,6 +812,9 @@ def _run_single_tool_completion(
             token_counter=token_counter,
             on_status=on_status,
             cache_key_parts=cache_key_parts,
+            tool_latency=tool_latency,
+            cancelled=cancelled,
+            tool_clock=tool_clock,
         )
     return _run_anthropic_tool_completion(
         config=config,
@@ -398,6 +826,9 @@ def _run_single_tool_completion(
         tool_call_counts=tool_call_counts,
         token_counter=token_counter,
         on_status=on_status,
+        tool_latency=tool_latency,
+        cancelled=cancelled,
+        tool_clock=tool_clock,
     )
 
 
@@ -413,6 +844,9 @@ def _run_openai_tool_completion(
     token_counter: dict[str, Any] | None,
     on_status: Callable[[str], None] | None,
     cache_key_parts: Iterable[str],
+    tool_latency: dict[str, dict] | None = None,
+    cancelled: threading.Event | _AnyEvent | None = None,
+    tool_clock: _ToolClock | None = None,
 ) -> ProviderResult:
     api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
     if not api_key:
@@ -420,10 +854,12 @@ def _run_openai_tool_completion(
 
     input_payload: list[dict[str, Any]] = _build_openai_messages(system_sections, user_message)
     previous_response_id: str | None = None
-    cache_key = _hash_for_cache(config.cache_key_prefix or "coder", *cache_key_parts)
+    cache_key = _prompt_cache_key(config, "coder", cache_key_parts, system_sections, tools)
+    clock = tool_clock or _ToolClock()
     calls = 0
 
     while True:
+        _raise_if_cancelled(config, cancelled)
         payload: dict[str, Any] = {
             "model": config.model,
             "input": input_payload,
@@ -436,8 +872,11 @@ def _run_openai_tool_completion(
             payload["reasoning"] = {"effort": config.reasoning_effort}
         if config.cache_retention:
             payload["prompt_cache_retention"] = config.cache_retention
-        if tools and calls < max_tool_calls:
+        if tools:
+            # Keep the schema once the budget is spent: it is part of the cached prefix.
             payload["tools"] = _openai_tools(tools)
+            if calls >= max_tool_calls:
+                payload["tool_choice"] = "none"
 
         response = _with_retries(lambda: _openai_post(payload, api_key), "openai", on_status)
         _note_usage(token_counter, response.get("usage") or {}, "openai")
@@ -447,23 +886,22 @@ def _run_openai_tool_completion(
         if not function_calls or calls >= max_tool_calls:
             return ProviderResult(text=text, trace=ProviderTrace(config.provider, config.model))
 
-        tool_outputs: list[dict[str, Any]] = []
+        parsed_calls: list[tuple[str, dict[str, Any]]] = []
         for call in function_calls:
-            calls += 1
-            name = call.get("name", "")
             raw_args = call.get("arguments") or "{}"
             try:
                 parsed_args = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
             except json.JSONDecodeError:
                 parsed_args = {}
-            if tool_call_counts is not None:
-                tool_call_counts[name] = tool_call_counts.get(name, 0) + 1
-            result = tool_dispatcher(name, parsed_args)
+            parsed_calls.append((call.get("name", ""), parsed_args))
+        with clock:
+            results = _dispatch_tool_calls(parsed_calls, tool_dispatcher, tool_call_counts, tool_latency)
+
+        tool_outputs: list[dict[str, Any]] = []
+        for call, result in zip(function_calls, results):
+            calls += 1
             if calls >= max_tool_calls:
-                result += (
-                    "\n\nCRITICAL SYSTEM WARNING: You have exhausted all tool calls. "
-                    "Do NOT call any more functions. You MUST output the complete final code NOW."
-                )
+                result += _TOOL_BUDGET_WARNING
             tool_outputs.append({
                 "type": "function_call_output",
                 "call_id": call.get("call_id") or call.get("id"),
@@ -483,21 +921,29 @@ def _run_anthropic_tool_completion(
     tool_call_counts: dict[str, int] | None,
     token_counter: dict[str, Any] | None,
     on_status: Callable[[str], None] | None,
+    tool_latency: dict[str, dict] | None = None,
+    cancelled: threading.Event | _AnyEvent | None = None,
+    tool_clock: _ToolClock | None = None,
 ) -> ProviderResult:
     client = anthropic.Anthropic()
     messages: list[dict[str, Any]] = [{"role": "user", "content": user_message}]
+    clock = tool_clock or _ToolClock()
     calls = 0
 
     while True:
+        _raise_if_cancelled(config, cancelled)
         kwargs: dict[str, Any] = {
             "model": config.model,
             "max_tokens": 8192,
             "temperature": 0.2,
-            "system": _build_anthropic_system(system_sections),
-            "messages": messages,
+            "system": _build_anthropic_system(system_sections, reserved=1 + _count_breakpoints(tools or [])),
+            "messages": _with_message_breakpoint(messages),
         }
-        if tools and calls < max_tool_calls:
+        if tools:
+            # Keep the schema once the budget is spent: it is part of the cached prefix.
             kwargs["tools"] = tools
+            if calls >= max_tool_calls:
+                kwargs["tool_choice"] = {"type": "none"}
 
         def _anthropic_call() -> Any:
             try:
@@ -525,17 +971,16 @@ def _run_anthropic_tool_completion(
             return ProviderResult(text="\n".join(text_parts).strip(), trace=ProviderTrace(config.provider, config.model))
 
         messages.append({"role": "assistant", "content": response.content})
+        with clock:
+            results = _dispatch_tool_calls(
+                [(block.name, block.input) for block in tool_use_blocks],
+                tool_dispatcher, tool_call_counts, tool_latency,
+            )
         tool_results = []
-        for block in tool_use_blocks:
+        for block, result in zip(tool_use_blocks, results):
             calls += 1
-            if tool_call_counts is not None:
-                tool_call_counts[block.name] = tool_call_counts.get(block.name, 0) + 1
-            result = tool_dispatcher(block.name, block.input)
             if calls >= max_tool_calls:
-                result += (
-                    "\n\nCRITICAL SYSTEM WARNING: You have exhausted all tool calls. "
-                    "Do NOT call any more functions. You MUST output the complete final code NOW."
-                )
+                result += _TOOL_BUDGET_WARNING
             tool_results.append({
                 "type": "tool_result",
                 "tool_use_id": block.id,
@@ -1,9 +1,11 @@
 """
-Fetch Manim documentation and source code directly from the GitHub repository.
+Manim documentation and source code lookups for the coder's tools.
 
-Uses raw.githubusercontent.com to retrieve plain-text .py and .rst files —
-no HTML scraping or extra parsing libraries required.  Results are cached
-in-memory for the lifetime of the process so repeated look-ups are free.
+Topic lookups are answered from an offline, symbol-level index of the
+installed ``manim`` package (see ``utils.manim_index``), returning only the
+relevant classes and methods.  Files that are not part of the package
+(tutorials, example scenes), or any lookup when manim is not installed,
+fall back to raw.githubusercontent.com, cached in-memory per process.
 """
 
 from __future__ import annotations
@@ -15,6 +17,8 @@ from typing import Optional
 
 import requests
 
+from utils.manim_index import get_doc_index
+
 logger = logging.getLogger(__name__)
 
 REPO_BASE = (
@@ -22,6 +26,11 @@ REPO_BASE = (
 )
 
 _FETCH_TIMEOUT = 15  # seconds
+# Marks a topic file that could not be downloaded in assembled topic docs.
+FETCH_FAILED_MARKER = "[fetch failed]"
+# Symbols returned per indexed lookup, and the size cap on their rendering.
+_INDEX_RESULTS = 6
+_INDEX_MAX_CHARS = 8_000
 
 # ---------------------------------------------------------------------------
 # Source-file registry: maps short topic keys to the repo paths that document
@@ -139,22 +148,10 @@ def _truncate(text: str, max_chars: int = 30_000) -> str:
 # Public API — designed to be registered as a Gemini callable tool
 # ---------------------------------------------------------------------------
 
-# Cache the assembled doc output so repeated look-ups for the same topic
-# skip fuzzy matching and string concatenation.  The underlying _fetch_raw
-# calls are already individually cached, but this avoids redundant work
-# when the same topic is queried multiple times in a single pipeline run.
 @lru_cache(maxsize=64)
-def _fetch_docs_cached(key: str) -> Optional[str]:
-    """Inner cached helper -- returns None when the topic is unknown."""
-    paths = TOPIC_INDEX.get(key)
-
-    # Fuzzy fallback: check if the key is a substring of any topic
-    if paths is None:
-        for registered_key, registered_paths in TOPIC_INDEX.items():
-            if key in registered_key or registered_key in key:
-                paths = registered_paths
-                break
-
+def _fetch_docs_from_github(key: str) -> Optional[str]:
+    """Assemble whole files for a topic from GitHub; None when the topic is unknown."""
+    paths = _topic_paths(key)
     if paths is None:
         return None
 
@@ -164,27 +161,55 @@ def _fetch_docs_cached(key: str) -> Optional[str]:
         if content is not None:
             parts.append(f"# --- {path} ---\n{content}")
         else:
-            parts.append(f"# --- {path} --- [fetch failed]")
+            parts.append(f"# --- {path} --- {FETCH_FAILED_MARKER}")
 
     return _truncate("\n\n".join(parts))
 
 
+def _topic_paths(key: str) -> Optional[list[str]]:
+    """Registered paths for *key*, falling back to substring matches on topic names."""
+    paths = TOPIC_INDEX.get(key)
+    if paths is None:
+        for registered_key, registered_paths in TOPIC_INDEX.items():
+            if key in registered_key or registered_key in key:
+                return registered_paths
+    return paths
+
+
+def _lookup_index(topic: str, key: str) -> Optional[str]:
+    """Answer a topic from the local symbol index; None to fall back to GitHub."""
+    index = get_doc_index()
+    if index is None:
+        return None
+    paths = _topic_paths(key)
+    if paths is not None and not any(p.startswith("manim/") for p in paths):
+        return None  # tutorials / example scenes are not part of the package
+    hits = index.search(topic, limit=_INDEX_RESULTS, paths=paths)
+    if not hits and paths:
+        hits = index.symbols_in(paths, limit=_INDEX_RESULTS)
+    if not hits:
+        return None
+    return _truncate("\n\n".join(chunk.render() for chunk in hits), _INDEX_MAX_CHARS)
+
+
 def fetch_manim_docs(topic: str) -> str:
     """Retrieve Manim source documentation for a topic.
 
     Args:
         topic: A keyword identifying the Manim concept to look up.
-               Must be one of the keys listed in the topic index
+               Either one of the keys listed in the topic index
                (e.g. "circle", "transform", "text", "axes", "scene",
-               "examples", "quickstart").
+               "examples", "quickstart") or a class/method name
+               (e.g. "MathTex", "next_to").
 
     Returns:
-        The raw source text (Python or RST) from the official Manim
-        repository, including docstrings and inline examples.
+        Signatures and docstrings of the most relevant symbols from the
+        installed Manim package, or raw source text (Python or RST) from
+        the official repository when no local match exists.
         Returns an error message if the topic is unknown or the fetch fails.
     """
     key = topic.strip().lower()
-    result = _fetch_docs_cached(key)
+    result = _lookup_index(topic, key) or _fetch_docs_from_github(key)
     if result is None:
         return (
             f"Unknown topic '{topic}'. "
@@ -205,7 +230,9 @@ def _fetch_file_cached(clean_path: str) -> Optional[str]:
 
 
 def fetch_manim_file(file_path: str) -> str:
-    """Retrieve any file from the Manim GitHub repository by its path.
+    """Retrieve any file from the Manim repository by its path.
+
+    Package files are read from the installed manim when available.
 
     Args:
         file_path: The path relative to the repository root
@@ -219,6 +246,11 @@ def fetch_manim_file(file_path: str) -> str:
     clean = re.sub(r"^(https?://[^/]+/[^/]+/[^/]+/(blob|raw)/[^/]+/)", "", file_path)
     clean = clean.lstrip("/")
 
+    index = get_doc_index()
+    local = index.read_source(clean) if index is not None else None
+    if local is not None:
+        return _truncate(local)
+
     result = _fetch_file_cached(clean)
     if result is not None:
         return result
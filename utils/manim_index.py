@@ -0,0 +1,289 @@
+"""
+Offline Manim documentation index built from the installed ``manim`` package.
+
+Every public class, method and function in the package source is cut into
+a symbol-level chunk (signature plus docstring) and ranked with BM25, so a
+doc lookup returns the handful of relevant symbols instead of whole files.
+The index is persisted next to the other paper2manim caches and rebuilt
+only when the installed Manim version changes, so lookups take
+milliseconds and need no network.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from utils.json_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_INDEX_FORMAT = 1
+_DEFAULT_INDEX_PATH = Path.home() / ".paper2manim" / "manim_doc_index.json"
+
+# BM25 parameters (standard defaults).
+_K1 = 1.2
+_B = 0.75
+# Extra score when a query term names the symbol itself (e.g. "circle" -> Circle).
+_SYMBOL_BONUS = 3.0
+# Extra score for chunks from files registered under the queried topic.
+_PATH_BONUS = 2.0
+
+_MAX_DOCSTRING_CHARS = 2_500
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def _tokenize(text: str) -> list[str]:
+    """Lower-cased words plus their camelCase/snake_case parts."""
+    tokens: list[str] = []
+    for word in _WORD_RE.findall(text):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = [p.lower() for p in _CAMEL_RE.findall(word)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+@dataclass
+class DocChunk:
+    """One indexed symbol: a class, method or module-level function."""
+
+    symbol: str  # qualified name, e.g. "Circle" or "Circle.surround"
+    kind: str  # "class" | "method" | "function"
+    path: str  # source path relative to site-packages, e.g. "manim/mobject/geometry/arc.py"
+    line: int
+    text: str
+
+    def render(self) -> str:
+        return f"# --- {self.path}:{self.line} ({self.kind} {self.symbol}) ---\n{self.text}"
+
+
+# ── Building ──────────────────────────────────────────────────────────
+
+
+def _signature(node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases}):" if bases else f"class {node.name}:"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}:"
+
+
+def _docstring(node: ast.AST) -> str:
+    doc = ast.get_docstring(node) or ""
+    if len(doc) > _MAX_DOCSTRING_CHARS:
+        doc = doc[:_MAX_DOCSTRING_CHARS] + "\n... [truncated]"
+    return doc
+
+
+def _format(signature: str, doc: str) -> str:
+    if not doc:
+        return signature
+    indented = "\n".join(f"    {line}" if line else "" for line in doc.splitlines())
+    return f'{signature}\n    """\n{indented}\n    """'
+
+
+def _chunks_for_module(source: str, rel_path: str) -> list[DocChunk]:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    chunks: list[DocChunk] = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            methods = [
+                item for item in node.body
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and (not item.name.startswith("_") or item.name == "__init__")
+            ]
+            init = next((m for m in methods if m.name == "__init__"), None)
+            header = _signature(node)
+            if init is not None:
+                header += f"\n    {_signature(init)} ..."
+            public = [m.name for m in methods if m.name != "__init__"]
+            text = _format(header, _docstring(node))
+            if public:
+                text += f"\n    # methods: {', '.join(public)}"
+            chunks.append(DocChunk(node.name, "class", rel_path, node.lineno, text))
+            for method in methods:
+                if method.name == "__init__":
+                    continue
+                chunks.append(DocChunk(
+                    f"{node.name}.{method.name}", "method", rel_path, method.lineno,
+                    _format(_signature(method), _docstring(method)),
+                ))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_"):
+            chunks.append(DocChunk(
+                node.name, "function", rel_path, node.lineno,
+                _format(_signature(node), _docstring(node)),
+            ))
+    return chunks
+
+
+def _installed_manim() -> Optional[tuple[Path, str]]:
+    """Return (package directory, version) of the installed manim, without importing it."""
+    try:
+        spec = importlib.util.find_spec("manim")
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    package_dir = Path(next(iter(spec.submodule_search_locations)))
+    try:
+        version = importlib.metadata.version("manim")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    return package_dir, version
+
+
+def build_chunks(package_dir: Path) -> list[DocChunk]:
+    """Walk *package_dir* and return symbol chunks for every public definition."""
+    root = package_dir.parent
+    chunks: list[DocChunk] = []
+    for py_file in sorted(package_dir.rglob("*.py")):
+        if py_file.name.startswith("_") and py_file.name != "__init__.py":
+            continue
+        try:
+            source = py_file.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        chunks.extend(_chunks_for_module(source, py_file.relative_to(root).as_posix()))
+    return chunks
+
+
+# ── Index ─────────────────────────────────────────────────────────────
+
+
+class ManimDocIndex:
+    """BM25 index over :class:`DocChunk` records."""
+
+    def __init__(self, chunks: list[DocChunk], version: str = "", source_root: str = "") -> None:
+        self.chunks = chunks
+        self.version = version
+        self.source_root = source_root
+        self._term_freqs = [Counter(_tokenize(f"{c.symbol} {c.text}")) for c in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_freq: Counter = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        total = len(chunks)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def search(self, query: str, limit: int = 6, paths: list[str] | None = None) -> list[DocChunk]:
+        """Return the top *limit* chunks for *query*, boosting files in *paths*."""
+        terms = set(_tokenize(query))
+        if not terms:
+            return []
+        preferred = set(paths or [])
+        scored: list[tuple[float, int]] = []
+        for i, tf in enumerate(self._term_freqs):
+            score = 0.0
+            norm = _K1 * (1 - _B + _B * self._lengths[i] / (self._avg_length or 1.0))
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (_K1 + 1) / (freq + norm)
+            if score <= 0:
+                continue
+            chunk = self.chunks[i]
+            leaf = chunk.symbol.rsplit(".", 1)[-1].lower()
+            if leaf in terms or chunk.symbol.lower() in terms:
+                score += _SYMBOL_BONUS
+            if chunk.path in preferred:
+                score += _PATH_BONUS
+            scored.append((score, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self.chunks[i] for _, i in scored[:limit]]
+
+    def symbols_in(self, paths: list[str], limit: int = 6) -> list[DocChunk]:
+        """Return the first class/function chunks defined in *paths*."""
+        wanted = set(paths)
+        return [c for c in self.chunks if c.path in wanted and c.kind != "method"][:limit]
+
+    def read_source(self, rel_path: str) -> Optional[str]:
+        """Read a file of the indexed package by its path relative to site-packages."""
+        if not self.source_root:
+            return None
+        root = Path(self.source_root).resolve()
+        target = (root / rel_path).resolve()
+        if root not in target.parents or not target.is_file():
+            return None
+        try:
+            return target.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    # ── persistence ──
+
+    def save(self, path: Path) -> None:
+        """Atomically write the index as compact JSON."""
+        payload = {
+            "format": _INDEX_FORMAT,
+            "version": self.version,
+            "source_root": self.source_root,
+            "chunks": [[c.symbol, c.kind, c.path, c.line, c.text] for c in self.chunks],
+        }
+        write_json_atomic(path, payload, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ManimDocIndex"]:
+        """Load a persisted index; None when missing, corrupt (including malformed rows) or of an old format."""
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(payload, dict) or payload.get("format") != _INDEX_FORMAT:
+            return None
+        try:
+            chunks = [DocChunk(*row) for row in payload.get("chunks", [])]
+        except (TypeError, ValueError):
+            return None
+        return cls(chunks, version=payload.get("version", ""), source_root=payload.get("source_root", ""))
+
+
+def _index_path() -> Path:
+    override = os.getenv("PAPER2MANIM_DOC_INDEX_PATH", "").strip()
+    return Path(override).expanduser() if override else _DEFAULT_INDEX_PATH
+
+
+@lru_cache(maxsize=1)
+def get_doc_index() -> Optional[ManimDocIndex]:
+    """Return the doc index for the installed manim, building it on first use.
+
+    Returns None when manim is not installed; callers then fall back to
+    fetching files from GitHub.
+    """
+    installed = _installed_manim()
+    if installed is None:
+        return None
+    package_dir, version = installed
+    path = _index_path()
+    index = ManimDocIndex.load(path)
+    if index is not None and index.version == version and index.source_root == str(package_dir.parent):
+        return index
+
+    index = ManimDocIndex(build_chunks(package_dir), version=version, source_root=str(package_dir.parent))
+    logger.info("Built Manim doc index: %d symbols from manim %s", len(index.chunks), version)
+    try:
+        index.save(path)
+    except OSError as exc:
+        logger.warning("Could not persist Manim doc index to %s: %s", path, exc)
+    return index
@@ -1,4 +1,5 @@
 import ast
+import json
 import logging
 import os
 import re
@@ -65,16 +66,215 @@ def _default_timeout_for_quality(quality_flag: str) -> int:
         return int(os.getenv("MANIM_RENDER_TIMEOUT_PRODUCTION_SECONDS", "420"))
     return int(os.getenv("MANIM_RENDER_TIMEOUT_SECONDS", "120"))
 
-def dry_run_manim_code(code: str, class_name: str, timeout_seconds: int = 0) -> dict:
+# ── Headless layout probe ───────────────────────────────────────────
+
+# Runs inside a fresh interpreter: imports the scene module, hooks
+# Scene.play/add/remove and records every on-screen mobject's real bounding
+# box after each beat while construct() runs under dry_run (no pixels).
+# Exit status 3 means manim is not importable from this interpreter.
+_PROBE_DRIVER = r'''
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import traceback
+
+scene_path, class_name, trace_path = sys.argv[1:4]
+try:
+    from manim import DL, UR, Scene, Wait, config
+    config.dry_run = True
+    config.disable_caching = True
+    config.verbosity = "ERROR"
+    config.media_dir = os.path.dirname(trace_path)
+except Exception as exc:
+    print(f"layout probe unavailable: {exc}", file=sys.stderr)
+    sys.exit(3)
+
+MAX_MOBJECTS = 40
+beats = []
+names = {}
+clock = [0.0]
+depth = [0]
+
+
+def _caller_line():
+    line = 0
+    frame = inspect.currentframe()
+    while frame is not None:
+        if frame.f_code.co_filename == scene_path:
+            line = line or frame.f_lineno
+            for key, value in frame.f_locals.items():
+                if key != "self" and hasattr(value, "get_corner"):
+                    names.setdefault(id(value), key)
+        frame = frame.f_back
+    return line
+
+
+def _describe(mob):
+    entry = {
+        "id": id(mob),
+        "name": names.get(id(mob), ""),
+        "type": type(mob).__name__,
+        "bbox": None,
+        "z_index": getattr(mob, "z_index", 0),
+        "submobjects": len(getattr(mob, "submobjects", [])),
+    }
+    try:
+        if any(m.has_points() for m in mob.get_family()):
+            dl, ur = mob.get_corner(DL), mob.get_corner(UR)
+            entry["bbox"] = [round(float(v), 3) for v in (dl[0], dl[1], ur[0], ur[1])]
+    except Exception:
+        pass
+    try:
+        entry["color"] = mob.get_color().to_hex()
+    except Exception:
+        pass
+    text = getattr(mob, "text", None) or getattr(mob, "tex_string", None)
+    if isinstance(text, str):
+        entry["text"] = text[:80]
+    return entry
+
+
+def _record(scene, event, line, start):
+    beats.append({
+        "index": len(beats),
+        "event": event,
+        "line": line,
+        "start": round(start, 3),
+        "end": round(clock[0], 3),
+        "mobjects": [_describe(m) for m in list(scene.mobjects)[:MAX_MOBJECTS]],
+    })
+
+
+def _hook(name):
+    original = getattr(Scene, name)
+
+    def wrapper(self, *args, **kwargs):
+        if depth[0]:
+            return original(self, *args, **kwargs)
+        line = _caller_line()
+        start = clock[0]
+        depth[0] += 1
+        try:
+            result = original(self, *args, **kwargs)
+        finally:
+            depth[0] -= 1
+        event = name
+        if name == "play":
+            clock[0] += float(getattr(self, "duration", 0.0) or 0.0)
+            if args and all(isinstance(a, Wait) for a in args):
+                event = "wait"
+        _record(self, event, line, start)
+        return result
+
+    setattr(Scene, name, wrapper)
+
+
+for _name in ("play", "add", "remove"):
+    _hook(_name)
+
+try:
+    sys.path.insert(0, os.path.dirname(scene_path))
+    spec = importlib.util.spec_from_file_location("probed_scene", scene_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    scene = getattr(module, class_name)()
+    scene.render()
+except Exception:
+    traceback.print_exc()
+    sys.exit(1)
+
+with open(trace_path, "w") as f:
+    json.dump({
+        "class_name": class_name,
+        "frame": {"width": float(config.frame_width), "height": float(config.frame_height)},
+        "duration": round(clock[0], 3),
+        "beats": beats,
+    }, f)
+'''
+
+
+def probe_manim_scene(code: str, class_name: str, timeout_seconds: int = 0) -> dict:
+    """Run ``construct()`` headlessly and record real mobject bounding boxes.
+
+    Like ``dry_run_manim_code`` this catches runtime errors without rendering,
+    but it also returns a ``layout_trace``: per beat (play/add/remove) the
+    on-screen mobjects with their bounding boxes, names, colours and the
+    scene clock.  ``probe_unavailable`` is set when manim cannot be imported
+    from this interpreter, so callers can fall back to a plain dry run.
+    """
+    if timeout_seconds <= 0:
+        timeout_seconds = int(os.getenv("MANIM_DRY_RUN_TIMEOUT_SECONDS", "30"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script_path = os.path.join(temp_dir, "scene.py")
+        driver_path = os.path.join(temp_dir, "layout_probe.py")
+        trace_path = os.path.join(temp_dir, "layout_trace.json")
+        with open(script_path, "w") as f:
+            f.write(code)
+        with open(driver_path, "w") as f:
+            f.write(_PROBE_DRIVER)
+
+        cmd = [sys.executable, driver_path, script_path, class_name, trace_path]
+        try:
+            result = subprocess.run(
+                cmd,
+                cwd=temp_dir,
+                capture_output=True,
+                text=True,
+                timeout=timeout_seconds,
+                env=_make_manim_env(),
+            )
+        except subprocess.TimeoutExpired:
+            return {
+                "success": False,
+                "video_path": None,
+                "error": (
+                    f"Dry run timed out after {timeout_seconds}s. "
+                    "Scene likely contains infinite loops or extremely expensive "
+                    "object construction. Simplify geometry and remove costly updaters."
+                ),
+                "error_type": "timeout",
+            }
+        except OSError as e:
+            logger.warning("Layout probe failed to start: %s", e)
+            return {"success": False, "video_path": None, "error": str(e), "probe_unavailable": True}
+
+        if result.returncode == 3:
+            return {"success": False, "video_path": None, "error": result.stderr, "probe_unavailable": True}
+        if result.returncode != 0:
+            return {"success": False, "video_path": None, "error": result.stderr or result.stdout}
+
+        try:
+            with open(trace_path) as f:
+                trace = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Layout probe produced no usable trace: %s", e)
+            return {"success": True, "video_path": None, "error": None}
+        return {"success": True, "video_path": None, "error": None, "layout_trace": trace}
+
+
+def dry_run_manim_code(code: str, class_name: str, timeout_seconds: int = 0, trace_layout: bool = False) -> dict:
     """Validate a Manim scene using --dry_run (no rendering).
 
     Executes ``construct()`` without producing any video, catching Python
     runtime errors, Manim API misuse, and LaTeX compilation failures in
     ~5-10s instead of the 45-240s a full render requires.
 
+    With ``trace_layout`` the headless probe (``probe_manim_scene``) is used
+    instead, adding a ``layout_trace`` of real bounding boxes to the result;
+    it falls back to the plain dry run when the probe is unavailable.
+
     Returns the same shape as ``run_manim_code``, always with
     ``video_path=None`` on success.
     """
+    if trace_layout:
+        probe = probe_manim_scene(code, class_name, timeout_seconds)
+        if not probe.get("probe_unavailable"):
+            return probe
+        logger.info("Layout probe unavailable, falling back to manim --dry_run")
+
     if timeout_seconds <= 0:
         timeout_seconds = int(os.getenv("MANIM_DRY_RUN_TIMEOUT_SECONDS", "30"))
 
@@ -219,8 +419,8 @@ def extract_class_name(code: str) -> str:
             if not isinstance(node, ast.ClassDef):
                 continue
             is_scene = any(
-                (isinstance(b, ast.Name) and b.id in _SCENE_BASES)
-                or (isinstance(b, ast.Attribute) and b.attr in _SCENE_BASES)
+                (isinstance(b, ast.Name) and b.id in SCENE_BASES)
+                or (isinstance(b, ast.Attribute) and b.attr in SCENE_BASES)
                 for b in node.bases
             )
             (scene_classes if is_scene else other_classes).append(node.name)
@@ -239,10 +439,11 @@ _ALLOWED_IMPORTS = {
     "copy", "operator", "string", "textwrap",
 }
 
-_SCENE_BASES = {
+# Manim base classes a generated scene may subclass (shared with layout_analyzer).
+SCENE_BASES = frozenset({
     "Scene", "ThreeDScene", "MovingCameraScene", "ZoomedScene",
     "LinearTransformationScene",
-}
+})
 
 _SINGLE_BACKSLASH_RE = re.compile(
     r'(?<!\\)\\(frac|int|sum|vec|text|sqrt|alpha|beta|gamma|theta|pi|infty|'
@@ -298,7 +499,7 @@ def validate_manim_code(code: str) -> dict:
                     base_name = base.id
                 elif isinstance(base, ast.Attribute):
                     base_name = base.attr
-                if base_name in _SCENE_BASES:
+                if base_name in SCENE_BASES:
                     has_scene = True
                     break
             if has_scene:
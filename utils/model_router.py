@@ -0,0 +1,358 @@
+"""
+Per-stage model routing from live latency, cost and quality telemetry.
+
+Every routed LLM call reports its latency, tokens and estimated cost for
+its (stage, model) pair; the coder adds dry-run outcomes and the pipeline
+adds visual-critique scores.  Rolling windows of these samples are
+persisted in ``~/.paper2manim/model_stats.json`` so they survive across
+runs, and :meth:`ModelRouter.route` uses them to pick between a stage's
+primary and fallback model on every call:
+
+* the primary is kept while it is healthy and meets the configured
+  latency / cost targets;
+* it is swapped for the fallback when its recent latency degrades, its
+  recent calls fail, or it misses a target the fallback meets -- unless the
+  fallback's dry-run pass rate is clearly worse;
+* a model that has not been tried for a while is probed again, so a
+  provider that recovers gets its traffic back.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from statistics import median
+from typing import Any, Optional
+
+from utils.json_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_STATS_FORMAT = 1
+_DEFAULT_STATS_PATH = Path.home() / ".paper2manim" / "model_stats.json"
+
+_WINDOW = 50  # samples kept per (stage, model) and metric
+_RECENT = 5  # latest samples compared against the rest to spot degradation
+_MIN_SAMPLES = 5  # before percentiles and means are trusted
+_DEGRADED_FACTOR = 2.0  # recent median latency vs. baseline median
+_MAX_FAILURE_RATE = 0.5  # over the recent calls
+_PROBE_AFTER_SECONDS = 600.0
+_MAX_PASS_RATE_DROP = 0.25
+_SAVE_INTERVAL_SECONDS = 5.0  # telemetry writes are batched; the remainder is flushed at exit
+
+
+def _window() -> deque:
+    return deque(maxlen=_WINDOW)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def _mean(values: list[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def model_key(config: Any) -> str:
+    """``provider:model`` label for a ``StageModelConfig``."""
+    return f"{config.provider}:{config.model}"
+
+
+@dataclass
+class ModelStats:
+    """Rolling telemetry for one (stage, model) pair."""
+
+    latencies: deque = field(default_factory=_window)  # seconds, successful calls
+    failures: deque = field(default_factory=_window)  # 1 = failed call, 0 = ok
+    passes: deque = field(default_factory=_window)  # 1 = dry run passed
+    scores: deque = field(default_factory=_window)  # visual critique scores
+    costs: deque = field(default_factory=_window)  # USD per call
+    tokens: deque = field(default_factory=_window)  # input + output per call
+    last_call_at: float = 0.0
+
+    @property
+    def p50(self) -> float:
+        return _percentile(list(self.latencies), 50)
+
+    @property
+    def p90(self) -> float:
+        return _percentile(list(self.latencies), 90)
+
+    @property
+    def p95(self) -> float:
+        return _percentile(list(self.latencies), 95)
+
+    @property
+    def pass_rate(self) -> Optional[float]:
+        return _mean(list(self.passes)) if len(self.passes) >= _MIN_SAMPLES else None
+
+    @property
+    def mean_cost(self) -> Optional[float]:
+        return _mean(list(self.costs)) if len(self.costs) >= _MIN_SAMPLES else None
+
+    def degraded(self) -> str:
+        """Reason the model looks unhealthy right now, or "" when it does not."""
+        recent_failures = list(self.failures)[-_RECENT:]
+        if len(recent_failures) >= 3 and _mean(recent_failures) >= _MAX_FAILURE_RATE:
+            return f"{sum(recent_failures)}/{len(recent_failures)} recent calls failed"
+        latencies = list(self.latencies)
+        if len(latencies) >= _MIN_SAMPLES + _RECENT:
+            baseline = median(latencies[:-_RECENT])
+            recent = median(latencies[-_RECENT:])
+            if recent > _DEGRADED_FACTOR * baseline:
+                return f"recent median latency {recent:.1f}s vs {baseline:.1f}s baseline"
+        return ""
+
+    def summary(self) -> dict[str, Any]:
+        pass_rate = _mean(list(self.passes))
+        score = _mean(list(self.scores))
+        cost = _mean(list(self.costs))
+        tokens = _mean(list(self.tokens))
+        return {
+            "calls": len(self.failures),
+            "p50_seconds": round(self.p50, 2),
+            "p95_seconds": round(self.p95, 2),
+            "failure_rate": round(_mean(list(self.failures)) or 0.0, 3),
+            "dry_run_pass_rate": None if pass_rate is None else round(pass_rate, 3),
+            "critique_score": None if score is None else round(score, 3),
+            "cost_usd": None if cost is None else round(cost, 5),
+            "tokens": None if tokens is None else round(tokens),
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "latencies": list(self.latencies),
+            "failures": list(self.failures),
+            "passes": list(self.passes),
+            "scores": list(self.scores),
+            "costs": list(self.costs),
+            "tokens": list(self.tokens),
+            "last_call_at": self.last_call_at,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> "ModelStats":
+        stats = cls(last_call_at=float(payload.get("last_call_at") or 0.0))
+        for name in ("latencies", "failures", "passes", "scores", "costs", "tokens"):
+            getattr(stats, name).extend(payload.get(name) or [])
+        return stats
+
+
+class ModelRouter:
+    """Chooses between a stage's primary and fallback model from telemetry."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        enabled: bool = True,
+        latency_target: float = 0.0,
+        cost_target: float = 0.0,
+    ) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.latency_target = latency_target  # p95 seconds; 0 = no target
+        self.cost_target = cost_target  # mean USD per call; 0 = no target
+        self._stats: dict[str, dict[str, ModelStats]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # serializes writers so an older snapshot never lands last
+        self._dirty = False
+        self._last_save = float("-inf")
+        self._local = threading.local()
+
+    def stats(self, stage: str, key: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(stage, {}).setdefault(key, ModelStats())
+
+    # ── telemetry ──
+
+    def record_call(
+        self,
+        stage: str,
+        config: Any,
+        seconds: float,
+        *,
+        ok: bool,
+        tokens: int = 0,
+        cost: float = 0.0,
+    ) -> None:
+        key = model_key(config)
+        stats = self.stats(stage, key)
+        with self._lock:
+            stats.failures.append(0 if ok else 1)
+            stats.last_call_at = time.time()
+            if ok:
+                stats.latencies.append(round(seconds, 3))
+                stats.tokens.append(tokens)
+                stats.costs.append(round(cost, 6))
+            self._dirty = True
+        if ok:
+            self._remember(stage, key)
+        self._save_if_due()
+
+    def _remember(self, stage: str, key: str) -> None:
+        last = getattr(self._local, "last", None) or {}
+        last[stage] = key
+        self._local.last = last
+
+    def note_model(self, stage: str, trace: Any) -> None:
+        """Mark the model in *trace* as this thread's latest for *stage*.
+
+        Needed when the call ran on a worker thread, e.g. a hedged request.
+        """
+        self._remember(stage, model_key(trace))
+
+    def last_model(self, stage: str) -> str:
+        """Model that served this thread's latest successful *stage* call."""
+        return (getattr(self._local, "last", None) or {}).get(stage, "")
+
+    def record_outcome(
+        self,
+        stage: str,
+        model: str = "",
+        *,
+        passed: Optional[bool] = None,
+        score: Optional[float] = None,
+    ) -> None:
+        """Attribute a dry-run result or critique score to *model* (default: this thread's last)."""
+        key = model or self.last_model(stage)
+        if not key:
+            return
+        stats = self.stats(stage, key)
+        with self._lock:
+            if passed is not None:
+                stats.passes.append(1 if passed else 0)
+            if score is not None:
+                stats.scores.append(round(float(score), 3))
+            self._dirty = True
+        self._save_if_due()
+
+    # ── routing ──
+
+    def _miss(self, stats: ModelStats) -> str:
+        """Why *stats* should not take the next call, or "" when it may."""
+        if stats.last_call_at and time.time() - stats.last_call_at > _PROBE_AFTER_SECONDS:
+            return ""  # stale data: probe again
+        reason = stats.degraded()
+        if reason:
+            return reason
+        if self.latency_target and len(stats.latencies) >= _MIN_SAMPLES and stats.p95 > self.latency_target:
+            return f"p95 latency {stats.p95:.1f}s over {self.latency_target:.1f}s target"
+        mean_cost = stats.mean_cost
+        if self.cost_target and mean_cost is not None and mean_cost > self.cost_target:
+            return f"mean cost ${mean_cost:.4f} over ${self.cost_target:.4f} target"
+        return ""
+
+    def route(self, stage: str, primary: Any, fallback: Any | None) -> tuple[Any, Any | None]:
+        """Return the (primary, fallback) pair to use for the next *stage* call."""
+        if not self.enabled or fallback is None:
+            return primary, fallback
+        primary_stats = self.stats(stage, model_key(primary))
+        reason = self._miss(primary_stats)
+        if not reason:
+            return primary, fallback
+        fallback_stats = self.stats(stage, model_key(fallback))
+        if self._miss(fallback_stats):
+            return primary, fallback
+        primary_pass, fallback_pass = primary_stats.pass_rate, fallback_stats.pass_rate
+        if primary_pass is not None and fallback_pass is not None and fallback_pass < primary_pass - _MAX_PASS_RATE_DROP:
+            return primary, fallback
+        logger.info("Routing %s to %s: %s has %s", stage, model_key(fallback), model_key(primary), reason)
+        return fallback, primary
+
+    def hedge_delay(self, stage: str, config: Any) -> Optional[float]:
+        """p90 latency of *config* for *stage*, once enough calls were observed."""
+        stats = self.stats(stage, model_key(config))
+        if len(stats.latencies) < _MIN_SAMPLES:
+            return None
+        return stats.p90
+
+    def summary(self) -> dict[str, dict[str, dict[str, Any]]]:
+        with self._lock:
+            return {
+                stage: {key: stats.summary() for key, stats in models.items()}
+                for stage, models in self._stats.items()
+            }
+
+    # ── persistence ──
+
+    def _save_if_due(self) -> None:
+        """Persist at most once per ``_SAVE_INTERVAL_SECONDS``; later samples wait for the next save."""
+        with self._lock:
+            now = time.monotonic()
+            due = self._dirty and now - self._last_save >= _SAVE_INTERVAL_SECONDS
+            if due:
+                self._last_save = now
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """Atomically persist unsaved telemetry (no-op without a path)."""
+        if self.path is None:
+            return
+        with self._save_lock:
+            # Snapshot under the router lock; the file I/O happens outside it.
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = {
+                    "format": _STATS_FORMAT,
+                    "stages": {
+                        stage: {key: stats.to_dict() for key, stats in models.items()}
+                        for stage, models in self._stats.items()
+                    },
+                }
+                self._dirty = False
+                self._last_save = time.monotonic()
+            try:
+                write_json_atomic(self.path, payload, separators=(",", ":"))
+            except OSError as exc:
+                logger.warning("Could not persist model stats to %s: %s", self.path, exc)
+
+    def load(self) -> None:
+        """Merge persisted telemetry from :attr:`path`, ignoring missing or corrupt files."""
+        if self.path is None:
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("format") != _STATS_FORMAT:
+            return
+        with self._lock:
+            for stage, models in (payload.get("stages") or {}).items():
+                for key, stats in (models or {}).items():
+                    self._stats.setdefault(stage, {})[key] = ModelStats.from_dict(stats)
+
+
+def _env_float(name: str, default: float = 0.0) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@lru_cache(maxsize=1)
+def get_model_router() -> ModelRouter:
+    """Process-wide router configured from ``PAPER2MANIM_MODEL_ROUTER*`` env vars."""
+    override = os.getenv("PAPER2MANIM_MODEL_STATS_PATH", "").strip()
+    router = ModelRouter(
+        Path(override).expanduser() if override else _DEFAULT_STATS_PATH,
+        enabled=os.getenv("PAPER2MANIM_MODEL_ROUTER", "1").strip().lower() not in {"0", "false", "no", "off"},
+        latency_target=_env_float("PAPER2MANIM_ROUTER_LATENCY_TARGET"),
+        cost_target=_env_float("PAPER2MANIM_ROUTER_COST_TARGET"),
+    )
+    router.load()
+    atexit.register(router.save)
+    return router
@@ -0,0 +1,105 @@
+"""
+Disk cache of validated planner stage outputs.
+
+Most runs re-plan a concept seen before, often with only a different video
+length, audience or quality mode.  Each planner stage's validated output is
+stored under ``~/.paper2manim/planner_cache`` keyed by a hash of the stage
+name, the inputs the stage actually consumes (normalized concept, the
+preferences relevant to it, and the upstream stage outputs it builds on),
+the model and the planner prompt version.  Because upstream outputs are part
+of a stage's key, a changed input invalidates exactly the stages downstream
+of it while earlier stages are still served from disk.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Optional
+
+from utils.json_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_concept(concept: str) -> str:
+    """Case- and whitespace-insensitive form of a concept."""
+    return _WHITESPACE_RE.sub(" ", concept).strip().lower()
+
+
+class PlannerCache:
+    """Planner stage outputs as JSON files, one per (stage, inputs) key.
+
+    With ``refresh`` set, lookups always miss but results are still written,
+    so a refreshed run repopulates the cache for the next one.
+    """
+
+    def __init__(self, directory: str, *, enabled: bool = True, refresh: bool = False) -> None:
+        self.directory = directory
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(stage: str, *, model: str, version: int, **inputs: Any) -> str:
+        payload = {"stage": stage, "model": model, "version": version, "inputs": inputs}
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.directory, f"{stage}-{key}.json")
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Return the cached value for *key*, or None on a miss, refresh or corrupt entry."""
+        if not self.enabled:
+            return None
+        value = None
+        if not self.refresh:
+            try:
+                with open(self._path(stage, key), encoding="utf-8") as fh:
+                    entry = json.load(fh)
+                if isinstance(entry, dict) and entry.get("key") == key:
+                    value = entry.get("value")
+            except (OSError, ValueError):
+                pass
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        """Atomically store *value* (no-op when disabled)."""
+        if not self.enabled:
+            return
+        try:
+            write_json_atomic(self._path(stage, key), {"key": key, "stage": stage, "value": value})
+        except OSError as exc:
+            logger.warning("Could not write planner cache entry: %s", exc)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=1)
+def get_planner_cache() -> PlannerCache:
+    """Process-wide cache configured from ``PAPER2MANIM_PLANNER_CACHE*`` env vars."""
+    directory = os.getenv("PAPER2MANIM_PLANNER_CACHE_DIR", "").strip() or os.path.join(
+        os.path.expanduser("~"), ".paper2manim", "planner_cache"
+    )
+    return PlannerCache(
+        os.path.expanduser(directory),
+        enabled=os.getenv("PAPER2MANIM_PLANNER_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"},
+        refresh=os.getenv("PAPER2MANIM_PLANNER_CACHE_REFRESH", "0").strip().lower() in {"1", "true", "yes", "on"},
+    )
@@ -0,0 +1,43 @@
+"""
+Cache-friendly prompt assembly.
+
+Provider prompt caches (OpenAI prefix caching, Anthropic ``cache_control``
+breakpoints) only reuse an exact prefix of a request, so a segment-specific
+line placed early invalidates everything after it.  :class:`PromptLayout`
+orders prompt content from most- to least-shared:
+
+1. ``instructions`` -- global system instructions, identical for every call of a stage;
+2. ``reference`` -- prefetched docs and golden scenes, shared by segments needing the same APIs;
+3. ``project`` -- theme and palette, shared by every segment of one project;
+4. ``segment`` -- the segment spec, class name, timing and tool budget (the user message).
+
+Each system tier becomes one section, and ``llm_provider`` places a cache
+breakpoint at the end of each, so a segment that differs only in its spec
+still reuses the first three tiers.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PromptLayout:
+    """Prompt content grouped into tiers, most-shared first."""
+
+    instructions: list[str] = field(default_factory=list)
+    reference: list[str] = field(default_factory=list)
+    project: list[str] = field(default_factory=list)
+    segment: list[str] = field(default_factory=list)
+
+    @staticmethod
+    def _join(parts: list[str]) -> str:
+        return "\n\n".join(part.strip() for part in parts if part and part.strip())
+
+    def system_sections(self) -> list[str]:
+        """One section per non-empty system tier, in cache order."""
+        tiers = (self.instructions, self.reference, self.project)
+        return [text for text in (self._join(tier) for tier in tiers) if text]
+
+    def user_message(self) -> str:
+        return self._join(self.segment) + "\n"
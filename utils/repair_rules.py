@@ -0,0 +1,374 @@
+"""Deterministic local fixes for recurring Manim/LaTeX failures.
+
+Most dry-run failures are the same handful of mistakes: LaTeX commands in
+non-raw strings (``"\\frac"`` is a form feed plus ``rac``), kwargs Manim no
+longer accepts, colour constants that do not exist, and missing imports.
+Each used to cost a full LLM repair round trip.  Here stderr is normalised
+into an :class:`ErrorSignature`; known signatures are rewritten in place and
+re-validated locally, and only unknown ones escalate to the LLM.  Every
+outcome is recorded in a small on-disk knowledge base so hit rates can be
+tracked across runs.
+"""
+
+from __future__ import annotations
+
+import ast
+import atexit
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tokenize
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional
+
+from utils.json_store import write_json_atomic
+from utils.manim_runner import _SINGLE_BACKSLASH_RE, validate_manim_code
+
+logger = logging.getLogger(__name__)
+
+
+# ── Error signatures ─────────────────────────────────────────────────
+
+_SCENE_LINE_RES = (
+    re.compile(r'scene\.py", line (\d+)'),
+    re.compile(r"scene\.py:(\d+)"),
+)
+_NAME_ERROR_RE = re.compile(r"NameError: name '(\w+)' is not defined")
+_KWARG_ERROR_RE = re.compile(r"unexpected keyword argument '(\w+)'")
+_ATTRIBUTE_ERROR_RE = re.compile(r"AttributeError: .*has no attribute '(\w+)'")
+_LATEX_MARKERS = ("latex error", "latex compilation", "tex_to_svg", "undefined control sequence", "missing $ inserted")
+_EXCEPTION_RE = re.compile(r"^\s*(\w+(?:Error|Exception))\b", re.MULTILINE)
+
+
+@dataclass
+class ErrorSignature:
+    """A normalised description of a failure, stable across runs."""
+
+    kind: str
+    detail: str = ""
+    line: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.detail}" if self.detail else self.kind
+
+
+def error_signature(error: str) -> ErrorSignature:
+    """Normalise dry-run stderr into an :class:`ErrorSignature`."""
+    text = error or ""
+    line = None
+    for pattern in _SCENE_LINE_RES:
+        hits = pattern.findall(text)
+        if hits:
+            line = int(hits[-1])
+            break
+
+    match = _NAME_ERROR_RE.search(text)
+    if match:
+        return ErrorSignature("name-error", match.group(1), line)
+    match = _KWARG_ERROR_RE.search(text)
+    if match:
+        return ErrorSignature("unexpected-kwarg", match.group(1), line)
+    if any(marker in text.lower() for marker in _LATEX_MARKERS):
+        return ErrorSignature("latex", "", line)
+    match = _ATTRIBUTE_ERROR_RE.search(text)
+    if match:
+        return ErrorSignature("attribute-error", match.group(1), line)
+    exceptions = _EXCEPTION_RE.findall(text)
+    if exceptions:
+        return ErrorSignature(exceptions[-1].lower(), "", line)
+    return ErrorSignature("unknown", "", line)
+
+
+# ── Source rewriting helpers ─────────────────────────────────────────
+
+def _offsets(code: str) -> list[int]:
+    """Start offset of each 1-based line (index 0 unused)."""
+    starts = [0, 0]
+    for line in code.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def _splice(code: str, edits: list[tuple[int, int, str]]) -> str:
+    """Apply non-overlapping (start, end, replacement) offset edits."""
+    for start, end, replacement in sorted(edits, reverse=True):
+        code = code[:start] + replacement + code[end:]
+    return code
+
+
+def _rename_names(code: str, renames: dict[str, str]) -> str:
+    """Rename NAME tokens (not attributes, strings or comments)."""
+    starts = _offsets(code)
+    edits = []
+    previous = None
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type == tokenize.NAME and tok.string in renames and not (previous and previous.string == "."):
+            start = starts[tok.start[0]] + tok.start[1]
+            edits.append((start, start + len(tok.string), renames[tok.string]))
+        if tok.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT):
+            previous = tok
+    return _splice(code, edits)
+
+
+def _insert_import(code: str, statement: str) -> str:
+    """Insert *statement* after the last top-level import (or at the top)."""
+    tree = ast.parse(code)
+    last = 0
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            last = node.end_lineno or node.lineno
+        elif not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)):
+            break
+    lines = code.splitlines(keepends=True)
+    lines.insert(last, statement + "\n")
+    return "".join(lines)
+
+
+# ── Rules ────────────────────────────────────────────────────────────
+
+_MODULE_IMPORTS = {
+    "np": "import numpy as np",
+    "numpy": "import numpy",
+    "math": "import math",
+    "random": "import random",
+    "itertools": "import itertools",
+    "functools": "import functools",
+}
+# Names from older Manim releases and their Community Edition replacements.
+_RENAMED_NAMES = {
+    "ShowCreation": "Create",
+    "TexMobject": "MathTex",
+    "TextMobject": "Tex",
+    "ShowCreationThenFadeOut": "ShowPassingFlash",
+}
+# Colour constants models invent, mapped to the nearest Manim palette entry.
+_COLOR_ALIASES = {
+    "CYAN": "TEAL",
+    "MAGENTA": "PINK",
+    "VIOLET": "PURPLE",
+    "LIME": "GREEN_B",
+    "NAVY": "BLUE_E",
+    "SKY_BLUE": "BLUE_B",
+    "CRIMSON": "RED_E",
+    "AMBER": "GOLD",
+    "BROWN": "DARK_BROWN",
+}
+_COLOR_BASES = {"BLUE", "TEAL", "GREEN", "YELLOW", "GOLD", "RED", "MAROON", "PURPLE", "GRAY", "GREY", "PINK"}
+_SHADE_RE = re.compile(r"^(LIGHT|LIGHTER|DARK|DARKER|PALE|DEEP|BRIGHT)_([A-Z]+)$")
+_KWARG_RENAMES = {"size": "font_size", "text_size": "font_size"}
+
+
+def _color_for(name: str) -> Optional[str]:
+    if name in _COLOR_ALIASES:
+        return _COLOR_ALIASES[name]
+    match = _SHADE_RE.match(name)
+    if match and match.group(2) in _COLOR_BASES:
+        return f"{match.group(2)}_{'B' if match.group(1) in ('LIGHT', 'LIGHTER', 'PALE', 'BRIGHT') else 'E'}"
+    return None
+
+
+def _fix_name_error(code: str, sig: ErrorSignature) -> Optional[tuple[str, str]]:
+    name = sig.detail
+    if name in _MODULE_IMPORTS:
+        return _insert_import(code, _MODULE_IMPORTS[name]), f"added `{_MODULE_IMPORTS[name]}`"
+    if name in _RENAMED_NAMES:
+        return _rename_names(code, {name: _RENAMED_NAMES[name]}), f"renamed {name} -> {_RENAMED_NAMES[name]}"
+    color = _color_for(name)
+    if color:
+        return _rename_names(code, {name: color}), f"replaced unknown colour {name} with {color}"
+    if "from manim import *" not in code and name[:1].isupper():
+        return _insert_import(code, "from manim import *"), "added `from manim import *`"
+    return None
+
+
+def _fix_unexpected_kwarg(code: str, sig: ErrorSignature) -> Optional[tuple[str, str]]:
+    kwarg = sig.detail
+    tree = ast.parse(code)
+    starts = _offsets(code)
+    if sig.line is None:
+        return None  # without the failing line the keyword may be valid elsewhere
+    targets = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if not (node.lineno <= sig.line <= (node.end_lineno or node.lineno)):
+            continue
+        targets.extend((node, kw) for kw in node.keywords if kw.arg == kwarg)
+    if not targets:
+        return None
+
+    edits = []
+    for _call, kw in targets:
+        start = starts[kw.lineno] + kw.col_offset
+        end = starts[kw.end_lineno] + kw.end_col_offset
+        if kwarg in _KWARG_RENAMES:
+            edits.append((start, start + len(kwarg), _KWARG_RENAMES[kwarg]))
+            continue
+        # Drop the keyword together with the comma that separates it.
+        before = code[:start].rstrip()
+        if before.endswith(","):
+            edits.append((len(before) - 1, end, ""))
+        else:
+            after = code[end:]
+            stripped = after.lstrip()
+            if stripped.startswith(","):
+                end += len(after) - len(stripped) + 1
+                end += len(code[end:]) - len(code[end:].lstrip(" "))
+            edits.append((start, end, ""))
+    if kwarg in _KWARG_RENAMES:
+        return _splice(code, edits), f"renamed keyword {kwarg}= -> {_KWARG_RENAMES[kwarg]}="
+    return _splice(code, edits), f"removed unsupported keyword {kwarg}="
+
+
+def _fix_latex(code: str, sig: ErrorSignature) -> Optional[tuple[str, str]]:
+    """Double single backslashes before LaTeX commands in non-raw strings."""
+    starts = _offsets(code)
+    edits = []
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type != tokenize.STRING:
+            continue
+        prefix = tok.string[: len(tok.string) - len(tok.string.lstrip("rRbBuUfF"))]
+        if "r" in prefix.lower():
+            continue
+        fixed = _SINGLE_BACKSLASH_RE.sub(lambda m: "\\\\" + m.group(1), tok.string)
+        if fixed != tok.string:
+            start = starts[tok.start[0]] + tok.start[1]
+            end = starts[tok.end[0]] + tok.end[1]
+            edits.append((start, end, fixed))
+    if not edits:
+        return None
+    return _splice(code, edits), f"escaped LaTeX backslashes in {len(edits)} string(s)"
+
+
+_RULES: dict[str, Callable[[str, ErrorSignature], Optional[tuple[str, str]]]] = {
+    "name-error": _fix_name_error,
+    "unexpected-kwarg": _fix_unexpected_kwarg,
+    "latex": _fix_latex,
+}
+
+
+# ── Knowledge base ───────────────────────────────────────────────────
+
+_SAVE_INTERVAL_SECONDS = 5.0  # writes are batched; the remainder is flushed at exit
+
+
+class ErrorKnowledgeBase:
+    """Per-signature counts of local fixes vs LLM escalations, persisted as JSON."""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # serializes writers so an older snapshot never lands last
+        self._dirty = False
+        self._last_save = float("-inf")
+        self._entries: dict[str, dict] = {}
+        if path and os.path.isfile(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f).get("signatures", {})
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable error knowledge base %s: %s", path, e)
+
+    def record(self, signature: ErrorSignature, rule: str = "") -> None:
+        """Count one occurrence; *rule* names the local fix, or "" if escalated."""
+        with self._lock:
+            entry = self._entries.setdefault(signature.key, {"seen": 0, "auto_fixed": 0, "escalated": 0})
+            entry["seen"] += 1
+            entry["auto_fixed" if rule else "escalated"] += 1
+            if rule:
+                entry["rule"] = rule
+            entry["last_seen"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self._dirty = True
+        self._save_if_due()
+
+    def stats(self) -> dict:
+        with self._lock:
+            seen = sum(e["seen"] for e in self._entries.values())
+            fixed = sum(e["auto_fixed"] for e in self._entries.values())
+            return {
+                "seen": seen,
+                "auto_fixed": fixed,
+                "hit_rate": round(fixed / seen, 3) if seen else 0.0,
+                "signatures": {key: dict(entry) for key, entry in self._entries.items()},
+            }
+
+    def _save_if_due(self) -> None:
+        """Persist at most once per ``_SAVE_INTERVAL_SECONDS``; later records wait for the next save."""
+        with self._lock:
+            now = time.monotonic()
+            due = self._dirty and now - self._last_save >= _SAVE_INTERVAL_SECONDS
+            if due:
+                self._last_save = now
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """Atomically persist unsaved counts (no-op without a path)."""
+        if not self.path:
+            return
+        with self._save_lock:
+            # Snapshot under the lock; the file I/O happens outside it.
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = {"signatures": {key: dict(entry) for key, entry in self._entries.items()}}
+                self._dirty = False
+                self._last_save = time.monotonic()
+            try:
+                write_json_atomic(self.path, payload, indent=2, sort_keys=True)
+            except OSError as e:
+                logger.warning("Could not persist error knowledge base: %s", e)
+
+
+@lru_cache(maxsize=1)
+def get_error_kb() -> ErrorKnowledgeBase:
+    """Process-wide knowledge base at ``PAPER2MANIM_ERROR_KB_PATH``."""
+    default = os.path.join(os.path.expanduser("~"), ".paper2manim", "error_signatures.json")
+    kb = ErrorKnowledgeBase(os.getenv("PAPER2MANIM_ERROR_KB_PATH", default))
+    atexit.register(kb.save)
+    return kb
+
+
+# ── Entry point ──────────────────────────────────────────────────────
+
+@dataclass
+class AutoFix:
+    """A locally repaired script."""
+
+    code: str
+    signature: ErrorSignature
+    rule: str
+    description: str
+
+
+def try_auto_fix(code: str, error: str, kb: ErrorKnowledgeBase | None = None) -> Optional[AutoFix]:
+    """Repair *code* for a known error signature without calling an LLM.
+
+    The rewrite must change the code and pass ``validate_manim_code``;
+    otherwise None is returned and the caller should escalate.  The outcome
+    is recorded in *kb* (the process-wide knowledge base by default).
+    """
+    kb = kb if kb is not None else get_error_kb()
+    sig = error_signature(error)
+    rule = _RULES.get(sig.kind)
+    fixed: Optional[tuple[str, str]] = None
+    if rule is not None:
+        try:
+            fixed = rule(code, sig)
+        except (SyntaxError, tokenize.TokenError, ValueError) as e:
+            logger.debug("Auto-fix rule %s failed on %s: %s", sig.kind, sig.key, e)
+    if fixed is not None:
+        new_code, description = fixed
+        if new_code == code or validate_manim_code(new_code)["errors"]:
+            fixed = None
+    if fixed is None:
+        kb.record(sig)
+        return None
+    kb.record(sig, rule=sig.kind)
+    return AutoFix(code=new_code, signature=sig, rule=sig.kind, description=description)
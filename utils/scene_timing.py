@@ -0,0 +1,195 @@
+"""Cheap, LLM-free re-timing of generated Manim scenes.
+
+Generated scenes end with one or more ``self.wait(...)`` calls that hold the
+final frame while narration finishes.  When the narration length changes
+after code was written (e.g. code generated speculatively from an estimated
+duration), those trailing waits can be stretched or shrunk in place instead
+of regenerating the scene.
+
+The scene's runtime itself is predicted from its timeline (``play`` run
+times, waits and Manim's defaults) so the ending can be fitted to the
+narration before rendering, rather than padded or trimmed at stitch time.
+"""
+
+from __future__ import annotations
+
+import ast
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.layout_analyzer import _find_construct, analyze_scene_layout
+
+logger = logging.getLogger(__name__)
+
+# ``self.wait()`` with no argument waits Manim's default of 1 second.
+_DEFAULT_WAIT_SECONDS = 1.0
+# Never shrink a trailing wait below this; the final frame needs to register.
+_MIN_TRAILING_WAIT_SECONDS = 0.5
+# Predicted runtimes this close to the narration are left alone.
+_FIT_TOLERANCE_SECONDS = 0.1
+
+
+def _wait_seconds(stmt: ast.stmt) -> Optional[float]:
+    """Return the literal duration of a ``self.wait(...)`` statement, else None."""
+    if not isinstance(stmt, ast.Expr) or not isinstance(stmt.value, ast.Call):
+        return None
+    call = stmt.value
+    func = call.func
+    if not (
+        isinstance(func, ast.Attribute)
+        and func.attr == "wait"
+        and isinstance(func.value, ast.Name)
+        and func.value.id == "self"
+    ):
+        return None
+    if call.keywords and not (len(call.keywords) == 1 and call.keywords[0].arg == "duration"):
+        return None
+    if not call.args and not call.keywords:
+        return _DEFAULT_WAIT_SECONDS
+    arg = call.args[0] if call.args else call.keywords[0].value
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, (int, float)):
+        return float(arg.value)
+    return None
+
+
+def _trailing_waits(construct: ast.FunctionDef) -> list[tuple[ast.stmt, float]]:
+    """Return the run of literal ``self.wait(...)`` calls ending construct, last first."""
+    trailing: list[tuple[ast.stmt, float]] = []
+    for stmt in reversed(construct.body):
+        seconds = _wait_seconds(stmt)
+        if seconds is None:
+            break
+        trailing.append((stmt, seconds))
+    return trailing
+
+
+def _trailing_wait_total(code: str) -> float:
+    try:
+        construct = _find_construct(ast.parse(code))
+    except SyntaxError:
+        return 0.0
+    if construct is None:
+        return 0.0
+    return sum(seconds for _, seconds in _trailing_waits(construct))
+
+
+def adjust_trailing_wait(code: str, delta_seconds: float) -> Optional[str]:
+    """Lengthen or shorten the end of ``construct`` by *delta_seconds*.
+
+    A positive delta extends the last trailing ``self.wait`` (or appends one);
+    a negative delta shrinks trailing waits, last first, down to a short
+    minimum hold.  Returns the adjusted code, or None when the scene cannot
+    be parsed or there is nothing to shrink.  A partial shrink is returned
+    when the trailing waits cannot absorb the full delta.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    construct = _find_construct(tree)
+    if construct is None or not construct.body:
+        return None
+
+    lines = code.splitlines()
+    last = construct.body[-1]
+    indent = lines[last.lineno - 1][: last.col_offset]
+
+    trailing = _trailing_waits(construct)
+
+    def _replace(stmt: ast.stmt, seconds: float) -> None:
+        lines[stmt.lineno - 1: stmt.end_lineno] = [f"{indent}self.wait({seconds:.2f})"]
+
+    if delta_seconds >= 0:
+        if trailing:
+            stmt, seconds = trailing[0]
+            _replace(stmt, seconds + delta_seconds)
+        else:
+            lines.insert(last.end_lineno, f"{indent}self.wait({delta_seconds:.2f})")
+    else:
+        remaining = -delta_seconds
+        changed = False
+        # trailing is last-first, so line numbers of earlier entries stay valid.
+        for stmt, seconds in trailing:
+            if remaining <= 0:
+                break
+            shrink = min(remaining, seconds - _MIN_TRAILING_WAIT_SECONDS)
+            if shrink <= 0:
+                continue
+            _replace(stmt, seconds - shrink)
+            remaining -= shrink
+            changed = True
+        if not changed:
+            return None
+        if remaining > 0:
+            logger.info("Trailing waits could only absorb %.2fs of %.2fs", -delta_seconds - remaining, -delta_seconds)
+
+    adjusted = "\n".join(lines)
+    if code.endswith("\n"):
+        adjusted += "\n"
+    return adjusted
+
+
+# ── Timeline estimation ──────────────────────────────────────────────
+
+
+@dataclass
+class DurationFit:
+    """A scene whose ending was re-timed to match its narration."""
+
+    code: str
+    estimated_seconds: float
+    fitted_seconds: float
+    layout_trace: Optional[dict] = None
+
+
+def estimate_scene_duration(code: str, layout_trace: dict | None = None) -> Optional[float]:
+    """Predict how long the scene runs without rendering it.
+
+    Uses the headless probe's scene clock when a ``layout_trace`` is given,
+    otherwise the static timeline (``play`` run times, ``wait`` durations and
+    Manim's 1s defaults, group ``lag_ratio`` offsets).  Returns None when any
+    part of the timeline depends on values only known at runtime, so callers
+    never re-time a scene from a partial estimate.
+    """
+    if layout_trace and layout_trace.get("duration") is not None:
+        return float(layout_trace["duration"])
+    return analyze_scene_layout(code).total_duration
+
+
+def fit_scene_to_duration(
+    code: str,
+    target_seconds: float,
+    layout_trace: dict | None = None,
+) -> Optional[DurationFit]:
+    """Stretch or shrink the scene's trailing waits so it runs *target_seconds*.
+
+    Returns None when no change is needed or possible: the target is unknown,
+    the runtime cannot be predicted, it is already within tolerance, or there
+    is nothing to shrink.  A given ``layout_trace`` is returned with its clock
+    shifted by the applied change, since only the final hold moves.
+    """
+    if target_seconds <= 0:
+        return None
+    estimated = estimate_scene_duration(code, layout_trace)
+    if estimated is None or abs(target_seconds - estimated) <= _FIT_TOLERANCE_SECONDS:
+        return None
+    adjusted = adjust_trailing_wait(code, target_seconds - estimated)
+    if adjusted is None:
+        return None
+    applied = _trailing_wait_total(adjusted) - _trailing_wait_total(code)
+    fitted = estimated + applied
+
+    trace = None
+    if layout_trace:
+        trace = dict(layout_trace)
+        trace["duration"] = round(fitted, 3)
+        beats = list(trace.get("beats") or [])
+        if beats:
+            last = dict(beats[-1])
+            last["end"] = round(max(last.get("start", 0.0), last.get("end", 0.0) + applied), 3)
+            beats[-1] = last
+            trace["beats"] = beats
+    return DurationFit(code=adjusted, estimated_seconds=round(estimated, 2),
+                       fitted_seconds=round(fitted, 2), layout_trace=trace)
+
@@ -0,0 +1,100 @@
+"""Typed resource slots for scheduling pipeline stages.
+
+Each segment runs as a chain of stages (TTS -> code -> verify -> render ->
+critique -> stitch).  Instead of bounding whole segment workers, every stage
+acquires a slot of the resource it actually consumes before running:
+
+* ``llm``    — code generation, verification and critique calls
+* ``render`` — CPU-heavy Manim HD renders
+* ``ffmpeg`` — stitching audio onto video
+* ``tts``    — voiceover synthesis
+
+So a segment stuck in a slow render holds a render slot only, and other
+segments' LLM stages keep running.  Per-stage queue-wait and run time are
+recorded for the pipeline summary.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+RESOURCE_LLM = "llm"
+RESOURCE_RENDER = "render"
+RESOURCE_FFMPEG = "ffmpeg"
+RESOURCE_TTS = "tts"
+
+_ENV_LIMITS = {
+    RESOURCE_LLM: ("PAPER2MANIM_LLM_SLOTS", 5),
+    RESOURCE_RENDER: ("PAPER2MANIM_RENDER_SLOTS", max(1, (os.cpu_count() or 2) // 2)),
+    RESOURCE_FFMPEG: ("PAPER2MANIM_FFMPEG_SLOTS", 2),
+    # Separate from GEMINI_TTS_MAX_CONCURRENCY, which bounds sessions inside the TTS loop.
+    RESOURCE_TTS: ("PAPER2MANIM_TTS_SLOTS", 4),
+}
+
+
+def default_resource_limits() -> dict[str, int]:
+    """Return slot counts per resource, honouring the ``*_SLOTS`` env overrides."""
+    limits: dict[str, int] = {}
+    for resource, (env_var, default) in _ENV_LIMITS.items():
+        try:
+            limits[resource] = max(1, int(os.getenv(env_var, str(default))))
+        except ValueError:
+            limits[resource] = default
+    return limits
+
+
+class StageScheduler:
+    """Bounded slots per resource type plus per-stage wait/run accounting."""
+
+    def __init__(self, limits: dict[str, int] | None = None) -> None:
+        self.limits = dict(limits or default_resource_limits())
+        self._slots = {name: threading.BoundedSemaphore(count) for name, count in self.limits.items()}
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    @contextmanager
+    def slot(self, resource: str, stage: str) -> Iterator[None]:
+        """Hold one *resource* slot while running *stage*.
+
+        Stages must not nest slots; each acquires exactly the one resource it
+        uses, which keeps the scheduler deadlock-free.
+        """
+        semaphore = self._slots[resource]
+        queued_at = time.perf_counter()
+        semaphore.acquire()
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished_at = time.perf_counter()
+            semaphore.release()
+            self._record(stage, resource, started_at - queued_at, finished_at - started_at)
+
+    def _record(self, stage: str, resource: str, wait: float, run: float) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(stage, {
+                "resource": resource,
+                "count": 0,
+                "queue_wait_seconds": 0.0,
+                "run_seconds": 0.0,
+                "max_queue_wait_seconds": 0.0,
+            })
+            entry["count"] += 1
+            entry["queue_wait_seconds"] += wait
+            entry["run_seconds"] += run
+            entry["max_queue_wait_seconds"] = max(entry["max_queue_wait_seconds"], wait)
+
+    def stats(self) -> dict[str, dict]:
+        """Return a snapshot of per-stage timings, rounded for reporting."""
+        with self._lock:
+            return {
+                stage: {
+                    key: round(value, 3) if isinstance(value, float) else value
+                    for key, value in entry.items()
+                }
+                for stage, entry in self._stats.items()
+            }
@@ -1,16 +1,21 @@
 """SRT subtitle generation from pipeline audio scripts and durations.
 
 Generates per-segment and combined SRT files by splitting audio_script text
-into sentences and distributing timing proportionally by word count.
+into sentences.  When the TTS stage left a timing sidecar next to the audio
+(``segment_N_audio.timing.json``) its measured per-sentence spans are used;
+otherwise timing is distributed proportionally by word count.
 """
 
 from __future__ import annotations
 
+import json
 import logging
 import os
 import re
 import subprocess
+import wave
 from dataclasses import dataclass
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -131,14 +136,123 @@ def _probe_audio_duration(audio_path: str) -> float:
     return 0.0
 
 
+# ── Timing sidecar ────────────────────────────────────────────────────
+
+TIMING_SIDECAR_VERSION = 1
+
+
+def timing_sidecar_path(audio_path: str) -> str:
+    """Return the sidecar path for *audio_path* (``foo.wav`` -> ``foo.timing.json``)."""
+    return os.path.splitext(audio_path)[0] + ".timing.json"
+
+
+def write_timing_sidecar(
+    audio_path: str,
+    duration: float,
+    spans: list[tuple[str, float, float]],
+    source: str,
+) -> Optional[str]:
+    """Persist per-sentence ``(text, start, end)`` spans for *audio_path*.
+
+    Returns the sidecar path, or None if it could not be written.
+    """
+    path = timing_sidecar_path(audio_path)
+    payload = {
+        "version": TIMING_SIDECAR_VERSION,
+        "duration": round(duration, 3),
+        "source": source,
+        "sentences": [
+            {"text": text, "start": round(start, 3), "end": round(end, 3)}
+            for text, start, end in spans
+        ],
+    }
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+    except OSError as exc:
+        logger.warning("Could not write timing sidecar %s: %s", path, exc)
+        return None
+    return path
+
+
+def load_timing_sidecar(audio_path: str) -> Optional[dict]:
+    """Load the timing sidecar for *audio_path*, or None if absent/invalid."""
+    if not audio_path:
+        return None
+    path = timing_sidecar_path(audio_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable timing sidecar %s: %s", path, exc)
+        return None
+    if not isinstance(data, dict) or data.get("version") != TIMING_SIDECAR_VERSION:
+        return None
+    # A sidecar older than its audio describes a previous take.
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(audio_path):
+            return None
+    except OSError:
+        return None
+    return data
+
+
+def read_audio_duration(audio_path: str) -> float:
+    """Return the duration of *audio_path* without spawning a subprocess.
+
+    Prefers the timing sidecar, then the WAV header.  Returns 0.0 when
+    neither is available (e.g. a compressed container).
+    """
+    sidecar = load_timing_sidecar(audio_path)
+    if sidecar and float(sidecar.get("duration") or 0.0) > 0:
+        return float(sidecar["duration"])
+    if not audio_path or not os.path.isfile(audio_path):
+        return 0.0
+    try:
+        with wave.open(audio_path, "rb") as wav:
+            rate = wav.getframerate()
+            return wav.getnframes() / rate if rate > 0 else 0.0
+    except (wave.Error, EOFError, OSError):
+        return 0.0
+
+
+def _entries_from_sidecar(
+    sidecar: dict,
+    audio_script: str,
+    duration: float,
+    offset: float,
+    start_index: int,
+) -> Optional[list[SrtEntry]]:
+    """Build SRT entries from measured spans, or None if they don't fit the script."""
+    spans = sidecar.get("sentences") or []
+    sentences = split_into_sentences(audio_script)
+    if not sentences or [s.get("text") for s in spans] != sentences:
+        return None
+    # Rescale in case the stored duration differs slightly from the sidecar's.
+    scale = duration / float(sidecar.get("duration") or duration)
+    return [
+        SrtEntry(
+            index=start_index + i,
+            start=offset + float(span["start"]) * scale,
+            end=offset + float(span["end"]) * scale,
+            text=span["text"],
+        )
+        for i, span in enumerate(spans)
+    ]
+
+
 def generate_combined_srt(
     segments: list[dict],
     tts_results: dict[int, dict],
 ) -> str:
     """Generate a complete SRT string for the full video.
 
-    Iterates segments in order, computes cumulative timing offsets,
-    and re-probes audio duration if the stored value is 0.0.
+    Iterates segments in order and computes cumulative timing offsets.
+    Segments with a timing sidecar use its measured sentence spans.  A stored
+    duration of 0.0 (resumed TTS) is recovered from the sidecar or WAV
+    header; ffprobe is only a last resort for non-WAV audio.
     """
     all_entries: list[SrtEntry] = []
     cumulative_offset = 0.0
@@ -150,9 +264,12 @@ def generate_combined_srt(
         if not tts_r.get("success"):
             continue
 
+        audio_path = tts_r.get("audio_path") or ""
         duration = tts_r.get("duration") or 0.0
         if duration <= 0:
-            duration = _probe_audio_duration(tts_r.get("audio_path", ""))
+            duration = read_audio_duration(audio_path)
+        if duration <= 0:
+            duration = _probe_audio_duration(audio_path)
         if duration <= 0:
             continue
 
@@ -161,11 +278,20 @@ def generate_combined_srt(
             cumulative_offset += duration
             continue
 
-        entries = generate_segment_srt(
-            audio_script, duration,
-            offset=cumulative_offset,
-            start_index=next_index,
-        )
+        entries = None
+        sidecar = load_timing_sidecar(audio_path)
+        if sidecar:
+            entries = _entries_from_sidecar(
+                sidecar, audio_script, duration,
+                offset=cumulative_offset,
+                start_index=next_index,
+            )
+        if entries is None:
+            entries = generate_segment_srt(
+                audio_script, duration,
+                offset=cumulative_offset,
+                start_index=next_index,
+            )
         all_entries.extend(entries)
         if entries:
             next_index = entries[-1].index + 1
@@ -4,16 +4,36 @@ import logging
 import os
 import re
 import subprocess
+import sys
 import tempfile
-from typing import Iterator, Optional, Tuple
+import threading
+import wave
+from array import array
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterator, Optional, Tuple
 
 from google import genai
 from google.genai import types
 
 from agents.config import GEMINI_TTS
+from utils.subtitle_generator import split_into_sentences, write_timing_sidecar
 
 logger = logging.getLogger(__name__)
 
+# Gemini TTS returns raw 16-bit little-endian mono PCM.
+_PCM_SAMPLE_WIDTH = 2
+_PCM_CHANNELS = 1
+
+# Silence detection for the per-sentence timing sidecar.
+_SILENCE_WINDOW_SECONDS = 0.02
+_SILENCE_MIN_GAP_SECONDS = 0.18
+_SILENCE_LEVEL_RATIO = 0.06  # window level below this fraction of the loudest window = silence
+
+@lru_cache(maxsize=1)
+def _get_client() -> genai.Client:
+    """Return one process-wide Gemini client shared by all TTS calls."""
+    return genai.Client()
+
 def _looks_like_container_audio(audio_bytes: bytes) -> bool:
     if audio_bytes.startswith((b"RIFF", b"ID3", b"OggS", b"fLaC")):
         return True
@@ -39,7 +59,27 @@ def _run_ffmpeg(cmd: list[str], timeout: int = 60) -> Tuple[bool, str]:
         return True, ""
     return False, result.stderr or result.stdout
 
+def _read_wav_header(path: str) -> Optional[Tuple[int, int]]:
+    """Return ``(frame_count, sample_rate)`` for a PCM WAV file, or None.
+
+    Reads only the RIFF header via the stdlib ``wave`` module, so WAVs we
+    wrote ourselves can be validated and timed without spawning ffprobe.
+    Returns None for anything ``wave`` cannot parse (compressed or
+    non-WAV containers), letting callers fall back to ffprobe.
+    """
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes(), wav.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
 def _is_valid_audio_file(path: str) -> bool:
+    header = _read_wav_header(path)
+    if header is not None:
+        frames, sample_rate = header
+        return frames > 0 and sample_rate > 0
+
     cmd = [
         "ffprobe",
         "-v",
@@ -73,23 +113,27 @@ def _normalize_to_wav(input_path: str, output_path: str) -> Tuple[bool, str]:
     ]
     return _run_ffmpeg(cmd)
 
-def _wrap_pcm_to_wav(input_path: str, output_path: str, sample_rate: int) -> Tuple[bool, str]:
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-f",
-        "s16le",
-        "-ar",
-        str(sample_rate),
-        "-ac",
-        "1",
-        "-i",
-        input_path,
-        "-c:a",
-        "pcm_s16le",
-        output_path,
-    ]
-    return _run_ffmpeg(cmd)
+def _write_pcm_wav(pcm_bytes: bytes, output_path: str, sample_rate: int) -> Tuple[bool, str]:
+    """Wrap raw s16le mono PCM in a WAV header directly from memory.
+
+    Equivalent to ``ffmpeg -f s16le -ar <rate> -ac 1 -i raw -c:a pcm_s16le``
+    but needs no temp file or subprocess.
+    """
+    if len(pcm_bytes) % _PCM_SAMPLE_WIDTH:
+        # A dangling half-sample cannot be played; drop it rather than fail.
+        pcm_bytes = pcm_bytes[:-1]
+    if not pcm_bytes:
+        return False, "PCM buffer is empty"
+    try:
+        with wave.open(output_path, "wb") as wav:
+            wav.setnchannels(_PCM_CHANNELS)
+            wav.setsampwidth(_PCM_SAMPLE_WIDTH)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm_bytes)
+    except (wave.Error, OSError) as exc:
+        logger.warning("Failed to write WAV %s: %s", output_path, exc)
+        return False, str(exc)
+    return True, ""
 
 def _extract_inline_audio(response) -> Tuple[Optional[bytes], Optional[str]]:
     """Extract and concatenate ALL audio parts from the response.
@@ -118,6 +162,12 @@ def _extract_inline_audio(response) -> Tuple[Optional[bytes], Optional[str]]:
     return b"".join(all_audio_bytes), mime_type
 
 def _get_audio_duration(path: str) -> Optional[float]:
+    header = _read_wav_header(path)
+    if header is not None:
+        frames, sample_rate = header
+        if sample_rate > 0:
+            return frames / sample_rate
+
     cmd = [
         "ffprobe",
         "-v",
@@ -140,6 +190,103 @@ def _get_audio_duration(path: str) -> Optional[float]:
         logger.warning("ffprobe failed for %s: %s", path, e)
     return None
 
+# ── Sentence timing (silence detection) ──────────────────────────────
+
+def _detect_silences(samples: array, sample_rate: int) -> list[Tuple[float, float]]:
+    """Return ``(start, end)`` seconds of interior silent runs in *samples*."""
+    window = max(1, int(sample_rate * _SILENCE_WINDOW_SECONDS))
+    levels: list[float] = []
+    for i in range(0, len(samples), window):
+        chunk = samples[i:i + window]
+        levels.append(sum(map(abs, chunk)) / len(chunk))
+    if not levels:
+        return []
+    threshold = max(levels) * _SILENCE_LEVEL_RATIO
+    min_windows = max(1, int(_SILENCE_MIN_GAP_SECONDS / _SILENCE_WINDOW_SECONDS))
+
+    gaps: list[Tuple[float, float]] = []
+    run_start: Optional[int] = None
+    for idx, level in enumerate(levels + [threshold + 1]):
+        if level <= threshold:
+            if run_start is None:
+                run_start = idx
+            continue
+        if run_start is not None:
+            # Leading/trailing silence is not a sentence boundary.
+            if run_start > 0 and idx < len(levels) and idx - run_start >= min_windows:
+                gaps.append((run_start * window / sample_rate, idx * window / sample_rate))
+            run_start = None
+    return gaps
+
+
+def _align_sentences(
+    sentences: list[str],
+    duration: float,
+    gaps: list[Tuple[float, float]],
+) -> Tuple[list[Tuple[str, float, float]], bool]:
+    """Place sentence boundaries on the silences nearest their expected times.
+
+    Each boundary is first estimated from the remaining word counts, then
+    snapped to the closest unused silence within half a sentence of it.
+    Returns the ``(text, start, end)`` spans and whether any boundary was
+    snapped to a measured silence.
+    """
+    word_counts = [max(1, len(s.split())) for s in sentences]
+    spans: list[Tuple[str, float, float]] = []
+    start = 0.0
+    snapped = False
+    for i, sentence in enumerate(sentences):
+        if i == len(sentences) - 1:
+            spans.append((sentence, start, duration))
+            break
+        remaining_words = sum(word_counts[i:])
+        expected_len = (duration - start) * word_counts[i] / remaining_words
+        expected = start + expected_len
+        candidates = [
+            (abs((g_start + g_end) / 2 - expected), (g_start + g_end) / 2)
+            for g_start, g_end in gaps
+            if (g_start + g_end) / 2 > start
+        ]
+        boundary = expected
+        if candidates:
+            distance, midpoint = min(candidates)
+            if distance <= expected_len / 2:
+                boundary = midpoint
+                snapped = True
+        spans.append((sentence, start, boundary))
+        start = boundary
+    return spans, snapped
+
+
+def _write_sentence_timing(text: str, wav_path: str) -> Optional[str]:
+    """Write a per-sentence timing sidecar for *wav_path*; never raises.
+
+    Reads the PCM back from the WAV we just wrote, so it works for Gemini
+    PCM and normalized gTTS output alike.
+    """
+    sentences = split_into_sentences(text)
+    if not sentences:
+        return None
+    try:
+        with wave.open(wav_path, "rb") as wav:
+            if wav.getsampwidth() != _PCM_SAMPLE_WIDTH or wav.getnchannels() != _PCM_CHANNELS:
+                return None
+            sample_rate = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+        samples = array("h")
+        samples.frombytes(raw[: len(raw) - len(raw) % _PCM_SAMPLE_WIDTH])
+        if sys.byteorder == "big":
+            samples.byteswap()
+        if not samples or sample_rate <= 0:
+            return None
+        duration = len(samples) / sample_rate
+        spans, snapped = _align_sentences(sentences, duration, _detect_silences(samples, sample_rate))
+        return write_timing_sidecar(wav_path, duration, spans, "silence" if snapped else "proportional")
+    except (wave.Error, EOFError, OSError) as exc:
+        logger.warning("Sentence timing failed for %s: %s", wav_path, exc)
+        return None
+
+
 def _gtts_fallback(text: str, output_path: str, original_error: str) -> dict:
     """Attempt gTTS fallback, return final result dict."""
     try:
@@ -154,7 +301,8 @@ def _gtts_fallback(text: str, output_path: str, original_error: str) -> dict:
         if not _is_valid_audio_file(output_path):
             return {"success": False, "audio_path": None, "mime_type": None, "duration": None, "error": f"Primary TTS failed: {original_error}. gTTS fallback produced invalid audio."}
         duration = _get_audio_duration(output_path)
-        return {"success": True, "audio_path": output_path, "mime_type": "audio/mpeg", "duration": duration, "error": f"Primary TTS failed, used gTTS fallback: {original_error}"}
+        timing_path = _write_sentence_timing(text, output_path)
+        return {"success": True, "audio_path": output_path, "mime_type": "audio/mpeg", "duration": duration, "timing_path": timing_path, "error": f"Primary TTS failed, used gTTS fallback: {original_error}"}
     except Exception as fallback_exc:
         return {"success": False, "audio_path": None, "mime_type": None, "duration": None, "error": f"Primary TTS failed: {original_error}. gTTS fallback unavailable/failed: {fallback_exc}"}
 
@@ -166,7 +314,7 @@ def generate_voiceover(text: str, output_path: str) -> Iterator[dict]:
     """
     try:
         yield {"status": "Initializing Gemini TTS client..."}
-        client = genai.Client()
+        client = _get_client()
 
         yield {"status": "Requesting audio generation from LLM..."}
         # L5: Allow model override via env var so callers aren't broken when the
@@ -193,27 +341,27 @@ def generate_voiceover(text: str, output_path: str) -> Iterator[dict]:
             yield {"final": True, "success": False, "audio_path": None, "mime_type": None, "error": "No audio data found in Gemini response."}
             return
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            input_path = os.path.join(temp_dir, "tts_audio_input.bin")
-            with open(input_path, "wb") as f:
-                f.write(audio_bytes)
-
-            yield {"status": f"Normalizing {mime_type or 'unknown'} audio format..."}
-            if mime_type and "audio/pcm" in mime_type.lower():
-                success, error = _wrap_pcm_to_wav(input_path, output_path, _parse_sample_rate(mime_type))
-                if not success:
-                    yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Failed to wrap PCM audio to WAV: {error}"}
-                    return
-            elif _looks_like_container_audio(audio_bytes):
+        yield {"status": f"Normalizing {mime_type or 'unknown'} audio format..."}
+        if mime_type and "audio/pcm" in mime_type.lower():
+            success, error = _write_pcm_wav(audio_bytes, output_path, _parse_sample_rate(mime_type))
+            if not success:
+                yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Failed to wrap PCM audio to WAV: {error}"}
+                return
+        elif _looks_like_container_audio(audio_bytes):
+            # Container formats (mp3/ogg/flac/mp4) still need ffmpeg to decode.
+            with tempfile.TemporaryDirectory() as temp_dir:
+                input_path = os.path.join(temp_dir, "tts_audio_input.bin")
+                with open(input_path, "wb") as f:
+                    f.write(audio_bytes)
                 success, error = _normalize_to_wav(input_path, output_path)
-                if not success:
-                    yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Failed to normalize container audio: {error}"}
-                    return
-            else:
-                success, error = _wrap_pcm_to_wav(input_path, output_path, _parse_sample_rate(mime_type))
-                if not success:
-                    yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Unknown audio format and PCM wrapping failed: {error}"}
-                    return
+            if not success:
+                yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Failed to normalize container audio: {error}"}
+                return
+        else:
+            success, error = _write_pcm_wav(audio_bytes, output_path, _parse_sample_rate(mime_type))
+            if not success:
+                yield {"final": True, "success": False, "audio_path": None, "mime_type": mime_type, "error": f"Unknown audio format and PCM wrapping failed: {error}"}
+                return
 
         yield {"status": "Validating finalized audio file..."}
         if not _is_valid_audio_file(output_path):
@@ -221,8 +369,9 @@ def generate_voiceover(text: str, output_path: str) -> Iterator[dict]:
             return
 
         duration = _get_audio_duration(output_path)
+        timing_path = _write_sentence_timing(text, output_path)
 
-        yield {"final": True, "success": True, "audio_path": output_path, "mime_type": mime_type, "duration": duration, "error": None}
+        yield {"final": True, "success": True, "audio_path": output_path, "mime_type": mime_type, "duration": duration, "timing_path": timing_path, "error": None}
     except Exception as exc:
         gemini_error = str(exc)
         yield {"status": "Gemini TTS failed, falling back to gTTS..."}
@@ -244,7 +393,8 @@ def generate_voiceover(text: str, output_path: str) -> Iterator[dict]:
                 return
 
             duration = _get_audio_duration(output_path)
-            yield {"final": True, "success": True, "audio_path": output_path, "mime_type": "audio/mpeg", "duration": duration, "error": f"Gemini TTS failed, used gTTS fallback: {gemini_error}"}
+            timing_path = _write_sentence_timing(text, output_path)
+            yield {"final": True, "success": True, "audio_path": output_path, "mime_type": "audio/mpeg", "duration": duration, "timing_path": timing_path, "error": f"Gemini TTS failed, used gTTS fallback: {gemini_error}"}
         except Exception as fallback_exc:
             yield {"final": True, "success": False, "audio_path": None, "mime_type": None, "error": f"Gemini TTS failed: {gemini_error}. gTTS fallback unavailable/failed: {fallback_exc}"}
 
@@ -257,7 +407,7 @@ async def generate_voiceover_live(text: str, output_path: str) -> dict:
     Returns the same result dict format as generate_voiceover's final yield.
     """
     try:
-        client = genai.Client()
+        client = _get_client()
         live_model = os.getenv("GEMINI_TTS_LIVE_MODEL", "gemini-3.1-flash-live-preview")
 
         config = types.LiveConnectConfig(
@@ -306,19 +456,16 @@ async def generate_voiceover_live(text: str, output_path: str) -> dict:
 
         pcm_data = b"".join(audio_chunks)
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            raw_path = os.path.join(temp_dir, "live_pcm.bin")
-            with open(raw_path, "wb") as f:
-                f.write(pcm_data)
-            success, error = _wrap_pcm_to_wav(raw_path, output_path, 24000)
-            if not success:
-                return _gtts_fallback(text, output_path, f"PCM-to-WAV conversion failed: {error}")
+        success, error = _write_pcm_wav(pcm_data, output_path, 24000)
+        if not success:
+            return _gtts_fallback(text, output_path, f"PCM-to-WAV conversion failed: {error}")
 
         if not _is_valid_audio_file(output_path):
             return _gtts_fallback(text, output_path, "Live API audio invalid after conversion")
 
         duration = _get_audio_duration(output_path)
-        return {"final": True, "success": True, "audio_path": output_path, "mime_type": "audio/pcm;rate=24000", "duration": duration, "error": None}
+        timing_path = _write_sentence_timing(text, output_path)
+        return {"final": True, "success": True, "audio_path": output_path, "mime_type": "audio/pcm;rate=24000", "duration": duration, "timing_path": timing_path, "error": None}
 
     except Exception as exc:
         return _gtts_fallback(text, output_path, f"Live API error: {exc}")
@@ -349,4 +496,86 @@ async def generate_voiceover_async(text: str, output_path: str) -> dict:
             last = update
         return last
 
-    return await loop.run_in_executor(None, _run_sync)
+    future = loop.run_in_executor(None, _run_sync)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The worker thread cannot be interrupted; stay "running" until the
+        # request returns so the caller's concurrency slot stays held.
+        await asyncio.wait([future])
+        raise
+
+
+# ── Shared background event loop ────────────────────────────────────
+
+class TTSSessionLoop:
+    """A long-lived event loop on a daemon thread that runs TTS coroutines.
+
+    Segment worker threads submit coroutines with :meth:`run` instead of
+    each spinning up its own loop.  An ``asyncio.Semaphore`` owned by the
+    loop caps concurrent TTS sessions (Live-mode WebSockets or batch
+    requests) across the whole process.
+    """
+
+    def __init__(self, max_concurrency: int = 4) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="tts-event-loop", daemon=True,
+        )
+        self._thread.start()
+
+    async def _limited(
+        self,
+        coro_fn: Callable[..., Awaitable[Any]],
+        args: tuple,
+        timeout: float,
+    ) -> Any:
+        # Created lazily so it binds to this loop (required on Python < 3.10).
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        task = asyncio.ensure_future(coro_fn(*args))
+        # The slot is freed when the session actually ends, which for a timed-out
+        # batch request is when its worker thread returns, not when we stop waiting.
+        task.add_done_callback(lambda _: semaphore.release())
+        if timeout <= 0:
+            return await task
+        try:
+            # The timeout covers synthesis only, not time spent queued.
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+            raise
+
+    def run(self, coro_fn: Callable[..., Awaitable[Any]], *args: Any, timeout: float = 0) -> Any:
+        """Run ``coro_fn(*args)`` on the shared loop and block for its result."""
+        future = asyncio.run_coroutine_threadsafe(self._limited(coro_fn, args, timeout), self._loop)
+        return future.result()
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+
+_shared_loop: Optional[TTSSessionLoop] = None
+_shared_loop_lock = threading.Lock()
+
+
+def get_tts_loop() -> TTSSessionLoop:
+    """Return the process-wide :class:`TTSSessionLoop`, starting it on first use.
+
+    Concurrency is read from ``GEMINI_TTS_MAX_CONCURRENCY`` (default 4).
+    """
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            try:
+                limit = int(os.getenv("GEMINI_TTS_MAX_CONCURRENCY", "4"))
+            except ValueError:
+                limit = 4
+            _shared_loop = TTSSessionLoop(max_concurrency=limit)
+        return _shared_loop
@@ -258,6 +258,7 @@ def critique_video(
             max_output_tokens=1024,
             token_counter=token_counter,
             cache_key_parts=("critique",),
+            stage="vision",
         )
         raw = result.text or ""
 
@@ -441,6 +442,7 @@ def verify_transitions(
                 max_output_tokens=512,
                 token_counter=token_counter,
                 cache_key_parts=("critique-transition",),
+                stage="vision",
             )
 
             import json as _json
@@ -8,6 +8,8 @@ content from known reference sites (StackOverflow, GitHub, Manim docs).
 The ``search_web`` function is designed to be registered as a Gemini
 callable tool so the LLM can autonomously look up code examples,
 library APIs, or animation techniques while generating Manim scripts.
+Every HTTP call and assembled result goes through the persistent
+``utils.http_cache`` so repeated queries across projects skip the network.
 """
 
 from __future__ import annotations
@@ -15,10 +17,12 @@ from __future__ import annotations
 import logging
 import os
 import re
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from utils.http_cache import get_http_cache, normalize_query
+
 logger = logging.getLogger(__name__)
 
 _TIMEOUT = 10  # seconds per HTTP request
@@ -40,11 +44,16 @@ def _google_search(query: str, num_results: int = 5) -> list[dict]:
     url = "https://www.googleapis.com/customsearch/v1"
     params = {"key": api_key, "cx": cse_id, "q": query, "num": min(num_results, 10)}
 
+    resp = get_http_cache().get_url(
+        url, params=params, timeout=_TIMEOUT,
+        # Keep the API key out of the on-disk cache key.
+        cache_key=f"google-cse:{cse_id}:{min(num_results, 10)}:{normalize_query(query)}",
+    )
+    if not resp.ok:
+        logger.warning("Google CSE search failed: %s", resp.error)
+        return []
     try:
-        resp = requests.get(url, params=params, timeout=_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-        items = data.get("items", [])
+        items = resp.json().get("items", [])
         return [
             {
                 "title": item.get("title", ""),
@@ -53,54 +62,45 @@ def _google_search(query: str, num_results: int = 5) -> list[dict]:
             }
             for item in items[:num_results]
         ]
-    except requests.RequestException as e:
-        logger.warning("Google CSE search failed: %s", e)
-        return []
-    except (KeyError, ValueError) as e:
+    except (KeyError, ValueError, AttributeError) as e:
         logger.warning("Failed to parse Google CSE response: %s", e)
         return []
 
 
 # ── Lightweight page content fetcher ──────────────────────────────────
 
+_FETCH_FAILED_PREFIX = "[Failed to fetch "
 _STRIP_RE = re.compile(r"<[^>]+>")
 _MULTI_SPACE_RE = re.compile(r"\s{2,}")
 
 
-# Cache fetched page text so the same URL is only downloaded once per
-# process.  This avoids redundant HTTP requests when the LLM tool-calls
-# search_web with overlapping result URLs.
-@lru_cache(maxsize=32)
 def _fetch_page_text(url: str, max_chars: int = 8_000) -> str:
     """Fetch a URL and return a rough plain-text version of the page body."""
-    try:
-        resp = requests.get(
-            url,
-            timeout=_TIMEOUT,
-            headers={"User-Agent": "Paper2Manim-Bot/1.0"},
-        )
-        resp.raise_for_status()
-        text = resp.text
-
-        # Very rough HTML → text (we avoid pulling in BeautifulSoup)
-        # Remove <script> and <style> blocks entirely
-        text = re.sub(r"<script[^>]*>.*?</script>", "", text, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-        text = _STRIP_RE.sub(" ", text)
-        text = _MULTI_SPACE_RE.sub(" ", text).strip()
-
-        return text[:max_chars]
-    except requests.RequestException as exc:
-        logger.warning("Failed to fetch page %s: %s", url, exc)
-        return f"[Failed to fetch {url}: {exc}]"
+    resp = get_http_cache().get_url(
+        url,
+        timeout=_TIMEOUT,
+        headers={"User-Agent": "Paper2Manim-Bot/1.0"},
+    )
+    if not resp.ok:
+        logger.warning("Failed to fetch page %s: %s", url, resp.error)
+        return f"{_FETCH_FAILED_PREFIX}{url}: {resp.error}]"
+    text = resp.text
+
+    # Very rough HTML → text (we avoid pulling in BeautifulSoup)
+    # Remove <script> and <style> blocks entirely
+    text = re.sub(r"<script[^>]*>.*?</script>", "", text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
+    text = _STRIP_RE.sub(" ", text)
+    text = _MULTI_SPACE_RE.sub(" ", text).strip()
+
+    return text[:max_chars]
 
 
 # ── Public tool callable by the LLM ──────────────────────────────────
 
-# Cache full search results so the same query string is not re-executed
-# within a pipeline run.  maxsize=32 covers typical usage where the LLM
-# issues a handful of distinct queries per code-generation session.
-@lru_cache(maxsize=32)
+_DEEP_FETCH_DOMAINS = ("stackoverflow.com", "github.com", "docs.manim.community", "pypi.org")
+
+
 def search_web(query: str) -> str:
     """Search the web for Manim code examples, Python libraries, or animation techniques.
 
@@ -119,12 +119,22 @@ def search_web(query: str) -> str:
         A summary of search results with titles, URLs, and snippets.
         If a result looks highly relevant, its page content is included.
     """
+    # Assembled results are cached by normalised query, so re-phrasings that
+    # differ only in case/spacing are free across runs.
+    cache = get_http_cache()
+    result_key = "search:" + normalize_query(query)
+    cached = cache.get_value(result_key)
+    if isinstance(cached, str):
+        return cached
+
     # Always add "manim" or "python" context to improve results
     enriched_query = query
     if "manim" not in query.lower() and "python" not in query.lower():
         enriched_query = f"python manim {query}"
 
     results = _google_search(enriched_query)
+    # Degraded output (scraped fallback, failed page fetch) is only kept briefly.
+    degraded = not results
 
     if not results:
         # Fallback: search known sites directly
@@ -141,81 +151,91 @@ def search_web(query: str) -> str:
         parts.append(f"    {r['snippet']}")
         parts.append("")
 
-    # Fetch the top 2 most relevant pages for deeper context
-    for r in results[:2]:
-        url = r["link"]
-        if any(
-            domain in url
-            for domain in [
-                "stackoverflow.com",
-                "github.com",
-                "docs.manim.community",
-                "pypi.org",
-            ]
-        ):
+    # Fetch the top 2 most relevant pages for deeper context, concurrently
+    deep_urls = [
+        r["link"] for r in results[:2]
+        if any(domain in r["link"] for domain in _DEEP_FETCH_DOMAINS)
+    ]
+    if deep_urls:
+        with ThreadPoolExecutor(max_workers=len(deep_urls)) as pool:
+            pages = list(pool.map(lambda url: _fetch_page_text(url, max_chars=6_000), deep_urls))
+        for url, page in zip(deep_urls, pages):
+            degraded = degraded or page.startswith(_FETCH_FAILED_PREFIX)
             parts.append(f"\n--- Fetched content from: {url} ---")
-            parts.append(_fetch_page_text(url, max_chars=6_000))
+            parts.append(page)
             parts.append("")
 
     output = "\n".join(parts)
     # Truncate to a reasonable size for prompt context
     if len(output) > 25_000:
         output = output[:25_000] + "\n\n... [truncated]"
+    cache.put_value(result_key, output, ttl_seconds=cache.negative_ttl_seconds if degraded else None)
     return output
 
 
-def _fallback_search(query: str) -> list[dict]:
-    """Search known reference sites when Google CSE is not configured."""
+def _github_code_search(query: str) -> list[dict]:
+    """Unauthenticated GitHub code search (heavily rate-limited, so cached)."""
+    resp = get_http_cache().get_url(
+        f"https://api.github.com/search/code?q={requests.utils.quote(query)}+language:python&per_page=5",
+        timeout=_TIMEOUT,
+        headers={
+            "Accept": "application/vnd.github.v3.text-match+json",
+            "User-Agent": "Paper2Manim-Bot/1.0",
+        },
+    )
+    if not resp.ok:
+        logger.warning("GitHub code search failed: %s", resp.error)
+        return []
     results = []
-
-    # Try GitHub code search via the web (unauthenticated, limited)
     try:
-        gh_url = f"https://api.github.com/search/code?q={requests.utils.quote(query)}+language:python&per_page=5"
-        resp = requests.get(
-            gh_url,
-            timeout=_TIMEOUT,
-            headers={
-                "Accept": "application/vnd.github.v3.text-match+json",
-                "User-Agent": "Paper2Manim-Bot/1.0",
-            },
-        )
-        if resp.ok:
-            for item in resp.json().get("items", [])[:3]:
-                snippet = ""
-                for tm in item.get("text_matches", []):
-                    snippet += tm.get("fragment", "") + " "
-                results.append(
-                    {
-                        "title": item.get("name", ""),
-                        "link": item.get("html_url", ""),
-                        "snippet": snippet.strip()[:300] or item.get("path", ""),
-                    }
-                )
-    except requests.RequestException as e:
-        logger.warning("GitHub code search failed: %s", e)
-    except (KeyError, ValueError) as e:
+        for item in resp.json().get("items", [])[:3]:
+            snippet = ""
+            for tm in item.get("text_matches", []):
+                snippet += tm.get("fragment", "") + " "
+            results.append(
+                {
+                    "title": item.get("name", ""),
+                    "link": item.get("html_url", ""),
+                    "snippet": snippet.strip()[:300] or item.get("path", ""),
+                }
+            )
+    except (KeyError, ValueError, AttributeError) as e:
         logger.warning("Failed to parse GitHub search response: %s", e)
+    return results
+
 
-    # Try StackOverflow tagged search
+def _stackoverflow_search(query: str) -> list[dict]:
+    """StackExchange relevance search on StackOverflow."""
+    resp = get_http_cache().get_url(
+        "https://api.stackexchange.com/2.3/search/advanced"
+        f"?order=desc&sort=relevance&q={requests.utils.quote(query)}"
+        "&site=stackoverflow&pagesize=3&filter=withbody",
+        timeout=_TIMEOUT,
+    )
+    if not resp.ok:
+        logger.warning("StackOverflow search failed: %s", resp.error)
+        return []
+    results = []
     try:
-        so_url = (
-            "https://api.stackexchange.com/2.3/search/advanced"
-            f"?order=desc&sort=relevance&q={requests.utils.quote(query)}"
-            "&site=stackoverflow&pagesize=3&filter=withbody"
-        )
-        resp = requests.get(so_url, timeout=_TIMEOUT)
-        if resp.ok:
-            for item in resp.json().get("items", [])[:3]:
-                results.append(
-                    {
-                        "title": item.get("title", ""),
-                        "link": item.get("link", ""),
-                        "snippet": _STRIP_RE.sub("", item.get("body", ""))[:300],
-                    }
-                )
-    except requests.RequestException as e:
-        logger.warning("StackOverflow search failed: %s", e)
-    except (KeyError, ValueError) as e:
+        for item in resp.json().get("items", [])[:3]:
+            results.append(
+                {
+                    "title": item.get("title", ""),
+                    "link": item.get("link", ""),
+                    "snippet": _STRIP_RE.sub("", item.get("body", ""))[:300],
+                }
+            )
+    except (KeyError, ValueError, AttributeError) as e:
         logger.warning("Failed to parse StackOverflow response: %s", e)
-
     return results
+
+
+def _fallback_search(query: str) -> list[dict]:
+    """Search known reference sites when Google CSE is not configured.
+
+    GitHub and StackOverflow are queried concurrently; GitHub results come first.
+    """
+    sources = (_github_code_search, _stackoverflow_search)
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        batches = list(pool.map(lambda source: source(query), sources))
+    return [result for batch in batches for result in batch]